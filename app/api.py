@@ -0,0 +1,109 @@
+import os
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from app.share.firebase import FirebaseInitializer
+from fastapi.middleware.cors import CORSMiddleware
+from app.share.firebase.domain.config import FirebaseConfigImpl
+
+from app.features.auth import auth_router
+from app.features.workspaces import workspaces_router
+from app.features.meters import meters_router
+from app.features.alerts import alerts_router
+from app.features.users import users_router
+from app.share.depends import get_range_reader, get_workspace_auth_context
+from app.share.users.infra.cached_users_repo_impl import CachedUserRepository
+
+# "ingest" serves everything but the analysis routes, so its workers never
+# load the analysis stack (pandas, matplotlib, fpdf, pydantic-ai)
+APP_PROFILE = os.getenv("APP_PROFILE", "full").lower()
+WITH_ANALYSIS = APP_PROFILE != "ingest"
+
+# Off when the socket ingest runs as its own app (app.ingest)
+WITH_SOCKETIO = os.getenv("SOCKETIO_IN_API", "true").lower() == "true"
+
+if WITH_SOCKETIO:
+    from app.share.socketio import (
+        control_repo,
+        fan_out,
+        ingest_writer,
+        session_keeper,
+        socket_app,
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WITH_SOCKETIO:
+        await session_keeper.start()
+    yield
+    if WITH_SOCKETIO:
+        await session_keeper.stop()
+        await fan_out.stop()
+        # Write the records still queued by the socket ingest
+        await ingest_writer.stop()
+        await control_repo.stop()
+    if WITH_ANALYSIS:
+        from app.features.analysis.presentation.depends import (
+            get_analysis_jobs,
+            get_report_renderer,
+        )
+
+        get_analysis_jobs().stop()
+        get_report_renderer().stop()
+    get_range_reader().stop()
+
+
+app = FastAPI(
+    lifespan=lifespan,
+    # Memoizes the workspace access checks of each request
+    dependencies=[Depends(get_workspace_auth_context)],
+)
+origins = ["*"]
+
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=origins,
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["Content-Disposition"],
+)
+
+if WITH_SOCKETIO:
+    app.mount("/socket.io/", socket_app, name="socketio")
+
+
+if not os.getenv("SKIP_FIREBASE_INIT", "false").lower() == "true":
+    FirebaseInitializer.initialize(FirebaseConfigImpl())
+
+app.include_router(auth_router)
+app.include_router(workspaces_router)
+app.include_router(meters_router)
+app.include_router(alerts_router)
+app.include_router(users_router)
+
+if WITH_ANALYSIS:
+    from app.features.analysis import analysis_router
+
+    app.include_router(analysis_router)
+
+
+@app.get("/")
+def get_index():
+    return {"message": "API"}
+
+
+if WITH_SOCKETIO:
+
+    @app.get("/metrics/ingest")
+    def get_ingest_metrics():
+        return ingest_writer.metrics()
+
+    @app.get("/metrics/fanout")
+    def get_fan_out_metrics():
+        return fan_out.metrics()
+
+
+@app.get("/metrics/users")
+def get_user_cache_metrics():
+    return CachedUserRepository.metrics()
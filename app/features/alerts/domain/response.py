@@ -13,6 +13,7 @@ class ResponseAlerts(ResponseApi):
 
 class NotificationsResponse(ResponseApi):
     notifications: list[NotificationBody | NotificationBodyDatetime]
+    next_cursor: str | None = None
 
 
 class NotificationResponse(ResponseApi):
@@ -11,6 +11,7 @@ from app.features.alerts.domain.model import (
     InfoForSendEmail,
 )
 from app.features.alerts.domain.repo import AlertRepository
+from app.share.messages.infra.alert_rules_impl import AlertRulesRepositoryImpl
 from app.share.parameters.domain.model import Parameter
 from app.share.workspace.domain.model import WorkspaceRoles
 from app.share.workspace.workspace_access import WorkspaceAccess
@@ -50,6 +51,7 @@ class AlertRepositoryImpl(AlertRepository):
         )
 
         alert_ref = db.reference("/alerts").push(new_alert.model_dump())
+        AlertRulesRepositoryImpl.invalidate(alert.meter_id)
 
         return Alert(
             id=alert_ref.key,
@@ -175,6 +177,7 @@ class AlertRepositoryImpl(AlertRepository):
             alert.guests = new_guests
 
         alert_ref.update(alert.model_dump())
+        AlertRulesRepositoryImpl.invalidate(alert_data.meter_id)
 
         return Alert(
             id=alert_id,
@@ -197,6 +200,7 @@ class AlertRepositoryImpl(AlertRepository):
             owner, alert_id, get_ref_alert=True)
 
         alert_ref.delete()
+        AlertRulesRepositoryImpl.invalidate(alert.meter_id)
 
         return alert
 
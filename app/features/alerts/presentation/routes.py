@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from app.features.alerts.domain.model import AlertCreate, AlertUpdate, AlertQueryParams, InfoForSendEmail
 from app.features.alerts.domain.response import ResponseAlert, ResponseAlerts, NotificationsResponse, NotificationResponse, NotificationUpdateResponse
 from app.features.alerts.presentation.depends import (
@@ -45,6 +45,8 @@ async def get_alerts_notifications(
     is_read: bool = None,
     convert_timestamp: bool = False,
     status: NotificationStatus = NotificationStatus.PENDING,
+    cursor: str = None,
+    limit: int = Query(default=None, ge=1, le=500),
     user=Depends(verify_access_token),
     notifications_history_repo: NotificationManagerRepository = Depends(
         get_notifications_history_repo
@@ -52,15 +54,21 @@ async def get_alerts_notifications(
 ) -> NotificationsResponse:
 
     params = QueryNotificationParams(
-        type=type, is_read=is_read, convert_timestamp=convert_timestamp, status=status
+        type=type,
+        is_read=is_read,
+        convert_timestamp=convert_timestamp,
+        status=status,
+        cursor=cursor,
+        limit=limit,
     )
-    notifications = notifications_history_repo.get_history(
+    page = notifications_history_repo.get_history_page(
         user_uid=user.uid, params=params
     )
 
     return NotificationsResponse(
         message="Notifications retrieved successfully",
-        notifications=notifications,
+        notifications=page.notifications,
+        next_cursor=page.next_cursor,
     )
 
 
@@ -0,0 +1,39 @@
+import os
+import tempfile
+
+from app.share.config import Config
+
+
+class AnalysisJobsConfigImpl(Config):
+    def _get_int(self, key: str, default: int) -> int:
+        value = self.get_env(key)
+        return int(value) if value else default
+
+    @property
+    def max_workers(self) -> int:
+        """Processes computing analyses (and jobs running at once)"""
+        return self._get_int("ANALYSIS_WORKERS", os.cpu_count() or 1)
+
+    @property
+    def max_queue(self) -> int:
+        """Jobs waiting for a worker; more are rejected"""
+        return self._get_int("ANALYSIS_QUEUE_SIZE", 100)
+
+    @property
+    def workspace_limit(self) -> int:
+        """Jobs of one workspace running at once"""
+        return self._get_int("ANALYSIS_WORKSPACE_LIMIT", 2)
+
+
+class ReportCacheConfigImpl(Config):
+    @property
+    def directory(self) -> str:
+        """Directory of the rendered charts and PDFs of the reports"""
+        value = self.get_env("REPORT_CACHE_DIR")
+        return value or os.path.join(tempfile.gettempdir(), "water_quality_reports")
+
+    @property
+    def max_bytes(self) -> int:
+        """Disk used by the report cache before old files are removed"""
+        value = self.get_env("REPORT_CACHE_MAX_MB")
+        return int(value or 256) * 1024 * 1024
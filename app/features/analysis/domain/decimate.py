@@ -0,0 +1,112 @@
+"""Reduction of long series to the points a chart can show"""
+
+import numpy as np
+
+
+# Average bucket size below which the points are compared as Python floats;
+# numpy only pays off on larger buckets
+SCALAR_BUCKET_SIZE = 16
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: indices of at most threshold points that
+    keep the shape of the line through (x, y). The first and last points are
+    always kept. x must be increasing and y finite.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Buckets of the points between the first and the last one
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+
+    # Average of each bucket; the last point is a bucket of its own
+    starts = np.append(edges[:-1], n - 1)
+    sizes = np.diff(np.append(starts, n))
+    avg_x = np.add.reduceat(x, starts) / sizes
+    avg_y = np.add.reduceat(y, starts) / sizes
+
+    if n < threshold * SCALAR_BUCKET_SIZE:
+        selected = _select_scalar(
+            x.tolist(), y.tolist(), edges.tolist(), avg_x.tolist(), avg_y.tolist()
+        )
+    else:
+        selected = _select_vector(x, y, edges, avg_x, avg_y)
+
+    return np.array([0, *selected, n - 1], dtype=np.int64)
+
+
+def _select_scalar(x, y, edges, avg_x, avg_y) -> list[int]:
+    """Point of each bucket with the largest triangle, as Python floats"""
+    selected = []
+    a = 0
+
+    for i in range(len(edges) - 1):
+        ax, ay = x[a], y[a]
+        # Average of the next bucket is the third vertex of the triangle
+        cx, cy = avg_x[i + 1], avg_y[i + 1]
+
+        largest = -1.0
+        for j in range(edges[i], edges[i + 1]):
+            area = abs((ax - cx) * (y[j] - ay) - (ax - x[j]) * (cy - ay))
+            if area > largest:
+                largest, a = area, j
+
+        selected.append(a)
+
+    return selected
+
+
+def _select_vector(x, y, edges, avg_x, avg_y) -> list[int]:
+    """Point of each bucket with the largest triangle, a bucket at a time"""
+    selected = []
+    a = 0
+
+    for i in range(len(edges) - 1):
+        start, end = edges[i], edges[i + 1]
+
+        area = np.abs(
+            (x[a] - avg_x[i + 1]) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y[i + 1] - y[a])
+        )
+        a = start + int(area.argmax())
+        selected.append(a)
+
+    return selected
+
+
+def decimate_series(values: np.ndarray, threshold: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Positions and values of a series with gaps (NaN) reduced to about
+    threshold points. Each run between gaps is reduced on its own, by its
+    share of the points, and the runs stay separated by a NaN.
+    """
+    n = len(values)
+    finite = np.isfinite(values)
+    if n <= threshold:
+        return np.arange(n), values
+    if not finite.any():
+        return np.arange(0), values[:0]
+
+    # Start and end (exclusive) of the runs of finite values
+    changes = np.diff(finite.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(changes == 1)
+    ends = np.flatnonzero(changes == -1)
+    total = finite.sum()
+
+    positions = []
+    for start, end in zip(starts, ends):
+        size = end - start
+        run_x = np.arange(start, end, dtype=np.float64)
+        keep = lttb(run_x, values[start:end], max(3, threshold * size // total))
+
+        if positions:
+            # A NaN point keeps the line broken between runs
+            positions.append(np.array([start - 0.5]))
+        positions.append(run_x[keep])
+
+    x = np.concatenate(positions)
+    index = x.astype(np.int64)
+    y = np.where(x == index, values[index], np.nan)
+    return x, y
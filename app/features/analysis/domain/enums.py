@@ -19,8 +19,23 @@ class AnalysisEnum(str, Enum):
     CORRELATION = "correlation"
 
 
+class AverageMode(str, Enum):
+    # Rollup buckets plus the raw records at the edges of the range
+    AGGREGATES = "aggregates"
+    # Every raw record, read page by page in constant memory
+    STREAMING = "streaming"
+
+
 class AnalysisStatus(str, Enum):
     CREATING = "creating"
     UPDATING = "updating"
     SAVED = "saved"
     ERROR = "error"
+
+
+class AnalysisJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    ERROR = "error"
+    CANCELLED = "cancelled"
@@ -0,0 +1,143 @@
+"""
+Array to result model conversion.
+
+The values come from DataFrames the analysis already computed, so the
+result models are built with model_construct instead of validating every
+label and value again.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from app.features.analysis.domain.enums import PeriodEnum
+from app.features.analysis.domain.models.average import (
+    AvgPeriodAllResult,
+    AvgPeriodResult,
+    AvgResult,
+    AvgSensor,
+    AvgValues,
+    Period,
+)
+from app.features.analysis.domain.models.prediction import (
+    PredData,
+    PredictionData,
+    PredictionInterval,
+    PredictionResult,
+    PredictionResultAll,
+    PredInterval,
+)
+from app.share.meter_records.domain.enums import SensorType
+
+
+def nullable(values: np.ndarray | pd.Series) -> list[float | None]:
+    """Values as floats, with NaN and infinities as None"""
+    values = np.asarray(values, dtype=np.float64)
+    missing = ~np.isfinite(values)
+
+    if not missing.any():
+        return values.tolist()
+
+    result = values.astype(object)
+    result[missing] = None
+    return result.tolist()
+
+
+def datetime_labels(index: pd.DatetimeIndex) -> list[datetime]:
+    return index.to_pydatetime().tolist()
+
+
+def avg_period_result(
+    df: pd.DataFrame, sensor_type: SensorType, period: Period, period_type: PeriodEnum
+) -> AvgPeriodResult:
+    """Averages of one sensor, df indexed by period"""
+    return AvgPeriodResult.model_construct(
+        sensor=sensor_type.value,
+        period=period,
+        period_type=period_type,
+        averages=[
+            AvgResult.model_construct(date=date, value=value)
+            for date, value in zip(
+                datetime_labels(df.index), nullable(df[sensor_type.value])
+            )
+        ],
+    )
+
+
+def avg_period_all_result(
+    df: pd.DataFrame, period: Period, period_type: PeriodEnum
+) -> AvgPeriodAllResult:
+    """Averages of every sensor, df indexed by period"""
+    labels = datetime_labels(df.index)
+
+    return AvgPeriodAllResult.model_construct(
+        period=period,
+        period_type=period_type,
+        results=AvgSensor.model_construct(
+            **{
+                name: AvgValues.model_construct(
+                    labels=labels, values=nullable(df[name])
+                )
+                for name in AvgSensor.model_fields
+            }
+        ),
+    )
+
+
+def prediction_data(
+    labels: list[str], sensors: list[SensorType], columns: np.ndarray
+) -> PredictionData:
+    """One column of `columns` per sensor"""
+    return PredictionData.model_construct(
+        labels=labels,
+        **{sensor.value: nullable(columns[:, i]) for i, sensor in enumerate(sensors)},
+    )
+
+
+def prediction_all_result(
+    sensors: list[SensorType],
+    labels: list[str],
+    values: np.ndarray,
+    pred_labels: list[str],
+    predicted: np.ndarray,
+    interval: tuple[float, np.ndarray, np.ndarray] | None = None,
+) -> PredictionResultAll:
+    """interval is (confidence, lower, upper) of the predicted values"""
+    return PredictionResultAll.model_construct(
+        data=prediction_data(labels, sensors, values),
+        pred=prediction_data(pred_labels, sensors, predicted),
+        interval=(
+            PredictionInterval.model_construct(
+                confidence=interval[0],
+                lower=prediction_data(pred_labels, sensors, interval[1]),
+                upper=prediction_data(pred_labels, sensors, interval[2]),
+            )
+            if interval is not None
+            else None
+        ),
+    )
+
+
+def prediction_result(
+    sensor_type: SensorType,
+    labels: list[str],
+    values: np.ndarray,
+    pred_labels: list[str],
+    predicted: np.ndarray,
+    interval: tuple[float, np.ndarray, np.ndarray] | None = None,
+) -> PredictionResult:
+    return PredictionResult.model_construct(
+        sensor=sensor_type,
+        data=PredData.model_construct(labels=labels, values=nullable(values)),
+        pred=PredData.model_construct(labels=pred_labels, values=nullable(predicted)),
+        interval=(
+            PredInterval.model_construct(
+                confidence=interval[0],
+                lower=nullable(interval[1]),
+                upper=nullable(interval[2]),
+            )
+            if interval is not None
+            else None
+        ),
+    )
@@ -1,7 +1,7 @@
 from datetime import datetime
 from pydantic import BaseModel
 
-from app.features.analysis.domain.enums import PeriodEnum
+from app.features.analysis.domain.enums import AverageMode, PeriodEnum
 from app.share.meter_records.domain.enums import SensorType
 
 
@@ -14,6 +14,7 @@ class AverageStats(BaseModel):
     average: float
     min: float
     max: float
+    std: float | None = None
 
 
 class AverageStatsSensor(AverageStats):
@@ -68,5 +69,9 @@ class AverageRange(BaseModel):
     sensor_type: SensorType | None = None
 
 
+class AverageParam(AverageRange):
+    mode: AverageMode = AverageMode.AGGREGATES
+
+
 class AvgPeriodParam(AverageRange):
     period_type: PeriodEnum = PeriodEnum.DAYS
@@ -0,0 +1,17 @@
+from datetime import datetime
+from pydantic import BaseModel
+
+from app.features.analysis.domain.enums import AnalysisJobStatus
+
+
+class AnalysisJob(BaseModel):
+    analysis_id: str
+    workspace_id: str
+    status: AnalysisJobStatus
+    position: int | None = None
+    queued_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    wait_seconds: float | None = None
+    run_seconds: float | None = None
+    error: str | None = None
@@ -18,9 +18,18 @@ class PredictionData(BaseModel):
     turbidity: list[float | None]
 
 
+class PredictionInterval(BaseModel):
+    """Confidence interval of each predicted value"""
+
+    confidence: float
+    lower: PredictionData
+    upper: PredictionData
+
+
 class PredictionResultAll(BaseModel):
     data: PredictionData
     pred: PredictionData
+    interval: PredictionInterval | None = None
 
 
 class PredData(BaseModel):
@@ -28,7 +37,16 @@ class PredData(BaseModel):
     values: list[float | None]
 
 
+class PredInterval(BaseModel):
+    """Confidence interval of each predicted value"""
+
+    confidence: float
+    lower: list[float | None]
+    upper: list[float | None]
+
+
 class PredictionResult(BaseModel):
     sensor: SensorType
     data: PredData
     pred: PredData
+    interval: PredInterval | None = None
@@ -0,0 +1,85 @@
+import math
+from statistics import NormalDist
+
+import numpy as np
+
+
+def t_critical(dof: np.ndarray, confidence: float) -> np.ndarray:
+    """
+    Two-sided critical value of Student's t for each degrees of freedom.
+
+    Exact for 1 and 2 degrees of freedom and the Cornish-Fisher expansion
+    (Abramowitz & Stegun 26.7.5) from 3 on, so no scipy is needed. NaN where
+    dof < 1.
+    """
+    dof = np.asarray(dof, dtype=np.float64)
+    p = 0.5 + confidence / 2
+    z = NormalDist().inv_cdf(p)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        g1 = (z**3 + z) / 4
+        g2 = (5 * z**5 + 16 * z**3 + 3 * z) / 96
+        g3 = (3 * z**7 + 19 * z**5 + 17 * z**3 - 15 * z) / 384
+        g4 = (79 * z**9 + 776 * z**7 + 1482 * z**5 - 1920 * z**3 - 945 * z) / 92160
+        t = z + g1 / dof + g2 / dof**2 + g3 / dof**3 + g4 / dof**4
+
+    t = np.where(dof == 1, math.tan(math.pi * (p - 0.5)), t)
+    t = np.where(dof == 2, (2 * p - 1) / math.sqrt(2 * p * (1 - p)), t)
+    return np.where(dof >= 1, t, np.nan)
+
+
+class LinearTrend:
+    """
+    Least squares line y = intercept + slope * x fitted to every column of Y
+    at once, each column with its own NaN mask.
+
+    predicted, lower and upper have one row per x_future and one column per
+    column of Y; lower and upper bound the confidence interval of the mean.
+    """
+
+    def __init__(
+        self,
+        x: np.ndarray,
+        Y: np.ndarray,
+        x_future: np.ndarray,
+        confidence: float = 0.95,
+    ):
+        x = np.asarray(x, dtype=np.float64)
+        Y = np.asarray(Y, dtype=np.float64)
+        x_future = np.asarray(x_future, dtype=np.float64)
+        if Y.ndim == 1:
+            Y = Y[:, None]
+
+        mask = ~np.isnan(Y)
+        W = mask.astype(np.float64)
+        Y0 = np.where(mask, Y, 0.0)
+
+        # Closed form of the normal equations of [1, x], one per column
+        n = W.sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_mean = (x @ W) / n
+            y_mean = Y0.sum(axis=0) / n
+
+            dx = x[:, None] - x_mean
+            sxx = (W * dx * dx).sum(axis=0)
+            sxy = (W * dx * (Y0 - y_mean)).sum(axis=0)
+
+            # A single distinct x gives a flat line, as LinearRegression did
+            slope = np.where(sxx > 0, sxy / sxx, 0.0)
+            intercept = y_mean - slope * x_mean
+
+            residuals = W * (Y0 - (intercept + slope * x[:, None]))
+            dof = n - 2
+            s = np.sqrt((residuals * residuals).sum(axis=0) / dof)
+
+            fx = x_future[:, None]
+            se = s * np.sqrt(1 / n + (fx - x_mean) ** 2 / sxx)
+            margin = t_critical(dof, confidence) * se
+            margin = np.where(np.isfinite(margin), margin, np.nan)
+
+        self.slope: np.ndarray = np.where(n > 0, slope, np.nan)
+        self.intercept: np.ndarray = np.where(n > 0, intercept, np.nan)
+        self.confidence = confidence
+        self.predicted: np.ndarray = self.intercept + self.slope * fx
+        self.lower: np.ndarray = self.predicted - margin
+        self.upper: np.ndarray = self.predicted + margin
@@ -0,0 +1,38 @@
+import hashlib
+from abc import ABC, abstractmethod
+
+
+def content_key(*parts: str) -> str:
+    """Key of a cached file from everything its content depends on"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ReportCacheRepository(ABC):
+    """
+    Rendered files of the reports of saved analyses (chart images and
+    PDFs). An analysis does not change between updates, so its files are
+    kept until it is updated or deleted.
+    """
+
+    @abstractmethod
+    def get(self, analysis_id: str, version: str, key: str) -> bytes | None:
+        """
+        Args:
+            analysis_id: Analysis the file belongs to
+            version: updated_at of the analysis the file was rendered from
+            key: content_key of what the file was rendered from
+        """
+        pass
+
+    @abstractmethod
+    def put(self, analysis_id: str, version: str, key: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def invalidate(self, analysis_id: str) -> None:
+        """Drop every file of the analysis"""
+        pass
@@ -1,25 +1,12 @@
 from abc import ABC, abstractmethod
-from typing import TypeVar, Generic, Any
+from typing import Callable, TypeVar, Generic, Any
+
+from pydantic import BaseModel
 
 from app.features.analysis.domain.enums import AnalysisEnum, AnalysisStatus
-from app.features.analysis.domain.models.average import (
-    AverageResult,
-    AverageResultAll,
-    AvgPeriodAllResult,
-    AvgPeriodParam,
-    AverageRange,
-    AvgPeriodResult,
-)
-from app.features.analysis.domain.models.correlation import (
-    CorrelationParams,
-    CorrelationResult,
-)
-from app.features.analysis.domain.models.prediction import (
-    PredictionParam,
-    PredictionResult,
-    PredictionResultAll,
-)
-from app.share.meter_records.domain.model import SensorIdentifier
+from app.features.analysis.domain.models.job import AnalysisJob
+from app.features.analysis.domain.state import AnalysisState
+from app.share.meter_records.domain.model import RecordWatermark, SensorIdentifier
 
 
 T = TypeVar("T")
@@ -28,29 +15,91 @@ T = TypeVar("T")
 class AnalysisRepository(ABC):
 
     @abstractmethod
-    def generate_average(
-        self, identifier: SensorIdentifier, average_range: AverageRange
-    ) -> AverageResult | AverageResultAll:
+    def load_state(
+        self,
+        identifier: SensorIdentifier,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        since: int | None = None,
+    ) -> AnalysisState:
+        """
+        Aggregates and watermark of the records in the range of params.
+
+        Args:
+            identifier: Sensor identifier
+            analysis_type: Analysis the aggregates are for
+            params: Analysis parameters
+            since: Only read records with a key >= since (the tail after a
+                stored watermark)
+
+        Returns:
+            AnalysisState grouped by state_granularity
+        """
         pass
 
     @abstractmethod
-    def generate_average_period(
-        self, identifier: SensorIdentifier, average_period: AvgPeriodParam
-    ) -> AvgPeriodAllResult | AvgPeriodResult:
+    def is_stale(
+        self,
+        identifier: SensorIdentifier,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        watermark: RecordWatermark,
+    ) -> bool:
+        """
+        Whether records were stored (or deleted) behind a watermark of
+        load_state, such as late or backfilled readings. Only the span of
+        the rollups is counted again, mostly from their buckets; records
+        older than the rollups are not read.
+        """
         pass
 
     @abstractmethod
-    def generate_prediction(
-        self, identifier: SensorIdentifier, prediction_param: PredictionParam
-    ) -> PredictionResult | PredictionResultAll:
+    def generate_from_state(
+        self,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        state: AnalysisState,
+    ) -> BaseModel:
+        """Compute the analysis result from its aggregates, without reading records"""
         pass
 
+
+class AnalysisJobRepository(ABC):
+
     @abstractmethod
-    def generate_correlation(
-        self,
-        identifier: SensorIdentifier,
-        correlation_params: CorrelationParams,
-    ) -> CorrelationResult:
+    def submit(
+        self, analysis_id: str, workspace_id: str, fn: Callable, /, **kwargs
+    ) -> AnalysisJob:
+        """
+        Queue fn(**kwargs) as the job of an analysis. While a job of the same
+        analysis with the same arguments is queued or running it is returned
+        instead of a new one; with other arguments it is replaced, so the
+        last submitted arguments are the ones stored.
+        """
+        pass
+
+    @abstractmethod
+    def compute(self, fn: Callable[..., T], *args) -> T:
+        """
+        Run fn(*args) in a worker process and wait for its result; fn and
+        its arguments must be picklable. Called from a running job.
+        """
+        pass
+
+    @abstractmethod
+    def get(self, analysis_id: str) -> AnalysisJob | None:
+        pass
+
+    @abstractmethod
+    def cancel(self, analysis_id: str) -> bool:
+        """
+        Cancel a queued job, or a running one before it stores its result.
+        False when there is no job in progress.
+        """
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
         pass
 
 
@@ -132,6 +181,34 @@ class AnalysisResultRepository(ABC, Generic[T]):
         """
         pass
 
+    @abstractmethod
+    def get_job(self, user_id: str, analysis_id: str) -> AnalysisJob | None:
+        """
+        Get the job generating an analysis (queue position and timings)
+
+        Args:
+            user_id: User ID requesting the job
+            analysis_id: ID of the analysis
+
+        Returns:
+            AnalysisJob or None if the analysis has no job
+        """
+        pass
+
+    @abstractmethod
+    def cancel_analysis(self, user_id: str, analysis_id: str) -> bool:
+        """
+        Cancel the job generating an analysis
+
+        Args:
+            user_id: User ID cancelling the job
+            analysis_id: ID of the analysis
+
+        Returns:
+            bool: True if there was a job in progress to cancel
+        """
+        pass
+
     @abstractmethod
     def delete_analysis(self, user_id: str, analysis_id: str) -> bool:
         """
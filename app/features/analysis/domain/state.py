@@ -0,0 +1,87 @@
+from typing import Any
+
+from app.features.analysis.domain.enums import AnalysisEnum, PeriodEnum
+from app.share.meter_records.domain.columns import AggregateColumns
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.model import RecordWatermark
+from app.share.meter_records.domain.rollup import RollupGranularity
+
+
+def state_granularity(
+    analysis_type: AnalysisEnum, params: dict[str, Any]
+) -> RollupGranularity | None:
+    """
+    Buckets an analysis keeps its aggregates in: one total for the average,
+    days or months (years are resampled from months) for the rest.
+    """
+    if analysis_type == AnalysisEnum.AVERAGE:
+        return None
+
+    if PeriodEnum(params.get("period_type") or PeriodEnum.DAYS) == PeriodEnum.DAYS:
+        return RollupGranularity.DAY
+
+    return RollupGranularity.MONTH
+
+
+class AnalysisState:
+    """
+    Aggregates an analysis result was computed from, grouped by
+    state_granularity, and the watermark of the raw data they cover.
+    """
+
+    def __init__(
+        self,
+        aggregates: AggregateColumns,
+        watermark: RecordWatermark,
+        granularity: RollupGranularity | None,
+    ):
+        self.aggregates = aggregates
+        self.watermark = watermark
+        self.granularity = granularity
+
+    def merge(self, tail: "AnalysisState") -> "AnalysisState":
+        """Add the aggregates of records newer than the watermark."""
+        if tail.watermark.last_key is None:
+            return self
+
+        sensors = list(self.aggregates.stats.keys())
+        aggregates = AggregateColumns.concat([self.aggregates, tail.aggregates], sensors)
+
+        # Counts from different rollup starts do not add up; without one the
+        # next update computes the state again
+        rollup_since = self.watermark.rollup_since
+        if tail.watermark.rollup_since != rollup_since:
+            rollup_since = None
+
+        return AnalysisState(
+            aggregates=aggregates.group(self.granularity),
+            watermark=RecordWatermark(
+                last_key=tail.watermark.last_key,
+                count=self.watermark.count + tail.watermark.count,
+                rollup_since=rollup_since,
+                rollup_count=(
+                    self.watermark.rollup_count + tail.watermark.rollup_count
+                    if rollup_since is not None
+                    else 0
+                ),
+            ),
+            granularity=self.granularity,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "granularity": self.granularity.value if self.granularity else None,
+            "sensors": [sensor.value for sensor in self.aggregates.stats.keys()],
+            "buckets": self.aggregates.to_buckets(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, watermark: RecordWatermark) -> "AnalysisState":
+        granularity = data.get("granularity")
+        sensors = [SensorType(sensor) for sensor in data.get("sensors") or []]
+
+        return cls(
+            aggregates=AggregateColumns.from_buckets(data.get("buckets"), sensors),
+            watermark=watermark,
+            granularity=RollupGranularity(granularity) if granularity else None,
+        )
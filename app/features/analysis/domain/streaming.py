@@ -0,0 +1,89 @@
+import numpy as np
+
+from app.share.meter_records.domain.columns import AggregateColumns, RecordColumns
+from app.share.meter_records.domain.enums import SensorType
+
+
+class RunningStats:
+    """
+    Count, mean, min, max and sum of squared deviations (m2) of each sensor,
+    updated one chunk of records at a time so a range of any size is
+    summarized in constant memory.
+
+    Chunks are merged with the parallel form of Welford's algorithm (Chan et
+    al.), so the variance does not lose precision the way sum_sq - sum²/n
+    does for large counts.
+    """
+
+    def __init__(self, sensors: list[SensorType]):
+        self.sensors = list(sensors)
+        size = len(self.sensors)
+
+        self.count = np.zeros(size, dtype=np.float64)
+        self.mean = np.zeros(size, dtype=np.float64)
+        self.m2 = np.zeros(size, dtype=np.float64)
+        self.min = np.full(size, np.nan, dtype=np.float64)
+        self.max = np.full(size, np.nan, dtype=np.float64)
+
+        self.records = 0
+        self.first_key: int | None = None
+        self.last_key: int | None = None
+
+    def update(self, columns: RecordColumns) -> None:
+        if not len(columns):
+            return
+
+        values = np.column_stack([columns.values[sensor] for sensor in self.sensors])
+        present = ~np.isnan(values)
+        count = present.sum(axis=0).astype(np.float64)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            mean = np.where(count > 0, np.where(present, values, 0.0).sum(axis=0) / count, 0.0)
+            deviation = np.where(present, values - mean, 0.0)
+            m2 = (deviation * deviation).sum(axis=0)
+
+            total = self.count + count
+            weight = np.where(total > 0, count / total, 0.0)
+
+        delta = mean - self.mean
+        self.mean = self.mean + delta * weight
+        self.m2 = self.m2 + m2 + delta * delta * self.count * weight
+        self.count = total
+
+        self.min = np.fmin(self.min, np.fmin.reduce(values, axis=0))
+        self.max = np.fmax(self.max, np.fmax.reduce(values, axis=0))
+
+        self.records += int(present.any(axis=1).sum())
+        first, last = int(columns.timestamps.min()), int(columns.timestamps.max())
+        self.first_key = first if self.first_key is None else min(self.first_key, first)
+        self.last_key = last if self.last_key is None else max(self.last_key, last)
+
+    def average(self) -> np.ndarray:
+        return np.where(self.count > 0, self.mean, np.nan)
+
+    def variance(self) -> np.ndarray:
+        """Population variance, NaN for sensors without values"""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.count > 0, self.m2 / self.count, np.nan)
+
+    def to_aggregates(self) -> AggregateColumns:
+        """A single aggregate row at the first key, as AggregateColumns.group(None)"""
+        if self.first_key is None:
+            return AggregateColumns.empty(self.sensors)
+
+        total = self.mean * self.count
+
+        return AggregateColumns(
+            timestamps=np.array([self.first_key], dtype=np.int64),
+            stats={
+                sensor: {
+                    "count": self.count[i : i + 1],
+                    "sum": total[i : i + 1],
+                    "sum_sq": (self.m2 + total * self.mean)[i : i + 1],
+                    "m2": self.m2[i : i + 1],
+                    "min": self.min[i : i + 1],
+                    "max": self.max[i : i + 1],
+                }
+                for i, sensor in enumerate(self.sensors)
+            },
+        )
@@ -1,22 +1,19 @@
-import math
 import numpy as np
 import pandas as pd
 from typing import Any
-from datetime import date, datetime, timedelta
-from sklearn.linear_model import LinearRegression
-from app.features.analysis.domain.enums import PeriodEnum
-from app.features.analysis.domain.interface import IPredictResult
+from datetime import datetime
+from pydantic import BaseModel
+from app.features.analysis.domain import marshal
+from app.features.analysis.domain.enums import AnalysisEnum, AverageMode, PeriodEnum
 from app.features.analysis.domain.models.average import (
     AverageResultAll,
     AverageStatsSensor,
     AvgPeriodParam,
+    AverageParam,
     AverageRange,
     AverageResult,
     AvgPeriodAllResult,
     AvgPeriodResult,
-    AvgResult,
-    AvgSensor,
-    AvgValues,
     Period,
 )
 from app.features.analysis.domain.models.correlation import (
@@ -24,580 +21,480 @@ from app.features.analysis.domain.models.correlation import (
     CorrelationResult,
 )
 from app.features.analysis.domain.models.prediction import (
-    PredData,
-    PredictionData,
     PredictionParam,
     PredictionResult,
     PredictionResultAll,
 )
+from app.features.analysis.domain.regression import LinearTrend
 from app.features.analysis.domain.repository import AnalysisRepository
+from app.features.analysis.domain.state import AnalysisState, state_granularity
+from app.features.analysis.domain.streaming import RunningStats
 
+from app.share.meter_records.domain.columns import AggregateColumns, RecordColumns
 from app.share.meter_records.domain.enums import SensorType
-from app.share.meter_records.domain.model import SensorIdentifier, SensorQueryParams
+from app.share.meter_records.domain.model import (
+    RecordWatermark,
+    SensorIdentifier,
+    SensorQueryParams,
+)
 from app.share.meter_records.domain.repository import (
     MeterRecordsRepository,
 )
+from app.share.meter_records.domain.rollup import RollupGranularity
 
 
-class AnalysisAverage(AnalysisRepository):
-    def __init__(self, record_repo: MeterRecordsRepository):
-        self.record_repo: MeterRecordsRepository = record_repo
-
-    def _get_df(
-        self, identifier: SensorIdentifier, params: SensorQueryParams, by_datetime=False
-    ):
-        records = self.record_repo.query_records(identifier=identifier, params=params)
-
-        rows = []
-        sensor_type = params.sensor_type
-
-        if sensor_type == SensorType.COLOR:
-            raise ValueError("El análisis de color no está soportado")
-
-        for ts, sensors in records.items():
-            row = {"timestamp": int(ts)}
-            if sensor_type is not None:
-                sensor_record = getattr(sensors, sensor_type.value)
-                row[sensor_type.value] = sensor_record.value if sensor_record else None
-
-            else:
-                for st in SensorType:
-                    if st == SensorType.COLOR:
-                        continue
-                    sensor_record = getattr(sensors, st.value)
-                    row[st.value] = sensor_record.value if sensor_record else None
+# Confidence level of the prediction intervals
+PREDICTION_CONFIDENCE = 0.95
 
-            rows.append(row)
+# Records per Firebase query of the streaming average
+STREAM_CHUNK_SIZE = 5000
 
-        df = pd.DataFrame(rows)
 
-        if by_datetime:
+def compute_analysis(
+    analysis_type: AnalysisEnum, params: dict[str, Any], state: AnalysisState
+) -> dict[str, Any]:
+    """
+    generate_from_state for a worker process: needs no records repository
+    and returns the result already serialized.
+    """
+    result = AnalysisAverage(record_repo=None).generate_from_state(
+        analysis_type, params, state
+    )
+    return result.model_dump(mode="json")
 
-            df["datetime"] = pd.to_datetime(df["timestamp"], unit="s")
 
-        return df
+class AnalysisAverage(AnalysisRepository):
+    def __init__(self, record_repo: MeterRecordsRepository):
+        self.record_repo: MeterRecordsRepository = record_repo
 
-    def _get_df_period(
+    def _period_df(
         self,
-        identifier: SensorIdentifier,
-        params: SensorQueryParams,
+        aggregates: AggregateColumns,
         period_type: PeriodEnum = PeriodEnum.DAYS,
-    ):
-
-        df = (
-            self._get_df(identifier=identifier, params=params, by_datetime=True)
-            .set_index("datetime")
-            .sort_index()
+        period_start: bool = False,
+    ) -> pd.DataFrame:
+        index = pd.to_datetime(aggregates.timestamps, unit="s")
+        sums = pd.DataFrame(
+            {sensor.value: stats["sum"] for sensor, stats in aggregates.stats.items()},
+            index=index,
+        )
+        counts = pd.DataFrame(
+            {sensor.value: stats["count"] for sensor, stats in aggregates.stats.items()},
+            index=index,
         )
 
-        avg: pd.DataFrame
-
+        rule: str
         if period_type == PeriodEnum.YEARS:
-            avg = df.resample("YE").mean()
+            rule = "YS" if period_start else "YE"
         elif period_type == PeriodEnum.MONTHS:
-            avg = df.resample("ME").mean()
+            rule = "MS" if period_start else "ME"
         else:
-            avg = df.resample("D").mean()
+            rule = "D"
 
-        return avg
+        sums = sums.resample(rule).sum()
+        counts = counts.resample(rule).sum()
 
-    def generate_average(
-        self, identifier: SensorIdentifier, average_range: AverageRange
-    ) -> AverageResult | AverageResultAll:
-
-        df = self._get_df(
-            identifier=identifier,
-            params=SensorQueryParams(
-                start_date=average_range.start_date,
-                end_date=average_range.end_date,
-                sensor_type=average_range.sensor_type,
-                ignore_limit=True,
-            ),
-        )
+        avg: pd.DataFrame = sums / counts.where(counts > 0)
+        avg.index.name = "datetime"
 
-        sensor_type = average_range.sensor_type
-
-        if sensor_type == SensorType.COLOR:
-            raise ValueError("Sensor de color no esta implementado")
-
-        if sensor_type is not None:
-
-            average = df[sensor_type.value].mean()
-            min = df[sensor_type.value].min()
-            max = df[sensor_type.value].max()
-
-            return AverageResult(
-                sensor=sensor_type,
-                period={
-                    "start_date": average_range.start_date,
-                    "end_date": average_range.end_date,
-                },
-                stats={"average": average, "min": min, "max": max},
-            )
-
-        result_all = AverageResultAll(
-            period=Period(
-                start_date=average_range.start_date,
-                end_date=average_range.end_date,
-            ),
-            result=[],
-        )
-
-        for sensor_name in SensorType:
-            if sensor_name == SensorType.COLOR:
-                continue
-
-            s_df = df[sensor_name]
-
-            average = s_df.mean()
-            min = s_df.min()
-            max = s_df.max()
+        return avg
 
-            result_all.result.append(
-                AverageStatsSensor(
-                    sensor=sensor_name, average=average, min=min, max=max
-                )
-            )
+    def _stream_stats(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        sensors: list[SensorType],
+    ) -> RunningStats:
+        """Statistics of the raw records, read one page at a time"""
+        stats = RunningStats(sensors)
 
-        return result_all
+        for chunk in self.record_repo.export_records(
+            identifier, params, chunk_size=STREAM_CHUNK_SIZE
+        ):
+            stats.update(RecordColumns.from_snapshot(chunk, sensors))
 
-    def _safe_value(self, v):
-        if v is None or (isinstance(v, float) and math.isnan(v)):
-            return None
-        try:
-            return float(v)
-        except (ValueError, TypeError):
-            return None
+        return stats
 
-    def generate_average_period(
-        self, identifier: SensorIdentifier, average_period: AvgPeriodParam
+    def _average_period_result(
+        self, df: pd.DataFrame, average_period: AvgPeriodParam
     ) -> AvgPeriodAllResult | AvgPeriodResult:
-
-        df = self._get_df_period(
-            identifier=identifier,
-            params=SensorQueryParams(
-                start_date=average_period.start_date,
-                end_date=average_period.end_date,
-                sensor_type=average_period.sensor_type,
-                ignore_limit=True,
-            ),
-            period_type=average_period.period_type,
-        )
-
         sensor_type = average_period.sensor_type
 
         if sensor_type == SensorType.COLOR:
             raise ValueError("Sensor de color no esta implementado")
 
-        if sensor_type is not None:
-            averages: list[AvgResult] = []
-
-            values_chart = []
-
-            for index, row in df.iterrows():
-                value = self._safe_value(row[sensor_type])
-                values_chart.append(value)
-                averages.append(AvgResult(date=index, value=value))
-
-            return AvgPeriodResult(
-                sensor=sensor_type,
-                period=Period(
-                    start_date=average_period.start_date,
-                    end_date=average_period.end_date,
-                ),
-                period_type=average_period.period_type,
-                averages=averages,
-            )
-
-        result_avg = AvgSensor(
-            conductivity=AvgValues(
-                labels=[],
-                values=[],
-            ),
-            ph=AvgValues(
-                labels=[],
-                values=[],
-            ),
-            tds=AvgValues(
-                labels=[],
-                values=[],
-            ),
-            temperature=AvgValues(
-                labels=[],
-                values=[],
-            ),
-            turbidity=AvgValues(
-                labels=[],
-                values=[],
-            ),
+        period = Period(
+            start_date=average_period.start_date,
+            end_date=average_period.end_date,
         )
 
-        labels = df.index.to_list()
-        for s_type in SensorType:
-            if s_type == SensorType.COLOR:
-                continue
+        if sensor_type is not None:
+            return marshal.avg_period_result(
+                df, sensor_type, period, average_period.period_type
+            )
 
-            sensor_name = s_type.value
-            avg_values_model = getattr(result_avg, sensor_name)
+        return marshal.avg_period_all_result(df, period, average_period.period_type)
 
-            avg_values_model.labels = labels
+    def _prediction_axis(
+        self, dates: pd.Series, period_type: PeriodEnum, ahead: int
+    ) -> tuple[list[str], np.ndarray, list[str], np.ndarray]:
+        """
+        Labels and regression x of the periods with data (one row per
+        period, at least one) and of the next `ahead` periods.
+        """
+        if period_type == PeriodEnum.MONTHS:
+            periods = dates.dt.to_period("M")
+            future = [periods.iloc[-1] + i for i in range(1, ahead + 1)]
+
+            # Months are numbered by position, skipping those without data
+            x = np.arange(len(periods), dtype=np.float64)
+            x_future = np.arange(len(periods), len(periods) + ahead, dtype=np.float64)
+
+            return (
+                periods.astype(str).tolist(),
+                x,
+                [str(p) for p in future],
+                x_future,
+            )
 
-            values_list = [self._safe_value(v) for v in df[sensor_name].to_list()]
-            avg_values_model.values = values_list
+        if period_type == PeriodEnum.YEARS:
+            years = dates.dt.year.to_numpy(dtype=np.int64)
+            first = years.min()
+            future = np.arange(years.max() + 1, years.max() + ahead + 1)
+
+            return (
+                [str(year) for year in years.tolist()],
+                (years - first).astype(np.float64),
+                [str(year) for year in future.tolist()],
+                (future - first).astype(np.float64),
+            )
 
-            print(avg_values_model)
+        days = dates.dt.normalize()
+        first = days.min()
+        future = pd.date_range(days.max(), periods=ahead + 1, freq="D")[1:]
 
-        return AvgPeriodAllResult(
-            period=Period(
-                start_date=average_period.start_date,
-                end_date=average_period.end_date,
-            ),
-            period_type=average_period.period_type,
-            results=result_avg,
+        return (
+            days.dt.strftime("%Y-%m-%d").tolist(),
+            (days - first).dt.days.to_numpy(dtype=np.float64),
+            future.strftime("%Y-%m-%d").tolist(),
+            (future - first).days.to_numpy(dtype=np.float64),
         )
 
-    def _predict_by_sensor(
-        self,
-        serie: pd.Series,
-        X: np.ndarray[tuple[int, int], np.dtype[Any]],
-        X_future: np.ndarray[tuple[int, int], np.dtype[Any]],
-    ) -> np.ndarray[Any, np.dtype[Any]]:
-        model = LinearRegression()
-        model.fit(X, serie)
-
-        return model.predict(X_future)
-
-    def _predict_daily(
-        self, df: pd.DataFrame, days_ahead=10, sensor: SensorType = None
-    ) -> IPredictResult:
-        """Predict values for the next N days"""
-        column_group = PeriodEnum.DAYS.value
-        df[column_group] = df["datetime"].dt.date
-
-        agg_param: dict[str, str] = {"datetime": "first"}
+    def _prediction_result(
+        self, df: pd.DataFrame, prediction_param: PredictionParam
+    ) -> PredictionResult | PredictionResultAll:
+        """
+        Linear trend of every sensor, fitted at once (NaN skipped per sensor),
+        with its confidence interval for the predicted periods
+        """
+        sensor_type = prediction_param.sensor_type
 
-        if sensor == SensorType.COLOR:
+        if sensor_type == SensorType.COLOR:
             raise ValueError("No hay implementación para el sensor de color")
 
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                agg_param[sensor_type.lower()] = "mean"
-
-        else:
-            agg_param[sensor.lower()] = "mean"
-
-        # Group by day
-        daily_data = df.groupby(column_group).agg(agg_param).reset_index()
-
-        # Create numeric temporary variable
-        daily_data["day_num"] = (
-            daily_data["datetime"] - daily_data["datetime"].min()
-        ).dt.days
-
-        # Regression models
-        X = daily_data["day_num"].values.reshape(-1, 1)
+        sensors = (
+            [sensor_type]
+            if sensor_type is not None
+            else [sensor for sensor in SensorType if sensor != SensorType.COLOR]
+        )
 
-        # Generate future dates
-        last_date = daily_data["datetime"].max()
-        future_dates: list[pd.Timestamp] = [
-            last_date + timedelta(days=i) for i in range(1, days_ahead + 1)
-        ]
-        future_day_nums = [
-            (date - daily_data["datetime"].min()).days for date in future_dates
-        ]
+        if df.empty:
+            raise ValueError("No hay datos en el rango para la predicción")
 
-        # Predictions
-        X_future = np.array(future_day_nums).reshape(-1, 1)
+        labels, x, pred_labels, x_future = self._prediction_axis(
+            df["datetime"], prediction_param.period_type, prediction_param.ahead
+        )
 
-        rows: dict[str, np.ndarray | None] = {
-            column_group: [d.date() for d in future_dates]
-        }
+        values = df[[sensor.value for sensor in sensors]].to_numpy(dtype=np.float64)
+        trend = LinearTrend(x, values, x_future, confidence=PREDICTION_CONFIDENCE)
 
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                rows[sensor_type.lower()] = self._predict_by_sensor(
-                    serie=daily_data[sensor_type.lower()], X=X, X_future=X_future
-                )
-        else:
-            rows[sensor.lower()] = self._predict_by_sensor(
-                serie=daily_data[sensor.lower()], X=X, X_future=X_future
+        if sensor_type is not None:
+            return marshal.prediction_result(
+                sensor_type,
+                labels,
+                values[:, 0],
+                pred_labels,
+                trend.predicted[:, 0],
+                interval=(trend.confidence, trend.lower[:, 0], trend.upper[:, 0]),
             )
 
-        predictions_df = pd.DataFrame(rows)
-
-        return IPredictResult(data=daily_data, pred=predictions_df)
-
-    def _predict_monthly(
-        self, df: pd.DataFrame, months_ahead=10, sensor: SensorType = None
-    ) -> IPredictResult:
-        """Predict average values for the next N months"""
-
-        agg_param: dict[str, str] = {"datetime": "first"}
+        return marshal.prediction_all_result(
+            sensors,
+            labels,
+            values,
+            pred_labels,
+            trend.predicted,
+            interval=(trend.confidence, trend.lower, trend.upper),
+        )
 
-        column_group = PeriodEnum.MONTHS.value
+    def _validate_correlation(self, correlation_params: CorrelationParams):
+        # Validar lista de sensores
+        if not correlation_params.sensors or len(correlation_params.sensors) < 2:
+            raise ValueError("Se requieren al menos 2 sensores para correlación")
 
-        if sensor == SensorType.COLOR:
-            raise ValueError("No hay implementación para el sensor de color")
+        if SensorType.COLOR in correlation_params.sensors:
+            raise ValueError("El sensor de color no es soportado en correlación")
 
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                agg_param[sensor_type.lower()] = "mean"
+    def _correlation_result(
+        self, df: pd.DataFrame, correlation_params: CorrelationParams
+    ) -> CorrelationResult:
+        sensor_names = [
+            s.value for s in correlation_params.sensors if s != SensorType.COLOR
+        ]
 
-        else:
-            agg_param[sensor.lower()] = "mean"
-
-        # Group by month
-        df[column_group] = df["datetime"].dt.to_period("M")
-        monthly_data = df.groupby(column_group).agg(agg_param).reset_index()
-
-        # Create numeric temporary variable
-        monthly_data["month_num"] = range(len(monthly_data))
-
-        # Regression models
-        X = monthly_data["month_num"].values.reshape(-1, 1)
-
-        # Generate future months
-        last_period = monthly_data[column_group].max()
-        future_periods = [last_period + i for i in range(1, months_ahead + 1)]
-        future_month_nums = range(len(monthly_data), len(monthly_data) + months_ahead)
-
-        # Predictions
-        X_future = np.array(future_month_nums).reshape(-1, 1)
-        rows: dict[str, np.ndarray | None] = {
-            column_group: [str(p) for p in future_periods]
-        }
-
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                rows[sensor_type.lower()] = self._predict_by_sensor(
-                    serie=monthly_data[sensor_type.lower()], X=X, X_future=X_future
-                )
-        else:
-            rows[sensor.lower()] = self._predict_by_sensor(
-                serie=monthly_data[sensor.lower()], X=X, X_future=X_future
-            )
+        df = df[sensor_names]
+        # Calcular matriz de correlación
+        method = correlation_params.method.value
+        corr_matrix = df.corr(method=method)
 
-        predictions_df = pd.DataFrame(rows)
+        # Convertir a lista para JSON
+        matrix_values = corr_matrix.values.tolist()
+        sensor_labels = list(corr_matrix.columns)
 
-        return IPredictResult(data=monthly_data, pred=predictions_df)
+        # Construir resultado
+        return CorrelationResult(
+            method=method,
+            sensors=sensor_labels,
+            matrix=matrix_values,
+        )
 
-    def _predict_yearly(
-        self, df: pd.DataFrame, years_ahead=10, sensor: SensorType = None
-    ) -> IPredictResult:
-        """Predict average values for the next N years"""
+    def _average_result(
+        self, aggregates: AggregateColumns, average_range: AverageRange
+    ) -> AverageResult | AverageResultAll:
+        """Statistics of the whole range, from the sums of the aggregates"""
+        totals = aggregates.group(None)
+
+        stats: dict[SensorType, dict[str, float]] = {}
+        for sensor, fields in totals.stats.items():
+            count = fields["count"][0] if len(totals) else 0.0
+            if count <= 0:
+                stats[sensor] = {
+                    "average": np.nan,
+                    "min": np.nan,
+                    "max": np.nan,
+                    "std": np.nan,
+                }
+                continue
 
-        column_group = PeriodEnum.YEARS.value
+            stats[sensor] = {
+                "average": fields["sum"][0] / count,
+                "min": fields["min"][0],
+                "max": fields["max"][0],
+                "std": np.sqrt(fields["m2"][0] / count),
+            }
 
-        df[column_group] = df["datetime"].dt.year
+        return self._average_stats_result(stats, average_range)
 
-        agg_param: dict[str, str] = {"datetime": "first"}
+    def _average_stats_result(
+        self, stats: dict[SensorType, dict[str, float]], average_range: AverageRange
+    ) -> AverageResult | AverageResultAll:
+        sensor_type = average_range.sensor_type
+        period = Period(
+            start_date=average_range.start_date,
+            end_date=average_range.end_date,
+        )
 
-        if sensor == SensorType.COLOR:
-            raise ValueError("No hay implementación para el sensor de color")
+        if sensor_type is not None:
+            return AverageResult(sensor=sensor_type, period=period, stats=stats[sensor_type])
+
+        return AverageResultAll(
+            period=period,
+            result=[
+                AverageStatsSensor(sensor=sensor, **sensor_stats)
+                for sensor, sensor_stats in stats.items()
+            ],
+        )
 
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                agg_param[sensor_type.lower()] = "mean"
+    def _params_model(self, analysis_type: AnalysisEnum, params: dict[str, Any]):
+        if analysis_type == AnalysisEnum.AVERAGE:
+            return AverageParam(**params)
+        if analysis_type == AnalysisEnum.AVERAGE_PERIOD:
+            return AvgPeriodParam(**params)
+        if analysis_type == AnalysisEnum.PREDICTION:
+            return PredictionParam(**params)
+        if analysis_type == AnalysisEnum.CORRELATION:
+            correlation_params = CorrelationParams(**params)
+            self._validate_correlation(correlation_params)
+            return correlation_params
+
+        raise ValueError(f"Unsupported analysis type: {analysis_type}")
+
+    def _date_str(self, timestamp: int) -> str:
+        """Inverse of the record repository date parsing (local time)"""
+        return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+    def _timestamp(self, date_str: str | None) -> int | None:
+        """Record repository date parsing (local time)"""
+        if not date_str:
+            return None
+        return int(datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S").timestamp())
 
+    def _state_sensors(self, analysis_type: AnalysisEnum, model) -> list[SensorType]:
+        if analysis_type == AnalysisEnum.CORRELATION:
+            sensors = list(model.sensors)
+        elif model.sensor_type is not None:
+            sensors = [model.sensor_type]
         else:
-            agg_param[sensor.lower()] = "mean"
-
-        # Group by year
-        yearly_data = df.groupby(column_group).agg(agg_param).reset_index()
+            sensors = [sensor for sensor in SensorType if sensor != SensorType.COLOR]
 
-        # Create numeric temporary variable
-        yearly_data["year_num"] = (
-            yearly_data[column_group] - yearly_data[column_group].min()
-        )
-
-        # Regression models
-        X = yearly_data["year_num"].values.reshape(-1, 1)
+        if SensorType.COLOR in sensors:
+            raise ValueError("El análisis de color no está soportado")
 
-        # Generate future years
-        last_year = yearly_data[column_group].max()
-        future_years = [last_year + i for i in range(1, years_ahead + 1)]
-        future_year_nums = [
-            (year - yearly_data[column_group].min()) for year in future_years
-        ]
+        return sensors
 
-        # Predictions
-        X_future = np.array(future_year_nums).reshape(-1, 1)
-        rows: dict[str, np.ndarray | None] = {column_group: future_years}
+    def load_state(
+        self,
+        identifier: SensorIdentifier,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        since: int | None = None,
+    ) -> AnalysisState:
+        model = self._params_model(analysis_type, params)
+        granularity = state_granularity(analysis_type, params)
+        sensors = self._state_sensors(analysis_type, model)
+
+        start_date = model.start_date if since is None else self._date_str(since)
+
+        # The newest key is read first, so records stored while the
+        # aggregates are read are left for the next update
+        last_key = self.record_repo.get_last_key(
+            identifier,
+            SensorQueryParams(start_date=start_date, end_date=model.end_date),
+        )
 
-        if sensor is None:
-            for sensor_type in SensorType:
-                if sensor_type == SensorType.COLOR:
-                    continue
-                rows[sensor_type.lower()] = self._predict_by_sensor(
-                    serie=yearly_data[sensor_type.lower()], X=X, X_future=X_future
-                )
-        else:
-            rows[sensor.lower()] = self._predict_by_sensor(
-                serie=yearly_data[sensor.lower()], X=X, X_future=X_future
+        if last_key is None:
+            return AnalysisState(
+                aggregates=AggregateColumns.empty(sensors),
+                watermark=RecordWatermark(),
+                granularity=granularity,
             )
 
-        predictions_df = pd.DataFrame(rows)
+        coverage = self.record_repo.get_rollup_coverage(identifier)
+        rollup_since = coverage.since if coverage is not None else None
 
-        return IPredictResult(data=yearly_data, pred=predictions_df)
+        if analysis_type == AnalysisEnum.AVERAGE and model.mode == AverageMode.STREAMING:
+            stats = self._stream_stats(
+                identifier,
+                SensorQueryParams(
+                    start_date=start_date, end_date=self._date_str(last_key)
+                ),
+                sensors,
+            )
+            rollup_count = 0
+            if rollup_since is not None:
+                rollup_count = self._count_records(
+                    identifier, start_date, rollup_since, last_key, granularity, sensors
+                )
 
-    def _date_validate(self, value: Any) -> str:
-        if isinstance(value, (pd.Period, int)):
-            return str(value)
-        elif isinstance(value, (float, np.float64)):
-            return str(int(value))
-        elif isinstance(value, (datetime, date)):
-            return str(value)
-        elif isinstance(value, str):
-            return value
-        return ""
+            return AnalysisState(
+                aggregates=stats.to_aggregates(),
+                watermark=RecordWatermark(
+                    last_key=last_key,
+                    count=stats.records,
+                    rollup_since=rollup_since,
+                    rollup_count=rollup_count,
+                ),
+                granularity=granularity,
+            )
 
-    def generate_prediction(
-        self, identifier: SensorIdentifier, prediction_param: PredictionParam
-    ) -> PredictionResult | PredictionResultAll:
-        df = self._get_df(
+        aggregates = self.record_repo.query_aggregates(
             identifier=identifier,
             params=SensorQueryParams(
-                start_date=prediction_param.start_date,
-                end_date=prediction_param.end_date,
-                sensor_type=prediction_param.sensor_type,
+                start_date=start_date,
+                end_date=self._date_str(last_key),
                 ignore_limit=True,
             ),
-            by_datetime=True,
+            max_granularity=granularity or RollupGranularity.MONTH,
+            sensors=sensors,
         )
-        period_type = prediction_param.period_type
-        pred_r: IPredictResult
-
-        if period_type == PeriodEnum.MONTHS:
-
-            pred_r = self._predict_monthly(
-                df=df,
-                months_ahead=prediction_param.ahead,
-                sensor=prediction_param.sensor_type,
-            )
-        elif period_type == PeriodEnum.YEARS:
-            pred_r = self._predict_yearly(
-                df=df,
-                years_ahead=prediction_param.ahead,
-                sensor=prediction_param.sensor_type,
-            )
-        else:
-            pred_r = self._predict_daily(
-                df=df,
-                days_ahead=prediction_param.ahead,
-                sensor=prediction_param.sensor_type,
-            )
-
-        period_type_str = period_type.value
-
-        if prediction_param.sensor_type is not None:
-            data_labels: list = []
-            data_values: list = []
-            for index, row in pred_r.data.iterrows():
-                data_labels.append(self._date_validate(row[period_type_str]))
-                data_values.append(
-                    self._safe_value(row[prediction_param.sensor_type.value])
-                )
-            pred_labels: list = []
-            pred_values: list = []
-            for index, row in pred_r.pred.iterrows():
-                pred_labels.append(self._date_validate(row[period_type_str]))
-                pred_values.append(
-                    self._safe_value(row[prediction_param.sensor_type.value])
-                )
 
-            return PredictionResult(
-                sensor=prediction_param.sensor_type.value,
-                data=PredData(labels=data_labels, values=data_values),
-                pred=PredData(labels=pred_labels, values=pred_values),
-            )
-
-        all_data: PredictionData = PredictionData(
-            labels=[], conductivity=[], ph=[], temperature=[], tds=[], turbidity=[]
-        )
-        all_pred: PredictionData = PredictionData(
-            labels=[], conductivity=[], ph=[], temperature=[], tds=[], turbidity=[]
+        return AnalysisState(
+            aggregates=aggregates.group(granularity),
+            watermark=RecordWatermark(
+                last_key=last_key,
+                count=aggregates.record_count(),
+                rollup_since=rollup_since,
+                rollup_count=(
+                    aggregates.record_count(since=rollup_since)
+                    if rollup_since is not None
+                    else 0
+                ),
+            ),
+            granularity=granularity,
         )
 
-        for index, row in pred_r.data.iterrows():
-
-            all_data.labels.append(self._date_validate(row[period_type_str]))
-            all_data.conductivity.append(
-                self._safe_value(row[SensorType.CONDUCTIVITY.value])
-            )
-            all_data.ph.append(self._safe_value(row[SensorType.PH.value]))
-            all_data.temperature.append(
-                self._safe_value(row[SensorType.TEMPERATURE.value])
-            )
-            all_data.tds.append(self._safe_value(row[SensorType.TDS.value]))
-            all_data.turbidity.append(self._safe_value(row[SensorType.TURBIDITY.value]))
-
-        for index, row in pred_r.pred.iterrows():
-
-            all_pred.labels.append(self._date_validate(row[period_type_str]))
-            all_pred.conductivity.append(
-                self._safe_value(row[SensorType.CONDUCTIVITY.value])
-            )
-            all_pred.ph.append(self._safe_value(row[SensorType.PH.value]))
-            all_pred.temperature.append(
-                self._safe_value(row[SensorType.TEMPERATURE.value])
-            )
-            all_pred.tds.append(self._safe_value(row[SensorType.TDS.value]))
-            all_pred.turbidity.append(self._safe_value(row[SensorType.TURBIDITY.value]))
-
-        return PredictionResultAll(data=all_data, pred=all_pred)
-
-    def generate_correlation(
+    def _count_records(
         self,
         identifier: SensorIdentifier,
-        correlation_params: CorrelationParams,
-    ) -> CorrelationResult:
-        """
-        Genera la matriz de correlación entre sensores seleccionados.
-        """
-        # Validar lista de sensores
-        if not correlation_params.sensors or len(correlation_params.sensors) < 2:
-            raise ValueError("Se requieren al menos 2 sensores para correlación")
-
-        if SensorType.COLOR in correlation_params.sensors:
-            raise ValueError("El sensor de color no es soportado en correlación")
-
-        # Obtener el DataFrame filtrado
-        df = self._get_df_period(
+        start_date: str | None,
+        since: int,
+        until: int,
+        granularity: RollupGranularity | None,
+        sensors: list[SensorType],
+    ) -> int:
+        """Records from start_date on with a key in [since, until]"""
+        start = self._timestamp(start_date)
+
+        aggregates = self.record_repo.query_aggregates(
             identifier=identifier,
             params=SensorQueryParams(
-                start_date=correlation_params.start_date,
-                end_date=correlation_params.end_date,
+                start_date=self._date_str(max(since, start or since)),
+                end_date=self._date_str(until),
                 ignore_limit=True,
             ),
-            period_type=correlation_params.period_type,
+            max_granularity=granularity or RollupGranularity.MONTH,
+            sensors=sensors,
         )
+        return aggregates.record_count()
 
-        sensor_names = [
-            s.value for s in correlation_params.sensors if s != SensorType.COLOR
-        ]
+    def is_stale(
+        self,
+        identifier: SensorIdentifier,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        watermark: RecordWatermark,
+    ) -> bool:
+        coverage = self.record_repo.get_rollup_coverage(identifier)
+        since = coverage.since if coverage is not None else None
+
+        if since != watermark.rollup_since:
+            # Rollups started or backfilled after the watermark
+            return True
+        if since is None:
+            # Without rollups, checking would read every record again
+            return False
+
+        model = self._params_model(analysis_type, params)
+        count = self._count_records(
+            identifier,
+            model.start_date,
+            since,
+            watermark.last_key,
+            state_granularity(analysis_type, params),
+            self._state_sensors(analysis_type, model),
+        )
+        return count != watermark.rollup_count
 
-        df = df[sensor_names]
-        # Calcular matriz de correlación
-        method = correlation_params.method.value
-        corr_matrix = df.corr(method=method)
+    def generate_from_state(
+        self,
+        analysis_type: AnalysisEnum,
+        params: dict[str, Any],
+        state: AnalysisState,
+    ) -> BaseModel:
+        model = self._params_model(analysis_type, params)
+
+        if analysis_type == AnalysisEnum.AVERAGE:
+            return self._average_result(state.aggregates, model)
+
+        if analysis_type == AnalysisEnum.PREDICTION:
+            df = self._period_df(
+                state.aggregates, model.period_type, period_start=True
+            )
+            return self._prediction_result(df.dropna(how="all").reset_index(), model)
 
-        # Convertir a lista para JSON
-        matrix_values = corr_matrix.values.tolist()
-        sensor_labels = list(corr_matrix.columns)
+        df = self._period_df(state.aggregates, model.period_type)
 
-        # Construir resultado
-        return CorrelationResult(
-            method=method,
-            sensors=sensor_labels,
-            matrix=matrix_values,
-        )
+        if analysis_type == AnalysisEnum.CORRELATION:
+            return self._correlation_result(df, model)
+
+        return self._average_period_result(df, model)
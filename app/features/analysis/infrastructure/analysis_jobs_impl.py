@@ -0,0 +1,290 @@
+import json
+import multiprocessing
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from typing import Any, Callable, TypeVar
+
+from fastapi import HTTPException
+from pydantic import BaseModel
+
+from app.features.analysis.domain.enums import AnalysisJobStatus
+from app.features.analysis.domain.models.job import AnalysisJob
+from app.features.analysis.domain.repository import AnalysisJobRepository
+
+T = TypeVar("T")
+
+# Loaded once by the fork server, so each worker starts with pandas imported
+_COMPUTE_MODULE = "app.features.analysis.infrastructure.analysis_impl"
+
+
+def _normalize(value: Any) -> Any:
+    """Value as stored in Firebase: enum values, models as dicts, no nulls"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, BaseModel):
+        return _normalize(value.model_dump())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(item) for item in value]
+    return value
+
+
+def _job_key(kwargs: dict) -> str:
+    """Key of the arguments of a job; jobs with the same key are the same work"""
+    return json.dumps(_normalize(kwargs), sort_keys=True, default=str)
+
+
+class _Job:
+    def __init__(self, analysis_id: str, workspace_id: str, fn: Callable, kwargs: dict):
+        self.analysis_id = analysis_id
+        self.workspace_id = workspace_id
+        self.fn = fn
+        self.kwargs = kwargs
+        self.key = _job_key(kwargs)
+        self.status = AnalysisJobStatus.QUEUED
+        self.queued_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+        self.error: str | None = None
+        self.cancelled = False
+        self.future: Future | None = None
+
+
+class AnalysisJobExecutorImpl(AnalysisJobRepository):
+    """
+    Jobs run in threads (Firebase reads and writes) and hand their CPU-bound
+    part to a process pool through compute, so pandas and the model fitting
+    don't hold the GIL of the API process.
+
+    At most max_workers jobs run at once, and at most workspace_limit of a
+    single workspace; the rest wait in a FIFO queue of max_queue jobs.
+
+    A job submitted again with other arguments while the previous one is
+    in progress replaces it: a queued job takes the new arguments, a
+    running one is cancelled (it stops before storing its result) and the
+    new job starts once it has finished.
+    """
+
+    # Finished jobs kept for the status endpoint
+    history_size: int = 1000
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 100, workspace_limit: int = 2):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.workspace_limit = workspace_limit
+
+        self._lock = threading.Lock()
+        self._queue: deque[_Job] = deque()
+        self._jobs: OrderedDict[str, _Job] = OrderedDict()
+        self._running: dict[str, int] = {}
+        self._running_count = 0
+        # Analyses with a running job, so a replacement waits for it
+        self._running_ids: set[str] = set()
+        self._local = threading.local()
+
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="analysis-job"
+        )
+        self._processes: ProcessPoolExecutor | None = None
+
+    def _get_processes(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._processes is None:
+                # Forking a process with running threads can deadlock the
+                # child. Workers are forked from a fork server that only
+                # loads the analysis code (importing the app package builds
+                # no app), or spawned where there is none
+                if "forkserver" in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context("forkserver")
+                    context.set_forkserver_preload([_COMPUTE_MODULE])
+                else:
+                    context = multiprocessing.get_context("spawn")
+
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=context
+                )
+            return self._processes
+
+    def submit(
+        self, analysis_id: str, workspace_id: str, fn: Callable, /, **kwargs
+    ) -> AnalysisJob:
+        with self._lock:
+            current = self._jobs.get(analysis_id)
+            if (
+                current is not None
+                and not current.cancelled
+                and current.status
+                in (AnalysisJobStatus.QUEUED, AnalysisJobStatus.RUNNING)
+            ):
+                if current.key == _job_key(kwargs):
+                    return self._to_model(current)
+
+                if current.status == AnalysisJobStatus.QUEUED:
+                    current.fn, current.kwargs = fn, kwargs
+                    current.key = _job_key(kwargs)
+                    return self._to_model(current)
+
+                # The running job would store a result of the old arguments
+                current.cancelled = True
+                if current.future is not None:
+                    current.future.cancel()
+
+            if len(self._queue) >= self.max_queue:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Hay demasiados análisis en proceso, intente más tarde",
+                )
+
+            job = _Job(analysis_id, workspace_id, fn, kwargs)
+            self._jobs[analysis_id] = job
+            self._jobs.move_to_end(analysis_id)
+            self._queue.append(job)
+            self._trim_history()
+
+            self._dispatch()
+            return self._to_model(job)
+
+    def _dispatch(self) -> None:
+        """Start queued jobs while there are free workers. Holds the lock."""
+        for job in list(self._queue):
+            if self._running_count >= self.max_workers:
+                return
+
+            if self._running.get(job.workspace_id, 0) >= self.workspace_limit:
+                continue
+
+            if job.analysis_id in self._running_ids:
+                continue
+
+            self._queue.remove(job)
+            job.status = AnalysisJobStatus.RUNNING
+            job.started_at = time.time()
+            self._running[job.workspace_id] = self._running.get(job.workspace_id, 0) + 1
+            self._running_count += 1
+            self._running_ids.add(job.analysis_id)
+            self._threads.submit(self._run, job)
+
+    def _run(self, job: _Job) -> None:
+        self._local.job = job
+        try:
+            job.fn(**job.kwargs)
+            status, error = AnalysisJobStatus.DONE, None
+        except CancelledError:
+            status, error = AnalysisJobStatus.CANCELLED, None
+        except Exception as e:
+            print(e.__class__.__name__)
+            print(e)
+            status, error = AnalysisJobStatus.ERROR, str(e)
+        finally:
+            self._local.job = None
+
+        with self._lock:
+            job.status = AnalysisJobStatus.CANCELLED if job.cancelled else status
+            job.error = error
+            job.finished_at = time.time()
+            job.future = None
+
+            self._running[job.workspace_id] -= 1
+            if not self._running[job.workspace_id]:
+                del self._running[job.workspace_id]
+            self._running_count -= 1
+            self._running_ids.discard(job.analysis_id)
+
+            self._dispatch()
+
+    def compute(self, fn: Callable[..., T], *args) -> T:
+        job: _Job | None = getattr(self._local, "job", None)
+
+        if job is not None and job.cancelled:
+            raise CancelledError()
+
+        future = self._get_processes().submit(fn, *args)
+        if job is not None:
+            with self._lock:
+                job.future = future
+                if job.cancelled:
+                    future.cancel()
+
+        result = future.result()
+
+        if job is not None and job.cancelled:
+            raise CancelledError()
+        return result
+
+    def cancel(self, analysis_id: str) -> bool:
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            if job is None:
+                return False
+
+            if job.status == AnalysisJobStatus.QUEUED:
+                self._queue.remove(job)
+                job.status = AnalysisJobStatus.CANCELLED
+                job.cancelled = True
+                job.finished_at = time.time()
+                return True
+
+            if job.status == AnalysisJobStatus.RUNNING:
+                # The job stops at its next compute call
+                job.cancelled = True
+                if job.future is not None:
+                    job.future.cancel()
+                return True
+
+            return False
+
+    def get(self, analysis_id: str) -> AnalysisJob | None:
+        with self._lock:
+            job = self._jobs.get(analysis_id)
+            return self._to_model(job) if job is not None else None
+
+    def _to_model(self, job: _Job) -> AnalysisJob:
+        position = None
+        if job.status == AnalysisJobStatus.QUEUED:
+            position = self._queue.index(job) + 1
+
+        now = time.time()
+        started = job.started_at or job.finished_at
+
+        return AnalysisJob(
+            analysis_id=job.analysis_id,
+            workspace_id=job.workspace_id,
+            status=job.status,
+            position=position,
+            queued_at=datetime.fromtimestamp(job.queued_at),
+            started_at=datetime.fromtimestamp(job.started_at) if job.started_at else None,
+            finished_at=(
+                datetime.fromtimestamp(job.finished_at) if job.finished_at else None
+            ),
+            wait_seconds=(started or now) - job.queued_at,
+            run_seconds=(
+                (job.finished_at or now) - job.started_at if job.started_at else None
+            ),
+            error=job.error,
+        )
+
+    def _trim_history(self) -> None:
+        finished = [
+            analysis_id
+            for analysis_id, job in self._jobs.items()
+            if job.status
+            not in (AnalysisJobStatus.QUEUED, AnalysisJobStatus.RUNNING)
+        ]
+        for analysis_id in finished[: max(0, len(self._jobs) - self.history_size)]:
+            del self._jobs[analysis_id]
+
+    def stop(self) -> None:
+        with self._lock:
+            for job in self._queue:
+                job.status = AnalysisJobStatus.CANCELLED
+                job.cancelled = True
+            self._queue.clear()
+
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,62 @@
+from io import BytesIO
+from typing import Callable
+
+from pydantic import BaseModel
+
+from app.features.analysis.domain.chart_model import (
+    BarChartData,
+    ChartConfig,
+    HeatmapData,
+    LineChartData,
+)
+from app.features.analysis.domain.chart_repository import AnalysisChartGenerator
+from app.features.analysis.domain.report_cache import (
+    ReportCacheRepository,
+    content_key,
+)
+
+
+class CachedAnalysisChartGenerator(AnalysisChartGenerator):
+    """
+    Chart generator for the report of one analysis version that reuses the
+    images already rendered for the same data and configuration.
+    """
+
+    def __init__(
+        self,
+        generator: AnalysisChartGenerator,
+        cache: ReportCacheRepository,
+        analysis_id: str,
+        version: str,
+    ):
+        self.generator = generator
+        self.cache = cache
+        self.analysis_id = analysis_id
+        self.version = version
+
+    def _cached(
+        self,
+        kind: str,
+        data: BaseModel,
+        config: ChartConfig,
+        render: Callable[[BaseModel, ChartConfig], BytesIO],
+    ) -> BytesIO:
+        key = content_key(kind, data.model_dump_json(), config.model_dump_json())
+
+        image = self.cache.get(self.analysis_id, self.version, key)
+        if image is not None:
+            return BytesIO(image)
+
+        chart = render(data, config)
+        self.cache.put(self.analysis_id, self.version, key, chart.getvalue())
+        chart.seek(0)
+        return chart
+
+    def generate_line_chart(self, data: LineChartData, config: ChartConfig) -> BytesIO:
+        return self._cached("line", data, config, self.generator.generate_line_chart)
+
+    def generate_heatmap(self, data: HeatmapData, config: ChartConfig) -> BytesIO:
+        return self._cached("heatmap", data, config, self.generator.generate_heatmap)
+
+    def generate_bar_chart(self, data: BarChartData, config: ChartConfig) -> BytesIO:
+        return self._cached("bar", data, config, self.generator.generate_bar_chart)
@@ -0,0 +1,115 @@
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.features.analysis.domain.report_cache import (
+    ReportCacheRepository,
+    content_key,
+)
+
+
+class DiskReportCache(ReportCacheRepository):
+    """
+    Report files on local disk, one directory per analysis, with the least
+    recently used files removed once they take more than max_bytes.
+
+    The recency order is kept in memory and rebuilt from the modification
+    times when the cache starts.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[Path, int] = OrderedDict()
+        self._size = 0
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._load()
+
+    def _load(self) -> None:
+        files = []
+        for path in self.root.glob("*/*.bin"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(files):
+            self._entries[path] = size
+            self._size += size
+
+        with self._lock:
+            self._evict()
+
+    def _dir(self, analysis_id: str) -> Path:
+        # Analysis ids are not used as paths as they are
+        return self.root / content_key("analysis", analysis_id)[:32]
+
+    def _path(self, analysis_id: str, version: str, key: str) -> Path:
+        return self._dir(analysis_id) / f"{content_key(version, key)}.bin"
+
+    def get(self, analysis_id: str, version: str, key: str) -> bytes | None:
+        path = self._path(analysis_id, version, key)
+
+        with self._lock:
+            if path not in self._entries:
+                return None
+            self._entries.move_to_end(path)
+
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            with self._lock:
+                self._size -= self._entries.pop(path, 0)
+            return None
+
+    def put(self, analysis_id: str, version: str, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        path = self._path(analysis_id, version, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Written aside and renamed, so readers never see a partial file
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+        with self._lock:
+            self._size -= self._entries.pop(path, 0)
+            self._entries[path] = len(data)
+            self._size += len(data)
+            self._evict()
+
+    def _evict(self) -> None:
+        """Remove the least recently used files. Holds the lock."""
+        while self._size > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._size -= size
+            path.unlink(missing_ok=True)
+
+    def invalidate(self, analysis_id: str) -> None:
+        directory = self._dir(analysis_id)
+
+        with self._lock:
+            for path in [path for path in self._entries if path.parent == directory]:
+                self._size -= self._entries.pop(path)
+
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def size(self) -> int:
+        with self._lock:
+            return self._size
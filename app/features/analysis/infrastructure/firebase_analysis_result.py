@@ -1,21 +1,23 @@
 import hashlib
 import uuid
+from concurrent.futures import CancelledError
 from datetime import datetime
-from typing import Any
+from enum import Enum
+from typing import Any, Callable
 
-from fastapi import BackgroundTasks
 from firebase_admin import db
 
 from app.features.analysis.domain.enums import AnalysisEnum, AnalysisStatus
-from app.features.analysis.domain.models.average import AverageRange, AvgPeriodParam
-from app.features.analysis.domain.models.correlation import CorrelationParams
-from app.features.analysis.domain.models.prediction import PredictionParam
+from app.features.analysis.domain.models.job import AnalysisJob
+from app.features.analysis.domain.report_cache import ReportCacheRepository
 from app.features.analysis.domain.repository import (
+    AnalysisJobRepository,
     AnalysisRepository,
     AnalysisResultRepository,
 )
+from app.features.analysis.domain.state import AnalysisState
 
-from app.share.meter_records.domain.model import SensorIdentifier
+from app.share.meter_records.domain.model import RecordWatermark, SensorIdentifier
 from app.share.workspace.domain.model import WorkspaceRoles
 from app.share.workspace.workspace_access import WorkspaceAccess
 
@@ -25,17 +27,33 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
         self,
         access: WorkspaceAccess,
         analysis_repo: AnalysisRepository,
-        background_tasks: BackgroundTasks,
+        jobs: AnalysisJobRepository,
+        report_cache: ReportCacheRepository | None = None,
+        report_warmer: Callable[[dict], dict[str, bytes]] | None = None,
     ):
+        """
+        Args:
+            report_cache: Rendered reports, dropped when an analysis changes
+            report_warmer: Renders the charts of the report of an analysis
+                once it is saved and returns them by report cache key; runs
+                in a worker process of jobs, so it must be picklable
+        """
         self.access = access
         self.analysis_repo: AnalysisRepository = analysis_repo
         self.collection = "analysis"
-        self.background_tasks = background_tasks
+        self.state_collection = "analysis_state"
+        self.jobs = jobs
+        self.report_cache = report_cache
+        self.report_warmer = report_warmer
 
     def _get_analysis_ref(self, analysis_id: str | None = None):
         ref = db.reference().child(self.collection)
         return ref.child(analysis_id) if analysis_id else ref
 
+    def _get_state_ref(self, analysis_id: str):
+        """Aggregates of an analysis, kept apart so listing analyses stays light"""
+        return db.reference().child(self.state_collection).child(analysis_id)
+
     def _fix_analysis_lists(self, data: Any) -> Any:
         if isinstance(data, dict):
             # This is the structure for AvgPeriodAllResult
@@ -150,6 +168,46 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
 
         return self._fix_analysis_lists(analysis_data)
 
+    def _check_analysis_access(self, user_id: str, analysis_ref) -> bool:
+        workspace_id = analysis_ref.child("workspace_id").get()
+        meter_id = analysis_ref.child("meter_id").get()
+
+        if workspace_id is None or meter_id is None:
+            return False
+
+        self._check_access(
+            SensorIdentifier(
+                workspace_id=workspace_id,
+                meter_id=meter_id,
+                user_id=user_id,
+            )
+        )
+        return True
+
+    def get_job(self, user_id: str, analysis_id: str) -> AnalysisJob | None:
+        if not self._check_analysis_access(user_id, self._get_analysis_ref(analysis_id)):
+            return None
+
+        return self.jobs.get(analysis_id)
+
+    def cancel_analysis(self, user_id: str, analysis_id: str) -> bool:
+        analysis_ref = self._get_analysis_ref(analysis_id)
+
+        if not self._check_analysis_access(user_id, analysis_ref):
+            return False
+
+        if not self.jobs.cancel(analysis_id):
+            return False
+
+        analysis_ref.update(
+            {
+                "status": AnalysisStatus.ERROR.value,
+                "error": "Análisis cancelado",
+                "updated_at": self._time_now(),
+            }
+        )
+        return True
+
     def delete_analysis(self, user_id: str, analysis_id: str) -> bool:
 
         analysis_ref = self._get_analysis_ref(analysis_id)
@@ -170,8 +228,33 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
         self._check_access(identifier)
 
         analysis_ref.delete()
+        self._get_state_ref(analysis_id).delete()
+        self._invalidate_report(analysis_id)
         return True
 
+    def _invalidate_report(self, analysis_id: str) -> None:
+        if self.report_cache is not None:
+            self.report_cache.invalidate(analysis_id)
+
+    def _warm_report(self, analysis_id: str) -> None:
+        """Render the report of a saved analysis; failing here keeps the result"""
+        if self.report_warmer is None or self.report_cache is None:
+            return
+
+        try:
+            analysis_data = self._get_analysis_ref(analysis_id).get()
+            if not analysis_data:
+                return
+
+            analysis_data = self._fix_analysis_lists(analysis_data)
+            charts = self.jobs.compute(self.report_warmer, analysis_data)
+
+            version = str(analysis_data.get("updated_at", ""))
+            for key, image in charts.items():
+                self.report_cache.put(analysis_id, version, key, image)
+        except Exception as e:
+            print(f"Error al pre-generar el reporte del análisis {analysis_id}: {e}")
+
     def _time_now(self):
         return str(datetime.now())
 
@@ -244,13 +327,15 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
         # Save initial document
         ref.set(analysis_data)
 
-        # Start background task to generate analysis
-        self.background_tasks.add_task(
-            self._generate_analysis,
-            identifier,
-            analysis_type,
+        # Queue the job that generates the analysis
+        self.jobs.submit(
             analysis_id,
-            parameters,
+            identifier.workspace_id,
+            self._generate_analysis,
+            identifier=identifier,
+            analysis_type=analysis_type,
+            analysis_id=analysis_id,
+            params=parameters,
         )
 
         return analysis_id
@@ -261,36 +346,63 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
         analysis_type,
         analysis_id,
         params,
+        incremental: bool = False,
     ):
-        """Background task to generate analysis data"""
+        """
+        Job that generates the analysis data; the result is computed in a
+        worker process.
+
+        The aggregates the result is computed from are stored with it
+        (state) along with the watermark of the records they cover. With
+        incremental, only the records newer than the stored watermark are
+        read and merged into the stored state; when there are none the
+        stored result is kept as is. A stored state with records stored
+        behind its watermark (late or backfilled readings, as counted from
+        the rollups) is computed again from all the records.
+        """
+        analysis_ref = self._get_analysis_ref(analysis_id)
+
         try:
-            # Call the appropriate method based on analysis type
-            if analysis_type == AnalysisEnum.AVERAGE:
-                result = self.analysis_repo.generate_average(
-                    identifier, average_range=AverageRange(**params)
-                )
-            elif analysis_type == AnalysisEnum.AVERAGE_PERIOD:
-                result = self.analysis_repo.generate_average_period(
-                    identifier, average_period=AvgPeriodParam(**params)
-                )
-            elif analysis_type == AnalysisEnum.PREDICTION:
-                result = self.analysis_repo.generate_prediction(
-                    identifier, PredictionParam(**params)
-                )
-            elif analysis_type == AnalysisEnum.CORRELATION:
-                result = self.analysis_repo.generate_correlation(
-                    identifier, CorrelationParams(**params)
+            previous = self._get_state(analysis_id) if incremental else None
+
+            if previous is not None and self.analysis_repo.is_stale(
+                identifier, analysis_type, params, previous.watermark
+            ):
+                previous = None
+
+            if previous is None:
+                state = self.analysis_repo.load_state(
+                    identifier, analysis_type, params
                 )
             else:
-                raise ValueError(f"Unsupported analysis type: {analysis_type}")
+                tail = self.analysis_repo.load_state(
+                    identifier,
+                    analysis_type,
+                    params,
+                    since=previous.watermark.last_key + 1,
+                )
+
+                if tail.watermark.last_key is None and self._same_params(
+                    analysis_ref.child("parameters").get(), params
+                ):
+                    analysis_ref.update({"status": AnalysisStatus.SAVED.value})
+                    self._warm_report(analysis_id)
+                    return
 
-            result_data = result.model_dump(mode="json")
-            print(result_data)
+                state = previous.merge(tail)
+
+            # pandas loads with the first analysis computed
+            from app.features.analysis.infrastructure.analysis_impl import (
+                compute_analysis,
+            )
 
-            analysis_ref = self._get_analysis_ref(analysis_id)
+            result_data = self.jobs.compute(
+                compute_analysis, analysis_type, params, state
+            )
 
             # Set data field separately to try to preserve nulls in lists
             analysis_ref.child("data").set(result_data)
+            self._get_state_ref(analysis_id).set(state.to_dict())
 
             # Update other fields
             analysis_ref.update(
@@ -298,18 +410,72 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
                     "status": AnalysisStatus.SAVED.value,
                     "updated_at": self._time_now(),
                     "error": "",
+                    "parameters": params,
+                    "watermark": state.watermark.model_dump(),
                 }
             )
 
+        except CancelledError:
+            # cancel_analysis already updated the status
+            raise
         except Exception as e:
             # Update with error
-            self._get_analysis_ref(analysis_id).update(
+            analysis_ref.update(
                 {
                     "status": AnalysisStatus.ERROR.value,
                     "error": str(e),
                     "updated_at": self._time_now(),
                 }
             )
+            return
+
+        self._warm_report(analysis_id)
+
+    def _get_state(self, analysis_id: str) -> AnalysisState | None:
+        watermark = self._get_analysis_ref(analysis_id).child("watermark").get()
+        state = self._get_state_ref(analysis_id).get()
+
+        if not watermark or not state or watermark.get("last_key") is None:
+            return None
+
+        return AnalysisState.from_dict(state, RecordWatermark(**watermark))
+
+    def _normalize_params(self, params: dict | None) -> dict:
+        """Parameters as stored in Firebase (enum values, no nulls)"""
+
+        def value(v):
+            if isinstance(v, Enum):
+                return v.value
+            if isinstance(v, list):
+                return [value(item) for item in v]
+            return v
+
+        return {k: value(v) for k, v in (params or {}).items() if v is not None}
+
+    def _same_params(self, stored: dict | None, params: dict) -> bool:
+        return self._normalize_params(stored) == self._normalize_params(params)
+
+    def _range_grew(self, stored: dict | None, params: dict) -> bool:
+        """
+        Same parameters with an end date equal or later than the stored one,
+        so the stored aggregates are still valid for the start of the range.
+        """
+        stored = self._normalize_params(stored)
+        params = self._normalize_params(params)
+
+        if not stored or stored.keys() != params.keys():
+            return False
+
+        if any(stored[k] != params[k] for k in params if k != "end_date"):
+            return False
+
+        try:
+            stored_end = datetime.strptime(stored["end_date"], "%Y-%m-%d %H:%M:%S")
+            end = datetime.strptime(params["end_date"], "%Y-%m-%d %H:%M:%S")
+        except (KeyError, ValueError, TypeError):
+            return False
+
+        return end >= stored_end
 
     def update_analysis(
         self,
@@ -349,18 +515,28 @@ class FirebaseAnalysisResultRepository(AnalysisResultRepository):
         if analysis_id is None:
             return None
 
+        incremental = analysis_ref.child(
+            "status"
+        ).get() == AnalysisStatus.SAVED.value and self._range_grew(
+            analysis_ref.child("parameters").get(), parameters
+        )
+
         analysis_ref.update(
             {
                 "status": AnalysisStatus.UPDATING.value,
             }
         )
+        self._invalidate_report(analysis_id)
 
-        self.background_tasks.add_task(
+        self.jobs.submit(
+            analysis_id,
+            identifier.workspace_id,
             self._generate_analysis,
             identifier=identifier,
             analysis_id=analysis_id,
             params=parameters,
             analysis_type=analysis_type,
+            incremental=incremental,
         )
 
         return analysis_id
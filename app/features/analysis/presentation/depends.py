@@ -1,7 +1,10 @@
 from functools import lru_cache
-from fastapi import BackgroundTasks, Depends
+from fastapi import Depends
 from typing_extensions import Annotated
 
+# The implementations on pandas (analysis), matplotlib (charts) and fpdf
+# (reports) are imported by their factories, so they load with the first
+# request that uses them instead of with the app
 
 from app.features.analysis.infrastructure.firebase_analysis_result import (
     FirebaseAnalysisResultRepository,
@@ -12,45 +15,94 @@ from app.share.depends import (
 )
 from app.share.meter_records.domain.repository import MeterRecordsRepository
 
-from app.features.analysis.infrastructure.analysis_impl import AnalysisAverage
+from app.features.analysis.infrastructure.analysis_jobs_impl import (
+    AnalysisJobExecutorImpl,
+)
+from app.features.analysis.domain.config import (
+    AnalysisJobsConfigImpl,
+    ReportCacheConfigImpl,
+)
+from app.features.analysis.domain.report_cache import ReportCacheRepository
+from app.features.analysis.infrastructure.disk_report_cache import DiskReportCache
 from app.features.analysis.domain.repository import (
+    AnalysisJobRepository,
     AnalysisRepository,
     AnalysisResultRepository,
 )
 from app.share.workspace.workspace_access import WorkspaceAccess
 from app.features.analysis.domain.chart_repository import AnalysisChartGenerator
-from app.features.analysis.infrastructure.matplotlib_chart_generator import (
-    MatplotlibAnalysisChartGenerator,
-)
-from app.share.reports.domain.repository import PDFReportGenerator
-from app.share.reports.infrastructure.fpdf_generator import FPDF2ReportGenerator
+from app.share.reports.domain.config import ReportRendererConfigImpl
+from app.share.reports.domain.repository import PDFReportGenerator, ReportRenderer
+from app.share.reports.infrastructure.report_renderer import ThreadPoolReportRenderer
+from app.features.analysis.presentation.report_content import render_report_charts
 
 
 @lru_cache
 def get_analysis(
     record_repo: Annotated[MeterRecordsRepository, Depends(get_meter_records_repo)],
 ) -> AnalysisRepository:
+    from app.features.analysis.infrastructure.analysis_impl import AnalysisAverage
+
     return AnalysisAverage(record_repo=record_repo)
 
 
 @lru_cache
-def get_analysis_result(
-    access: Annotated[WorkspaceAccess, Depends(get_workspace_access)],
-    analysis_rep: Annotated[AnalysisRepository, Depends(get_analysis)],
-    background_tasks: BackgroundTasks,
-) -> AnalysisResultRepository:
-    return FirebaseAnalysisResultRepository(
-        access=access, analysis_repo=analysis_rep, background_tasks=background_tasks
+def get_analysis_jobs() -> AnalysisJobRepository:
+    """Get singleton instance of the analysis job executor"""
+    config = AnalysisJobsConfigImpl()
+    return AnalysisJobExecutorImpl(
+        max_workers=config.max_workers,
+        max_queue=config.max_queue,
+        workspace_limit=config.workspace_limit,
     )
 
 
 @lru_cache
 def get_analysis_chart_generator() -> AnalysisChartGenerator:
     """Get singleton instance of analysis chart generator"""
+    from app.features.analysis.infrastructure.matplotlib_chart_generator import (
+        MatplotlibAnalysisChartGenerator,
+    )
+
     return MatplotlibAnalysisChartGenerator()
 
 
-@lru_cache
 def get_pdf_generator() -> PDFReportGenerator:
-    """Get singleton instance of PDF report generator"""
+    """Get a new PDF report generator; each one builds a single document"""
+    from app.share.reports.infrastructure.fpdf_generator import FPDF2ReportGenerator
+
     return FPDF2ReportGenerator()
+
+
+@lru_cache
+def get_report_renderer() -> ReportRenderer:
+    """Get singleton instance of the report renderer"""
+    config = ReportRendererConfigImpl()
+    return ThreadPoolReportRenderer(
+        pdf_factory=get_pdf_generator,
+        max_workers=config.max_workers,
+        max_queue=config.max_queue,
+    )
+
+
+@lru_cache
+def get_report_cache() -> ReportCacheRepository:
+    """Get singleton instance of the rendered reports cache"""
+    config = ReportCacheConfigImpl()
+    return DiskReportCache(root=config.directory, max_bytes=config.max_bytes)
+
+
+@lru_cache
+def get_analysis_result(
+    access: Annotated[WorkspaceAccess, Depends(get_workspace_access)],
+    analysis_rep: Annotated[AnalysisRepository, Depends(get_analysis)],
+    jobs: Annotated[AnalysisJobRepository, Depends(get_analysis_jobs)],
+    report_cache: Annotated[ReportCacheRepository, Depends(get_report_cache)],
+) -> AnalysisResultRepository:
+    return FirebaseAnalysisResultRepository(
+        access=access,
+        analysis_repo=analysis_rep,
+        jobs=jobs,
+        report_cache=report_cache,
+        report_warmer=render_report_charts,
+    )
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 
+from app.features.analysis.domain.models.job import AnalysisJob
 from app.features.analysis.domain.repository import AnalysisResultRepository
 from app.features.analysis.domain.response import AnalysisDeleteResponse
 from app.features.analysis.presentation.depends import get_analysis_result
@@ -52,3 +53,49 @@ async def delete_analysis(
         print(e.__class__.__name__)
         print(e)
         raise HTTPException(status_code=500, detail="Server error")
+
+
+@analysis_router.get("/{id}/job/")
+async def get_analysis_job(
+    id: str,
+    user: UserPayload = Depends(verify_access_token),
+    analysis_result: AnalysisResultRepository = Depends(get_analysis_result),
+) -> AnalysisJob:
+    try:
+        job = analysis_result.get_job(user_id=user.uid, analysis_id=id)
+
+        if job is None:
+            raise HTTPException(
+                status_code=404, detail="No hay un proceso para el análisis"
+            )
+
+        return job
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(e.__class__.__name__)
+        print(e)
+        raise HTTPException(status_code=500, detail="Server error")
+
+
+@analysis_router.delete("/{id}/job/")
+async def cancel_analysis_job(
+    id: str,
+    user: UserPayload = Depends(verify_access_token),
+    analysis_result: AnalysisResultRepository = Depends(get_analysis_result),
+) -> AnalysisDeleteResponse:
+    try:
+        cancelled = analysis_result.cancel_analysis(user_id=user.uid, analysis_id=id)
+
+        if not cancelled:
+            raise HTTPException(
+                status_code=404, detail="No hay un proceso en curso para el análisis"
+            )
+
+        return AnalysisDeleteResponse(message="Análisis cancelado")
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(e.__class__.__name__)
+        print(e)
+        raise HTTPException(status_code=500, detail="Server error")
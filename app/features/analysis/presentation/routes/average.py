@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 
 from app.features.analysis.domain.enums import AnalysisEnum
-from app.features.analysis.domain.models.average import AverageRange
+from app.features.analysis.domain.models.average import AverageParam
 from app.features.analysis.domain.models.correlation import AnalysisIdentifier
 from app.features.analysis.domain.repository import AnalysisResultRepository
 from app.features.analysis.domain.response import AnalysisResponse, AnalysisCreateResponse, AnalysisUpdateResponse
@@ -43,7 +43,7 @@ async def get_average(
 @average_router.post("/")
 async def create_average(
     identifier: AnalysisIdentifier,
-    range: AverageRange,
+    range: AverageParam,
     user: UserPayload = Depends(verify_access_token),
     analysis_result: AnalysisResultRepository = Depends(get_analysis_result),
 ) -> AnalysisCreateResponse:
@@ -80,7 +80,7 @@ async def create_average(
 @average_router.put("/{id}/")
 async def update_average(
     id: str,
-    range: AverageRange,
+    range: AverageParam,
     user: UserPayload = Depends(verify_access_token),
     analysis_result: AnalysisResultRepository = Depends(get_analysis_result),
 ) -> AnalysisUpdateResponse:
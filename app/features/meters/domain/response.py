@@ -1,5 +1,8 @@
 from app.features.meters.domain.model import WaterQualityMeter
-from app.share.meter_records.domain.response import SensorRecordsResponse
+from app.share.meter_records.domain.response import (
+    RecordTimeline,
+    SensorRecordsResponse,
+)
 from app.share.response.model import ResponseApi
 from app.share.socketio.domain.model import Record
 
@@ -20,5 +23,14 @@ class WQMeterSensorRecordsResponse(ResponseApi):
     records: list[Record]
 
 
+class WQMeterTimelineResponse(ResponseApi):
+    timeline: RecordTimeline
+
+
+class WQMeterRollupsResponse(ResponseApi):
+    # Records added to the rollups
+    records: int
+
+
 class WQMeterConnectResponse(ResponseApi):
     token: str
@@ -8,14 +8,17 @@ from app.features.meters.domain.model import (
     WQMeterCreate,
 )
 from app.features.meters.domain.repository import WaterQualityMeterRepository
+from app.share.meter_records.domain.rollup_repository import RollupRepository
 from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
+from app.share.socketio.infra.meter_cache_impl import MeterCacheRepositoryImpl
 from app.share.workspace.domain.model import WorkspaceRoles, WorkspaceRolesAll
 from app.share.workspace.workspace_access import WorkspaceAccess
 
 
 class WaterQualityMeterRepositoryImpl(WaterQualityMeterRepository):
-    def __init__(self, access: WorkspaceAccess):
+    def __init__(self, access: WorkspaceAccess, rollup_repo: RollupRepository = None):
         self.access = access
+        self.rollup_repo = rollup_repo
 
     def add(
         self, id_workspace: str, owner: str, water_quality_meter: WQMeterCreate
@@ -137,6 +140,11 @@ class WaterQualityMeterRepositoryImpl(WaterQualityMeterRepository):
             raise HTTPException(status_code=400, detail="El sensor está enviando datos")
 
         meter_ref.delete()
+        MeterCacheRepositoryImpl.invalidate(id_workspace, id_meter)
+
+        if self.rollup_repo is not None:
+            self.rollup_repo.delete(id_workspace, id_meter)
+
         return WaterQualityMeter(
             id=meter_ref.key,
             name=meter.get("name"),
@@ -169,6 +177,7 @@ class WaterQualityMeterRepositoryImpl(WaterQualityMeterRepository):
             raise HTTPException(status_code=400, detail="El sensor está enviando datos")
 
         meter_ref.update(meter.model_dump())
+        MeterCacheRepositoryImpl.invalidate(id_workspace, id_meter)
 
         meter_update: dict = meter_ref.get()
 
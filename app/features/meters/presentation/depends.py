@@ -8,9 +8,10 @@ from app.features.meters.domain.repository import (
 from app.features.meters.infrastructure.repo_meter_impl import (
     WaterQualityMeterRepositoryImpl,
 )
-from app.share.depends import get_workspace_access
+from app.share.depends import get_rollup_repo, get_workspace_access
 from app.share.jwt.domain.payload import MeterPayload
 from app.share.jwt.infrastructure.access_token import AccessToken
+from app.share.meter_records.domain.rollup_repository import RollupRepository
 from app.share.weatherapi.domain.repository import WeatherRepo
 from app.share.weatherapi.services.services import WeatherService
 from app.share.workspace.workspace_access import WorkspaceAccess
@@ -24,9 +25,12 @@ def get_access_token() -> AccessToken[MeterPayload]:
 @lru_cache()
 def get_water_quality_meter_repo(
     workspace_access: Annotated[WorkspaceAccess, Depends(get_workspace_access)],
+    rollup_repo: Annotated[RollupRepository, Depends(get_rollup_repo)],
 ) -> WaterQualityMeterRepository:
 
-    return WaterQualityMeterRepositoryImpl(access=workspace_access)
+    return WaterQualityMeterRepositoryImpl(
+        access=workspace_access, rollup_repo=rollup_repo
+    )
 
 
 @lru_cache()
@@ -1,5 +1,7 @@
+import asyncio
 import time
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from jwt import InvalidSignatureError
 from app.features.meters.domain.model import (
     ValidMeterToken,
@@ -16,19 +18,27 @@ from app.features.meters.domain.response import (
     WQMeterGetResponse,
     WQMeterRecordsResponse,
     WQMeterResponse,
+    WQMeterRollupsResponse,
     WQMeterSensorRecordsResponse,
+    WQMeterTimelineResponse,
 )
 from app.features.meters.presentation.depends import (
     get_access_token,
     get_water_quality_meter_repo,
     get_weather_service,
 )
-from app.share.depends import get_meter_records_repo
-from app.share.jwt.infrastructure.verify_access_token import verify_access_token
+from app.share.depends import get_meter_records_repo, get_rollup_repo
+from app.share.jwt.infrastructure.verify_access_token import (
+    verify_access_admin_token,
+    verify_access_token,
+)
 from app.share.jwt.domain.payload import MeterPayload, UserPayload
 from app.share.jwt.infrastructure.access_token import AccessToken
+from app.share.meter_records.domain.export import ExportFormat, encode_records
 from app.share.meter_records.domain.model import SensorIdentifier, SensorQueryParams
 from app.share.meter_records.domain.repository import MeterRecordsRepository
+from app.share.meter_records.domain.rollup import RollupGranularity
+from app.share.meter_records.domain.rollup_repository import RollupRepository
 from app.share.response.model import ResponseApi
 from app.share.weatherapi.domain.repository import WeatherRepo
 from app.share.weatherapi.domain.model import (
@@ -311,6 +321,104 @@ async def query_records(
         raise HTTPException(status_code=500, detail="Server error")
 
 
+@meters_router.get("/records/{id_workspace}/{id_meter}/export/")
+async def export_records(
+    id_workspace: str,
+    id_meter: str,
+    format: ExportFormat = ExportFormat.NDJSON,
+    start_date: str = None,
+    end_date: str = None,
+    user: UserPayload = Depends(verify_access_token),
+    meter_records_repo: MeterRecordsRepository = Depends(get_meter_records_repo),
+) -> StreamingResponse:
+    try:
+        identifier = SensorIdentifier(
+            meter_id=id_meter,
+            workspace_id=id_workspace,
+            user_id=user.uid,
+        )
+        params = SensorQueryParams(
+            start_date=start_date,
+            end_date=end_date,
+        )
+        chunks = meter_records_repo.export_records(identifier, params)
+        filename = f"{id_meter}.{format.extension()}"
+
+        return StreamingResponse(
+            encode_records(chunks, format),
+            media_type=format.media_type(),
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    except HTTPException as he:
+        raise he
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=ve.args[0])
+    except Exception as e:
+        print(e.__class__.__name__)
+        print(e)
+        raise HTTPException(status_code=500, detail="Server error")
+
+
+@meters_router.get("/records/{id_workspace}/{id_meter}/timeline/")
+async def get_records_timeline(
+    id_workspace: str,
+    id_meter: str,
+    granularity: RollupGranularity = RollupGranularity.DAY,
+    start_date: str = None,
+    end_date: str = None,
+    user: UserPayload = Depends(verify_access_token),
+    meter_records_repo: MeterRecordsRepository = Depends(get_meter_records_repo),
+) -> WQMeterTimelineResponse:
+    try:
+        identifier = SensorIdentifier(
+            meter_id=id_meter,
+            workspace_id=id_workspace,
+            user_id=user.uid,
+        )
+        params = SensorQueryParams(
+            start_date=start_date,
+            end_date=end_date,
+        )
+        timeline = await asyncio.to_thread(
+            meter_records_repo.get_timeline, identifier, params, granularity
+        )
+        return WQMeterTimelineResponse(
+            message="Timeline retrieved successfully", timeline=timeline
+        )
+    except HTTPException as he:
+        raise he
+    except ValueError as ve:
+        raise HTTPException(status_code=404, detail=ve.args[0])
+    except Exception as e:
+        print(e.__class__.__name__)
+        print(e)
+        raise HTTPException(status_code=500, detail="Server error")
+
+
+@meters_router.post("/records/{id_workspace}/{id_meter}/rollups/")
+async def backfill_rollups(
+    id_workspace: str,
+    id_meter: str,
+    user: UserPayload = Depends(verify_access_admin_token),
+    rollup_repo: RollupRepository = Depends(get_rollup_repo),
+) -> WQMeterRollupsResponse:
+    """
+    Add the records stored before the meter had rollups, so summaries,
+    timelines and analyses stop reading them raw.
+    """
+    try:
+        count = await asyncio.to_thread(rollup_repo.backfill, id_workspace, id_meter)
+        return WQMeterRollupsResponse(
+            message="Rollups backfilled successfully", records=count
+        )
+    except HTTPException as he:
+        raise he
+    except Exception as e:
+        print(e.__class__.__name__)
+        print(e)
+        raise HTTPException(status_code=500, detail="Server error")
+
+
 @meters_router.get("/records/{id_workspace}/{id_meter}/{sensor_name}/")
 async def get_sensor_records(
     id_workspace: str,
@@ -9,12 +9,14 @@ from app.features.workspaces.domain.model import (
     WorkspaceShareResponse,
     WorskspacePagination,
 )
+from app.share.socketio.infra.meter_cache_impl import MeterCacheRepositoryImpl
 from app.share.users.domain.repository import UserRepository
 from app.share.workspace.domain.model import (
     WorkspaceRoles,
     WorkspaceRolesAll,
     WorkspaceType,
 )
+from app.share.workspace.auth_context import WorkspaceAuthContext
 from app.share.workspace.workspace_access import WorkspaceAccess
 
 
@@ -225,6 +227,8 @@ class WorkspaceRepositoryImpl(WorkspaceRepository):
             if workspace_ref.get() is None:
                 return False
             workspace_ref.delete()
+            MeterCacheRepositoryImpl.invalidate(id)
+            WorkspaceAuthContext.current().invalidate(id)
             return True
         except Exception:
             return False
@@ -240,6 +244,7 @@ class WorkspaceRepositoryImpl(WorkspaceRepository):
 
         update_data = workspace.model_dump()
         workspace_ref.update(update_data)
+        WorkspaceAuthContext.current().invalidate(id)
         updated_data = workspace_ref.get()
         return WorkspaceResponse(
             id=id,
@@ -11,6 +11,7 @@ from firebase_admin import db
 
 from app.share.users.domain.repository import UserRepository
 from app.share.workspace.domain.model import WorkspaceRoles
+from app.share.workspace.auth_context import WorkspaceAuthContext
 from app.share.workspace.workspace_access import WorkspaceAccess
 
 
@@ -145,6 +146,7 @@ class WorkspaceGuestRepositoryImpl(WorkspaceGuestRepository):
             )
 
         guest_ref.set({"rol": workspace_share.rol})
+        WorkspaceAuthContext.current().invalidate(id_workspace)
 
         guest_data = guest_ref.get()
 
@@ -203,6 +205,7 @@ class WorkspaceGuestRepositoryImpl(WorkspaceGuestRepository):
             )
 
         guest_ref.update({"rol": share_update.rol})
+        WorkspaceAuthContext.current().invalidate(id_workspace)
 
         guest_data = guest_ref.get()
 
@@ -252,6 +255,7 @@ class WorkspaceGuestRepositoryImpl(WorkspaceGuestRepository):
             )
 
         guest_ref.delete()
+        WorkspaceAuthContext.current().invalidate(workspace_delete.workspace_id)
 
         db.reference().child("guest_workspaces").child(workspace_delete.guest).child(
             workspace_delete.workspace_id
@@ -0,0 +1,42 @@
+"""
+Socket ingest without the HTTP API: the /receive/ namespace of the meters and
+the /subscribe/ namespace of the clients, at /socket.io/.
+
+    uvicorn app.ingest:app
+
+Run apart from the API (SOCKETIO_IN_API=false there), with
+SOCKETIO_MESSAGE_QUEUE set when there is more than one process, so the
+records of a meter reach the subscribers connected to any of them.
+"""
+
+import os
+
+from socketio import ASGIApp
+
+from app.share.firebase import FirebaseInitializer
+from app.share.firebase.domain.config import FirebaseConfigImpl
+from app.share.socketio import (
+    control_repo,
+    fan_out,
+    ingest_writer,
+    session_keeper,
+    sio,
+)
+
+
+async def startup():
+    await session_keeper.start()
+
+
+async def shutdown():
+    await session_keeper.stop()
+    await fan_out.stop()
+    # Write the records still queued
+    await ingest_writer.stop()
+    await control_repo.stop()
+
+
+if not os.getenv("SKIP_FIREBASE_INIT", "false").lower() == "true":
+    FirebaseInitializer.initialize(FirebaseConfigImpl())
+
+app = ASGIApp(sio, on_startup=startup, on_shutdown=shutdown)
@@ -4,7 +4,6 @@ from fastapi import Depends
 from app.share.ai.domain.config import OpenRouterConfig
 from app.share.ai.domain.services import AIChatService
 from app.share.ai.infra.firebase_repository import FirebaseChatRepository
-from app.share.ai.services.openai_service import OpenAIChatService
 
 
 def get_chat_repository() -> FirebaseChatRepository:
@@ -16,4 +15,7 @@ def get_ai_service(
     repository: FirebaseChatRepository = Depends(get_chat_repository),
 ) -> AIChatService:
     """Get AI chat service instance"""
+    # pydantic-ai and the OpenAI client load with the first chat
+    from app.share.ai.services.openai_service import OpenAIChatService
+
     return OpenAIChatService(config=OpenRouterConfig(), repository=repository)
@@ -2,20 +2,30 @@ from functools import lru_cache
 from typing import Annotated
 from fastapi import Depends
 
-from app.share.meter_records.domain.repository import (
-    MeterRecordsRepository,
-)
+from app.share.meter_records.domain.config import RangeReaderConfigImpl
+from app.share.meter_records.domain.repository import MeterRecordsRepository
+from app.share.meter_records.domain.rollup_repository import RollupRepository
 from app.share.meter_records.infrastructure.meter_records_impl import (
     MeterRecordsRepositoryImpl,
 )
+from app.share.meter_records.infrastructure.range_reader import FirebaseRangeReader
+from app.share.meter_records.infrastructure.rollup_impl import RollupRepositoryImpl
 from app.share.users.domain.repository import UserRepository
+from app.share.users.infra.cached_users_repo_impl import CachedUserRepository
 from app.share.users.infra.users_repo_impl import UserRepositoryImpl
+from app.share.workspace.auth_context import WorkspaceAuthContext
 from app.share.workspace.workspace_access import WorkspaceAccess
 
 
+async def get_workspace_auth_context() -> WorkspaceAuthContext:
+    # Async, so the context is set on the request itself and not on a
+    # copy made for the threadpool
+    return WorkspaceAuthContext.start()
+
+
 @lru_cache()
 def get_user_repo() -> UserRepository:
-    return UserRepositoryImpl()
+    return CachedUserRepository(user_repo=UserRepositoryImpl())
 
 
 @lru_cache()
@@ -26,9 +36,33 @@ def get_workspace_access(
     return WorkspaceAccess(user_repo=user_repo)
 
 
+@lru_cache()
+def get_range_reader() -> FirebaseRangeReader:
+    config = RangeReaderConfigImpl()
+    return FirebaseRangeReader(
+        slice_seconds=config.slice_seconds,
+        max_workers=config.max_workers,
+        page_size=config.page_size,
+        retries=config.retries,
+    )
+
+
+@lru_cache()
+def get_rollup_repo(
+    range_reader: Annotated[FirebaseRangeReader, Depends(get_range_reader)],
+) -> RollupRepository:
+    return RollupRepositoryImpl(range_reader=range_reader)
+
+
 @lru_cache()
 def get_meter_records_repo(
     workspace_access: Annotated[WorkspaceAccess, Depends(get_workspace_access)],
+    rollup_repo: Annotated[RollupRepository, Depends(get_rollup_repo)],
+    range_reader: Annotated[FirebaseRangeReader, Depends(get_range_reader)],
 ) -> MeterRecordsRepository:
 
-    return MeterRecordsRepositoryImpl(workspace_access=workspace_access)
+    return MeterRecordsRepositoryImpl(
+        workspace_access=workspace_access,
+        rollup_repo=rollup_repo,
+        range_reader=range_reader,
+    )
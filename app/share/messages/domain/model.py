@@ -99,3 +99,10 @@ class QueryNotificationParams(BaseModel):
     is_read: bool | None = None
     convert_timestamp: bool = False
     status: NotificationStatus
+    cursor: str | None = None
+    limit: int | None = None
+
+
+class NotificationHistoryPage(BaseModel):
+    notifications: list[NotificationBody | NotificationBodyDatetime]
+    next_cursor: str | None = None
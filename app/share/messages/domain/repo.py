@@ -1,6 +1,7 @@
 from abc import ABC, abstractmethod
 
-from app.share.messages.domain.model import NotificationBody, NotificationBodyDatetime, NotificationControl, QueryNotificationParams
+from app.share.messages.domain.model import NotificationBody, NotificationBodyDatetime, NotificationControl, NotificationHistoryPage, QueryNotificationParams
+from app.share.messages.domain.rules import AlertRules
 from app.share.socketio.domain.model import RecordBody
 
 
@@ -17,6 +18,16 @@ class SenderAlertsRepository(ABC):
         """
         pass
 
+    @abstractmethod
+    def send_alerts_many(
+        self, workspace_id: str, meter_id: str, records: list[RecordBody]
+    ) -> None:
+        """
+        Check the records of a batch message, in order, against the alerts
+        of the meter.
+        """
+        pass
+
 
 class SenderServiceRepository(ABC):
     @abstractmethod
@@ -41,6 +52,14 @@ class NotificationManagerRepository(ABC):
     def get_history(self, user_uid: str, params: QueryNotificationParams) -> list[NotificationBody | NotificationBodyDatetime]:
         pass
 
+    @abstractmethod
+    def get_history_page(self, user_uid: str, params: QueryNotificationParams) -> NotificationHistoryPage:
+        """
+        Notifications of the user after params.cursor, at most params.limit.
+        next_cursor is None when there are no more.
+        """
+        pass
+
     @abstractmethod
     def create_control(self, alert: NotificationControl) -> NotificationControl:
         pass
@@ -68,3 +87,64 @@ class NotificationManagerRepository(ABC):
     @abstractmethod
     def get_by_id(self, notification_id: str, convert_timestamp: bool = False) -> NotificationBodyDatetime | NotificationBody:
         pass
+
+
+class AlertRulesRepository(ABC):
+    """
+    Compiled alert rules of each meter.
+    """
+
+    @abstractmethod
+    def get(self, meter_id: str) -> AlertRules:
+        pass
+
+    @abstractmethod
+    def invalidate(cls, meter_id: str) -> None:
+        """
+        Drop the rules of a meter after one of its alerts changed.
+        """
+        pass
+
+
+class NotificationControlRepository(ABC):
+    """
+    Debounce counters of the alerts (consecutive validations and last
+    sent), kept in memory and written to Firebase in the background.
+    """
+
+    @abstractmethod
+    def get(self, alert_id: str) -> NotificationControl:
+        pass
+
+    @abstractmethod
+    def increment(self, alert_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def reset(self, alert_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def set_last_sent(self, alert_id: str, last_sent: float) -> None:
+        pass
+
+    @abstractmethod
+    def flush(self) -> int:
+        """
+        Write the changed controls with one multi-path update.
+
+        Returns:
+            Number of controls written
+        """
+        pass
+
+    @abstractmethod
+    def start(self) -> None:
+        """
+        Start flushing periodically. Must be called from the event loop.
+        """
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        pass
@@ -0,0 +1,109 @@
+import numpy as np
+
+from app.share.messages.domain.model import (
+    AlertData,
+    ParameterDataForAlert,
+    PriorityParameters,
+    ResultValidationAlert,
+)
+from app.share.parameters.domain.model import Parameter
+from app.share.socketio.domain.model import RecordBody
+
+# Columns of the compiled rules, in the order of the fields of Parameter
+RULE_PARAMETERS: list[str] = list(Parameter.model_fields)
+
+# Parameters (not priority) in range needed to trigger an alert
+MIN_VALID_PARAMETERS = 3
+
+
+class AlertRules:
+    """
+    Alerts of a meter compiled into arrays of bounds, one row per alert
+    with parameters and one column per parameter, so that records are
+    checked against every rule at once.
+
+    An alert is triggered when a priority parameter is in range or when at
+    least MIN_VALID_PARAMETERS of the other parameters are.
+    """
+
+    def __init__(self, alerts: list[AlertData]):
+        self.alerts: list[AlertData] = alerts
+        self.rule_alerts: list[AlertData] = [
+            alert for alert in alerts if alert.parameters
+        ]
+
+        shape = (len(self.rule_alerts), len(RULE_PARAMETERS))
+        self.mins: np.ndarray = np.empty(shape, dtype=np.float64)
+        self.maxs: np.ndarray = np.empty(shape, dtype=np.float64)
+
+        for i, alert in enumerate(self.rule_alerts):
+            for j, parameter in enumerate(RULE_PARAMETERS):
+                range_value = getattr(alert.parameters, parameter)
+                self.mins[i, j] = range_value.min
+                self.maxs[i, j] = range_value.max
+
+        self.priority: np.ndarray = np.array(
+            [parameter in PriorityParameters.parameters for parameter in RULE_PARAMETERS]
+        )
+
+    @property
+    def has_parameters(self) -> bool:
+        return len(self.rule_alerts) > 0
+
+    @staticmethod
+    def values(records: list[RecordBody]) -> np.ndarray:
+        """Values of the records, one row per record."""
+        return np.array(
+            [[getattr(record, parameter) for parameter in RULE_PARAMETERS] for record in records],
+            dtype=np.float64,
+        ).reshape(len(records), len(RULE_PARAMETERS))
+
+    def evaluate(self, values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Check values (records x parameters) against every rule.
+
+        Returns:
+            in_range: records x alerts x parameters
+            triggered: records x alerts
+        """
+        values = np.atleast_2d(values)[:, np.newaxis, :]
+
+        in_range = (values >= self.mins) & (values <= self.maxs)
+        triggered = (in_range & self.priority).any(axis=2) | (
+            (in_range & ~self.priority).sum(axis=2) >= MIN_VALID_PARAMETERS
+        )
+
+        return in_range, triggered
+
+    def validate(self, record: RecordBody) -> ResultValidationAlert:
+        return self.validate_many([record])[0]
+
+    def validate_many(self, records: list[RecordBody]) -> list[ResultValidationAlert]:
+        if not self.has_parameters:
+            return [ResultValidationAlert() for _ in records]
+
+        values = self.values(records)
+        in_range, triggered = self.evaluate(values)
+
+        results = []
+        for row in range(len(records)):
+            alert_indexes, parameter_indexes = np.nonzero(in_range[row])
+
+            results.append(
+                ResultValidationAlert(
+                    has_parameters=True,
+                    alerts_ids=[
+                        self.rule_alerts[i].id for i in np.flatnonzero(triggered[row])
+                    ],
+                    parameters_data=[
+                        ParameterDataForAlert(
+                            alert_id=self.rule_alerts[i].id,
+                            parameter=RULE_PARAMETERS[j],
+                            value=values[row, j],
+                        )
+                        for i, j in zip(alert_indexes, parameter_indexes)
+                    ],
+                )
+            )
+
+        return results
@@ -0,0 +1,62 @@
+import time
+
+from firebase_admin import db
+
+from app.share.messages.domain.model import AlertData
+from app.share.messages.domain.repo import AlertRulesRepository
+from app.share.messages.domain.rules import AlertRules
+
+
+class AlertRulesRepositoryImpl(AlertRulesRepository):
+    """
+    Keeps the compiled rules of each meter in memory. They are invalidated
+    by AlertRepositoryImpl, and reloaded after ttl seconds in case the
+    alert was changed by another process.
+    """
+
+    # meter_id -> (loaded at, rules)
+    rules: dict[str, tuple[float, AlertRules]] = {}
+
+    def __init__(self, ttl: float = 300):
+        self.ttl = ttl
+
+    def _list_alerts_by_meter(self, meter_id: str) -> list[AlertData]:
+        # Fetch alerts for the given meter_id from Firebase Realtime Database
+        ref = (
+            db.reference().child("alerts").order_by_child("meter_id").equal_to(meter_id)
+        )
+
+        alerts_data = ref.get() or {}
+
+        alerts = []
+
+        for alert_id, alert in alerts_data.items():
+
+            alerts.append(
+                AlertData(
+                    id=alert_id,
+                    meter_id=alert.get("meter_id"),
+                    title=alert.get("title"),
+                    type=alert.get("type"),
+                    user_uid=alert.get("owner"),
+                    parameters=alert.get("parameters") or None,
+                    user_to_notify=alert.get("guests") or [],
+                )
+            )
+
+        return alerts
+
+    def get(self, meter_id: str) -> AlertRules:
+        cached = self.rules.get(meter_id)
+        now = time.monotonic()
+
+        if cached is not None and now - cached[0] < self.ttl:
+            return cached[1]
+
+        rules = AlertRules(self._list_alerts_by_meter(meter_id))
+        self.rules[meter_id] = (now, rules)
+        return rules
+
+    @classmethod
+    def invalidate(cls, meter_id: str) -> None:
+        cls.rules.pop(meter_id, None)
@@ -0,0 +1,178 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from itertools import islice
+from typing import Callable
+
+from firebase_admin import db
+
+from app.share.messages.domain.model import NotificationControl
+from app.share.messages.domain.repo import (
+    NotificationControlRepository,
+    NotificationManagerRepository,
+)
+
+
+class NotificationControlRepositoryImpl(NotificationControlRepository):
+    """
+    Each control is read once from /notifications_control and then only
+    changed in memory. Changed controls are written every flush_interval
+    seconds with a single multi-path update, so validating a message does
+    not touch the database.
+
+    At most max_size controls are kept, the least recently used are dropped
+    first, and one that was not changed is read again after ttl seconds.
+    Controls waiting to be written are never dropped.
+    """
+
+    max_size: int = 10_000
+    ttl: float = 300
+
+    def __init__(
+        self,
+        notification_manager: NotificationManagerRepository,
+        flush_interval: float = 5,
+    ):
+        self.notification_manager = notification_manager
+        self.flush_interval = flush_interval
+
+        # alert_id -> (expires at, control)
+        self._controls: OrderedDict[str, tuple[float, NotificationControl]] = (
+            OrderedDict()
+        )
+        self._dirty: set[str] = set()
+        self._lock = threading.Lock()
+        self._task: asyncio.Task | None = None
+
+    def _cached(self, alert_id: str, now: float) -> NotificationControl | None:
+        entry = self._controls.get(alert_id)
+        if entry is None:
+            return None
+
+        expires, control = entry
+        if expires <= now and alert_id not in self._dirty:
+            return None
+
+        self._controls.move_to_end(alert_id)
+        return control
+
+    def _load(self, alert_id: str) -> NotificationControl:
+        now = time.monotonic()
+        with self._lock:
+            control = self._cached(alert_id, now)
+        if control is not None:
+            return control
+
+        # Read outside the lock, the first loaded copy is kept
+        loaded = self.notification_manager.get_control(alert_id=alert_id)
+
+        with self._lock:
+            control = self._cached(alert_id, now)
+            if control is not None:
+                return control
+
+            self._controls[alert_id] = (time.monotonic() + self.ttl, loaded)
+            self._evict()
+            return loaded
+
+    def _evict(self) -> None:
+        excess = len(self._controls) - self.max_size
+        if excess <= 0:
+            return
+
+        for alert_id in list(
+            islice(
+                (key for key in self._controls if key not in self._dirty), excess
+            )
+        ):
+            del self._controls[alert_id]
+
+    def _change(
+        self, alert_id: str, change: Callable[[NotificationControl], bool]
+    ) -> None:
+        control = self._load(alert_id)
+
+        with self._lock:
+            entry = self._controls.get(alert_id)
+            if entry is not None:
+                # Read again by another thread meanwhile
+                control = entry[1]
+            else:
+                # Dropped meanwhile, kept until it is written
+                self._controls[alert_id] = (time.monotonic() + self.ttl, control)
+
+            if change(control):
+                self._dirty.add(alert_id)
+
+    def get(self, alert_id: str) -> NotificationControl:
+        return self._load(alert_id).model_copy()
+
+    def increment(self, alert_id: str) -> None:
+        def change(control: NotificationControl) -> bool:
+            control.validation_count += 1
+            return True
+
+        self._change(alert_id, change)
+
+    def reset(self, alert_id: str) -> None:
+        def change(control: NotificationControl) -> bool:
+            if control.validation_count == 0:
+                return False
+            control.validation_count = 0
+            return True
+
+        self._change(alert_id, change)
+
+    def set_last_sent(self, alert_id: str, last_sent: float) -> None:
+        def change(control: NotificationControl) -> bool:
+            control.last_sent = last_sent
+            return True
+
+        self._change(alert_id, change)
+
+    def flush(self) -> int:
+        with self._lock:
+            dirty = self._dirty
+            self._dirty = set()
+            updates = {}
+            for alert_id in dirty:
+                _, control = self._controls[alert_id]
+                updates[f"notifications_control/{alert_id}/alert_id"] = alert_id
+                updates[f"notifications_control/{alert_id}/validation_count"] = (
+                    control.validation_count
+                )
+                updates[f"notifications_control/{alert_id}/last_sent"] = (
+                    control.last_sent
+                )
+
+        if not updates:
+            return 0
+
+        try:
+            db.reference().update(updates)
+        except Exception:
+            with self._lock:
+                self._dirty |= dirty
+            raise
+
+        return len(dirty)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        await asyncio.to_thread(self.flush)
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                print(f"Error al guardar el control de notificaciones: {e}")
@@ -1,10 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import time
 from firebase_admin import db
-from app.share.messages.domain.model import NotificationBody, NotificationBodyDatetime, NotificationControl, QueryNotificationParams, RecordParameter
+from app.share.messages.domain.model import NotificationBody, NotificationBodyDatetime, NotificationControl, NotificationHistoryPage, QueryNotificationParams, RecordParameter
 from app.share.messages.domain.repo import NotificationManagerRepository
+from app.share.users.domain.repository import UserRepository
 from app.share.workspace.workspace_access import WorkspaceAccess
 
+# Notifications of a history page read at the same time
+HISTORY_FETCH_WORKERS = 16
+
 
 class NotificationManagerRepositoryImpl(NotificationManagerRepository):
     """
@@ -12,13 +17,23 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
     This class is responsible for managing notifications.
     """
 
-    def __init__(self, access: WorkspaceAccess = None):
+    def __init__(self, access: WorkspaceAccess = None, user_repo: UserRepository = None):
         self.access = access
+        self.user_repo = user_repo or (access.user_repo if access is not None else None)
 
     def create(self, notification: NotificationBody) -> NotificationBody:
         ref = db.reference("/notifications_history/")
 
-        result = ref.push(notification.model_dump())
+        notification_data = notification.model_dump()
+
+        # Store the emails, so the history doesn't look them up
+        if notification.user_ids and self.user_repo is not None:
+            emails = self._get_emails(notification.user_ids)
+            notification_data["user_emails"] = [
+                emails[user_id] for user_id in notification.user_ids if user_id in emails
+            ]
+
+        result = ref.push(notification_data)
 
         notification.id = result.key
 
@@ -47,25 +62,53 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
         return notification
 
     def get_history(self, user_uid: str, params: QueryNotificationParams) -> list[NotificationBody | NotificationBodyDatetime]:
+        return self.get_history_page(user_uid, params).notifications
+
+    def get_history_page(self, user_uid: str, params: QueryNotificationParams) -> NotificationHistoryPage:
         notifications_ids = self._get_notifications_by_user(user_uid)
-        if notifications_ids is None:
-            return []
 
-        notifications = []
+        if params.cursor is not None:
+            notifications_ids = [
+                notification_id for notification_id in notifications_ids
+                if notification_id > params.cursor
+            ]
+
+        selected: list[tuple[str, dict]] = []
+        next_cursor = None
+        chunk_size = params.limit or len(notifications_ids) or 1
 
-        for notification_id in notifications_ids:
-            notification_data = db.reference(
-                f"/notifications_history/{notification_id}/").get()
+        for start in range(0, len(notifications_ids), chunk_size):
+            chunk_ids = notifications_ids[start:start + chunk_size]
+            chunk_data = self._fetch_notifications(chunk_ids)
 
-            if notification_data is None:
-                continue
+            for notification_id, notification_data in zip(chunk_ids, chunk_data):
+                # Filter the raw data, before building the models
+                if notification_data is None or not self._matches(notification_data, params):
+                    continue
+
+                if params.limit is not None and len(selected) == params.limit:
+                    next_cursor = selected[-1][0]
+                    break
+
+                selected.append((notification_id, notification_data))
+
+            if next_cursor is not None:
+                break
+
+        # Emails of the old notifications, stored without user_emails
+        emails = self._get_emails([
+            user_id
+            for _, notification_data in selected
+            if notification_data.get("user_emails") is None
+            for user_id in notification_data.get("user_ids") or []
+        ])
+
+        notifications = []
 
-            notification = None
+        for notification_id, notification_data in selected:
             records_parameters = self._parse_record_parameters(
                 notification_data.get("record_parameters") or [])
-
-            if params.status and notification_data.get("status") != params.status:
-                continue
+            user_emails = self._get_user_emails(notification_data, emails)
 
             if params.convert_timestamp:
                 notification = NotificationBodyDatetime(
@@ -73,9 +116,9 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
                     read=notification_data.get("read"),
                     title=notification_data.get("title"),
                     body=notification_data.get("body"),
-                    user_ids=self._get_email_of_user_ids(
-                        notification_data.get("user_ids")),
-                    datetime=notification_data.get("timestamp"),
+                    user_ids=user_emails,
+                    datetime=self._convert_timestamp_to_datetime(
+                        notification_data.get("timestamp")),
                     status=notification_data.get("status") or None,
                     record_parameters=records_parameters or [],
                     aproved_by=notification_data.get("aproved_by"),
@@ -86,26 +129,36 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
                     read=notification_data.get("read"),
                     title=notification_data.get("title"),
                     body=notification_data.get("body"),
-                    user_ids=self._get_email_of_user_ids(
-                        notification_data.get("user_ids")),
+                    user_ids=user_emails,
                     timestamp=notification_data.get("timestamp"),
                     status=notification_data.get("status") or None,
                     record_parameters=records_parameters or [],
                     aproved_by=notification_data.get("aproved_by"),
                 )
 
-            notification.id = notification_id
+            notifications.append(notification)
 
-            if params.is_read is not None and notification.read != params.is_read:
-                continue
+        return NotificationHistoryPage(notifications=notifications, next_cursor=next_cursor)
 
-            if params.convert_timestamp:
-                notification.datetime = self._convert_timestamp_to_datetime(
-                    notification.datetime)
+    def _matches(self, notification_data: dict, params: QueryNotificationParams) -> bool:
+        if params.status and notification_data.get("status") != params.status:
+            return False
 
-            notifications.append(notification)
+        if params.is_read is not None and notification_data.get("read", False) != params.is_read:
+            return False
 
-        return notifications
+        return True
+
+    def _fetch_notifications(self, notifications_ids: list[str]) -> list[dict | None]:
+        if not notifications_ids:
+            return []
+
+        workers = min(HISTORY_FETCH_WORKERS, len(notifications_ids))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(
+                lambda notification_id: self._get_reference_notification(notification_id).get(),
+                notifications_ids,
+            ))
 
     def _convert_timestamp_to_datetime(self, timestamp: float) -> str:
         return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
@@ -138,8 +191,7 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
     def update_control_validation(self, alert_id: str):
         ref = db.reference(
             f'/notifications_control/{alert_id}/validation_count')
-        current_count = ref.get() or 0
-        ref.set(current_count + 1)
+        ref.transaction(lambda current_count: (current_count or 0) + 1)
 
     def reset_control_validation(self, alert_id: str):
         # Logic to reset control validation for an alert
@@ -191,8 +243,7 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
                 read=notification_data.get("read"),
                 title=notification_data.get("title"),
                 body=notification_data.get("body"),
-                user_ids=self._get_email_of_user_ids(
-                    notification_data.get("user_ids")),
+                user_ids=self._get_user_emails(notification_data),
                 datetime=self._convert_timestamp_to_datetime(
                     notification_data.get("timestamp")),
                 status=notification_data.get("status"),
@@ -205,8 +256,7 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
                 read=notification_data.get("read"),
                 title=notification_data.get("title"),
                 body=notification_data.get("body"),
-                user_ids=self._get_email_of_user_ids(
-                    notification_data.get("user_ids")),
+                user_ids=self._get_user_emails(notification_data),
                 timestamp=notification_data.get("timestamp"),
                 status=notification_data.get("status"),
                 record_parameters=record_parameters,
@@ -232,19 +282,31 @@ class NotificationManagerRepositoryImpl(NotificationManagerRepository):
 
     def _get_notifications_by_user(self, user_id: str) -> list[str]:
         ref = db.reference(f"/notifications_by_user/{user_id}/")
-        data = ref.get()
+        data = ref.get(shallow=True)
         if data is None:
             return []
-        return list(data.keys())
+        # Push keys, sorted they are in creation order
+        return sorted(data.keys())
 
     def _get_reference_notification(self, notification_id: str):
         return db.reference(f"/notifications_history/{notification_id}/")
 
-    def _get_email_of_user_ids(self, user_ids: list[str]) -> list[str]:
-        emails = []
-        for user_id in user_ids:
-            user_detail = self.access.user_repo.get_by_uid(
-                user_id, limit_data=True)
-            if user_detail and user_detail.email:
-                emails.append(user_detail.email)
-        return emails
+    def _get_emails(self, user_ids: list[str]) -> dict[str, str]:
+        """Emails by uid, looked up in one batch (cached by the user repository)."""
+        if not user_ids or self.user_repo is None:
+            return {}
+
+        users = self.user_repo.get_by_uids(user_ids, limit_data=True)
+
+        return {user_id: user.email for user_id, user in users.items() if user.email}
+
+    def _get_user_emails(self, notification_data: dict, emails: dict[str, str] | None = None) -> list[str]:
+        user_emails = notification_data.get("user_emails")
+        if user_emails is not None:
+            return user_emails
+
+        user_ids = notification_data.get("user_ids") or []
+        if emails is None:
+            emails = self._get_emails(user_ids)
+
+        return [emails[user_id] for user_id in user_ids if user_id in emails]
@@ -1,4 +1,5 @@
 from firebase_admin import db
+import asyncio
 import time
 from datetime import datetime, timezone
 from app.share.messages.domain.model import (
@@ -7,13 +8,19 @@ from app.share.messages.domain.model import (
     NotificationBody,
     NotificationStatus,
     RecordParameter,
+    ResultValidationAlert,
 )
 from app.share.messages.domain.repo import (
+    AlertRulesRepository,
+    NotificationControlRepository,
     NotificationManagerRepository,
     SenderAlertsRepository,
     SenderServiceRepository,
 )
-from app.share.messages.domain.validate import RecordValidation
+from app.share.messages.infra.alert_rules_impl import AlertRulesRepositoryImpl
+from app.share.messages.infra.notification_control_impl import (
+    NotificationControlRepositoryImpl,
+)
 from app.share.socketio.domain.model import RecordBody
 from app.share.workspace.domain.model import WorkspaceRoles
 
@@ -23,61 +30,64 @@ class SenderAlertsRepositoryImpl(SenderAlertsRepository):
         self,
         sender_service: SenderServiceRepository,
         notification_manager: NotificationManagerRepository,
+        alert_rules: AlertRulesRepository | None = None,
+        control_repo: NotificationControlRepository | None = None,
     ):
         self.sender_service = sender_service
         self.notification_manager = notification_manager
-
-    def _list_alerts_by_meter(self, meter_id: str) -> list[AlertData]:
-        # Fetch alerts for the given meter_id from Firebase Realtime Database
-        ref = (
-            db.reference().child("alerts").order_by_child("meter_id").equal_to(meter_id)
+        self.alert_rules = alert_rules or AlertRulesRepositoryImpl()
+        self.control_repo = control_repo or NotificationControlRepositoryImpl(
+            notification_manager=notification_manager
         )
 
-        alerts_data = ref.get()
-
-        alerts = []
-
-        for alert_id, alert in alerts_data.items():
-
-            alerts.append(
-                AlertData(
-                    id=alert_id,
-                    meter_id=alert.get("meter_id"),
-                    title=alert.get("title"),
-                    type=alert.get("type"),
-                    user_uid=alert.get("owner"),
-                    parameters=alert.get("parameters") or None,
-                    user_to_notify=alert.get("guests") or [],
-                )
-            )
-
-        return alerts
-
     def _get_owner_of_workspace(self, workspace_id: str) -> str:
         ref = db.reference().child("workspaces").child(workspace_id).child("owner")
         owner_data = ref.get()
         return owner_data
 
-    def _validate_records(self, meter_id, records: RecordBody) -> list[AlertData]:
-        alerts = self._list_alerts_by_meter(meter_id)
+    def _get_meter_name(self, workspace_id: str, meter_id: str) -> str | None:
+        return (
+            db.reference()
+            .child("workspaces")
+            .child(workspace_id)
+            .child("meters")
+            .child(meter_id)
+            .child("name")
+            .get()
+        )
+
+    def _validate_many(
+        self, meter_id, records: list[RecordBody]
+    ) -> tuple[list[AlertData], list[ResultValidationAlert]]:
+        """
+        Alerts of the meter and the result of each record, checked against
+        the rules at once. The controls of the alerts are loaded, so they
+        can be updated without reading Firebase.
+        """
+        rules = self.alert_rules.get(meter_id)
+        alerts = rules.alerts
 
         if not alerts:
             print("Not found alerts for meter")
-            return []
-
-        result_validation_alert = RecordValidation.validate(
-            record=records, alerts=alerts
-        )
+            return alerts, []
 
-        if not result_validation_alert.has_parameters:
+        if not rules.has_parameters:
             print("Not found parameters in alerts")
-            return []
+            return alerts, []
+
+        for alert in alerts:
+            self.control_repo.get(alert.id)
 
+        return alerts, rules.validate_many(records)
+
+    def _triggered_alerts(
+        self, alerts: list[AlertData], result_validation_alert: ResultValidationAlert
+    ) -> list[AlertData]:
         if not result_validation_alert.alerts_ids:
             alerts_ids = [alert.id for alert in alerts]
 
             for alert_id in alerts_ids:
-                self.notification_manager.reset_control_validation(alert_id=alert_id)
+                self.control_repo.reset(alert_id=alert_id)
 
             print("Not found alert type")
             return []
@@ -89,21 +99,26 @@ class SenderAlertsRepositoryImpl(SenderAlertsRepository):
         ]
 
         for alert in alerts_not_validated:
-            self.notification_manager.reset_control_validation(alert_id=alert.id)
+            self.control_repo.reset(alert_id=alert.id)
 
         alerts_validated = []
 
         for alert in alerts:
             if alert.id in result_validation_alert.alerts_ids:
-                # Add the records of parameters that triggered the alert
-                alert.records_of_parameters = [
+                # Add the records of parameters that triggered the alert.
+                # The cached alert is copied, it is shared between messages
+                records_of_parameters = [
                     RecordParameter(
                         parameter=param_data.parameter, value=param_data.value
                     )
                     for param_data in result_validation_alert.parameters_data
                     if param_data.alert_id == alert.id
                 ]
-                alerts_validated.append(alert)
+                alerts_validated.append(
+                    alert.model_copy(
+                        update={"records_of_parameters": records_of_parameters}
+                    )
+                )
 
         return alerts_validated
 
@@ -116,21 +131,40 @@ class SenderAlertsRepositoryImpl(SenderAlertsRepository):
         return last_date == datetime.now(timezone.utc).date()
 
     async def send_alerts(self, workspace_id: str, meter_id: str, records: RecordBody):
-        alert_valid = self._validate_records(meter_id, records=records)
+        await self.send_alerts_many(workspace_id, meter_id, [records])
+
+    async def send_alerts_many(
+        self, workspace_id: str, meter_id: str, records: list[RecordBody]
+    ):
+        self.control_repo.start()
 
-        if not alert_valid:
-            print("Not found alerts for validation")
-            return
+        # Firebase reads run in a thread to keep the event loop free. The
+        # rules are evaluated once for the whole batch; the records are then
+        # counted one after the other, as if they had come one by one
+        alerts, results = await asyncio.to_thread(
+            self._validate_many, meter_id, records=records
+        )
+
+        for result in results:
+            alert_valid = self._triggered_alerts(alerts, result)
+
+            if not alert_valid:
+                print("Not found alerts for validation")
+                continue
 
+            await self._notify(workspace_id, meter_id, alert_valid)
+
+    async def _notify(self, workspace_id: str, meter_id: str, alert_valid: list[AlertData]):
         print(alert_valid)
-        # Get the list of managers and owner of the workspace
-        owner = self._get_owner_of_workspace(workspace_id=workspace_id)
+        owner = None
+        meter_name = None
 
         for alert in alert_valid:
             # Check if the alert is already validated
 
-            notification_control = self.notification_manager.get_control(
-                alert_id=alert.id
+            # Controls are kept in memory, only the first access reads them
+            notification_control = await asyncio.to_thread(
+                self.control_repo.get, alert.id
             )
 
             if notification_control.last_sent is not None and self._was_sent_today(
@@ -139,19 +173,19 @@ class SenderAlertsRepositoryImpl(SenderAlertsRepository):
                 continue
 
             if notification_control.validation_count < 20:
-                self.notification_manager.update_control_validation(alert_id=alert.id)
+                self.control_repo.increment(alert_id=alert.id)
                 continue
+
+            if owner is None:
+                # Get the owner of the workspace and the name of the meter
+                owner = await asyncio.to_thread(
+                    self._get_owner_of_workspace, workspace_id=workspace_id
+                )
+                meter_name = await asyncio.to_thread(
+                    self._get_meter_name, workspace_id, meter_id
+                )
             recipients = alert.user_to_notify + [owner]  # Notify owner and guests
             recipients = self._remove_duplicate_user_ids(recipients)
-            meter_name = (
-                db.reference()
-                .child("workspaces")
-                .child(workspace_id)
-                .child("meters")
-                .child(meter_id)
-                .child("name")
-                .get()
-            )
             # Send notification
             notification = NotificationBody(
                 title=alert.title,
@@ -165,17 +199,15 @@ class SenderAlertsRepositoryImpl(SenderAlertsRepository):
 
             await self.sender_service.send_notification(notification)
 
-            # Update the notification count in Firebase
-            self.notification_manager.update_control_last_sent(
-                alert_id=alert.id, last_sent=notification.timestamp
-            )
-            self.notification_manager.reset_control_validation(alert_id=alert.id)
-
-            self.notification_manager.update_control_last_sent(
+            # Update the notification control, written right away so a
+            # restart can't send the alert twice on the same day
+            self.control_repo.set_last_sent(
                 alert_id=alert.id, last_sent=notification.timestamp
             )
+            self.control_repo.reset(alert_id=alert.id)
+            await asyncio.to_thread(self.control_repo.flush)
 
-            self.notification_manager.create(notification)
+            await asyncio.to_thread(self.notification_manager.create, notification)
 
             print(f"Notification sent to {alert.user_uid} for alert {alert.id}")
 
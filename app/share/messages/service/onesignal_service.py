@@ -1,7 +1,3 @@
-from onesignal import ApiClient, Configuration, ApiException
-from onesignal.api.default_api import DefaultApi
-from onesignal.model.string_map import StringMap
-from onesignal.model.notification import Notification
 from app.share.messages.domain.config import ConfigOneSignal
 from app.share.messages.domain.model import NotificationBody
 from app.share.messages.domain.repo import SenderServiceRepository
@@ -11,12 +7,16 @@ class OneSignalService(SenderServiceRepository):
 
     config = ConfigOneSignal()
 
-    api_client: ApiClient = None
+    # onesignal (and its generated models) is imported on the first
+    # notification sent
+    api_client = None
 
     def get_api_client(self):
         if self.api_client:
             return self.api_client
 
+        from onesignal import ApiClient, Configuration
+
         # La configuración correcta según la documentación actual
         configuration = Configuration(
             # El header de Authorization debe ser "Basic REST_API_KEY"
@@ -26,6 +26,9 @@ class OneSignalService(SenderServiceRepository):
         return self.api_client
 
     def create_notification(self, notification: NotificationBody):
+        from onesignal.model.notification import Notification
+        from onesignal.model.string_map import StringMap
+
         return Notification(
             app_id=self.config.app_id,
             headings=StringMap(en=notification.title),
@@ -34,6 +37,8 @@ class OneSignalService(SenderServiceRepository):
         )
 
     async def send_notification(self, notification: NotificationBody):
+        from onesignal import ApiException
+        from onesignal.api.default_api import DefaultApi
 
         with self.get_api_client() as api_client_context:
             default_api = DefaultApi(api_client_context)
@@ -0,0 +1,336 @@
+import numpy as np
+
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.rollup import HOUR_SECONDS, DAY_SECONDS, RollupGranularity
+
+
+NUMERIC_SENSORS: list[SensorType] = [
+    sensor for sensor in SensorType if sensor != SensorType.COLOR
+]
+
+
+class RecordColumns:
+    """
+    Columnar view of meter records.
+
+    timestamps: int64 array with the record keys (seconds)
+    values: one float64 array per sensor, NaN where the sensor has no value
+    """
+
+    def __init__(self, timestamps: np.ndarray, values: dict[SensorType, np.ndarray]):
+        self.timestamps: np.ndarray = timestamps
+        self.values: dict[SensorType, np.ndarray] = values
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls, sensors: list[SensorType]) -> "RecordColumns":
+        return cls(
+            timestamps=np.empty(0, dtype=np.int64),
+            values={sensor: np.empty(0, dtype=np.float64) for sensor in sensors},
+        )
+
+    @classmethod
+    def from_snapshot(
+        cls, records_data: dict | None, sensors: list[SensorType] | None = None
+    ) -> "RecordColumns":
+        """
+        Build the columns straight from the raw Firebase snapshot
+        ({timestamp: {sensor: {"value": ..., "datetime": ...}}}).
+        """
+        sensors = _numeric_sensors(sensors)
+
+        if not records_data:
+            return cls.empty(sensors)
+
+        keys = [key for key in records_data.keys() if key.isdigit()]
+        count = len(keys)
+
+        timestamps = np.fromiter(
+            (int(key) for key in keys), dtype=np.int64, count=count
+        )
+
+        rows = [records_data[key] for key in keys]
+        values = {
+            sensor: np.fromiter(
+                (_sensor_value(row, sensor.value) for row in rows),
+                dtype=np.float64,
+                count=count,
+            )
+            for sensor in sensors
+        }
+
+        return cls(timestamps=timestamps, values=values)
+
+    @classmethod
+    def concat(
+        cls, parts: list["RecordColumns"], sensors: list[SensorType] | None = None
+    ) -> "RecordColumns":
+        """Join parts that are already in timestamp order."""
+        sensors = _numeric_sensors(sensors)
+        parts = [part for part in parts if len(part)]
+
+        if not parts:
+            return cls.empty(sensors)
+
+        return cls(
+            timestamps=np.concatenate([part.timestamps for part in parts]),
+            values={
+                sensor: np.concatenate([part.values[sensor] for part in parts])
+                for sensor in sensors
+            },
+        )
+
+
+class AggregateColumns:
+    """
+    Columnar aggregates (count, sum, sum of squares, sum of squared
+    deviations from the mean (m2), min and max per sensor) indexed by
+    timestamp. Rows can be raw records or rollup buckets, so both sources can
+    be combined before resampling.
+    """
+
+    FIELDS = ("count", "sum", "sum_sq", "m2", "min", "max")
+
+    def __init__(
+        self, timestamps: np.ndarray, stats: dict[SensorType, dict[str, np.ndarray]]
+    ):
+        self.timestamps: np.ndarray = timestamps
+        self.stats: dict[SensorType, dict[str, np.ndarray]] = stats
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @classmethod
+    def empty(cls, sensors: list[SensorType]) -> "AggregateColumns":
+        return cls(
+            timestamps=np.empty(0, dtype=np.int64),
+            stats={
+                sensor: {
+                    field: np.empty(0, dtype=np.float64) for field in cls.FIELDS
+                }
+                for sensor in sensors
+            },
+        )
+
+    @classmethod
+    def from_records(cls, columns: RecordColumns) -> "AggregateColumns":
+        stats = {}
+        for sensor, values in columns.values.items():
+            present = ~np.isnan(values)
+            filled = np.where(present, values, 0.0)
+            stats[sensor] = {
+                "count": present.astype(np.float64),
+                "sum": filled,
+                "sum_sq": filled * filled,
+                "m2": np.zeros(len(values), dtype=np.float64),
+                "min": values,
+                "max": values,
+            }
+
+        return cls(timestamps=columns.timestamps, stats=stats)
+
+    @classmethod
+    def from_buckets(
+        cls, buckets: dict | None, sensors: list[SensorType] | None = None
+    ) -> "AggregateColumns":
+        """
+        Build the columns from rollup buckets
+        ({bucket_start: {sensor: {"count", "sum", "sum_sq", "min", "max"}}}).
+        Buckets without m2 (rollups) get it from the sum of squares.
+        """
+        sensors = _numeric_sensors(sensors)
+
+        if not buckets:
+            return cls.empty(sensors)
+
+        keys = [key for key in buckets.keys() if str(key).isdigit()]
+        count = len(keys)
+
+        timestamps = np.fromiter(
+            (int(key) for key in keys), dtype=np.int64, count=count
+        )
+
+        rows = [buckets[key] for key in keys]
+        stats = {
+            sensor: {
+                field: np.fromiter(
+                    (_bucket_value(row, sensor.value, field) for row in rows),
+                    dtype=np.float64,
+                    count=count,
+                )
+                for field in cls.FIELDS
+            }
+            for sensor in sensors
+        }
+        for fields in stats.values():
+            _fill_m2(fields)
+
+        return cls(timestamps=timestamps, stats=stats)
+
+    @classmethod
+    def concat(
+        cls, parts: list["AggregateColumns"], sensors: list[SensorType] | None = None
+    ) -> "AggregateColumns":
+        """Join several parts into one, sorted by timestamp."""
+        sensors = _numeric_sensors(sensors)
+        parts = [part for part in parts if len(part)]
+
+        if not parts:
+            return cls.empty(sensors)
+
+        timestamps = np.concatenate([part.timestamps for part in parts])
+        order = np.argsort(timestamps, kind="stable")
+
+        stats = {
+            sensor: {
+                field: np.concatenate(
+                    [part.stats[sensor][field] for part in parts]
+                )[order]
+                for field in cls.FIELDS
+            }
+            for sensor in sensors
+        }
+
+        return cls(timestamps=timestamps[order], stats=stats)
+
+    def group(self, granularity: RollupGranularity | None) -> "AggregateColumns":
+        """
+        Merge the rows into buckets of the granularity (UTC), or into a single
+        row at the first timestamp when granularity is None.
+        """
+        if not len(self):
+            return self
+
+        if granularity is None:
+            keys = np.full(len(self), self.timestamps.min(), dtype=np.int64)
+        else:
+            keys = bucket_starts(self.timestamps, granularity)
+
+        starts, index = np.unique(keys, return_inverse=True)
+
+        stats = {}
+        for sensor, fields in self.stats.items():
+            grouped = {}
+            for field in ("count", "sum", "sum_sq"):
+                grouped[field] = np.zeros(len(starts), dtype=np.float64)
+                np.add.at(grouped[field], index, fields[field])
+
+            # m2 of each row plus its count times the squared distance of its
+            # mean to the bucket mean (Chan et al.)
+            deviation = _mean(fields) - _mean(grouped)[index]
+            grouped["m2"] = np.zeros(len(starts), dtype=np.float64)
+            np.add.at(
+                grouped["m2"],
+                index,
+                fields["m2"] + fields["count"] * deviation * deviation,
+            )
+
+            grouped["min"] = np.full(len(starts), np.nan, dtype=np.float64)
+            np.fmin.at(grouped["min"], index, fields["min"])
+            grouped["max"] = np.full(len(starts), np.nan, dtype=np.float64)
+            np.fmax.at(grouped["max"], index, fields["max"])
+
+            stats[sensor] = grouped
+
+        return AggregateColumns(timestamps=starts, stats=stats)
+
+    def to_buckets(self) -> dict[str, dict]:
+        """Inverse of from_buckets; sensors without values are left out."""
+        buckets: dict[str, dict] = {}
+
+        for i, timestamp in enumerate(self.timestamps.tolist()):
+            bucket = {}
+            for sensor, fields in self.stats.items():
+                if fields["count"][i] <= 0:
+                    continue
+                bucket[sensor.value] = {
+                    field: float(fields[field][i]) for field in self.FIELDS
+                }
+            buckets[str(timestamp)] = bucket
+
+        return buckets
+
+    def record_count(self, since: int | None = None) -> int:
+        """
+        Records behind the aggregates (the rows from since on): a meter sends
+        every sensor on each reading, so per row it is the count of the
+        sensor with most values.
+        """
+        counts = self.row_counts()
+        if since is not None:
+            counts = counts[self.timestamps >= since]
+        return int(counts.sum())
+
+    def row_counts(self) -> np.ndarray:
+        """Records behind each row, as in record_count"""
+        if not len(self) or not self.stats:
+            return np.zeros(len(self), dtype=np.float64)
+
+        counts = np.vstack([fields["count"] for fields in self.stats.values()])
+        return counts.max(axis=0)
+
+
+def bucket_starts(timestamps: np.ndarray, granularity: RollupGranularity) -> np.ndarray:
+    """Vectorized rollup.bucket_start."""
+    if granularity == RollupGranularity.HOUR:
+        return timestamps - timestamps % HOUR_SECONDS
+    if granularity == RollupGranularity.DAY:
+        return timestamps - timestamps % DAY_SECONDS
+
+    months = timestamps.astype("datetime64[s]").astype("datetime64[M]")
+    return months.astype("datetime64[s]").astype(np.int64)
+
+
+def _numeric_sensors(sensors: list[SensorType] | None) -> list[SensorType]:
+    if sensors is None:
+        return NUMERIC_SENSORS
+
+    if SensorType.COLOR in sensors:
+        raise ValueError("El análisis de color no está soportado")
+
+    return list(sensors)
+
+
+def _sensor_value(row: dict | None, sensor_name: str) -> float:
+    if not row:
+        return np.nan
+
+    record = row.get(sensor_name)
+    if not record:
+        return np.nan
+
+    value = record.get("value")
+    if value is None:
+        return np.nan
+
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return np.nan
+
+
+def _bucket_value(row: dict | None, sensor_name: str, field: str) -> float:
+    aggregate = (row or {}).get(sensor_name)
+    if not aggregate:
+        return 0.0 if field in ("count", "sum", "sum_sq", "m2") else np.nan
+
+    value = aggregate.get(field)
+    return np.nan if value is None else float(value)
+
+
+def _mean(fields: dict[str, np.ndarray]) -> np.ndarray:
+    """Mean of each row, 0 for rows without values"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(fields["count"] > 0, fields["sum"] / fields["count"], 0.0)
+
+
+def _fill_m2(fields: dict[str, np.ndarray]) -> None:
+    missing = np.isnan(fields["m2"])
+    if not missing.any():
+        return
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        m2 = fields["sum_sq"] - fields["sum"] * _mean(fields)
+    fields["m2"] = np.where(missing, np.maximum(np.nan_to_num(m2), 0.0), fields["m2"])
@@ -0,0 +1,28 @@
+from app.share.config import Config
+from app.share.meter_records.domain.rollup import DAY_SECONDS
+
+
+class RangeReaderConfigImpl(Config):
+    def _get_int(self, key: str, default: int) -> int:
+        value = self.get_env(key)
+        return int(value) if value else default
+
+    @property
+    def slice_seconds(self) -> int:
+        """Time covered by each slice of a range read"""
+        return self._get_int("RECORDS_SLICE_SECONDS", DAY_SECONDS)
+
+    @property
+    def max_workers(self) -> int:
+        """Slices fetched at once, across all reads"""
+        return self._get_int("RECORDS_READ_WORKERS", 4)
+
+    @property
+    def page_size(self) -> int:
+        """Records per query inside a slice"""
+        return self._get_int("RECORDS_PAGE_SIZE", 5000)
+
+    @property
+    def retries(self) -> int:
+        """Retries of a failed query"""
+        return self._get_int("RECORDS_READ_RETRIES", 2)
@@ -0,0 +1,143 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Iterable, Iterator
+
+from app.share.meter_records.domain.columns import NUMERIC_SENSORS
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+    ARROW = "arrow"
+
+    def media_type(self) -> str:
+        media_types = {
+            ExportFormat.NDJSON: "application/x-ndjson",
+            ExportFormat.CSV: "text/csv",
+            ExportFormat.ARROW: "application/vnd.apache.arrow.stream",
+        }
+        return media_types[self]
+
+    def extension(self) -> str:
+        return self.value
+
+
+EXPORT_COLUMNS: list[str] = (
+    ["timestamp", "datetime"]
+    + [sensor.value for sensor in NUMERIC_SENSORS]
+    + ["color_r", "color_g", "color_b"]
+)
+
+
+type RecordChunk = dict[str, dict]
+
+
+def flatten_record(key: str, data: dict) -> dict:
+    """One raw Firebase record as a flat row with every export column."""
+    row: dict = {column: None for column in EXPORT_COLUMNS}
+    row["timestamp"] = int(key)
+
+    for name, sensor in data.items():
+        if not isinstance(sensor, dict):
+            continue
+
+        if row["datetime"] is None:
+            row["datetime"] = sensor.get("datetime")
+
+        value = sensor.get("value")
+        if name == "color":
+            if isinstance(value, dict):
+                row["color_r"] = value.get("r")
+                row["color_g"] = value.get("g")
+                row["color_b"] = value.get("b")
+        elif name in row:
+            row[name] = value
+
+    return row
+
+
+def _rows(chunk: RecordChunk) -> list[dict]:
+    return [flatten_record(key, data) for key, data in chunk.items() if key.isdigit()]
+
+
+def to_ndjson(chunks: Iterable[RecordChunk]) -> Iterator[bytes]:
+    """One JSON object per line, encoded one chunk at a time."""
+    for chunk in chunks:
+        rows = _rows(chunk)
+        if rows:
+            yield "".join(json.dumps(row) + "\n" for row in rows).encode()
+
+
+def to_csv(chunks: Iterable[RecordChunk]) -> Iterator[bytes]:
+    """CSV with a header row, encoded one chunk at a time."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS, lineterminator="\n")
+
+    writer.writeheader()
+    yield buffer.getvalue().encode()
+
+    for chunk in chunks:
+        rows = _rows(chunk)
+        if not rows:
+            continue
+
+        buffer.seek(0)
+        buffer.truncate(0)
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+
+
+def to_arrow(chunks: Iterable[RecordChunk]) -> Iterator[bytes]:
+    """
+    Arrow IPC stream: the schema followed by one record batch per chunk.
+
+    pyarrow is only needed for this format, so it is imported here.
+    """
+    import pyarrow as pa
+
+    schema = pa.schema(
+        [("timestamp", pa.int64()), ("datetime", pa.string())]
+        + [(column, pa.float64()) for column in EXPORT_COLUMNS[2:]]
+    )
+
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain() -> bytes:
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate(0)
+        return data
+
+    for chunk in chunks:
+        rows = _rows(chunk)
+        if not rows:
+            continue
+
+        batch = pa.RecordBatch.from_arrays(
+            [
+                pa.array([row[field.name] for row in rows], type=field.type)
+                for field in schema
+            ],
+            schema=schema,
+        )
+        writer.write_batch(batch)
+        yield drain()
+
+    writer.close()
+    yield drain()
+
+
+ENCODERS = {
+    ExportFormat.NDJSON: to_ndjson,
+    ExportFormat.CSV: to_csv,
+    ExportFormat.ARROW: to_arrow,
+}
+
+
+def encode_records(
+    chunks: Iterable[RecordChunk], export_format: ExportFormat
+) -> Iterator[bytes]:
+    return ENCODERS[export_format](chunks)
@@ -20,6 +20,17 @@ class SensorQueryParams(BaseModel):
     sensor_type: SensorType | None = None
 
 
+class RecordWatermark(BaseModel):
+    """Raw data a result was computed from: last record key and record count."""
+
+    last_key: int | None = None
+    count: int = 0
+    # Part of count from the first timestamp of the rollups on, which can be
+    # checked again from them; None when the meter had no rollups
+    rollup_since: int | None = None
+    rollup_count: int = 0
+
+
 class RecordEntry(BaseModel):
     color: Record[SRColorValue] | None = None
     conductivity: Record[float] | None = None
@@ -1,11 +1,19 @@
 from abc import ABC, abstractmethod
+from typing import Iterator
+from app.share.meter_records.domain.columns import AggregateColumns
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.export import RecordChunk
+from app.share.meter_records.domain.rollup import RollupCoverage, RollupGranularity
 from app.share.meter_records.domain.model import (
     RecordsDict,
     SensorIdentifier,
     SensorQueryParams,
 )
 from app.share.socketio.domain.model import Record
-from app.share.meter_records.domain.response import SensorRecordsResponse
+from app.share.meter_records.domain.response import (
+    RecordTimeline,
+    SensorRecordsResponse,
+)
 
 
 class MeterRecordsRepository(ABC):
@@ -41,3 +49,89 @@ class MeterRecordsRepository(ABC):
         self, identifier: SensorIdentifier, params: SensorQueryParams
     ) -> RecordsDict:
         pass
+
+    @abstractmethod
+    def query_aggregates(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        max_granularity: RollupGranularity,
+        sensors: list[SensorType] | None = None,
+    ) -> AggregateColumns:
+        """
+        Query per-bucket aggregates for the date range of params.
+
+        Complete rollup buckets (up to max_granularity) are read instead of
+        the raw records; the edges of the range and the time before the
+        rollups existed are read raw and aggregated per record.
+
+        Args:
+            identifier: Sensor identifier
+            params: Query parameters (start_date and end_date)
+            max_granularity: Coarsest bucket allowed; must not be coarser
+                than the period the caller resamples to
+            sensors: Numeric sensors to load (default: all but color)
+
+        Returns:
+            AggregateColumns in ascending timestamp order
+        """
+        pass
+
+    @abstractmethod
+    def get_last_key(
+        self, identifier: SensorIdentifier, params: SensorQueryParams
+    ) -> int | None:
+        """
+        Key (timestamp) of the newest record in the date range of params,
+        reading a single record. None when the range has no records.
+        """
+        pass
+
+    @abstractmethod
+    def get_rollup_coverage(self, identifier: SensorIdentifier) -> RollupCoverage | None:
+        """
+        Timestamps the rollups of the meter include, None if it has none.
+        """
+        pass
+
+
+    @abstractmethod
+    def export_records(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        chunk_size: int = 1000,
+    ) -> Iterator[RecordChunk]:
+        """
+        Iterate over the raw records of the date range of params, oldest
+        first, paging through the keys so only one chunk is held at a time.
+
+        Access to the meter is checked when called, before iterating.
+
+        Args:
+            identifier: Sensor identifier
+            params: Query parameters (start_date and end_date)
+            chunk_size: Records read per query
+
+        Returns:
+            Iterator of raw snapshots ({timestamp: {sensor: {...}}})
+        """
+        pass
+
+    @abstractmethod
+    def get_timeline(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        granularity: RollupGranularity = RollupGranularity.DAY,
+    ) -> RecordTimeline:
+        """
+        Record count per bucket of granularity and the first and last key in
+        the date range of params, without reading the records themselves.
+
+        Counts come from the rollups; only the few records newer than them,
+        not added by the ingest yet, are read. Records older than the
+        rollups are left out until they are backfilled (see counted_from).
+        Buckets at the edges of the range are counted whole.
+        """
+        pass
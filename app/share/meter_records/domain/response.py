@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from app.share.meter_records.domain.rollup import RollupGranularity
 from app.share.socketio.domain.model import Record, SRColorValue
 
 
@@ -9,3 +10,23 @@ class SensorRecordsResponse(BaseModel):
     temperature: list[Record[float]]
     tds: list[Record[float]]
     turbidity: list[Record[float]]
+
+
+class TimelineBucket(BaseModel):
+    start: int
+    count: int
+
+
+class RecordTimeline(BaseModel):
+    """
+    Records per bucket of a date range and the first and last key in it,
+    so clients can draw the density of the data and jump to a date.
+    """
+
+    granularity: RollupGranularity
+    first_key: int | None = None
+    last_key: int | None = None
+    # First timestamp counted, None while the meter has no rollups; older
+    # records are counted once the rollups are backfilled
+    counted_from: int | None = None
+    buckets: list[TimelineBucket] = []
@@ -0,0 +1,240 @@
+from datetime import datetime, timezone
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+HOUR_SECONDS = 60 * 60
+DAY_SECONDS = 24 * HOUR_SECONDS
+
+# Field of a stored bucket with the number of records it counts
+RECORDS_FIELD = "records"
+
+# Field of a stored hour with the newest timestamp it counts
+LAST_FIELD = "last"
+
+
+class RollupGranularity(str, Enum):
+    HOUR = "hour"
+    DAY = "day"
+    MONTH = "month"
+
+
+# From the coarsest to the finest bucket
+ROLLUP_LEVELS: list[RollupGranularity] = [
+    RollupGranularity.MONTH,
+    RollupGranularity.DAY,
+    RollupGranularity.HOUR,
+]
+
+
+class RollupCoverage(BaseModel):
+    """
+    The records from since to until (inclusive) are in the buckets. Older
+    ones wait for a backfill and newer ones for the rollups of the ingest,
+    so both are read raw.
+    """
+
+    since: int
+    until: int | None = None
+
+    @property
+    def end(self) -> int:
+        """Exclusive end of the records in the buckets"""
+        return self.until + 1 if self.until is not None else self.since
+
+
+class RollupSpan(BaseModel):
+    """
+    Part of a time range [start, end) that is read from the rollup buckets
+    of one granularity, or from the raw records when granularity is None.
+    """
+
+    granularity: RollupGranularity | None = None
+    start: int
+    end: int
+
+
+def bucket_start(timestamp: int, granularity: RollupGranularity) -> int:
+    """Start (UTC, seconds) of the bucket that contains the timestamp."""
+    if granularity == RollupGranularity.HOUR:
+        return timestamp - timestamp % HOUR_SECONDS
+    if granularity == RollupGranularity.DAY:
+        return timestamp - timestamp % DAY_SECONDS
+
+    dt = datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    return int(datetime(dt.year, dt.month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def bucket_end(start: int, granularity: RollupGranularity) -> int:
+    """Exclusive end of the bucket that begins at start."""
+    if granularity == RollupGranularity.HOUR:
+        return start + HOUR_SECONDS
+    if granularity == RollupGranularity.DAY:
+        return start + DAY_SECONDS
+
+    dt = datetime.fromtimestamp(start, tz=timezone.utc)
+    year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+    return int(datetime(year, month, 1, tzinfo=timezone.utc).timestamp())
+
+
+def _bucket_ceil(timestamp: int, granularity: RollupGranularity) -> int:
+    start = bucket_start(timestamp, granularity)
+    return start if start == timestamp else bucket_end(start, granularity)
+
+
+def cover_range(
+    start: int,
+    end: int,
+    max_granularity: RollupGranularity = RollupGranularity.MONTH,
+) -> list[RollupSpan]:
+    """
+    Split [start, end) into the fewest complete buckets, using granularities
+    up to max_granularity. The leftovers at the edges (less than one hour)
+    are returned as raw spans.
+    """
+    levels = ROLLUP_LEVELS[ROLLUP_LEVELS.index(max_granularity):]
+    return _cover(start, end, levels)
+
+
+def _cover(start: int, end: int, levels: list[RollupGranularity]) -> list[RollupSpan]:
+    if start >= end:
+        return []
+
+    if not levels:
+        return [RollupSpan(start=start, end=end)]
+
+    granularity = levels[0]
+    first = _bucket_ceil(start, granularity)
+    last = bucket_start(end, granularity)
+
+    if first >= last:
+        return _cover(start, end, levels[1:])
+
+    return (
+        _cover(start, first, levels[1:])
+        + [RollupSpan(granularity=granularity, start=first, end=last)]
+        + _cover(last, end, levels[1:])
+    )
+
+
+def aggregate_value(value: float) -> dict:
+    """Aggregate of a single reading."""
+    return {
+        "count": 1,
+        "sum": value,
+        "sum_sq": value * value,
+        "min": value,
+        "max": value,
+    }
+
+
+def merge_aggregate(current: dict | None, other: dict) -> dict:
+    if not current:
+        return dict(other)
+
+    return {
+        "count": current["count"] + other["count"],
+        "sum": current["sum"] + other["sum"],
+        "sum_sq": current["sum_sq"] + other["sum_sq"],
+        "min": min(current["min"], other["min"]),
+        "max": max(current["max"], other["max"]),
+    }
+
+
+def merge_bucket(current: dict | None, values: dict[str, float | None]) -> dict:
+    """
+    Add one reading per sensor to a stored bucket.
+
+    A bucket is {sensor: {"count", "sum", "sum_sq", "min", "max"}}; sensors
+    without a value are left untouched.
+    """
+    bucket = dict(current or {})
+
+    for sensor, value in values.items():
+        if value is None:
+            continue
+        bucket[sensor] = merge_aggregate(bucket.get(sensor), aggregate_value(value))
+
+    return bucket
+
+
+def merge_buckets(current: dict | None, other: dict) -> dict:
+    """Merge two buckets of aggregates ({sensor: aggregate})."""
+    bucket = dict(current or {})
+
+    for sensor, aggregate in other.items():
+        if sensor in (RECORDS_FIELD, LAST_FIELD):
+            continue
+        bucket[sensor] = merge_aggregate(bucket.get(sensor), aggregate)
+
+    return bucket
+
+
+def add_buckets(current: dict | None, other: dict) -> dict:
+    """Add a bucket to a stored one, records included."""
+    bucket = merge_buckets(current, other)
+    bucket[RECORDS_FIELD] = (current or {}).get(RECORDS_FIELD, 0) + other.get(
+        RECORDS_FIELD, 0
+    )
+    return bucket
+
+
+def diff_buckets(new: dict, old: dict | None) -> dict:
+    """
+    What a bucket counted again from more records adds to the old one, so
+    it can be added to the buckets that contain it.
+    """
+    old = old or {}
+    bucket: dict = {RECORDS_FIELD: new.get(RECORDS_FIELD, 0) - old.get(RECORDS_FIELD, 0)}
+
+    for sensor, aggregate in new.items():
+        if sensor in (RECORDS_FIELD, LAST_FIELD):
+            continue
+        previous = old.get(sensor) or {"count": 0, "sum": 0.0, "sum_sq": 0.0}
+        bucket[sensor] = {
+            "count": aggregate["count"] - previous["count"],
+            "sum": aggregate["sum"] - previous["sum"],
+            "sum_sq": aggregate["sum_sq"] - previous["sum_sq"],
+            "min": aggregate["min"],
+            "max": aggregate["max"],
+        }
+
+    return bucket
+
+
+def readings_bucket(readings: dict[int, dict[str, float | None]]) -> dict:
+    """Bucket of readings ({timestamp: {sensor: value}}), with their records."""
+    bucket: dict = {}
+    for _, values in sorted(readings.items()):
+        bucket = merge_bucket(bucket, values)
+
+    bucket[RECORDS_FIELD] = len(readings)
+    return bucket
+
+
+def new_readings(
+    hour: dict | None, readings: dict[int, dict[str, float | None]]
+) -> dict[int, dict[str, float | None]]:
+    """
+    Readings newer than the last one counted by a stored hour. The older
+    ones may have been counted already: a retried batch, or a late one.
+    """
+    last = (hour or {}).get(LAST_FIELD)
+    return {
+        timestamp: values
+        for timestamp, values in readings.items()
+        if last is None or timestamp > last
+    }
+
+
+def split_readings(
+    readings: dict[int, dict[str, float | None]], granularity: RollupGranularity
+) -> dict[int, dict[int, dict[str, float | None]]]:
+    """Readings by the start of the bucket that contains them."""
+    split: dict[int, dict[int, dict[str, float | None]]] = {}
+
+    for timestamp, values in readings.items():
+        split.setdefault(bucket_start(timestamp, granularity), {})[timestamp] = values
+
+    return split
@@ -0,0 +1,63 @@
+from abc import ABC, abstractmethod
+
+from app.share.meter_records.domain.rollup import RollupCoverage, RollupGranularity
+
+
+class RollupRepository(ABC):
+    """
+    Hourly, daily and monthly aggregates (count, sum, sum of squares, min
+    and max) of the numeric sensors of each meter.
+    """
+
+    @abstractmethod
+    def add_many(
+        self,
+        id_workspace: str,
+        id_meter: str,
+        readings: dict[int, dict[str, float | None]],
+    ) -> None:
+        """
+        Add several readings ({timestamp: {sensor: value}}), writing each
+        bucket once, and move until to the last of them. Readings older than
+        since are left to backfill. An hour with readings no newer than its
+        last one is counted again from the records, so a failed call can be
+        retried as is.
+        """
+        pass
+
+    @abstractmethod
+    def get_coverage(self, id_workspace: str, id_meter: str) -> RollupCoverage | None:
+        """
+        Timestamps included in the rollups, None if there are none. Records
+        outside them are read raw.
+        """
+        pass
+
+    @abstractmethod
+    def query(
+        self,
+        id_workspace: str,
+        id_meter: str,
+        granularity: RollupGranularity,
+        start: int,
+        end: int,
+    ) -> dict:
+        """
+        Buckets whose start is in [start, end), keyed by bucket start.
+        """
+        pass
+
+    @abstractmethod
+    def backfill(self, id_workspace: str, id_meter: str) -> int:
+        """
+        Add the records older than since to the buckets, read a day at a
+        time, and move since to the first of them.
+
+        Returns:
+            Number of records added
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, id_workspace: str, id_meter: str) -> None:
+        pass
@@ -1,8 +1,18 @@
+import time
 from datetime import datetime
+
+import numpy as np
 from fastapi import HTTPException
 from firebase_admin import db
-from typing import Any
+from typing import Any, Iterator
 
+from app.share.meter_records.domain.columns import (
+    AggregateColumns,
+    RecordColumns,
+    bucket_starts,
+)
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.export import RecordChunk
 from app.share.meter_records.domain.model import (
     RecordEntry,
     RecordsDict,
@@ -10,7 +20,21 @@ from app.share.meter_records.domain.model import (
     SensorQueryParams,
 )
 from app.share.meter_records.domain.repository import MeterRecordsRepository
-from app.share.meter_records.domain.response import SensorRecordsResponse
+from app.share.meter_records.domain.rollup_repository import RollupRepository
+from app.share.meter_records.domain.rollup import (
+    RollupCoverage,
+    RollupGranularity,
+    RollupSpan,
+    bucket_end,
+    bucket_start,
+    cover_range,
+)
+from app.share.meter_records.domain.response import (
+    RecordTimeline,
+    SensorRecordsResponse,
+    TimelineBucket,
+)
+from app.share.meter_records.infrastructure.range_reader import FirebaseRangeReader
 from app.share.socketio.domain.model import Record, SRColorValue
 from app.share.workspace.domain.model import WorkspaceRoles
 from app.share.workspace.workspace_access import WorkspaceAccess
@@ -18,8 +42,15 @@ from app.share.workspace.workspace_access import WorkspaceAccess
 
 class MeterRecordsRepositoryImpl(MeterRecordsRepository):
 
-    def __init__(self, workspace_access: WorkspaceAccess):
+    def __init__(
+        self,
+        workspace_access: WorkspaceAccess,
+        rollup_repo: RollupRepository | None = None,
+        range_reader: FirebaseRangeReader | None = None,
+    ):
         self.workspace_access = workspace_access
+        self.rollup_repo = rollup_repo
+        self.range_reader = range_reader or FirebaseRangeReader()
 
     def get_sensor_records(
         self, identifier: SensorIdentifier, params: SensorQueryParams
@@ -73,7 +104,8 @@ class MeterRecordsRepositoryImpl(MeterRecordsRepository):
         )
 
         meter_ref = workspace.ref.child("meters").child(identifier.meter_id)
-        if meter_ref.get() is None:
+        # Every meter has a name; reading the whole meter would load its records
+        if meter_ref.child("name").get() is None:
             raise HTTPException(
                 status_code=404,
                 detail=f"No existe el medidor con ID: {identifier.meter_id}",
@@ -177,6 +209,14 @@ class MeterRecordsRepositoryImpl(MeterRecordsRepository):
         self, identifier: SensorIdentifier, params: SensorQueryParams
     ) -> dict[str, Any]:
         meter_ref = self._get_meter(identifier)
+
+        if params.ignore_limit:
+            # The whole range, read in slices
+            records_data: dict = {}
+            for chunk in self._read_range(meter_ref, params):
+                records_data.update(chunk)
+            return records_data
+
         sensors_ref = meter_ref.child("sensors").order_by_key()
 
         # Convert date strings to timestamps
@@ -199,18 +239,27 @@ class MeterRecordsRepositoryImpl(MeterRecordsRepository):
         if params.index is not None:
             sensors_ref = sensors_ref.end_at(params.index)
 
-        records_data: dict
-
-        if not params.ignore_limit:
-            limit = params.limit if params.index is None else params.limit + 1
-            # Get the records and apply limit
-            records_data = sensors_ref.limit_to_last(limit).get() or {}
+        limit = params.limit if params.index is None else params.limit + 1
+        # Get the records and apply limit
+        return sensors_ref.limit_to_last(limit).get() or {}
+
+    def _read_range(
+        self,
+        meter_ref: db.Reference,
+        params: SensorQueryParams,
+        page_size: int | None = None,
+    ) -> Iterator[RecordChunk]:
+        start = (
+            self._convert_to_timestamp(params.start_date) if params.start_date else None
+        )
+        end = self._convert_to_timestamp(params.end_date) if params.end_date else None
 
-        else:
-            # Get all records without limit
-            records_data = sensors_ref.get() or {}
+        if params.index is not None and params.index.isdigit():
+            end = int(params.index) if end is None else min(end, int(params.index))
 
-        return records_data
+        return self.range_reader.read(
+            meter_ref.child("sensors"), start, end, page_size=page_size
+        )
 
     def query_sensor_records(
         self, identifier: SensorIdentifier, params: SensorQueryParams
@@ -306,3 +355,177 @@ class MeterRecordsRepositoryImpl(MeterRecordsRepository):
             )
             for key, value in records_data.items()
         }
+
+    def _query_range(self, meter_ref: db.Reference, start: int, end: int) -> dict:
+        """Raw records with a key in [start, end)."""
+        if start >= end:
+            return {}
+
+        records_data: dict = {}
+        for chunk in self.range_reader.read(meter_ref.child("sensors"), start, end - 1):
+            records_data.update(chunk)
+        return records_data
+
+    def query_aggregates(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        max_granularity: RollupGranularity,
+        sensors: list[SensorType] | None = None,
+    ) -> AggregateColumns:
+        meter_ref = self._get_meter(identifier)
+
+        start = (
+            self._convert_to_timestamp(params.start_date) if params.start_date else None
+        )
+        end = self._convert_to_timestamp(params.end_date) if params.end_date else None
+
+        start = start if start is not None else 0
+        end = (end if end is not None else int(time.time())) + 1
+
+        coverage = None
+        if self.rollup_repo is not None:
+            coverage = self.rollup_repo.get_coverage(
+                identifier.workspace_id, identifier.meter_id
+            )
+        since, until = (coverage.since, coverage.end) if coverage else (end, end)
+
+        # Records outside the rollups are always read raw
+        spans = [RollupSpan(start=start, end=min(since, end))]
+        spans.extend(cover_range(max(start, since), min(until, end), max_granularity))
+        spans.append(RollupSpan(start=max(start, until), end=end))
+
+        parts: list[AggregateColumns] = []
+        for span in spans:
+            if span.start >= span.end:
+                continue
+
+            if span.granularity is None:
+                records_data = self._query_range(meter_ref, span.start, span.end)
+                parts.append(
+                    AggregateColumns.from_records(
+                        RecordColumns.from_snapshot(records_data, sensors)
+                    )
+                )
+            else:
+                buckets = self.rollup_repo.query(
+                    identifier.workspace_id,
+                    identifier.meter_id,
+                    span.granularity,
+                    span.start,
+                    span.end,
+                )
+                parts.append(AggregateColumns.from_buckets(buckets, sensors))
+
+        return AggregateColumns.concat(parts, sensors)
+
+    def get_last_key(
+        self, identifier: SensorIdentifier, params: SensorQueryParams
+    ) -> int | None:
+        meter_ref = self._get_meter(identifier)
+        query = meter_ref.child("sensors").order_by_key()
+
+        start = (
+            self._convert_to_timestamp(params.start_date) if params.start_date else None
+        )
+        end = self._convert_to_timestamp(params.end_date) if params.end_date else None
+
+        if start is not None:
+            query = query.start_at(str(start))
+        if end is not None:
+            query = query.end_at(str(end))
+
+        last = query.limit_to_last(1).get() or {}
+        keys = [int(key) for key in last if key.isdigit()]
+
+        return max(keys) if keys else None
+
+    def get_rollup_coverage(self, identifier: SensorIdentifier) -> RollupCoverage | None:
+        if self.rollup_repo is None:
+            return None
+
+        return self.rollup_repo.get_coverage(identifier.workspace_id, identifier.meter_id)
+
+    def export_records(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        chunk_size: int = 1000,
+    ) -> Iterator[RecordChunk]:
+        # Access is checked before the first chunk is requested
+        meter_ref = self._get_meter(identifier)
+
+        return self._read_range(meter_ref, params, page_size=chunk_size)
+
+    def get_timeline(
+        self,
+        identifier: SensorIdentifier,
+        params: SensorQueryParams,
+        granularity: RollupGranularity = RollupGranularity.DAY,
+    ) -> RecordTimeline:
+        meter_ref = self._get_meter(identifier)
+
+        start = (
+            self._convert_to_timestamp(params.start_date) if params.start_date else None
+        )
+        end = self._convert_to_timestamp(params.end_date) if params.end_date else None
+
+        bounds = self.range_reader.bounds(meter_ref.child("sensors"), start, end)
+        if bounds is None:
+            return RecordTimeline(granularity=granularity)
+
+        first, last = bounds
+
+        coverage = None
+        if self.rollup_repo is not None:
+            coverage = self.rollup_repo.get_coverage(
+                identifier.workspace_id, identifier.meter_id
+            )
+        if coverage is None:
+            return RecordTimeline(granularity=granularity, first_key=first, last_key=last)
+
+        since, until = max(first, coverage.since), coverage.end
+        counts: dict[int, int] = {}
+
+        # Records older than the rollups are not read: they are counted once
+        # they are backfilled
+        if since < until and since <= last:
+            buckets = self.rollup_repo.query(
+                identifier.workspace_id,
+                identifier.meter_id,
+                granularity,
+                bucket_start(since, granularity),
+                bucket_end(bucket_start(min(last, until - 1), granularity), granularity),
+            )
+            aggregates = AggregateColumns.from_buckets(buckets)
+            for bucket, count in zip(
+                aggregates.timestamps.tolist(), aggregates.row_counts().tolist()
+            ):
+                counts[bucket] = counts.get(bucket, 0) + int(count)
+
+        if max(since, until) <= last:
+            # Newer than the rollups: the few records the ingest has not
+            # added yet are counted
+            for chunk in self.range_reader.read(
+                meter_ref.child("sensors"), max(since, until), last
+            ):
+                timestamps = np.fromiter(
+                    (int(key) for key in chunk if key.isdigit()), dtype=np.int64
+                )
+                starts, key_counts = np.unique(
+                    bucket_starts(timestamps, granularity), return_counts=True
+                )
+                for bucket, count in zip(starts.tolist(), key_counts.tolist()):
+                    counts[bucket] = counts.get(bucket, 0) + count
+
+        return RecordTimeline(
+            granularity=granularity,
+            first_key=first,
+            last_key=last,
+            counted_from=since,
+            buckets=[
+                TimelineBucket(start=bucket, count=count)
+                for bucket, count in sorted(counts.items())
+                if count > 0
+            ],
+        )
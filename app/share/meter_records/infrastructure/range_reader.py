@@ -0,0 +1,171 @@
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Iterator, TypeVar
+
+from firebase_admin import db
+
+from app.share.meter_records.domain.export import RecordChunk
+from app.share.meter_records.domain.rollup import DAY_SECONDS
+
+T = TypeVar("T")
+
+
+class FirebaseRangeReader:
+    """
+    Reads the records of a key range in time slices instead of one
+    unbounded query.
+
+    The range is first clipped to its first and last key, then split into
+    slices of slice_seconds. Up to max_workers slices are fetched at once
+    (shared by every read), each in pages of at most page_size records, and
+    failed queries are retried. Chunks are yielded in key order, and only the
+    slices of the current window are held in memory.
+    """
+
+    def __init__(
+        self,
+        slice_seconds: int = DAY_SECONDS,
+        max_workers: int = 4,
+        page_size: int = 5000,
+        retries: int = 2,
+        retry_delay: float = 0.5,
+    ):
+        self.slice_seconds = slice_seconds
+        self.max_workers = max_workers
+        self.page_size = page_size
+        self.retries = retries
+        self.retry_delay = retry_delay
+
+        self._lock = threading.Lock()
+        self._executor: ThreadPoolExecutor | None = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="records-read"
+                )
+            return self._executor
+
+    def _retry(self, fn: Callable[[], T]) -> T:
+        for attempt in range(self.retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == self.retries:
+                    raise
+                print(f"Error al leer registros, reintentando: {e}")
+                time.sleep(self.retry_delay * 2**attempt)
+
+    def _edge_key(
+        self,
+        sensors_ref: db.Reference,
+        start: int | None,
+        end: int | None,
+        last: bool,
+    ) -> int | None:
+        query = sensors_ref.order_by_key()
+        if start is not None:
+            query = query.start_at(str(start))
+        if end is not None:
+            query = query.end_at(str(end))
+
+        query = query.limit_to_last(1) if last else query.limit_to_first(1)
+        edge = self._retry(query.get) or {}
+        keys = [int(key) for key in edge if key.isdigit()]
+
+        return keys[0] if keys else None
+
+    def bounds(
+        self, sensors_ref: db.Reference, start: int | None, end: int | None
+    ) -> tuple[int, int] | None:
+        """First and last key in [start, end], None when there are no records"""
+        first = self._edge_key(sensors_ref, start, end, last=False)
+        if first is None:
+            return None
+
+        last = self._edge_key(sensors_ref, first, end, last=True)
+        return first, (last if last is not None else first)
+
+    def slices(self, first: int, last: int) -> list[tuple[int, int]]:
+        """Inclusive key ranges of slice_seconds covering [first, last]"""
+        count = math.ceil((last - first + 1) / self.slice_seconds)
+        return [
+            (
+                first + i * self.slice_seconds,
+                min(first + (i + 1) * self.slice_seconds - 1, last),
+            )
+            for i in range(count)
+        ]
+
+    def _read_slice(
+        self, sensors_ref: db.Reference, start: int, end: int, page_size: int
+    ) -> list[RecordChunk]:
+        pages: list[RecordChunk] = []
+        cursor = start
+
+        while cursor <= end:
+            query = (
+                sensors_ref.order_by_key()
+                .start_at(str(cursor))
+                .end_at(str(end))
+                .limit_to_first(page_size)
+            )
+            page = self._retry(query.get) or {}
+            if page:
+                pages.append(page)
+
+            if len(page) < page_size:
+                break
+
+            cursor = max(int(key) for key in page if key.isdigit()) + 1
+
+        return pages
+
+    def read(
+        self,
+        sensors_ref: db.Reference,
+        start: int | None = None,
+        end: int | None = None,
+        page_size: int | None = None,
+    ) -> Iterator[RecordChunk]:
+        """
+        Records with a key in [start, end] (open when None) in ascending key
+        order, at most page_size per chunk.
+        """
+        page_size = page_size or self.page_size
+
+        bounds = self.bounds(sensors_ref, start, end)
+        if bounds is None:
+            return
+
+        slices = deque(self.slices(*bounds))
+        executor = self._get_executor()
+        window: deque[Future] = deque()
+
+        try:
+            while slices or window:
+                while slices and len(window) < self.max_workers:
+                    slice_start, slice_end = slices.popleft()
+                    window.append(
+                        executor.submit(
+                            self._read_slice,
+                            sensors_ref,
+                            slice_start,
+                            slice_end,
+                            page_size,
+                        )
+                    )
+
+                yield from window.popleft().result()
+        finally:
+            # The consumer stopped early or a slice failed
+            for future in window:
+                future.cancel()
+
+    def stop(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,342 @@
+import time
+
+from firebase_admin import db
+
+from app.share.meter_records.domain.columns import NUMERIC_SENSORS
+from app.share.meter_records.domain.rollup_repository import RollupRepository
+from app.share.meter_records.domain.rollup import (
+    LAST_FIELD,
+    RollupCoverage,
+    RollupGranularity,
+    add_buckets,
+    bucket_end,
+    bucket_start,
+    diff_buckets,
+    new_readings,
+    readings_bucket,
+    split_readings,
+)
+from app.share.meter_records.infrastructure.range_reader import FirebaseRangeReader
+
+
+class RollupRepositoryImpl(RollupRepository):
+    """
+    Rollups stored in /rollups/{workspace}/{meter}:
+        since: first timestamp included in the buckets; older records are
+            read raw until backfill adds them
+        until: last timestamp included in the buckets; newer records are
+            read raw until the ingest adds them
+        hour|day|month/{bucket_start}: records counted and
+            {sensor}: count, sum, sum_sq, min, max
+        hours also keep the last timestamp they count
+
+    Readings come in time order, so an hour adds the readings newer than
+    its last one. When some are not newer (a retried or a late batch) the
+    hour is counted again from the records and its days and months get the
+    difference. The hours, days and months touched by a call are read with
+    one query per granularity and written with one multi-path update,
+    without transactions: the rollups of a meter are only added by the
+    ingest writer of the process the meter is connected to.
+    """
+
+    # Coverage of the rollups of each meter, as written by this process
+    _coverage: dict[tuple[str, str], RollupCoverage] = {}
+
+    def __init__(
+        self,
+        collection: str = "rollups",
+        range_reader: FirebaseRangeReader | None = None,
+    ):
+        self.collection = collection
+        self.range_reader = range_reader or FirebaseRangeReader()
+
+    def _get_ref(self, id_workspace: str, id_meter: str) -> db.Reference:
+        return db.reference().child(self.collection).child(id_workspace).child(id_meter)
+
+    def _get_sensors_ref(self, id_workspace: str, id_meter: str) -> db.Reference:
+        return (
+            db.reference()
+            .child("workspaces")
+            .child(id_workspace)
+            .child("meters")
+            .child(id_meter)
+            .child("sensors")
+        )
+
+    def _read(
+        self, sensors_ref: db.Reference, start: int, end: int
+    ) -> dict[int, dict[str, float | None]]:
+        """Readings of the records with a key in [start, end]"""
+        readings: dict[int, dict[str, float | None]] = {}
+        for chunk in self.range_reader.read(sensors_ref, start, end):
+            readings.update(_readings(chunk))
+
+        return readings
+
+    def _mark_coverage(
+        self, rollup_ref: db.Reference, id_workspace: str, id_meter: str, timestamp: int
+    ) -> tuple[RollupCoverage, bool]:
+        """Coverage of the meter and whether it was already known here"""
+        key = (id_workspace, id_meter)
+        if key in self._coverage:
+            return self._coverage[key], True
+
+        stored = rollup_ref.get(shallow=True) or {}
+        since = stored.get("since")
+        if since is None:
+            # Never moved back here: the records before it are not in the
+            # buckets, only backfill adds them
+            since = rollup_ref.child("since").transaction(
+                lambda current: current if current is not None else timestamp
+            )
+
+        until = stored.get("until")
+        self._coverage[key] = RollupCoverage(
+            since=int(since), until=int(until) if until is not None else None
+        )
+        return self._coverage[key], False
+
+    def add_many(
+        self,
+        id_workspace: str,
+        id_meter: str,
+        readings: dict[int, dict[str, float | None]],
+    ) -> None:
+        if not readings:
+            return
+
+        try:
+            self._add_many(id_workspace, id_meter, readings)
+        except Exception:
+            # Read again on the next call, which also adds what this one left out
+            self._coverage.pop((id_workspace, id_meter), None)
+            raise
+
+    def _add_many(
+        self,
+        id_workspace: str,
+        id_meter: str,
+        readings: dict[int, dict[str, float | None]],
+    ) -> None:
+        rollup_ref = self._get_ref(id_workspace, id_meter)
+        sensors_ref = self._get_sensors_ref(id_workspace, id_meter)
+
+        coverage, known = self._mark_coverage(
+            rollup_ref, id_workspace, id_meter, min(readings)
+        )
+        if not known and coverage.until is not None and min(readings) > coverage.end:
+            # Records written while their rollups were not added: a restart
+            # or a failed call
+            readings = {
+                **self._read(sensors_ref, coverage.end, min(readings) - 1),
+                **readings,
+            }
+
+        readings = {
+            timestamp: values
+            for timestamp, values in readings.items()
+            if timestamp >= coverage.since
+        }
+        if not readings:
+            return
+
+        until = max(coverage.until or coverage.since, max(readings))
+        updates: dict = {"until": until}
+        added = self._add_hours(rollup_ref, sensors_ref, readings, updates)
+        for granularity in (RollupGranularity.DAY, RollupGranularity.MONTH):
+            added = self._add_parts(rollup_ref, granularity, added, updates)
+
+        rollup_ref.update(updates)
+        self._coverage[(id_workspace, id_meter)] = RollupCoverage(
+            since=coverage.since, until=until
+        )
+
+    def _add_hours(
+        self,
+        rollup_ref: db.Reference,
+        sensors_ref: db.Reference,
+        readings: dict[int, dict[str, float | None]],
+        updates: dict,
+    ) -> dict[int, dict]:
+        """Add the new readings to their hours; returns what each hour added"""
+        hours = split_readings(readings, RollupGranularity.HOUR)
+        stored = self._query(
+            rollup_ref, RollupGranularity.HOUR, min(hours), max(hours) + 1
+        )
+
+        added: dict[int, dict] = {}
+        for start, hour_readings in hours.items():
+            hour = stored.get(str(start))
+            readings = new_readings(hour, hour_readings)
+
+            if len(readings) < len(hour_readings):
+                # The hour may count some of them already
+                readings = {
+                    **self._read(
+                        sensors_ref,
+                        start,
+                        bucket_end(start, RollupGranularity.HOUR) - 1,
+                    ),
+                    **hour_readings,
+                }
+                bucket = readings_bucket(readings)
+                added[start] = diff_buckets(bucket, hour)
+            elif readings:
+                added[start] = readings_bucket(readings)
+                bucket = add_buckets(hour, added[start])
+            else:
+                continue
+
+            updates[f"{RollupGranularity.HOUR.value}/{start}"] = {
+                **bucket,
+                LAST_FIELD: max(readings),
+            }
+
+        return added
+
+    def _add_parts(
+        self,
+        rollup_ref: db.Reference,
+        granularity: RollupGranularity,
+        parts: dict[int, dict],
+        updates: dict,
+    ) -> dict[int, dict]:
+        """Add buckets of a finer granularity to the buckets that contain them"""
+        added = _group(parts, granularity)
+        if not added:
+            return added
+
+        stored = self._query(rollup_ref, granularity, min(added), max(added) + 1)
+        for start, bucket in added.items():
+            updates[f"{granularity.value}/{start}"] = add_buckets(
+                stored.get(str(start)), bucket
+            )
+
+        return added
+
+    def get_coverage(self, id_workspace: str, id_meter: str) -> RollupCoverage | None:
+        stored = self._get_ref(id_workspace, id_meter).get(shallow=True) or {}
+        if stored.get("since") is None:
+            return None
+
+        until = stored.get("until")
+        return RollupCoverage(
+            since=int(stored["since"]),
+            until=int(until) if until is not None else None,
+        )
+
+    def query(
+        self,
+        id_workspace: str,
+        id_meter: str,
+        granularity: RollupGranularity,
+        start: int,
+        end: int,
+    ) -> dict:
+        return self._query(self._get_ref(id_workspace, id_meter), granularity, start, end)
+
+    def _query(
+        self,
+        rollup_ref: db.Reference,
+        granularity: RollupGranularity,
+        start: int,
+        end: int,
+    ) -> dict:
+        if start >= end:
+            return {}
+
+        return (
+            rollup_ref
+            .child(granularity.value)
+            .order_by_key()
+            .start_at(str(start))
+            .end_at(str(end - 1))
+            .get()
+            or {}
+        )
+
+    def backfill(self, id_workspace: str, id_meter: str) -> int:
+        rollup_ref = self._get_ref(id_workspace, id_meter)
+        sensors_ref = self._get_sensors_ref(id_workspace, id_meter)
+
+        # A meter without rollups gets them from now on, the rest is added here
+        self._coverage.pop((id_workspace, id_meter), None)
+        coverage, _ = self._mark_coverage(
+            rollup_ref, id_workspace, id_meter, int(time.time())
+        )
+        since = coverage.since
+
+        hours: dict[int, dict] = {}
+        first: int | None = None
+        count = 0
+
+        # One day of records at a time
+        for chunk in self.range_reader.read(sensors_ref, None, since - 1):
+            readings = _readings(chunk)
+            if not readings:
+                continue
+
+            first = min(readings) if first is None else min(first, min(readings))
+            count += len(readings)
+
+            for start, hour_readings in split_readings(
+                readings, RollupGranularity.HOUR
+            ).items():
+                last = max(hour_readings)
+                if start in hours:
+                    last = max(last, hours[start][LAST_FIELD])
+                hours[start] = {
+                    **add_buckets(hours.get(start), readings_bucket(hour_readings)),
+                    LAST_FIELD: last,
+                }
+
+        if first is None:
+            return 0
+
+        until = coverage.until if coverage.until is not None else since - 1
+        updates: dict = {"since": first, "until": until}
+        buckets = hours
+        for granularity in RollupGranularity:
+            if granularity != RollupGranularity.HOUR:
+                buckets = _group(buckets, granularity)
+
+            for start, bucket in buckets.items():
+                if start == bucket_start(since, granularity):
+                    # Also counts the readings added after since
+                    stored = (
+                        rollup_ref.child(granularity.value).child(str(start)).get()
+                    )
+                    bucket = {**bucket, **(stored or {}), **add_buckets(stored, bucket)}
+                updates[f"{granularity.value}/{start}"] = bucket
+
+        rollup_ref.update(updates)
+
+        self._coverage[(id_workspace, id_meter)] = RollupCoverage(
+            since=first, until=until
+        )
+        return count
+
+    def delete(self, id_workspace: str, id_meter: str) -> None:
+        self._get_ref(id_workspace, id_meter).delete()
+        self._coverage.pop((id_workspace, id_meter), None)
+
+
+def _readings(records_data: dict) -> dict[int, dict[str, float | None]]:
+    return {
+        int(key): {
+            sensor.value: (record.get(sensor.value) or {}).get("value")
+            for sensor in NUMERIC_SENSORS
+        }
+        for key, record in records_data.items()
+        if key.isdigit() and record
+    }
+
+
+def _group(parts: dict[int, dict], granularity: RollupGranularity) -> dict[int, dict]:
+    """Sum buckets of a finer granularity into the buckets of granularity"""
+    buckets: dict[int, dict] = {}
+    for start, bucket in sorted(parts.items()):
+        key = bucket_start(start, granularity)
+        buckets[key] = add_buckets(buckets.get(key), bucket)
+
+    return buckets
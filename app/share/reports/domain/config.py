@@ -0,0 +1,17 @@
+from app.share.config import Config
+
+
+class ReportRendererConfigImpl(Config):
+    def _get_int(self, key: str, default: int) -> int:
+        value = self.get_env(key)
+        return int(value) if value else default
+
+    @property
+    def max_workers(self) -> int:
+        """Reports built at once"""
+        return self._get_int("REPORT_WORKERS", 2)
+
+    @property
+    def max_queue(self) -> int:
+        """Reports waiting for a worker; more are rejected"""
+        return self._get_int("REPORT_QUEUE_SIZE", 8)
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
 from io import BytesIO
+from typing import Callable
 
 from app.share.reports.domain.model import (
     ReportConfig,
@@ -86,3 +87,27 @@ class PDFReportGenerator(ABC):
             BytesIO: Complete PDF document in memory
         """
         pass
+
+
+class ReportRenderer(ABC):
+    """
+    Builds reports away from the event loop, each with its own
+    PDFReportGenerator, and limits how many are built at once.
+    """
+
+    @abstractmethod
+    async def render(self, build: Callable[[PDFReportGenerator], bytes]) -> bytes:
+        """
+        Args:
+            build: Fills the given generator and returns the generated PDF;
+                runs in a worker
+
+        Returns:
+            bytes: The PDF returned by build
+        """
+        pass
+
+    @abstractmethod
+    def stop(self) -> None:
+        """Stop the workers; reports being built are finished"""
+        pass
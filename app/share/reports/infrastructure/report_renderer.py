@@ -0,0 +1,65 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator
+
+from fastapi import HTTPException
+
+from app.share.reports.domain.repository import PDFReportGenerator, ReportRenderer
+
+
+class ThreadPoolReportRenderer(ReportRenderer):
+    """
+    Reports are built in a pool of max_workers threads, each one with a new
+    generator from pdf_factory, as the generators keep the document being
+    built. At most max_queue reports wait for a thread; more are rejected.
+    """
+
+    def __init__(
+        self,
+        pdf_factory: Callable[[], PDFReportGenerator],
+        max_workers: int = 2,
+        max_queue: int = 8,
+    ):
+        self.pdf_factory = pdf_factory
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._threads = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="report"
+        )
+
+    async def render(self, build: Callable[[PDFReportGenerator], bytes]) -> bytes:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Hay demasiados reportes en proceso, intente más tarde",
+                )
+            self._pending += 1
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._threads, self._build, build)
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _build(self, build: Callable[[PDFReportGenerator], bytes]) -> bytes:
+        return build(self.pdf_factory())
+
+    def pending(self) -> int:
+        """Reports being built or waiting for a thread"""
+        with self._lock:
+            return self._pending
+
+    def stop(self) -> None:
+        self._threads.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_chunks(content: bytes, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+    """The content in slices, for a StreamingResponse"""
+    for start in range(0, len(content), chunk_size):
+        yield content[start : start + chunk_size]
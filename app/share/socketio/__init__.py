@@ -1,44 +1,149 @@
+import asyncio
+
 from fastapi import HTTPException
-from socketio import AsyncServer, ASGIApp
+from socketio import ASGIApp
 from fastapi import BackgroundTasks
 from app.share.messages.infra.notification_manager import (
     NotificationManagerRepositoryImpl,
 )
+from app.share.messages.infra.notification_control_impl import (
+    NotificationControlRepositoryImpl,
+)
 from app.share.messages.infra.sender_alerts import SenderAlertsRepositoryImpl
+from app.share.meter_records.infrastructure.rollup_impl import RollupRepositoryImpl
 from app.share.jwt.domain.payload import MeterPayload, UserPayload
 from app.share.jwt.infrastructure.access_token import AccessToken
 from app.share.messages.service.onesignal_service import OneSignalService
+from app.share.socketio.domain.config import SocketIOConfigImpl
 from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
-from app.share.socketio.domain.model import RecordBody
-from app.share.socketio.infra.meter_status_repo_impl import MeterStateRepositoryImpl
-from app.share.socketio.infra.record_repo_impl import RecordRepositoryImpl
-from app.share.socketio.infra.session_repo_impl import (
-    SessionMeterSocketIORepositoryImpl,
+from app.share.socketio.domain.model import (
+    BatchResponse,
+    IngestItem,
+    RecordBatchBody,
+    RecordBody,
 )
+from app.share.socketio.infra.client_manager import create_client_manager
+from app.share.socketio.infra.dead_letter_impl import create_dead_letter_store
+from app.share.socketio.infra.fan_out_impl import (
+    BoundedAsyncServer,
+    FanOutRepositoryImpl,
+)
+from app.share.socketio.infra.ingest_writer_impl import IngestWriterRepositoryImpl
+from app.share.socketio.infra.meter_cache_impl import MeterCacheRepositoryImpl
+from app.share.socketio.infra.record_repo_impl import RecordRepositoryImpl
+from app.share.socketio.infra.session_keeper import SessionKeeper
+from app.share.socketio.infra.session_repo_impl import SessionSocketIORepositoryImpl
+from app.share.socketio.infra.session_store_impl import create_session_store
 
 from app.share.socketio.util.query_string_to_dict import query_string_to_dict
+from app.share.users.infra.cached_users_repo_impl import CachedUserRepository
 from app.share.users.infra.users_repo_impl import UserRepositoryImpl
 from app.share.workspace.domain.model import WorkspaceRoles
 from app.share.workspace.workspace_access import WorkspaceAccess
 
-sio = AsyncServer(cors_allowed_origins="*", async_mode="asgi")
+socket_config = SocketIOConfigImpl()
+
+# With a message queue the emits to the /subscribe/ rooms reach the
+# subscribers of every process, not only the ones connected to this one
+sio = BoundedAsyncServer(
+    cors_allowed_origins="*",
+    async_mode="asgi",
+    client_manager=create_client_manager(socket_config),
+    dropped_namespace="/subscribe/",
+    max_client_queue=socket_config.client_queue,
+)
 socket_app = ASGIApp(sio)
 
+# Records reach the subscribers coalesced into frames at a maximum rate
+fan_out = FanOutRepositoryImpl(
+    server=sio,
+    namespace="/subscribe/",
+    rate=socket_config.fan_out_rate,
+    latest_only=socket_config.fan_out_latest,
+    frame_records=socket_config.frame_records,
+)
+
 access_token_connection = AccessToken[MeterPayload]()
 access_token_user = AccessToken[UserPayload]()
 
-workspace_access = WorkspaceAccess(user_repo=UserRepositoryImpl())
+workspace_access = WorkspaceAccess(
+    user_repo=CachedUserRepository(user_repo=UserRepositoryImpl())
+)
+
+rollup_repo = RollupRepositoryImpl()
 
-record_repo = RecordRepositoryImpl()
+MeterCacheRepositoryImpl.ttl = socket_config.meter_cache_ttl
+meter_cache = MeterCacheRepositoryImpl()
 
-meter_state_repo = MeterStateRepositoryImpl()
+record_repo = RecordRepositoryImpl(meter_cache=meter_cache)
+
+ingest_writer = IngestWriterRepositoryImpl(
+    rollup_repo=rollup_repo, dead_letters=create_dead_letter_store(socket_config)
+)
 
 background_tasks = BackgroundTasks()
 
 onesignal = OneSignalService()
-notification_manager = NotificationManagerRepositoryImpl()
+notification_manager = NotificationManagerRepositoryImpl(
+    user_repo=workspace_access.user_repo
+)
+meter_sessions = SessionSocketIORepositoryImpl[MeterPayload](
+    store=create_session_store(socket_config),
+    kind="meter",
+    model=MeterPayload,
+    ttl=socket_config.session_ttl,
+)
+
+control_repo = NotificationControlRepositoryImpl(
+    notification_manager=notification_manager
+)
 sender = SenderAlertsRepositoryImpl(
-    sender_service=onesignal, notification_manager=notification_manager
+    sender_service=onesignal,
+    notification_manager=notification_manager,
+    control_repo=control_repo,
+)
+
+
+async def _put_state(
+    sessions: list[MeterPayload], state: MeterConnectionState
+) -> None:
+    for payload in sessions:
+        # Written whatever this process last knew of the meter
+        meter_cache.invalidate(payload.id_workspace, payload.id_meter)
+        await ingest_writer.put(
+            IngestItem(
+                id_workspace=payload.id_workspace,
+                id_meter=payload.id_meter,
+                state=state,
+            )
+        )
+
+
+async def _expired_sessions(sessions: list[MeterPayload]) -> None:
+    # The meters that connected again, to any process, keep their state
+    connected = {
+        (payload.id_workspace, payload.id_meter)
+        for payload in await asyncio.to_thread(meter_sessions.values)
+    }
+    await _put_state(
+        [
+            payload
+            for payload in sessions
+            if (payload.id_workspace, payload.id_meter) not in connected
+        ],
+        MeterConnectionState.DISCONNECTED,
+    )
+
+
+async def _lost_sessions(sessions: list[MeterPayload]) -> None:
+    await _put_state(sessions, MeterConnectionState.CONNECTED)
+
+
+session_keeper = SessionKeeper(
+    sessions=meter_sessions,
+    on_expired=_expired_sessions,
+    on_lost=_lost_sessions,
+    interval=socket_config.session_ttl / 3,
 )
 
 
@@ -59,73 +164,175 @@ async def receive_connection(sid, environ):
 
         payload = MeterPayload(**decoded_token)
 
-        meter_state_repo.set_state(
+        # Fills the meter cache, so the messages don't read the meter
+        if not await asyncio.to_thread(
+            meter_cache.load, payload.id_workspace, payload.id_meter
+        ):
+            raise Exception("No existe el sensor")
+
+        if meter_cache.set_state(
             payload.id_workspace, payload.id_meter, MeterConnectionState.CONNECTED
-        )
+        ):
+            await ingest_writer.put(
+                IngestItem(
+                    id_workspace=payload.id_workspace,
+                    id_meter=payload.id_meter,
+                    state=MeterConnectionState.CONNECTED,
+                )
+            )
 
         # Guardar información del medidor
-        SessionMeterSocketIORepositoryImpl.add(sid, payload)
+        await asyncio.to_thread(meter_sessions.add, sid, payload)
     except Exception as e:
         print(e)
         print(f"📡 Desconexión: {sid}")
         await sio.disconnect(sid, namespace="/receive/")
 
 
+async def _emit_error(payload: MeterPayload, e: Exception) -> None:
+    print(e.__class__.__name__)
+    print(e)
+    await sio.emit(
+        "error",
+        f"Error: {e.__class__.__name__}",
+        namespace="/subscribe/",
+        room=f"{payload.id_workspace}-{payload.id_meter}",
+    )
+
+
+async def _ingest(
+    payload: MeterPayload,
+    item: IngestItem,
+    records: list[dict],
+    bodies: list[RecordBody],
+) -> None:
+    """Queue the write of the records, publish them and check the alerts"""
+    room_name = f"{payload.id_workspace}-{payload.id_meter}"
+
+    try:
+        if not meter_cache.is_cached(payload.id_workspace, payload.id_meter):
+            await asyncio.to_thread(record_repo.check_meter, payload)
+
+        # The records are written by the ingest writer in the background,
+        # the state only when it changes
+        state_changed = meter_cache.set_state(
+            payload.id_workspace, payload.id_meter, MeterConnectionState.SENDING_DATA
+        )
+        if state_changed:
+            item.state = MeterConnectionState.SENDING_DATA
+        await ingest_writer.put(item)
+
+        await fan_out.publish(room_name, records)
+        print(f"📤 Mensaje enviado a sala {room_name} en namespace /subscribe/")
+
+        await sender.send_alerts_many(
+            workspace_id=payload.id_workspace, meter_id=payload.id_meter, records=bodies
+        )
+
+    except Exception as e:
+        await _emit_error(payload, e)
+
+
+async def _session(sid: str) -> MeterPayload | None:
+    """
+    Session of a meter connected to this process. A connection without one
+    (e.g. its session could not be stored) is closed.
+    """
+    payload = meter_sessions.get_local(sid)
+    if payload is None:
+        print(f"📡 Sesión no encontrada, desconexión: {sid}")
+        await sio.disconnect(sid, namespace="/receive/")
+    return payload
+
+
 @sio.on("message", namespace="/receive/")
 async def receive_message(sid, data: dict):
 
     # Obtener información del medidor
-    payload = SessionMeterSocketIORepositoryImpl.get(sid)
+    payload = await _session(sid)
+    if payload is None:
+        return
     print(f"Payload del medidor: {payload}")
 
-    room_name = f"{payload.id_workspace}-{payload.id_meter}"
-
     try:
         record_body = RecordBody(**data)
+    except Exception as e:
+        await _emit_error(payload, e)
+        return
 
-        meter_state_repo.set_state(
-            payload.id_workspace, payload.id_meter, MeterConnectionState.SENDING_DATA
-        )
+    timestamp, response = record_repo.create(record_body)
 
-        response = record_repo.add(payload, record_body)
-        # print(response.model_dump())
-        """
-        background_tasks.add_task(
-            sender.send_alerts, payload.id_meter, record_body)
-        """
-        await sender.send_alerts(workspace_id=payload.id_workspace, meter_id=payload.id_meter, records=record_body)
-        await sio.emit(
-            "message",
-            response.model_dump(mode="json"),
-            namespace="/subscribe/",
-            room=room_name,
-        )
-        print(f"📤 Mensaje enviado a sala {room_name} en namespace /subscribe/")
+    await _ingest(
+        payload,
+        IngestItem(
+            id_workspace=payload.id_workspace,
+            id_meter=payload.id_meter,
+            timestamp=timestamp,
+            record=response,
+        ),
+        [response.model_dump(mode="json")],
+        [record_body],
+    )
+
+
+@sio.on("batch", namespace="/receive/")
+async def receive_batch(sid, data: dict):
+    """
+    Readings taken at different times, sent together: written with one
+    update, checked against the alerts at once and published together, in
+    time order.
+
+    Returns the readings that were rejected, as the acknowledgement of the
+    message.
+    """
+    payload = await _session(sid)
+    if payload is None:
+        return
 
+    try:
+        batch = RecordBatchBody.model_validate(data)
     except Exception as e:
-        print(e.__class__.__name__)
-        print(e)
-        await sio.emit(
-            "error",
-            f"Error: {e.__class__.__name__}",
-            namespace="/subscribe/",
-            room=room_name,
-        )
+        await _emit_error(payload, e)
+        return
 
+    response = BatchResponse(accepted=len(batch.records), rejected=batch.rejected)
+    if batch.rejected:
+        print(f"Lecturas rechazadas de {sid}: {len(batch.rejected)}")
+    if not batch.records:
+        return response.model_dump()
 
-@sio.on("disconnect", namespace="/receive/")
-async def receive_disconnection(sid):
-    print(f"📡 Desconexión de receive: {sid}")
-    payload = SessionMeterSocketIORepositoryImpl.get(sid)
+    records = record_repo.create_many(batch)
 
-    if payload is not None:
-        meter_state_repo.set_state(
+    await _ingest(
+        payload,
+        IngestItem(
             id_workspace=payload.id_workspace,
             id_meter=payload.id_meter,
-            state=MeterConnectionState.DISCONNECTED,
+            records=records,
+        ),
+        [record.model_dump(mode="json") for record in records.values()],
+        batch.records,
+    )
+
+    return response.model_dump()
+
+
+@sio.on("disconnect", namespace="/receive/")
+async def receive_disconnection(sid):
+    print(f"📡 Desconexión de receive: {sid}")
+    payload = await asyncio.to_thread(meter_sessions.delete, sid)
+
+    if payload is not None and meter_cache.set_state(
+        payload.id_workspace, payload.id_meter, MeterConnectionState.DISCONNECTED
+    ):
+        await ingest_writer.put(
+            IngestItem(
+                id_workspace=payload.id_workspace,
+                id_meter=payload.id_meter,
+                state=MeterConnectionState.DISCONNECTED,
+            )
         )
 
-    SessionMeterSocketIORepositoryImpl.delete(sid)
     await sio.emit("disconnect", sid, namespace="/receive/")
 
 
@@ -0,0 +1,80 @@
+from app.share.config import Config
+
+
+class SocketIOConfigImpl(Config):
+    def _get_int(self, key: str, default: int) -> int:
+        value = self.get_env(key)
+        return int(value) if value else default
+
+    def _get_float(self, key: str, default: float) -> float:
+        value = self.get_env(key)
+        return float(value) if value else default
+
+    @property
+    def message_queue(self) -> str | None:
+        """
+        URL of the queue shared by the socket processes (redis://...). Without
+        it each process only reaches the subscribers connected to itself.
+        """
+        return self.get_env("SOCKETIO_MESSAGE_QUEUE") or None
+
+    @property
+    def channel(self) -> str:
+        """Channel of the queue, the same in every process"""
+        return self.get_env("SOCKETIO_CHANNEL") or "water_quality"
+
+    @property
+    def session_store(self) -> str | None:
+        """
+        Store of the socket sessions: memory:// (default, one worker),
+        sqlite:///path (workers of one host) or redis://...
+        """
+        return self.get_env("SOCKETIO_SESSION_STORE") or None
+
+    @property
+    def session_ttl(self) -> int:
+        """
+        Seconds a session lasts without a heartbeat of its process; the
+        meters of the expired sessions are marked as disconnected
+        """
+        return self._get_int("SOCKETIO_SESSION_TTL", 60)
+
+    @property
+    def meter_cache_ttl(self) -> float:
+        """
+        Seconds a meter is trusted to exist without reading it again; a meter
+        deleted through another process is rejected after at most this long
+        """
+        return self._get_float("SOCKETIO_METER_CACHE_TTL", 30)
+
+    @property
+    def dead_letter_store(self) -> str:
+        """
+        Store of the ingest writes that failed every retry:
+        sqlite:///path (default sqlite:///dead_letters.db) or memory://
+        (lost on restart)
+        """
+        return self.get_env("SOCKETIO_DEAD_LETTER_STORE") or "sqlite:///dead_letters.db"
+
+    @property
+    def fan_out_rate(self) -> float:
+        """Frames per second sent to each /subscribe/ room; 0 sends every record"""
+        return self._get_float("SOCKETIO_FANOUT_RATE", 4)
+
+    @property
+    def fan_out_latest(self) -> bool:
+        """Frames carry only the latest record instead of every record since the last one"""
+        return self.get_env("SOCKETIO_FANOUT_MODE") == "latest"
+
+    @property
+    def frame_records(self) -> int:
+        """Records of a frame; older ones are left out"""
+        return self._get_int("SOCKETIO_FRAME_RECORDS", 100)
+
+    @property
+    def client_queue(self) -> int:
+        """
+        Packets waiting to be sent to a subscriber; frames for a subscriber
+        with more are dropped
+        """
+        return self._get_int("SOCKETIO_CLIENT_QUEUE", 64)
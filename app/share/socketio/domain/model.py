@@ -1,7 +1,10 @@
-from typing import Generic, TypeVar
-from pydantic import BaseModel
+import time
+from typing import Any, Generic, TypeVar
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
 from datetime import datetime
 
+from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
+
 T = TypeVar("T")
 
 
@@ -20,6 +23,78 @@ class RecordBody(BaseModel):
     turbidity: float
 
 
+# Readings of a batch message; a meter backfilling an outage sends several
+MAX_BATCH_RECORDS = 1000
+
+# Seconds a reading may be ahead of the server clock
+MAX_CLOCK_SKEW = 300
+
+# Seconds a reading may be behind the server clock
+MAX_READING_AGE = 30 * 24 * 60 * 60
+
+
+class ReadingBody(RecordBody):
+    # Unix time the reading was taken, in seconds
+    timestamp: float = Field(gt=0)
+
+    @field_validator("timestamp")
+    @classmethod
+    def check_timestamp(cls, timestamp: float) -> float:
+        now = time.time()
+        if timestamp > now + MAX_CLOCK_SKEW:
+            raise ValueError("Lectura con fecha futura")
+        if timestamp < now - MAX_READING_AGE:
+            raise ValueError("Lectura demasiado antigua")
+        return timestamp
+
+
+class RejectedReading(BaseModel):
+    # Position of the reading in the message
+    index: int
+    error: str
+
+
+class RecordBatchBody(BaseModel):
+    """
+    Readings sent in one message. They are stored by second, so readings
+    of the same second keep the last one.
+
+    Each reading is validated on its own: the invalid ones are left out of
+    records and reported in rejected, the rest are stored.
+    """
+
+    records: list[ReadingBody]
+    rejected: list[RejectedReading] = []
+
+    @model_validator(mode="before")
+    @classmethod
+    def split_readings(cls, data: Any) -> Any:
+        readings = data.get("records") if isinstance(data, dict) else None
+        if not isinstance(readings, list) or not (
+            1 <= len(readings) <= MAX_BATCH_RECORDS
+        ):
+            raise ValueError(f"Se esperan entre 1 y {MAX_BATCH_RECORDS} lecturas")
+
+        records: list[ReadingBody] = []
+        rejected: list[RejectedReading] = []
+        for index, reading in enumerate(readings):
+            try:
+                records.append(ReadingBody.model_validate(reading))
+            except ValidationError as e:
+                rejected.append(
+                    RejectedReading(index=index, error=e.errors()[0]["msg"])
+                )
+
+        return {"records": records, "rejected": rejected}
+
+
+class BatchResponse(BaseModel):
+    """Acknowledgement of a batch message"""
+
+    accepted: int
+    rejected: list[RejectedReading] = []
+
+
 class Record(BaseModel, Generic[T]):
     id: int | str = None
     value: T
@@ -33,3 +108,65 @@ class RecordResponse(BaseModel):
     temperature: Record[float]
     tds: Record[float]
     turbidity: Record[float]
+
+
+class IngestItem(BaseModel):
+    """
+    Pending write of the ingest pipeline. Carries a record (or the records
+    of a batch), a connection state change, or both.
+    """
+
+    id_workspace: str
+    id_meter: str
+    state: MeterConnectionState | None = None
+    timestamp: int | None = None
+    record: RecordResponse | None = None
+    # Records of a batch message by timestamp
+    records: dict[int, RecordResponse] | None = None
+
+
+class RollupReadings(BaseModel):
+    """Readings ({timestamp: {sensor: value}}) to add to the rollups of a meter"""
+
+    id_workspace: str
+    id_meter: str
+    readings: dict[int, dict[str, float | None]]
+
+
+class DeadLetter(BaseModel):
+    """
+    Ingest writes that failed every retry, kept to be written again: the
+    record paths of a multi-path update and the readings whose rollups are
+    missing.
+    """
+
+    updates: dict[str, Any] = {}
+    rollups: list[RollupReadings] = []
+
+
+class IngestMetrics(BaseModel):
+    queue_depth: int
+    max_queue: int
+    received: int
+    written: int
+    batches: int
+    failed_batches: int
+    # Items neither written nor kept as a dead letter
+    dropped: int
+    rollup_queue_depth: int = 0
+    failed_rollups: int = 0
+    # Dead letters waiting to be written again, and the ones written
+    dead_letters: int = 0
+    replayed: int = 0
+    last_flush_latency: float | None = None
+    max_flush_latency: float | None = None
+
+
+class FanOutMetrics(BaseModel):
+    rooms_pending: int
+    published: int
+    frames: int
+    # Records left out of a frame: older than the latest, or over the limit
+    coalesced: int
+    # Frames not sent to a subscriber that wasn't reading them
+    dropped_frames: int
@@ -1,37 +1,259 @@
 from abc import ABC, abstractmethod
+from typing import Generic, TypeVar
 
-from app.share.jwt.domain.payload import MeterPayload, UserPayload
+from pydantic import BaseModel
+
+from app.share.jwt.domain.payload import MeterPayload
 from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
-from app.share.socketio.domain.model import RecordBody, RecordResponse
+from app.share.socketio.domain.model import (
+    DeadLetter,
+    FanOutMetrics,
+    IngestItem,
+    IngestMetrics,
+    RecordBatchBody,
+    RecordBody,
+    RecordResponse,
+)
+
+P = TypeVar("P", bound=BaseModel)
+
+
+class SessionStoreRepository(ABC):
+    """
+    Serialized sessions of the socket connections, with the time each one
+    expires. Shared by the processes of the socket layer, so the sessions of
+    a process that stopped are found by the others.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> str | None:
+        pass
+
+    @abstractmethod
+    def put(self, items: dict[str, str], expires_at: float) -> None:
+        pass
+
+    @abstractmethod
+    def renew(self, keys: list[str], expires_at: float) -> list[str]:
+        """
+        Extend the sessions that are still stored.
+
+        Returns:
+            Keys that were no longer stored
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @abstractmethod
+    def values(self, prefix: str) -> list[str]:
+        """
+        Sessions stored under keys that start with prefix, expired or not.
+        """
+        pass
+
+    @abstractmethod
+    def pop_expired(self, prefix: str, now: float) -> list[str]:
+        """
+        Remove the sessions under prefix that expired by now. Each one is
+        returned to a single caller, even with several processes popping.
+        """
+        pass
 
 
-class SessionMeterSocketIORepository(ABC):
+class SessionSocketIORepository(ABC, Generic[P]):
+    """
+    Payload of each socket connection (sid) of one kind. The sessions of a
+    process expire when it stops renewing them with heartbeat.
+    """
+
+    @abstractmethod
+    def get(self, sid: str) -> P | None:
+        pass
+
     @abstractmethod
-    def get(cls, id: str):
+    def get_local(self, sid: str) -> P | None:
+        """Session of a connection of this process, without reading the store"""
         pass
 
     @abstractmethod
-    def add(cls, id: str, payload: MeterPayload):
+    def add(self, sid: str, payload: P) -> None:
         pass
 
     @abstractmethod
-    def delete(cls, id: str):
+    def delete(self, sid: str) -> P | None:
         pass
 
+    @abstractmethod
+    def values(self) -> list[P]:
+        """Sessions of every process"""
+        pass
 
-class SessionUserSocketIORepository(ABC):
     @abstractmethod
-    def get(self, id: str):
+    def heartbeat(self) -> list[P]:
+        """
+        Renew the sessions of this process.
+
+        Returns:
+            Sessions that had already expired and were added again
+        """
         pass
 
     @abstractmethod
-    def add(self, user_id: str, payload: UserPayload):
+    def pop_expired(self) -> list[P]:
+        """Remove the expired sessions of any process and return them"""
         pass
 
 
 class RecordRepository(ABC):
     @abstractmethod
-    def add(self, meter_connection: MeterPayload, body: RecordBody) -> RecordResponse:
+    def create(self, body: RecordBody) -> tuple[int, RecordResponse]:
+        """
+        Build the record stored for a message, without writing it.
+
+        Returns:
+            Timestamp (key of the record) and the record
+        """
+        pass
+
+    @abstractmethod
+    def create_many(self, body: RecordBatchBody) -> dict[int, RecordResponse]:
+        """
+        Build the records stored for a batch message, without writing them.
+
+        Returns:
+            Records by timestamp, in time order
+        """
+        pass
+
+    @abstractmethod
+    def check_meter(self, meter_connection: MeterPayload) -> None:
+        """
+        Raise if the meter of the connection does not exist.
+        """
+        pass
+
+
+class DeadLetterRepository(ABC):
+    """
+    Failed ingest writes kept until they are written again, oldest first.
+    """
+
+    @abstractmethod
+    def put(self, letter: DeadLetter) -> None:
+        pass
+
+    @abstractmethod
+    def peek(self, limit: int) -> list[tuple[int, DeadLetter]]:
+        """
+        Oldest letters with their id, left in the store until removed.
+        """
+        pass
+
+    @abstractmethod
+    def remove(self, letter_id: int) -> None:
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+
+class IngestWriterRepository(ABC):
+    """
+    Queue of ingest writes flushed in the background. Items of the same
+    meter are written in the order they were put.
+    """
+
+    @abstractmethod
+    async def put(self, item: IngestItem) -> None:
+        """
+        Queue an item, waiting while the queue is full.
+        """
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """
+        Flush the queued items and stop the writer.
+        """
+        pass
+
+    @abstractmethod
+    def metrics(self) -> IngestMetrics:
+        pass
+
+
+class FanOutRepository(ABC):
+    """
+    Records sent to the subscribers of each room, coalesced into frames at
+    a maximum rate per room.
+    """
+
+    @abstractmethod
+    async def publish(self, room: str, records: list[dict]) -> None:
+        """
+        Send records to a room, now or with the next frame of the room.
+
+        Args:
+            records: Records already serialized (json mode), in time order
+        """
+        pass
+
+    @abstractmethod
+    async def stop(self) -> None:
+        """
+        Send the pending frames.
+        """
+        pass
+
+    @abstractmethod
+    def metrics(self) -> FanOutMetrics:
+        pass
+
+
+class MeterCacheRepository(ABC):
+    """
+    Existence and last written connection state of the meters, kept per
+    process and keyed by (workspace, meter) for a limited time.
+    """
+
+    @abstractmethod
+    def is_cached(cls, id_workspace: str, id_meter: str) -> bool:
+        """
+        True if the meter was loaded and its entry has not expired yet.
+        """
+        pass
+
+    @abstractmethod
+    def load(cls, id_workspace: str, id_meter: str) -> bool:
+        """
+        Read the meter (shallow) and cache it.
+
+        Returns:
+            False if the meter does not exist
+        """
+        pass
+
+    @abstractmethod
+    def set_state(
+        cls, id_workspace: str, id_meter: str, state: MeterConnectionState
+    ) -> bool:
+        """
+        Record the state of a meter.
+
+        Returns:
+            True if it differs from the last known state and must be written
+        """
+        pass
+
+    @abstractmethod
+    def invalidate(cls, id_workspace: str, id_meter: str | None = None) -> None:
+        """
+        Drop a meter, or every meter of the workspace when id_meter is None.
+        """
         pass
 
 
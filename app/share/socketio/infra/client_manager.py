@@ -0,0 +1,52 @@
+import asyncio
+
+from socketio import AsyncManager, AsyncRedisManager
+from socketio.async_pubsub_manager import AsyncPubSubManager
+
+from app.share.socketio.domain.config import SocketIOConfigImpl
+
+
+class InProcessPubSubManager(AsyncPubSubManager):
+    """
+    Message queue of the servers in the same process, a stand-in for Redis
+    where the API and the ingest run together or in tests.
+    """
+
+    name = "inprocess"
+
+    # channel -> queue of each server listening on it
+    channels: dict[str, list[asyncio.Queue]] = {}
+
+    def __init__(self, channel: str = "socketio", write_only: bool = False):
+        super().__init__(channel=channel, write_only=write_only)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        if not write_only:
+            self.channels.setdefault(channel, []).append(self.queue)
+
+    async def _publish(self, data):
+        for queue in self.channels.get(self.channel, []):
+            queue.put_nowait(data)
+
+    async def _listen(self):
+        while True:
+            yield await self.queue.get()
+
+    def close(self) -> None:
+        """Stop receiving the messages of the channel"""
+        queues = self.channels.get(self.channel, [])
+        if self.queue in queues:
+            queues.remove(self.queue)
+
+
+def create_client_manager(config: SocketIOConfigImpl) -> AsyncManager:
+    """
+    Client manager of the socket server: the rooms of this process only, or
+    every process sharing the message queue of the config.
+    """
+    url = config.message_queue
+
+    if url is None:
+        return AsyncManager()
+    if url.startswith("memory://"):
+        return InProcessPubSubManager(channel=config.channel)
+    return AsyncRedisManager(url, channel=config.channel)
@@ -0,0 +1,88 @@
+import sqlite3
+import threading
+from itertools import count
+
+from app.share.socketio.domain.config import SocketIOConfigImpl
+from app.share.socketio.domain.model import DeadLetter
+from app.share.socketio.domain.repository import DeadLetterRepository
+
+
+class MemoryDeadLetterStore(DeadLetterRepository):
+    """Dead letters of this process, lost when it stops"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._ids = count(1)
+        self._letters: dict[int, DeadLetter] = {}
+
+    def put(self, letter: DeadLetter) -> None:
+        with self._lock:
+            self._letters[next(self._ids)] = letter
+
+    def peek(self, limit: int) -> list[tuple[int, DeadLetter]]:
+        with self._lock:
+            return list(self._letters.items())[:limit]
+
+    def remove(self, letter_id: int) -> None:
+        with self._lock:
+            self._letters.pop(letter_id, None)
+
+    def count(self) -> int:
+        with self._lock:
+            return len(self._letters)
+
+
+class SQLiteDeadLetterStore(DeadLetterRepository):
+    """Dead letters in a SQLite file, kept across restarts"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS ingest_dead_letters ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, letter TEXT NOT NULL)"
+        )
+
+    def put(self, letter: DeadLetter) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingest_dead_letters (letter) VALUES (?)",
+                (letter.model_dump_json(),),
+            )
+
+    def peek(self, limit: int) -> list[tuple[int, DeadLetter]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, letter FROM ingest_dead_letters ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+        return [
+            (letter_id, DeadLetter.model_validate_json(letter))
+            for letter_id, letter in rows
+        ]
+
+    def remove(self, letter_id: int) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM ingest_dead_letters WHERE id = ?", (letter_id,)
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM ingest_dead_letters"
+            ).fetchone()[0]
+
+
+def create_dead_letter_store(config: SocketIOConfigImpl) -> DeadLetterRepository:
+    url = config.dead_letter_store
+
+    if url.startswith("sqlite:///"):
+        return SQLiteDeadLetterStore(url.removeprefix("sqlite:///"))
+    if url.startswith("memory://"):
+        return MemoryDeadLetterStore()
+
+    raise ValueError(f"Almacén de escrituras fallidas no soportado: {url}")
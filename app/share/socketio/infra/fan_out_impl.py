@@ -0,0 +1,146 @@
+import asyncio
+from collections import deque
+
+from engineio import packet as eio_packet
+from socketio import AsyncServer
+
+from app.share.socketio.domain.model import FanOutMetrics
+from app.share.socketio.domain.repository import FanOutRepository
+
+
+class BoundedAsyncServer(AsyncServer):
+    """
+    Socket server that drops the frames of the dropped_namespace for the
+    clients that have more than max_client_queue packets waiting to be
+    sent, instead of queuing them without bound. A client that reads again
+    gets the next frames.
+    """
+
+    def __init__(self, *args, dropped_namespace: str, max_client_queue: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_client_queue = max_client_queue
+        self.dropped_frames = 0
+        # Encoded events of the namespace start with the type and namespace
+        self._frame_prefix = f"2{dropped_namespace},"
+
+    async def _send_eio_packet(self, eio_sid, eio_pkt):
+        socket = self.eio.sockets.get(eio_sid)
+
+        if (
+            socket is not None
+            and socket.queue.qsize() >= self.max_client_queue
+            and eio_pkt.packet_type == eio_packet.MESSAGE
+            and isinstance(eio_pkt.data, str)
+            and eio_pkt.data.startswith(self._frame_prefix)
+        ):
+            self.dropped_frames += 1
+            return
+
+        await super()._send_eio_packet(eio_sid, eio_pkt)
+
+
+class FanOutRepositoryImpl(FanOutRepository):
+    """
+    Sends at most rate frames per second to each room. The records that
+    arrive in between wait for the next frame of the room, which carries
+    all of them (up to frame_records, newest kept) or only the latest.
+
+    A room that hasn't had a frame in the last 1 / rate seconds gets the
+    record right away. A frame with one record is a "message" event, as
+    single records have always been sent; with more, it is a "batch" event
+    with {"records": [...]} in time order.
+    """
+
+    def __init__(
+        self,
+        server: AsyncServer,
+        namespace: str,
+        rate: float = 4,
+        latest_only: bool = False,
+        frame_records: int = 100,
+    ):
+        self.server = server
+        self.namespace = namespace
+        self.interval = 1 / rate if rate > 0 else 0
+        self.frame_records = 1 if latest_only else frame_records
+
+        self._pending: dict[str, deque[dict]] = {}
+        self._sent_at: dict[str, float] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+        self._published = 0
+        self._frames = 0
+        self._coalesced = 0
+
+    async def publish(self, room: str, records: list[dict]) -> None:
+        self._published += len(records)
+
+        if self.interval == 0:
+            await self._send(room, records)
+            return
+
+        pending = self._pending.get(room)
+        if pending is None:
+            pending = self._pending[room] = deque(maxlen=self.frame_records)
+        self._coalesced += max(0, len(pending) + len(records) - self.frame_records)
+        pending.extend(records)
+
+        if room in self._timers:
+            return
+
+        loop = asyncio.get_running_loop()
+        delay = self._sent_at.get(room, float("-inf")) + self.interval - loop.time()
+
+        if delay <= 0:
+            await self._flush(room)
+        else:
+            self._timers[room] = loop.call_later(delay, self._flush_later, room)
+
+    def _flush_later(self, room: str) -> None:
+        task = asyncio.ensure_future(self._flush(room))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, room: str) -> None:
+        self._timers.pop(room, None)
+        pending = self._pending.pop(room, None)
+        if not pending:
+            return
+
+        self._sent_at[room] = asyncio.get_running_loop().time()
+        await self._send(room, list(pending))
+
+    async def _send(self, room: str, records: list[dict]) -> None:
+        self._frames += 1
+
+        try:
+            if len(records) == 1:
+                await self.server.emit(
+                    "message", records[0], namespace=self.namespace, room=room
+                )
+            else:
+                await self.server.emit(
+                    "batch", {"records": records}, namespace=self.namespace, room=room
+                )
+        except Exception as e:
+            print(f"Error al enviar los registros a la sala {room}: {e}")
+
+    async def stop(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+
+        for room in list(self._pending):
+            await self._flush(room)
+
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def metrics(self) -> FanOutMetrics:
+        return FanOutMetrics(
+            rooms_pending=len(self._pending),
+            published=self._published,
+            frames=self._frames,
+            coalesced=self._coalesced,
+            dropped_frames=getattr(self.server, "dropped_frames", 0),
+        )
@@ -0,0 +1,313 @@
+import asyncio
+import time
+from typing import Callable
+
+from firebase_admin import db
+
+from app.share.meter_records.domain.columns import NUMERIC_SENSORS
+from app.share.meter_records.domain.rollup_repository import RollupRepository
+from app.share.socketio.domain.model import (
+    DeadLetter,
+    IngestItem,
+    IngestMetrics,
+    RollupReadings,
+)
+from app.share.socketio.domain.repository import (
+    DeadLetterRepository,
+    IngestWriterRepository,
+)
+from app.share.socketio.infra.dead_letter_impl import MemoryDeadLetterStore
+
+
+class IngestWriterRepositoryImpl(IngestWriterRepository):
+    """
+    Writes the queued items with one multi-path update per batch.
+
+    A single background task drains the queue, so items (and therefore the
+    items of each meter) are written in the order they were put. A batch is
+    flushed after flush_interval seconds or as soon as max_batch items are
+    waiting.
+
+    The rollups of the written records are added by a second task, so a
+    slow rollup never holds back the records. Writes that fail every retry
+    are kept as dead letters and written again every retry_interval
+    seconds; rollups added again or late recount their hours from the
+    records, so writing them twice is harmless.
+    """
+
+    def __init__(
+        self,
+        rollup_repo: RollupRepository | None = None,
+        dead_letters: DeadLetterRepository | None = None,
+        max_queue: int = 10_000,
+        max_batch: int = 500,
+        flush_interval: float = 0.25,
+        max_retries: int = 3,
+        retry_interval: float = 30.0,
+    ):
+        self.rollup_repo = rollup_repo
+        self.dead_letters = (
+            dead_letters if dead_letters is not None else MemoryDeadLetterStore()
+        )
+        self.max_queue = max_queue
+        self.max_batch = max_batch
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_interval = retry_interval
+
+        self._queue: asyncio.Queue[IngestItem | None] | None = None
+        self._task: asyncio.Task | None = None
+        self._rollup_queue: asyncio.Queue[list[RollupReadings] | None] | None = None
+        self._rollup_task: asyncio.Task | None = None
+        self._next_replay = 0.0
+
+        self._received = 0
+        self._written = 0
+        self._batches = 0
+        self._failed_batches = 0
+        self._failed_rollups = 0
+        self._dropped = 0
+        self._replayed = 0
+        self._last_flush_latency: float | None = None
+        self._max_flush_latency: float | None = None
+
+    def _ensure_started(self) -> None:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._rollup_queue = asyncio.Queue(maxsize=self.max_queue)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+        if self._rollup_task is None or self._rollup_task.done():
+            self._next_replay = time.monotonic() + self.retry_interval
+            self._rollup_task = asyncio.create_task(self._run_rollups())
+
+    async def put(self, item: IngestItem) -> None:
+        self._ensure_started()
+        await self._queue.put(item)
+        self._received += 1
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            await self._queue.put(None)
+            await self._task
+        self._task = None
+
+        if self._rollup_task is not None and not self._rollup_task.done():
+            await self._rollup_queue.put(None)
+            await self._rollup_task
+        self._rollup_task = None
+
+    def metrics(self) -> IngestMetrics:
+        return IngestMetrics(
+            queue_depth=self._queue.qsize() if self._queue is not None else 0,
+            max_queue=self.max_queue,
+            received=self._received,
+            written=self._written,
+            batches=self._batches,
+            failed_batches=self._failed_batches,
+            dropped=self._dropped,
+            rollup_queue_depth=(
+                self._rollup_queue.qsize() if self._rollup_queue is not None else 0
+            ),
+            failed_rollups=self._failed_rollups,
+            dead_letters=self.dead_letters.count(),
+            replayed=self._replayed,
+            last_flush_latency=self._last_flush_latency,
+            max_flush_latency=self._max_flush_latency,
+        )
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            stopping = item is None
+            batch = [] if stopping else [item]
+
+            if not stopping and self._queue.qsize() < self.max_batch:
+                await asyncio.sleep(self.flush_interval)
+
+            while not stopping and len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+
+                if item is None:
+                    stopping = True
+                else:
+                    batch.append(item)
+
+            if batch:
+                await self._flush(batch)
+
+            if stopping:
+                return
+
+    async def _retry(self, write: Callable[[], None], description: str) -> bool:
+        """Run write in a thread up to max_retries times; False if every try failed"""
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                await asyncio.to_thread(write)
+                return True
+            except Exception as e:
+                print(f"Error al {description}: {e}")
+
+                if attempt == self.max_retries:
+                    return False
+
+                await asyncio.sleep(self.flush_interval * attempt)
+
+    async def _flush(self, batch: list[IngestItem]) -> None:
+        updates, rollups = self._build_updates(batch)
+        started = time.perf_counter()
+
+        written = await self._retry(
+            lambda: db.reference().update(updates),
+            f"escribir {len(batch)} registros",
+        )
+        if not written:
+            self._failed_batches += 1
+            # The state of the meters is not kept: a later write has a newer one
+            records = {
+                path: value
+                for path, value in updates.items()
+                if not path.endswith("/state")
+            }
+            if records and not await self._dead_letter(
+                DeadLetter(updates=records, rollups=rollups)
+            ):
+                self._dropped += len(batch)
+            return
+
+        if self.rollup_repo is not None and rollups:
+            try:
+                self._rollup_queue.put_nowait(rollups)
+            except asyncio.QueueFull:
+                await self._dead_letter(DeadLetter(rollups=rollups))
+
+        latency = time.perf_counter() - started
+        self._written += len(batch)
+        self._batches += 1
+        self._last_flush_latency = latency
+        self._max_flush_latency = max(self._max_flush_latency or 0.0, latency)
+
+    async def _dead_letter(self, letter: DeadLetter) -> bool:
+        try:
+            await asyncio.to_thread(self.dead_letters.put, letter)
+            return True
+        except Exception as e:
+            print(f"Error al guardar las escrituras fallidas: {e}")
+            return False
+
+    def _build_updates(
+        self, batch: list[IngestItem]
+    ) -> tuple[dict, list[RollupReadings]]:
+        updates: dict = {}
+        readings: dict[tuple[str, str], dict[int, dict]] = {}
+
+        for item in batch:
+            meter_path = f"workspaces/{item.id_workspace}/meters/{item.id_meter}"
+
+            records = dict(item.records or {})
+            if item.record is not None:
+                records[item.timestamp] = item.record
+
+            for timestamp, record in records.items():
+                updates[f"{meter_path}/sensors/{timestamp}"] = record.model_dump(
+                    mode="json"
+                )
+                readings.setdefault((item.id_workspace, item.id_meter), {})[
+                    timestamp
+                ] = {
+                    sensor.value: getattr(record, sensor.value).value
+                    for sensor in NUMERIC_SENSORS
+                }
+
+            if item.state is not None:
+                updates[f"{meter_path}/state"] = item.state.value
+
+        return updates, _rollup_readings(readings)
+
+    async def _run_rollups(self) -> None:
+        while True:
+            timeout = max(self._next_replay - time.monotonic(), 0.0)
+            try:
+                rollups = await asyncio.wait_for(self._rollup_queue.get(), timeout)
+            except asyncio.TimeoutError:
+                rollups = []
+
+            stopping = rollups is None
+            pending: dict[tuple[str, str], dict[int, dict]] = {}
+
+            # Every waiting batch at once, so each bucket is written once
+            while rollups is not None:
+                for item in rollups:
+                    pending.setdefault((item.id_workspace, item.id_meter), {}).update(
+                        item.readings
+                    )
+                try:
+                    rollups = self._rollup_queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                stopping = stopping or rollups is None
+
+            for item in _rollup_readings(pending):
+                await self._add_rollups(item)
+
+            if stopping:
+                return
+
+            if time.monotonic() >= self._next_replay:
+                await self._replay()
+                self._next_replay = time.monotonic() + self.retry_interval
+
+    async def _add_rollups(self, item: RollupReadings) -> None:
+        added = await self._retry(
+            lambda: self.rollup_repo.add_many(
+                item.id_workspace, item.id_meter, item.readings
+            ),
+            "actualizar los rollups",
+        )
+        if not added:
+            self._failed_rollups += 1
+            await self._dead_letter(DeadLetter(rollups=[item]))
+
+    async def _replay(self) -> None:
+        """Write the oldest dead letters again, until one of them fails"""
+        try:
+            letters = await asyncio.to_thread(self.dead_letters.peek, self.max_batch)
+        except Exception as e:
+            print(f"Error al leer las escrituras fallidas: {e}")
+            return
+
+        for letter_id, letter in letters:
+            try:
+                if letter.updates:
+                    await asyncio.to_thread(db.reference().update, letter.updates)
+
+                for item in letter.rollups if self.rollup_repo is not None else []:
+                    await asyncio.to_thread(
+                        self.rollup_repo.add_many,
+                        item.id_workspace,
+                        item.id_meter,
+                        item.readings,
+                    )
+
+                await asyncio.to_thread(self.dead_letters.remove, letter_id)
+            except Exception as e:
+                print(f"Error al reintentar las escrituras fallidas: {e}")
+                return
+
+            self._replayed += 1
+
+
+def _rollup_readings(
+    readings: dict[tuple[str, str], dict[int, dict]],
+) -> list[RollupReadings]:
+    return [
+        RollupReadings(
+            id_workspace=id_workspace, id_meter=id_meter, readings=meter_readings
+        )
+        for (id_workspace, id_meter), meter_readings in readings.items()
+    ]
@@ -0,0 +1,86 @@
+import time
+
+from firebase_admin import db
+
+from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
+from app.share.socketio.domain.repository import MeterCacheRepository
+
+
+class MeterCacheRepositoryImpl(MeterCacheRepository):
+    """
+    Entries expire after ttl seconds, so a meter deleted through another
+    process (the API invalidates only its own cache) is read again and
+    rejected by this one within ttl.
+    """
+
+    ttl: float = 30
+
+    # (workspace, meter) -> last known state, None if the meter has no state
+    meters: dict[tuple[str, str], MeterConnectionState | None] = {}
+    # (workspace, meter) -> time the entry expires (monotonic)
+    expires: dict[tuple[str, str], float] = {}
+
+    @classmethod
+    def is_cached(cls, id_workspace: str, id_meter: str) -> bool:
+        key = (id_workspace, id_meter)
+        if key not in cls.meters:
+            return False
+
+        if cls.expires.get(key, 0.0) <= time.monotonic():
+            cls.meters.pop(key, None)
+            cls.expires.pop(key, None)
+            return False
+
+        return True
+
+    @classmethod
+    def load(cls, id_workspace: str, id_meter: str) -> bool:
+        # Shallow read: children are returned as True, except primitive
+        # values such as the state, which come with their value
+        meter = db.reference(f"workspaces/{id_workspace}/meters/{id_meter}").get(
+            shallow=True
+        )
+
+        if meter is None:
+            cls.meters.pop((id_workspace, id_meter), None)
+            cls.expires.pop((id_workspace, id_meter), None)
+            return False
+
+        cls.expires[(id_workspace, id_meter)] = time.monotonic() + cls.ttl
+
+        state = meter.get("state") if isinstance(meter, dict) else None
+        try:
+            cls.meters[(id_workspace, id_meter)] = (
+                MeterConnectionState(state) if state is not None else None
+            )
+        except ValueError:
+            cls.meters[(id_workspace, id_meter)] = None
+
+        return True
+
+    @classmethod
+    def set_state(
+        cls, id_workspace: str, id_meter: str, state: MeterConnectionState
+    ) -> bool:
+        key = (id_workspace, id_meter)
+
+        # Unknown meters are not cached here, only by load
+        if key not in cls.meters:
+            return True
+
+        if cls.meters[key] == state:
+            return False
+
+        cls.meters[key] = state
+        return True
+
+    @classmethod
+    def invalidate(cls, id_workspace: str, id_meter: str | None = None) -> None:
+        if id_meter is not None:
+            cls.meters.pop((id_workspace, id_meter), None)
+            cls.expires.pop((id_workspace, id_meter), None)
+            return
+
+        for key in [key for key in cls.meters if key[0] == id_workspace]:
+            cls.meters.pop(key, None)
+            cls.expires.pop(key, None)
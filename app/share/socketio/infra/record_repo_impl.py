@@ -1,33 +1,50 @@
 from app.share.jwt.domain.payload import MeterPayload
 from app.share.socketio.domain.model import (
     Record,
+    RecordBatchBody,
     RecordBody,
     RecordResponse,
     SRColorValue,
 )
-from app.share.socketio.domain.repository import RecordRepository
+from app.share.socketio.domain.repository import (
+    MeterCacheRepository,
+    RecordRepository,
+)
 from firebase_admin import db
 from datetime import datetime
 
 
 class RecordRepositoryImpl(RecordRepository):
+    def __init__(self, meter_cache: MeterCacheRepository | None = None):
+        self.meter_cache = meter_cache
 
     def _add_in_sensor(self, sensor_ref: db.Reference, sensor_name: str, value: Record):
         record_data = value.model_dump(mode="json")
         sensor_ref.child(sensor_name).push(record_data)
 
-    def add(self, meter_connection: MeterPayload, body: RecordBody) -> RecordResponse:
+    def _get_meter_ref(self, meter_connection: MeterPayload) -> db.Reference:
         workspace_ref = db.reference("workspaces").child(meter_connection.id_workspace)
 
-        meter_ref = workspace_ref.child("meters").child(meter_connection.id_meter)
+        return workspace_ref.child("meters").child(meter_connection.id_meter)
+
+    def check_meter(self, meter_connection: MeterPayload) -> None:
+        if self.meter_cache is not None:
+            if self.meter_cache.is_cached(
+                meter_connection.id_workspace, meter_connection.id_meter
+            ):
+                return
+
+            if not self.meter_cache.load(
+                meter_connection.id_workspace, meter_connection.id_meter
+            ):
+                raise Exception(f"No existe el sensor")
+            return
 
-        meter = meter_ref.get()
+        meter = self._get_meter_ref(meter_connection).get(shallow=True)
         if meter is None:
             raise Exception(f"No existe el sensor")
 
-        current_datetime = datetime.now()
-        timestamp = int(current_datetime.timestamp())
-
+    def _build(self, body: RecordBody, current_datetime: datetime) -> RecordResponse:
         color_record = Record[SRColorValue](value=body.color, datetime=current_datetime)
         conductivity_record = Record[float](
             value=body.conductivity, datetime=current_datetime
@@ -41,7 +58,7 @@ class RecordRepositoryImpl(RecordRepository):
             value=body.turbidity, datetime=current_datetime
         )
 
-        records = RecordResponse(
+        return RecordResponse(
             color=color_record,
             conductivity=conductivity_record,
             ph=ph_record,
@@ -50,8 +67,19 @@ class RecordRepositoryImpl(RecordRepository):
             turbidity=turbidity_record,
         )
 
-        meter_ref.child("sensors").child(str(timestamp)).set(
-            records.model_dump(mode="json")
-        )
+    def create(self, body: RecordBody) -> tuple[int, RecordResponse]:
+        current_datetime = datetime.now()
+        timestamp = int(current_datetime.timestamp())
+
+        return timestamp, self._build(body, current_datetime)
+
+    def create_many(self, body: RecordBatchBody) -> dict[int, RecordResponse]:
+        # The last reading of each second is the one kept
+        readings = {int(reading.timestamp): reading for reading in body.records}
 
-        return records
+        return {
+            timestamp: self._build(
+                readings[timestamp], datetime.fromtimestamp(readings[timestamp].timestamp)
+            )
+            for timestamp in sorted(readings)
+        }
@@ -0,0 +1,64 @@
+import asyncio
+from typing import Awaitable, Callable
+
+from app.share.socketio.domain.repository import P, SessionSocketIORepository
+
+
+class SessionKeeper:
+    """
+    Background task of a socket process: renews its sessions every
+    interval seconds and hands the sessions that expired in any process (one
+    that stopped without running the disconnect handlers) to on_expired.
+    Sessions renewed after they had expired go to on_lost.
+    """
+
+    def __init__(
+        self,
+        sessions: SessionSocketIORepository[P],
+        on_expired: Callable[[list[P]], Awaitable[None]],
+        on_lost: Callable[[list[P]], Awaitable[None]],
+        interval: float,
+    ):
+        self.sessions = sessions
+        self.on_expired = on_expired
+        self.on_lost = on_lost
+        self.interval = interval
+
+        self._task: asyncio.Task | None = None
+
+    async def start(self) -> None:
+        # Sessions left by a previous run of the processes
+        try:
+            await self._reconcile()
+        except Exception as e:
+            print(f"Error al reconciliar las sesiones de socket: {e}")
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                lost = await asyncio.to_thread(self.sessions.heartbeat)
+                if lost:
+                    await self.on_lost(lost)
+                await self._reconcile()
+            except Exception as e:
+                print(f"Error al renovar las sesiones de socket: {e}")
+
+    async def _reconcile(self) -> None:
+        expired = await asyncio.to_thread(self.sessions.pop_expired)
+        if expired:
+            await self.on_expired(expired)
@@ -1,37 +1,96 @@
-from app.share.jwt.domain.payload import MeterPayload, UserPayload
-from app.share.socketio.domain.repository import SessionMeterSocketIORepository
+import threading
+import time
 
+from app.share.socketio.domain.repository import (
+    P,
+    SessionSocketIORepository,
+    SessionStoreRepository,
+)
 
-class SessionUserSocketIORepositoryImpl(SessionMeterSocketIORepository):
-    sessions: dict[str, UserPayload] = {}
 
-    @classmethod
-    def get(cls, id: str):
-        return cls.sessions.get(id)
+class SessionSocketIORepositoryImpl(SessionSocketIORepository[P]):
+    """
+    Sessions of one kind (meter, user) in a session store, keyed by
+    "kind:sid".
 
-    @classmethod
-    def add(cls, id: str, payload: UserPayload):
-        cls.sessions[id] = payload
+    A connection stays in the process that accepted it, so the sessions of
+    this process are also kept in memory: reading them (on every message)
+    does not go to the store.
+    """
 
-    @classmethod
-    def delete(cls, id: str):
-        cls.sessions.pop(id)
+    def __init__(
+        self,
+        store: SessionStoreRepository,
+        kind: str,
+        model: type[P],
+        ttl: float = 60,
+    ):
+        self.store = store
+        self.kind = kind
+        self.model = model
+        self.ttl = ttl
 
+        self._lock = threading.Lock()
+        self._local: dict[str, P] = {}
 
-class SessionMeterSocketIORepositoryImpl(SessionMeterSocketIORepository):
-    sessions: dict[str, MeterPayload] = {}
+    def _key(self, sid: str) -> str:
+        return f"{self.kind}:{sid}"
 
-    @classmethod
-    def get(cls, id: str):
-        return cls.sessions.get(id)
+    def _load(self, payload: str | None) -> P | None:
+        return self.model.model_validate_json(payload) if payload is not None else None
 
-    @classmethod
-    def add(cls, id: str, payload: MeterPayload):
-        cls.sessions[id] = payload
+    def get(self, sid: str) -> P | None:
+        with self._lock:
+            payload = self._local.get(sid)
+        if payload is not None:
+            return payload
+        return self._load(self.store.get(self._key(sid)))
 
-    @classmethod
-    def delete(cls, id: str):
-        try:
-            cls.sessions.pop(id)
-        except KeyError:
-            pass
+    def get_local(self, sid: str) -> P | None:
+        with self._lock:
+            return self._local.get(sid)
+
+    def add(self, sid: str, payload: P) -> None:
+        with self._lock:
+            self._local[sid] = payload
+        self.store.put(
+            {self._key(sid): payload.model_dump_json()}, time.time() + self.ttl
+        )
+
+    def delete(self, sid: str) -> P | None:
+        with self._lock:
+            payload = self._local.pop(sid, None)
+        if payload is None:
+            payload = self._load(self.store.get(self._key(sid)))
+        self.store.delete(self._key(sid))
+        return payload
+
+    def values(self) -> list[P]:
+        return [self._load(payload) for payload in self.store.values(f"{self.kind}:")]
+
+    def heartbeat(self) -> list[P]:
+        with self._lock:
+            sessions = dict(self._local)
+        if not sessions:
+            return []
+
+        expires_at = time.time() + self.ttl
+        keys = {self._key(sid): sid for sid in sessions}
+        missing = self.store.renew(list(keys), expires_at)
+
+        # Popped as expired by another process (this one stalled) while the
+        # connection was still open
+        with self._lock:
+            lost = {key: self._local[keys[key]] for key in missing if keys[key] in self._local}
+        if lost:
+            self.store.put(
+                {key: payload.model_dump_json() for key, payload in lost.items()},
+                expires_at,
+            )
+        return list(lost.values())
+
+    def pop_expired(self) -> list[P]:
+        return [
+            self._load(payload)
+            for payload in self.store.pop_expired(f"{self.kind}:", time.time())
+        ]
@@ -0,0 +1,220 @@
+import sqlite3
+import threading
+
+from app.share.socketio.domain.config import SocketIOConfigImpl
+from app.share.socketio.domain.repository import SessionStoreRepository
+
+
+class MemorySessionStore(SessionStoreRepository):
+    """Sessions of this process only, for a single worker"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> (payload, expires_at)
+        self._sessions: dict[str, tuple[str, float]] = {}
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            session = self._sessions.get(key)
+        return session[0] if session is not None else None
+
+    def put(self, items: dict[str, str], expires_at: float) -> None:
+        with self._lock:
+            for key, payload in items.items():
+                self._sessions[key] = (payload, expires_at)
+
+    def renew(self, keys: list[str], expires_at: float) -> list[str]:
+        missing = []
+        with self._lock:
+            for key in keys:
+                if key in self._sessions:
+                    self._sessions[key] = (self._sessions[key][0], expires_at)
+                else:
+                    missing.append(key)
+        return missing
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
+    def values(self, prefix: str) -> list[str]:
+        with self._lock:
+            return [
+                payload
+                for key, (payload, _) in self._sessions.items()
+                if key.startswith(prefix)
+            ]
+
+    def pop_expired(self, prefix: str, now: float) -> list[str]:
+        with self._lock:
+            expired = [
+                key
+                for key, (_, expires_at) in self._sessions.items()
+                if key.startswith(prefix) and expires_at <= now
+            ]
+            return [self._sessions.pop(key)[0] for key in expired]
+
+
+class SQLiteSessionStore(SessionStoreRepository):
+    """
+    Sessions in a SQLite file shared by the workers of the same host, a
+    stand-in for Redis when the socket layer does not leave the machine.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=5, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS socket_sessions ("
+            " key TEXT PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS socket_sessions_expires_at"
+            " ON socket_sessions (expires_at)"
+        )
+
+    def get(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT payload FROM socket_sessions WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def put(self, items: dict[str, str], expires_at: float) -> None:
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO socket_sessions VALUES (?, ?, ?)",
+                [(key, payload, expires_at) for key, payload in items.items()],
+            )
+
+    def renew(self, keys: list[str], expires_at: float) -> list[str]:
+        missing = []
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for key in keys:
+                    cursor = self._conn.execute(
+                        "UPDATE socket_sessions SET expires_at = ? WHERE key = ?",
+                        (expires_at, key),
+                    )
+                    if cursor.rowcount == 0:
+                        missing.append(key)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return missing
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM socket_sessions WHERE key = ?", (key,))
+
+    def values(self, prefix: str) -> list[str]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT payload FROM socket_sessions WHERE substr(key, 1, ?) = ?",
+                (len(prefix), prefix),
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def pop_expired(self, prefix: str, now: float) -> list[str]:
+        condition = "substr(key, 1, ?) = ? AND expires_at <= ?"
+        params = (len(prefix), prefix, now)
+
+        with self._lock:
+            # The write lock is taken before reading, so another process
+            # can't pop the same sessions
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    f"SELECT payload FROM socket_sessions WHERE {condition}", params
+                ).fetchall()
+                self._conn.execute(f"DELETE FROM socket_sessions WHERE {condition}", params)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return [row[0] for row in rows]
+
+
+class RedisSessionStore(SessionStoreRepository):
+    """
+    Sessions in Redis: the payloads in a hash and the expiry times in a
+    sorted set, so the expired ones are found with a range query.
+    """
+
+    def __init__(self, url: str, prefix: str = "water_quality:sessions"):
+        from redis import Redis
+
+        self.client = Redis.from_url(url, decode_responses=True)
+        self.data_key = f"{prefix}:data"
+        self.expiry_key = f"{prefix}:expiry"
+
+    def get(self, key: str) -> str | None:
+        return self.client.hget(self.data_key, key)
+
+    def put(self, items: dict[str, str], expires_at: float) -> None:
+        pipe = self.client.pipeline()
+        pipe.hset(self.data_key, mapping=items)
+        pipe.zadd(self.expiry_key, {key: expires_at for key in items})
+        pipe.execute()
+
+    def renew(self, keys: list[str], expires_at: float) -> list[str]:
+        pipe = self.client.pipeline()
+        for key in keys:
+            # xx: only the sessions that were not popped; ch: counts the
+            # renewed ones, as the expiry always moves forward
+            pipe.zadd(self.expiry_key, {key: expires_at}, xx=True, ch=True)
+        return [key for key, renewed in zip(keys, pipe.execute()) if not renewed]
+
+    def delete(self, key: str) -> None:
+        pipe = self.client.pipeline()
+        pipe.hdel(self.data_key, key)
+        pipe.zrem(self.expiry_key, key)
+        pipe.execute()
+
+    def values(self, prefix: str) -> list[str]:
+        return [
+            payload
+            for _, payload in self.client.hscan_iter(self.data_key, match=f"{prefix}*")
+        ]
+
+    def pop_expired(self, prefix: str, now: float) -> list[str]:
+        keys = [
+            key
+            for key in self.client.zrangebyscore(self.expiry_key, "-inf", now)
+            if key.startswith(prefix)
+        ]
+        if not keys:
+            return []
+
+        # Only the process whose zrem removes a key gets its session
+        pipe = self.client.pipeline()
+        for key in keys:
+            pipe.zrem(self.expiry_key, key)
+        popped = [key for key, removed in zip(keys, pipe.execute()) if removed]
+        if not popped:
+            return []
+
+        pipe = self.client.pipeline()
+        pipe.hmget(self.data_key, popped)
+        pipe.hdel(self.data_key, *popped)
+        payloads = pipe.execute()[0]
+        return [payload for payload in payloads if payload is not None]
+
+
+def create_session_store(config: SocketIOConfigImpl) -> SessionStoreRepository:
+    """
+    Session store of the socket layer: this process only, a SQLite file
+    shared by the workers of the host, or Redis.
+    """
+    url = config.session_store
+
+    if url is None or url.startswith("memory://"):
+        return MemorySessionStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url.removeprefix("sqlite:///"))
+    return RedisSessionStore(url)
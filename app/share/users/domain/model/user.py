@@ -21,3 +21,11 @@ class UserUpdate(BaseModel):
 
 class UserUpdatePassword(BaseModel):
     password: PasswordStr
+
+
+class UserCacheMetrics(BaseModel):
+    hits: int
+    misses: int
+    evictions: int
+    size: int
+    max_size: int
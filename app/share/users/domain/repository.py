@@ -10,6 +10,15 @@ class UserRepository(ABC):
     def get_by_uid(self, uid: str,limit_data:bool=False) -> UserData:
         pass
 
+    @abstractmethod
+    def get_by_uids(self, uids: list[str], limit_data: bool = False) -> dict[str, UserData]:
+        """
+        Get several users at once.
+        :param uids: User UIDs.
+        :return: Found users by UID, missing users are left out.
+        """
+        pass
+
     @abstractmethod
     def get_by_email(self, email: str) -> UserData:
         pass
@@ -0,0 +1,151 @@
+import threading
+import time
+from collections import OrderedDict
+
+from app.share.users.domain.enum.roles import Roles
+from app.share.users.domain.model.auth import UserRegister
+from app.share.users.domain.model.user import UserCacheMetrics, UserData, UserUpdate
+from app.share.users.domain.repository import UserRepository
+
+
+class CachedUserRepository(UserRepository):
+    """
+    UserRepository with an LRU cache of the users by (uid, limit_data) in
+    front of another repository. Entries expire after ttl seconds and are
+    dropped when the user is updated through this repository.
+
+    The cache is shared by every instance of the process.
+    """
+
+    max_size: int = 2048
+    ttl: float = 300
+
+    # (uid, limit_data) -> (expires at, user or None if not found)
+    _entries: "OrderedDict[tuple[str, bool], tuple[float, UserData | None]]" = (
+        OrderedDict()
+    )
+    _lock = threading.Lock()
+    _hits = 0
+    _misses = 0
+    _evictions = 0
+
+    def __init__(self, user_repo: UserRepository):
+        self.user_repo = user_repo
+
+    def _get_cached(self, uid: str, limit_data: bool) -> tuple[bool, UserData | None]:
+        now = time.monotonic()
+
+        with self._lock:
+            # A full entry also answers a limited lookup
+            keys = [(uid, True), (uid, False)] if limit_data else [(uid, False)]
+
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+
+                expires, user = entry
+                if expires <= now:
+                    del self._entries[key]
+                    continue
+
+                self._entries.move_to_end(key)
+                CachedUserRepository._hits += 1
+
+                if limit_data and key[1] is False and user is not None:
+                    user = user.model_copy(update={"phone": None, "rol": None})
+                return True, user
+
+            CachedUserRepository._misses += 1
+            return False, None
+
+    def _set_cached(self, uid: str, limit_data: bool, user: UserData | None) -> None:
+        with self._lock:
+            self._entries[(uid, limit_data)] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end((uid, limit_data))
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                CachedUserRepository._evictions += 1
+
+    @classmethod
+    def invalidate(cls, uid: str) -> None:
+        with cls._lock:
+            cls._entries.pop((uid, True), None)
+            cls._entries.pop((uid, False), None)
+
+    @classmethod
+    def clear(cls) -> None:
+        with cls._lock:
+            cls._entries.clear()
+            cls._hits = cls._misses = cls._evictions = 0
+
+    @classmethod
+    def metrics(cls) -> UserCacheMetrics:
+        with cls._lock:
+            return UserCacheMetrics(
+                hits=cls._hits,
+                misses=cls._misses,
+                evictions=cls._evictions,
+                size=len(cls._entries),
+                max_size=cls.max_size,
+            )
+
+    def get_by_uid(self, uid: str, limit_data: bool = False) -> UserData | None:
+        found, user = self._get_cached(uid, limit_data)
+        if found:
+            return user
+
+        user = self.user_repo.get_by_uid(uid, limit_data=limit_data)
+        self._set_cached(uid, limit_data, user)
+        return user
+
+    def get_by_uids(
+        self, uids: list[str], limit_data: bool = False
+    ) -> dict[str, UserData]:
+        users: dict[str, UserData] = {}
+        missing: list[str] = []
+
+        for uid in dict.fromkeys(uids):
+            found, user = self._get_cached(uid, limit_data)
+            if not found:
+                missing.append(uid)
+            elif user is not None:
+                users[uid] = user
+
+        if missing:
+            loaded = self.user_repo.get_by_uids(missing, limit_data=limit_data)
+            for uid in missing:
+                self._set_cached(uid, limit_data, loaded.get(uid))
+            users.update(loaded)
+
+        return users
+
+    def get_by_email(self, email: str) -> UserData | None:
+        user = self.user_repo.get_by_email(email)
+
+        if user is not None and user.uid is not None:
+            self._set_cached(user.uid, False, user)
+        return user
+
+    def get_all(self, page_token: str = None) -> list[UserData]:
+        return self.user_repo.get_all(page_token=page_token)
+
+    def update_user(self, uid: str, user: UserUpdate) -> UserData:
+        try:
+            return self.user_repo.update_user(uid, user)
+        finally:
+            self.invalidate(uid)
+
+    def create_user(self, user: UserRegister, rol: Roles) -> UserData:
+        user_data = self.user_repo.create_user(user, rol)
+
+        if user_data.uid is not None:
+            self.invalidate(user_data.uid)
+        return user_data
+
+    def change_password(self, uid: str, password: str) -> UserData:
+        try:
+            return self.user_repo.change_password(uid, password)
+        finally:
+            self.invalidate(uid)
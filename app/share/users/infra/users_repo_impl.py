@@ -7,6 +7,10 @@ from app.share.users.domain.model.user import UserData, UserDetail, UserUpdate
 from app.share.users.domain.repository import UserRepository
 
 
+# Maximum identifiers accepted by auth.get_users
+GET_USERS_BATCH = 100
+
+
 class UserRepositoryImpl(UserRepository):
     def get_by_uid(self, uid: str, limit_data: bool = False) -> UserData | None:
         """Obtiene un usuario por su UID."""
@@ -26,6 +30,37 @@ class UserRepositoryImpl(UserRepository):
             print(e)
             raise HTTPException(status_code=500, detail="Error del servidor")
 
+    def get_by_uids(
+        self, uids: list[str], limit_data: bool = False
+    ) -> dict[str, UserData]:
+        """Obtiene varios usuarios, en lotes de GET_USERS_BATCH."""
+        uids = list(dict.fromkeys(uids))
+        users: dict[str, UserData] = {}
+
+        try:
+            for i in range(0, len(uids), GET_USERS_BATCH):
+                result: auth.GetUsersResult = auth.get_users(
+                    [auth.UidIdentifier(uid) for uid in uids[i : i + GET_USERS_BATCH]]
+                )
+                for auth_user in result.users:
+                    users[auth_user.uid] = UserData(
+                        uid=auth_user.uid,
+                        username=auth_user.display_name,
+                        email=auth_user.email,
+                        phone=auth_user.phone_number if not limit_data else None,
+                        rol=(
+                            (auth_user.custom_claims or {}).get("rol")
+                            if not limit_data
+                            else None
+                        ),
+                    )
+        except Exception as e:
+            print(e.__class__.__name__)
+            print(e)
+            raise HTTPException(status_code=500, detail="Error del servidor")
+
+        return users
+
     def create_user(self, user: UserRegister, rol: Roles) -> UserData:
         try:
             user_record: auth.UserRecord = auth.create_user(
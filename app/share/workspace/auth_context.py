@@ -0,0 +1,80 @@
+from contextvars import ContextVar
+
+from firebase_admin import db
+
+
+class WorkspaceInfo:
+    owner: str | None
+    type: str | None
+
+    def __init__(self, owner: str | None = None, type: str | None = None):
+        self.owner = owner
+        self.type = type
+
+
+class WorkspaceAuthContext:
+    """
+    Workspace fields used by the access checks (owner, type and guest
+    roles), read once per request.
+
+    The workspace node is read shallow, so its meters and their records are
+    never loaded.
+    """
+
+    def __init__(self):
+        self._workspaces: dict[str, WorkspaceInfo | None] = {}
+        self._guest_roles: dict[tuple[str, str], str | None] = {}
+
+    @classmethod
+    def start(cls) -> "WorkspaceAuthContext":
+        """Create the context of the current request."""
+        context = cls()
+        _current_context.set(context)
+        return context
+
+    @classmethod
+    def current(cls) -> "WorkspaceAuthContext":
+        """
+        Context of the current request. Outside a request (e.g. sockets) a
+        new context is returned, so nothing is memoized.
+        """
+        context = _current_context.get()
+        return context if context is not None else cls()
+
+    def _get_ref(self, workspace_id: str) -> db.Reference:
+        return db.reference().child("workspaces").child(workspace_id)
+
+    def get_workspace(self, workspace_id: str) -> WorkspaceInfo | None:
+        if workspace_id in self._workspaces:
+            return self._workspaces[workspace_id]
+
+        # A shallow read returns the scalar fields with their values and
+        # only true for the meters, guests, etc.
+        fields = self._get_ref(workspace_id).get(shallow=True)
+
+        workspace = None
+        if isinstance(fields, dict) and fields.get("owner") is not None:
+            workspace = WorkspaceInfo(owner=fields["owner"], type=fields.get("type"))
+
+        self._workspaces[workspace_id] = workspace
+        return workspace
+
+    def get_guest_rol(self, workspace_id: str, user: str) -> str | None:
+        key = (workspace_id, user)
+        if key in self._guest_roles:
+            return self._guest_roles[key]
+
+        rol = self._get_ref(workspace_id).child("guests").child(user).child("rol").get()
+
+        self._guest_roles[key] = rol
+        return rol
+
+    def invalidate(self, workspace_id: str) -> None:
+        self._workspaces.pop(workspace_id, None)
+        for key in [key for key in self._guest_roles if key[0] == workspace_id]:
+            self._guest_roles.pop(key, None)
+
+
+_current_context: ContextVar[WorkspaceAuthContext | None] = ContextVar(
+    "workspace_auth_context", default=None
+)
@@ -3,6 +3,7 @@ from firebase_admin import db
 
 from app.share.users.domain.enum.roles import Roles
 from app.share.users.domain.repository import UserRepository
+from app.share.workspace.auth_context import WorkspaceAuthContext
 from app.share.workspace.domain.model import (
     WorkspaceRef,
     WorkspaceGuest,
@@ -31,7 +32,7 @@ class WorkspaceAccess:
             bool: True if the user has a role in the workspace, False otherwise.
 
         """
-        rol = workspace_ref.child("guests").child(user).child("rol").get()
+        rol = WorkspaceAuthContext.current().get_guest_rol(workspace_ref.key, user)
         return WorkspaceGuest(
             is_guest=rol in roles,
             rol=WorkspaceRoles(rol) if rol else WorkspaceRolesAll.UNKNOWN,
@@ -47,9 +48,9 @@ class WorkspaceAccess:
         owner_limit_data=False,
     ) -> WorkspaceRef | None:
         workspaces_ref = db.reference().child("workspaces").child(workspace_id)
-        workspaces = workspaces_ref.get()
+        workspace = WorkspaceAuthContext.current().get_workspace(workspace_id)
 
-        if workspaces is None:
+        if workspace is None:
             if is_null:
                 return None
             raise HTTPException(
@@ -57,9 +58,9 @@ class WorkspaceAccess:
             )
 
         # Verificar si es público
-        is_workspace_public = workspaces.get("type") == WorkspaceType.PUBLIC
+        is_workspace_public = workspace.type == WorkspaceType.PUBLIC
         user_role = WorkspaceRoles.VISITOR
-        owner_uid = workspaces.get("owner")
+        owner_uid = workspace.owner
         user_detail = None
         owner_detail = None
 
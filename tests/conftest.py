@@ -38,6 +38,7 @@ os.environ["SKIP_FIREBASE_INIT"] = "true"
 os.environ["FIREBASE_DATABASE_URL"] = "https://test-project.firebaseio.com/"
 os.environ["JWT_SECRET_KEY"] = "test-secret-key-for-testing-only"
 os.environ["JWT_ALGORITHM"] = "HS256"
+os.environ["SOCKETIO_DEAD_LETTER_STORE"] = "memory://"
 
 
 @pytest.fixture(scope="session", autouse=True)
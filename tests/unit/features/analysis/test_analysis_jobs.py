@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.features.analysis.domain.enums import AnalysisJobStatus
+from app.features.analysis.infrastructure.analysis_jobs_impl import (
+    AnalysisJobExecutorImpl,
+)
+
+
+def _pid() -> int:
+    return os.getpid()
+
+
+def _loaded(module: str) -> bool:
+    return module in sys.modules
+
+
+@pytest.fixture
+def executor():
+    jobs = AnalysisJobExecutorImpl(max_workers=2, max_queue=3, workspace_limit=1)
+    yield jobs
+    jobs.stop()
+
+
+class Blocker:
+    """Job that runs until released."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.done = threading.Event()
+
+    def __call__(self, **kwargs):
+        self.started.set()
+        self.release.wait(5)
+        self.done.set()
+
+
+def _wait_status(executor, analysis_id, status):
+    for _ in range(500):
+        if executor.get(analysis_id).status == status:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"{analysis_id} is {executor.get(analysis_id).status}")
+
+
+class TestAnalysisJobExecutor:
+
+    def test_workspace_limit_and_queue_position(self, executor):
+        a, b, c = Blocker(), Blocker(), Blocker()
+
+        executor.submit("a", "w1", a)
+        executor.submit("b", "w1", b)
+        executor.submit("c", "w2", c)
+        a.started.wait(5)
+        c.started.wait(5)
+
+        job = executor.get("b")
+        assert job.status == AnalysisJobStatus.QUEUED
+        assert job.position == 1
+        assert executor.get("c").status == AnalysisJobStatus.RUNNING
+
+        a.release.set()
+        b.started.wait(5)
+        assert executor.get("b").status == AnalysisJobStatus.RUNNING
+
+        b.release.set()
+        c.release.set()
+        _wait_status(executor, "b", AnalysisJobStatus.DONE)
+        job = executor.get("b")
+        assert job.wait_seconds >= 0 and job.run_seconds >= 0
+
+    def test_in_flight_jobs_are_deduplicated(self, executor):
+        a = Blocker()
+        calls = []
+
+        executor.submit("a", "w1", a)
+        executor.submit("a", "w1", lambda: calls.append(1))
+        a.release.set()
+        _wait_status(executor, "a", AnalysisJobStatus.DONE)
+
+        assert calls == []
+
+    def test_queued_job_takes_new_arguments(self, executor):
+        a = Blocker()
+        calls = []
+
+        executor.submit("a", "w1", a)
+        executor.submit("b", "w1", lambda **kwargs: calls.append(kwargs), params={"x": 1})
+        executor.submit("b", "w1", lambda **kwargs: calls.append(kwargs), params={"x": 2})
+        assert executor.get("b").position == 1
+
+        a.release.set()
+        _wait_status(executor, "b", AnalysisJobStatus.DONE)
+
+        assert calls == [{"params": {"x": 2}}]
+
+    def test_running_job_is_replaced(self, executor):
+        a = Blocker()
+        stored = []
+
+        def job(params):
+            if params["x"] == 1:
+                a()
+            executor.compute(_pid)
+            stored.append(params["x"])
+
+        executor.submit("a", "w1", job, params={"x": 1})
+        a.started.wait(5)
+        # Same arguments, normalized: the running job is kept
+        executor.submit("a", "w1", job, params={"x": 1, "y": None})
+        assert executor.get("a").status == AnalysisJobStatus.RUNNING
+
+        executor.submit("a", "w1", job, params={"x": 2})
+        # Waits for the running job of the analysis
+        assert executor.get("a").status == AnalysisJobStatus.QUEUED
+
+        a.release.set()
+        _wait_status(executor, "a", AnalysisJobStatus.DONE)
+
+        assert stored == [2]
+
+    def test_bounded_queue(self, executor):
+        blockers = [Blocker() for _ in range(4)]
+        for i, blocker in enumerate(blockers):
+            executor.submit(f"j{i}", "w1", blocker)
+
+        with pytest.raises(HTTPException) as error:
+            executor.submit("j4", "w1", Blocker())
+
+        assert error.value.status_code == 503
+        for blocker in blockers:
+            blocker.release.set()
+
+    def test_cancel_queued(self, executor):
+        a, b = Blocker(), Blocker()
+        executor.submit("a", "w1", a)
+        executor.submit("b", "w1", b)
+
+        assert executor.cancel("b")
+        a.release.set()
+        _wait_status(executor, "a", AnalysisJobStatus.DONE)
+
+        assert executor.get("b").status == AnalysisJobStatus.CANCELLED
+        assert not b.started.is_set()
+        assert not executor.cancel("b")
+
+    def test_compute_runs_in_worker_process(self, executor):
+        result = {}
+
+        def job():
+            result["pid"] = executor.compute(_pid)
+
+        executor.submit("a", "w1", job)
+        _wait_status(executor, "a", AnalysisJobStatus.DONE)
+
+        assert result["pid"] != os.getpid()
+
+    def test_cancel_running(self, executor):
+        a = Blocker()
+        stored = []
+
+        def job():
+            a()
+            executor.compute(_pid)
+            stored.append(True)
+
+        executor.submit("a", "w1", job)
+        a.started.wait(5)
+
+        assert executor.cancel("a")
+        a.release.set()
+        _wait_status(executor, "a", AnalysisJobStatus.CANCELLED)
+
+        assert stored == []
+
+    def test_errors_are_reported(self, executor):
+        def job():
+            raise ValueError("sin datos")
+
+        executor.submit("a", "w1", job)
+        _wait_status(executor, "a", AnalysisJobStatus.ERROR)
+
+        assert executor.get("a").error == "sin datos"
+
+    def test_compute_outside_job(self, executor):
+        assert executor.compute(_pid) != os.getpid()
+
+    def test_workers_are_not_forked_from_the_app(self, executor):
+        import wave  # noqa: F401
+
+        # A forked worker would have the modules of this process
+        assert not executor.compute(_loaded, "wave")
@@ -0,0 +1,430 @@
+import pickle
+from datetime import datetime
+from io import BytesIO
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from app.features.analysis.domain.enums import AnalysisEnum, AnalysisStatus, PeriodEnum
+from app.features.analysis.domain.models.average import AverageRange, AvgPeriodParam
+from app.features.analysis.domain.models.prediction import PredictionParam
+from app.features.analysis.domain.state import AnalysisState
+from app.features.analysis.infrastructure.analysis_impl import AnalysisAverage
+from app.features.analysis.infrastructure.cached_chart_generator import (
+    CachedAnalysisChartGenerator,
+)
+from app.features.analysis.infrastructure.disk_report_cache import DiskReportCache
+from app.features.analysis.infrastructure.firebase_analysis_result import (
+    FirebaseAnalysisResultRepository,
+)
+from app.features.analysis.presentation.report_content import (
+    collect_analysis_charts,
+    render_analysis_charts,
+    render_report_charts,
+)
+from app.share.meter_records.domain.columns import AggregateColumns, RecordColumns
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.model import RecordWatermark, SensorIdentifier
+from app.share.meter_records.domain.rollup import RollupCoverage
+
+DAY = 24 * 60 * 60
+START = 1704067200  # 2024-01-01 00:00:00 UTC
+
+
+def _snapshot(days: int, per_day: int = 4) -> dict:
+    data = {}
+    for day in range(days):
+        for i in range(per_day):
+            ts = START + day * DAY + i * 60
+            data[str(ts)] = {
+                sensor.value: {"value": float(day * 10 + i), "datetime": ""}
+                for sensor in SensorType
+                if sensor != SensorType.COLOR
+            }
+    return data
+
+
+def _timestamp(date: str | None) -> int | None:
+    if date is None:
+        return None
+    return int(datetime.strptime(date, "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+def _date(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _in_range(snapshot: dict, params) -> dict:
+    start, end = _timestamp(params.start_date), _timestamp(params.end_date)
+    return {
+        key: value
+        for key, value in snapshot.items()
+        if (start is None or int(key) >= start) and (end is None or int(key) <= end)
+    }
+
+
+@pytest.fixture
+def snapshot():
+    return _snapshot(days=3)
+
+
+@pytest.fixture
+def record_repo(snapshot):
+    """Record repository over the snapshot that honours the date range."""
+    repo = Mock()
+    repo.query_aggregates.side_effect = (
+        lambda identifier, params, max_granularity, sensors=None: (
+            AggregateColumns.from_records(
+                RecordColumns.from_snapshot(_in_range(snapshot, params), sensors)
+            )
+        )
+    )
+    repo.get_last_key.side_effect = lambda identifier, params: max(
+        (int(key) for key in _in_range(snapshot, params)), default=None
+    )
+    # The first day is older than the rollups
+    repo.get_rollup_coverage.return_value = RollupCoverage(since=START + DAY)
+    return repo
+
+
+@pytest.fixture
+def analysis(record_repo):
+    return AnalysisAverage(record_repo=record_repo)
+
+
+@pytest.fixture
+def identifier():
+    return SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+
+
+RANGE = {"start_date": _date(START), "end_date": _date(START + 3 * DAY - 1)}
+
+
+class TestAnalysisState:
+
+    def test_average_from_state(self, analysis, identifier):
+        params = AverageRange(**RANGE).model_dump()
+
+        state = analysis.load_state(identifier, AnalysisEnum.AVERAGE, params)
+        result = analysis.generate_from_state(AnalysisEnum.AVERAGE, params, state)
+
+        assert state.watermark == RecordWatermark(
+            last_key=START + 2 * DAY + 180,
+            count=12,
+            rollup_since=START + DAY,
+            rollup_count=8,
+        )
+        ph = next(r for r in result.result if r.sensor == SensorType.PH)
+        assert (ph.min, ph.max) == (0.0, 23.0)
+        assert ph.average == pytest.approx(11.5)
+        assert ph.std == pytest.approx(
+            np.std([day * 10 + i for day in range(3) for i in range(4)])
+        )
+
+    def test_single_sensor_only_loads_that_sensor(
+        self, analysis, record_repo, identifier
+    ):
+        params = AverageRange(**RANGE, sensor_type=SensorType.TDS).model_dump()
+
+        state = analysis.load_state(identifier, AnalysisEnum.AVERAGE, params)
+        result = analysis.generate_from_state(AnalysisEnum.AVERAGE, params, state)
+
+        _, kwargs = record_repo.query_aggregates.call_args
+        assert kwargs["sensors"] == [SensorType.TDS]
+        assert result.sensor == SensorType.TDS
+
+    def test_period_from_state(self, analysis, identifier):
+        params = AvgPeriodParam(**RANGE, period_type=PeriodEnum.DAYS).model_dump()
+
+        state = analysis.load_state(identifier, AnalysisEnum.AVERAGE_PERIOD, params)
+        result = analysis.generate_from_state(AnalysisEnum.AVERAGE_PERIOD, params, state)
+
+        assert len(state.aggregates) == 3
+        assert result.results.ph.values == [1.5, 11.5, 21.5]
+        assert len(result.results.ph.labels) == 3
+
+    def test_prediction_from_state(self, analysis, identifier):
+        params = PredictionParam(**RANGE, sensor_type=SensorType.PH).model_dump()
+
+        state = analysis.load_state(identifier, AnalysisEnum.PREDICTION, params)
+        result = analysis.generate_from_state(AnalysisEnum.PREDICTION, params, state)
+
+        assert result.data.labels == ["2024-01-01", "2024-01-02", "2024-01-03"]
+        assert result.data.values == [1.5, 11.5, 21.5]
+        assert result.pred.values[0] == pytest.approx(31.5)
+
+    def test_merge_tail_matches_full_state(self, analysis, identifier, snapshot):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        full = analysis.load_state(identifier, AnalysisEnum.AVERAGE_PERIOD, params)
+
+        first = {**params, "end_date": _date(START + DAY + 90)}
+        state = analysis.load_state(identifier, AnalysisEnum.AVERAGE_PERIOD, first)
+        tail = analysis.load_state(
+            identifier,
+            AnalysisEnum.AVERAGE_PERIOD,
+            params,
+            since=state.watermark.last_key + 1,
+        )
+        merged = state.merge(tail)
+
+        assert merged.watermark == full.watermark
+        assert merged.aggregates.to_buckets() == full.aggregates.to_buckets()
+
+    def test_round_trip(self, analysis, identifier):
+        params = AvgPeriodParam(**RANGE, period_type=PeriodEnum.MONTHS).model_dump()
+        state = analysis.load_state(identifier, AnalysisEnum.AVERAGE_PERIOD, params)
+
+        loaded = AnalysisState.from_dict(state.to_dict(), state.watermark)
+
+        assert loaded.granularity == state.granularity
+        assert loaded.aggregates.to_buckets() == state.aggregates.to_buckets()
+
+
+class FakeRef:
+    def __init__(self, tree: dict, path: tuple = ()):
+        self.tree = tree
+        self.path = path
+
+    def child(self, name):
+        return FakeRef(self.tree, self.path + (name,))
+
+    def get(self, etag=False):
+        node = self.tree
+        for name in self.path:
+            node = node.get(name) if isinstance(node, dict) else None
+        return node
+
+    def set(self, value):
+        node = self.tree
+        for name in self.path[:-1]:
+            node = node.setdefault(name, {})
+        node[self.path[-1]] = value
+
+    def update(self, values):
+        for key, value in values.items():
+            self.child(key).set(value)
+
+
+@pytest.fixture
+def tree():
+    return {}
+
+
+@pytest.fixture
+def report_options():
+    """Report cache and warm-up of the repository, none by default"""
+    return {}
+
+
+@pytest.fixture
+def results(analysis, tree, report_options):
+    # Jobs run right away, in this process
+    jobs = Mock()
+    jobs.submit.side_effect = lambda analysis_id, workspace_id, fn, /, **kwargs: fn(**kwargs)
+    jobs.compute.side_effect = lambda fn, *args: fn(*args)
+
+    repo = FirebaseAnalysisResultRepository(
+        access=Mock(), analysis_repo=analysis, jobs=jobs, **report_options
+    )
+
+    with patch(
+        "app.features.analysis.infrastructure.firebase_analysis_result.db"
+    ) as db:
+        db.reference.side_effect = lambda: FakeRef(tree)
+        yield repo
+
+
+def _create(results, identifier, tree, params: dict) -> str:
+    analysis_id = results.create_analysis(
+        identifier, AnalysisEnum.AVERAGE_PERIOD, params
+    )
+    assert tree["analysis"][analysis_id]["status"] == AnalysisStatus.SAVED.value
+    return analysis_id
+
+
+class TestUpdateAnalysis:
+
+    def test_unchanged_data_is_not_recomputed(
+        self, results, analysis, record_repo, identifier, tree
+    ):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+        last_key = tree["analysis"][analysis_id]["watermark"]["last_key"]
+        record_repo.query_aggregates.reset_mock()
+
+        results.jobs.compute.reset_mock()
+
+        results.update_analysis("u1", analysis_id, params)
+
+        results.jobs.compute.assert_not_called()
+        # Only the count of the rollups up to the watermark is read
+        record_repo.query_aggregates.assert_called_once()
+        params_read = record_repo.query_aggregates.call_args.kwargs["params"]
+        assert _timestamp(params_read.start_date) == START + DAY
+        assert _timestamp(params_read.end_date) == last_key
+        assert tree["analysis"][analysis_id]["status"] == AnalysisStatus.SAVED.value
+
+    def test_backfilled_records_are_picked_up(
+        self, results, record_repo, identifier, tree, snapshot
+    ):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+
+        # A reading stored late, behind the watermark
+        late = START + DAY + 30
+        snapshot[str(late)] = {
+            sensor.value: {"value": 100.0, "datetime": ""}
+            for sensor in SensorType
+            if sensor != SensorType.COLOR
+        }
+
+        results.update_analysis("u1", analysis_id, params)
+
+        stored = tree["analysis"][analysis_id]
+        assert stored["watermark"]["count"] == 13
+        assert stored["watermark"]["rollup_count"] == 9
+        assert stored["data"]["results"]["ph"]["values"][1] == 29.2
+
+    def test_rollup_backfill_recomputes(self, results, record_repo, identifier, tree):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+        results.jobs.compute.reset_mock()
+
+        record_repo.get_rollup_coverage.return_value = RollupCoverage(since=START)
+        results.update_analysis("u1", analysis_id, params)
+
+        results.jobs.compute.assert_called_once()
+        assert tree["analysis"][analysis_id]["watermark"]["rollup_count"] == 12
+
+    def test_grown_range_reads_only_the_tail(
+        self, results, record_repo, identifier, tree, snapshot
+    ):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+        last_key = tree["analysis"][analysis_id]["watermark"]["last_key"]
+
+        snapshot.update(
+            {key: value for key, value in _snapshot(days=5).items() if key not in snapshot}
+        )
+        grown = {**params, "end_date": _date(START + 5 * DAY - 1)}
+        record_repo.query_aggregates.reset_mock()
+
+        results.update_analysis("u1", analysis_id, grown)
+
+        params_read = record_repo.query_aggregates.call_args.kwargs["params"]
+        assert _timestamp(params_read.start_date) == last_key + 1
+
+        stored = tree["analysis"][analysis_id]
+        assert stored["watermark"] == {
+            "last_key": START + 4 * DAY + 180,
+            "count": 20,
+            "rollup_since": START + DAY,
+            "rollup_count": 16,
+        }
+        assert stored["data"]["results"]["ph"]["values"] == [1.5, 11.5, 21.5, 31.5, 41.5]
+
+    def test_changed_start_recomputes(self, results, record_repo, identifier, tree):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+
+        moved = {**params, "start_date": _date(START + DAY)}
+        results.update_analysis("u1", analysis_id, moved)
+
+        params_read = record_repo.query_aggregates.call_args.kwargs["params"]
+        assert params_read.start_date == moved["start_date"]
+        assert tree["analysis"][analysis_id]["watermark"]["count"] == 8
+
+
+@pytest.fixture
+def chart_gen():
+    chart_gen = Mock()
+    chart_gen.generate_line_chart.side_effect = lambda data, config: BytesIO(b"png")
+    return chart_gen
+
+
+@pytest.fixture
+def report_cache(tmp_path):
+    return DiskReportCache(root=str(tmp_path), max_bytes=1_000_000)
+
+
+
+class TestReportCache:
+
+    @pytest.fixture
+    def report_options(self, chart_gen, report_cache):
+        def warm_report(analysis_data):
+            return collect_analysis_charts(chart_gen, analysis_data)
+
+        return {"report_cache": report_cache, "report_warmer": warm_report}
+
+    def _render(self, chart_gen, report_cache, analysis_id, tree):
+        render_analysis_charts(
+            CachedAnalysisChartGenerator(
+                chart_gen,
+                report_cache,
+                analysis_id,
+                tree["analysis"][analysis_id]["updated_at"],
+            ),
+            tree["analysis"][analysis_id],
+        )
+
+    def test_charts_are_rendered_when_saved(
+        self, results, identifier, tree, chart_gen, report_cache
+    ):
+        analysis_id = _create(
+            results, identifier, tree, AvgPeriodParam(**RANGE).model_dump()
+        )
+        rendered = chart_gen.generate_line_chart.call_count
+
+        assert rendered > 0
+        assert report_cache.size() > 0
+        # In a worker process, not in the job thread
+        assert results.jobs.compute.call_args.args[0] is results.report_warmer
+
+        self._render(chart_gen, report_cache, analysis_id, tree)
+        assert chart_gen.generate_line_chart.call_count == rendered
+
+    def test_worker_charts_are_found_by_the_report(
+        self, results, identifier, tree, chart_gen, report_cache
+    ):
+        analysis_id = _create(
+            results, identifier, tree, AvgPeriodParam(**RANGE).model_dump()
+        )
+        analysis_data = tree["analysis"][analysis_id]
+
+        # Sent to the worker process by reference
+        warmer = pickle.loads(pickle.dumps(render_report_charts))
+        charts = warmer(analysis_data)
+        assert charts and all(image.startswith(b"\x89PNG") for image in charts.values())
+
+        report_cache.invalidate(analysis_id)
+        for key, image in charts.items():
+            report_cache.put(analysis_id, analysis_data["updated_at"], key, image)
+        chart_gen.generate_line_chart.reset_mock()
+
+        self._render(chart_gen, report_cache, analysis_id, tree)
+        chart_gen.generate_line_chart.assert_not_called()
+
+    def test_update_drops_the_rendered_charts(
+        self, results, identifier, tree, report_cache
+    ):
+        params = AvgPeriodParam(**RANGE).model_dump()
+        analysis_id = _create(results, identifier, tree, params)
+        report_cache.invalidate = Mock(wraps=report_cache.invalidate)
+
+        results.update_analysis(
+            "u1", analysis_id, {**params, "start_date": _date(START + DAY)}
+        )
+
+        report_cache.invalidate.assert_called_once_with(analysis_id)
+
+    def test_failed_warm_up_keeps_the_result(self, results, identifier, tree):
+        results.report_warmer = Mock(side_effect=RuntimeError("sin memoria"))
+
+        analysis_id = _create(
+            results, identifier, tree, AvgPeriodParam(**RANGE).model_dump()
+        )
+
+        results.report_warmer.assert_called_once()
+        assert tree["analysis"][analysis_id]["data"]
@@ -0,0 +1,232 @@
+import io
+import threading
+import time
+from datetime import datetime
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features.analysis.domain.chart_model import (
+    ChartConfig,
+    ChartType,
+    HeatmapData,
+    LineChartData,
+)
+from app.features.analysis.domain.decimate import decimate_series, lttb
+from app.features.analysis.infrastructure.matplotlib_chart_generator import (
+    MatplotlibAnalysisChartGenerator,
+)
+
+PNG = b"\x89PNG"
+
+
+def _daily(days: int, sensors: int = 1) -> LineChartData:
+    dates = pd.date_range("2019-01-01", periods=days, freq="D")
+    values = np.sin(np.arange(days) / 30.0)
+    return LineChartData(
+        x_values=list(dates.strftime("%Y-%m-%dT%H:%M:%S")),
+        series={
+            f"s{i}": [None if k % 97 == 0 else float(v + i) for k, v in enumerate(values)]
+            for i in range(sensors)
+        },
+    )
+
+
+def _config(chart_type=ChartType.LINE, **kwargs) -> ChartConfig:
+    return ChartConfig(chart_type=chart_type, title="Chart", period_type="days", **kwargs)
+
+
+class TestDecimate:
+
+    def test_lttb_keeps_the_ends_and_the_peaks(self):
+        x = np.arange(1000, dtype=np.float64)
+        y = np.zeros(1000)
+        y[[250, 700]] = [10.0, -10.0]
+
+        keep = lttb(x, y, 20)
+
+        assert len(keep) == 20
+        assert keep[0] == 0 and keep[-1] == 999
+        assert {250, 700} <= set(keep.tolist())
+        assert np.all(np.diff(keep) > 0)
+
+    def test_short_series_are_kept(self):
+        x, y = decimate_series(np.array([1.0, np.nan, 2.0]), 10)
+
+        assert x.tolist() == [0, 1, 2]
+        assert np.isnan(y[1])
+
+    def test_gaps_are_kept(self):
+        values = np.arange(1000, dtype=np.float64)
+        values[400:500] = np.nan
+
+        x, y = decimate_series(values, 100)
+
+        assert len(x) <= 100 + 1
+        assert np.isnan(y).sum() == 1
+        gap = int(np.flatnonzero(np.isnan(y))[0])
+        assert x[gap - 1] < 400 and x[gap + 1] >= 500
+        finite = np.isfinite(y)
+        assert np.array_equal(y[finite], x[finite])
+
+
+class TestDateLabels:
+
+    FORMATS = ["%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%Y"]
+
+    def _strptime_each(self, values):
+        parsed = []
+        for value in values:
+            for fmt in self.FORMATS:
+                try:
+                    parsed.append(datetime.strptime(value, fmt))
+                    break
+                except ValueError:
+                    continue
+            else:
+                return values
+        return parsed
+
+    @pytest.mark.parametrize(
+        "values",
+        [
+            ["2024-01-30T00:00:00", "2024-01-31T00:00:00", "2024-02-01T00:00:00"],
+            ["2024-01-30 12:00:00", "2024-02-01 00:00:00"],
+            ["2024-01-30", "2024/01/31"],
+            ["30-01-2024", "31-01-2024"],
+            ["2023", "2024"],
+            ["2024-01", "2024-02"],
+            ["", "2024-01-30"],
+            ["ph", "tds"],
+        ],
+    )
+    def test_parsed_like_each_value(self, values):
+        generator = MatplotlibAnalysisChartGenerator()
+
+        parsed = generator._parse_x_values(values)
+        expected = self._strptime_each(values)
+
+        if expected is values:
+            assert parsed == values
+        else:
+            assert parsed.to_pydatetime().tolist() == expected
+
+    @pytest.mark.parametrize("period_type", [None, "days", "months", "years"])
+    def test_labels(self, period_type):
+        generator = MatplotlibAnalysisChartGenerator()
+        dates = pd.DatetimeIndex(["2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02"])
+
+        labels = generator._format_date_labels(dates, period_type)
+
+        assert labels == {
+            None: ["30/01", "31", "01/02", "02/02"],
+            "days": ["30/01/2024", "31/01", "01/02", "02/02/2024"],
+            "months": ["01/2024", "01/2024", "02/2024", "02/2024"],
+            "years": ["2024"] * 4,
+        }[period_type]
+
+    @pytest.mark.parametrize("period_type", [None, "days"])
+    def test_labels_of_some_positions(self, period_type):
+        generator = MatplotlibAnalysisChartGenerator()
+        dates = pd.date_range("2024-01-20", "2024-03-10", freq="D")
+        positions = [0, 7, 11, 12, 40, 50]
+
+        labels = generator._format_date_labels(dates, period_type, positions)
+
+        every = generator._format_date_labels(dates, period_type)
+        assert labels == [every[i] for i in positions]
+
+
+class TestMatplotlibAnalysisChartGenerator:
+
+    def test_figures_are_reused(self):
+        generator = MatplotlibAnalysisChartGenerator()
+
+        first = generator.generate_line_chart(_daily(30), _config()).getvalue()
+        second = generator.generate_line_chart(_daily(30), _config()).getvalue()
+
+        assert first.startswith(PNG)
+        assert first == second
+        assert len(generator._local.templates) == 1
+
+    def test_heatmaps_are_redrawn(self):
+        generator = MatplotlibAnalysisChartGenerator()
+        config = _config(ChartType.HEATMAP)
+
+        charts = [
+            generator.generate_heatmap(
+                HeatmapData(data=[[1.0, r], [r, 1.0]], x_labels=["a", "b"], y_labels=["a", "b"]),
+                config,
+            ).getvalue()
+            for r in (0.5, -0.5, 0.5)
+        ]
+
+        assert charts[0] == charts[2] != charts[1]
+
+    def test_rendered_from_threads(self):
+        generator = MatplotlibAnalysisChartGenerator()
+        expected = generator.generate_line_chart(_daily(400, 2), _config()).getvalue()
+        charts = []
+
+        def render():
+            charts.append(generator.generate_line_chart(_daily(400, 2), _config()).getvalue())
+
+        threads = [threading.Thread(target=render) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert charts == [expected] * 4
+
+
+def _pyplot_line_chart(data: LineChartData, config: ChartConfig) -> bytes:
+    """Line charts as drawn before: pyplot, every point, dates one by one"""
+    fig, ax = plt.subplots(figsize=(config.width / 25.4, config.height / 25.4), dpi=config.dpi)
+    dates = TestDateLabels()._strptime_each(data.x_values)
+    x = np.arange(len(dates))
+    for name, values in data.series.items():
+        ax.plot(x, [np.nan if v is None else v for v in values], marker="o", label=name, linewidth=2, markersize=4)
+    ax.set_title(config.title, fontsize=12, fontweight="bold", pad=15)
+    labels = [
+        date.strftime("%d/%m/%Y" if i in (0, len(dates) - 1) else "%d/%m")
+        for i, date in enumerate(dates)
+    ]
+    ticks = list(range(0, len(dates), max(1, len(dates) // 10))) + [len(dates) - 1]
+    ax.set_xticks(ticks)
+    ax.set_xticklabels([labels[i] for i in ticks], rotation=45, ha="right", fontsize=8)
+    ax.grid(True, alpha=0.3, linestyle="--")
+    ax.legend(loc="best", framealpha=0.9, fontsize=9)
+    plt.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=config.dpi, bbox_inches="tight", facecolor="white")
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def _best_time(render, runs: int = 3) -> float:
+    render()
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        render()
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+@pytest.mark.slow
+class TestChartBenchmark:
+
+    DAYS = 10 * 365
+
+    def test_multi_year_daily_series(self):
+        data, config = _daily(self.DAYS, sensors=5), _config()
+        generator = MatplotlibAnalysisChartGenerator()
+
+        before = _best_time(lambda: _pyplot_line_chart(data, config))
+        after = _best_time(lambda: generator.generate_line_chart(data, config))
+
+        print(f"pyplot {before:.3f}s, figure templates {after:.3f}s")
+        assert after < before * 0.8
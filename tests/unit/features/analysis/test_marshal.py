@@ -0,0 +1,184 @@
+import gc
+import math
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features.analysis.domain import marshal
+from app.features.analysis.domain.enums import PeriodEnum
+from app.features.analysis.domain.models.average import (
+    AvgPeriodAllResult,
+    AvgPeriodResult,
+    AvgResult,
+    AvgSensor,
+    AvgValues,
+    Period,
+)
+from app.features.analysis.domain.models.prediction import (
+    PredictionResult,
+    PredictionResultAll,
+)
+from app.share.meter_records.domain.enums import SensorType
+
+SENSORS = [sensor for sensor in SensorType if sensor != SensorType.COLOR]
+PERIOD = Period(start_date="2000-01-01 00:00:00", end_date="2024-01-01 00:00:00")
+
+
+def _daily_df(days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2000-01-01", periods=days, freq="D", name="datetime")
+    df = pd.DataFrame(
+        {sensor.value: rng.normal(10, 2, days) for sensor in SENSORS}, index=index
+    )
+    df[df > 13] = np.nan
+    return df
+
+
+def _safe_value(v):
+    if v is None or (isinstance(v, float) and math.isnan(v)):
+        return None
+    try:
+        return float(v)
+    except (ValueError, TypeError):
+        return None
+
+
+def _per_cell_all_result(df: pd.DataFrame) -> AvgPeriodAllResult:
+    """The per-cell conversion of every sensor the builders replaced"""
+    labels = df.index.to_list()
+    values = {}
+    for sensor in SENSORS:
+        values[sensor.value] = AvgValues(
+            labels=labels,
+            values=[_safe_value(v) for v in df[sensor.value].to_list()],
+        )
+
+    return AvgPeriodAllResult(
+        period=PERIOD, period_type=PeriodEnum.DAYS, results=AvgSensor(**values)
+    )
+
+
+def _iterrows_result(df: pd.DataFrame, sensor_type: SensorType) -> AvgPeriodResult:
+    """The row by row conversion of one sensor the builders replaced"""
+    averages = []
+    for index, row in df.iterrows():
+        averages.append(AvgResult(date=index, value=_safe_value(row[sensor_type])))
+
+    return AvgPeriodResult(
+        sensor=sensor_type,
+        period=PERIOD,
+        period_type=PeriodEnum.DAYS,
+        averages=averages,
+    )
+
+
+class TestNullable:
+
+    def test_missing_values_are_none(self):
+        values = np.array([1.0, np.nan, np.inf, -2.5])
+
+        result = marshal.nullable(values)
+
+        assert result == [1.0, None, None, -2.5]
+        assert type(result[0]) is float
+
+    def test_without_missing_values(self):
+        assert marshal.nullable(pd.Series([1, 2])) == [1.0, 2.0]
+
+
+class TestBuilders:
+
+    def test_average_period_all_matches_validated_model(self):
+        df = _daily_df(40)
+
+        result = marshal.avg_period_all_result(df, PERIOD, PeriodEnum.DAYS)
+
+        dumped = result.model_dump(mode="json")
+        assert dumped == _per_cell_all_result(df).model_dump(mode="json")
+        assert AvgPeriodAllResult.model_validate(dumped).model_dump(mode="json") == dumped
+
+    def test_average_period_single_sensor(self):
+        df = _daily_df(10)
+
+        result = marshal.avg_period_result(df, SensorType.PH, PERIOD, PeriodEnum.DAYS)
+
+        assert result.model_dump(mode="json") == _iterrows_result(
+            df, SensorType.PH
+        ).model_dump(mode="json")
+
+    def test_prediction_results_validate(self):
+        values = np.arange(10, dtype=float).reshape(2, 5)
+        values[0, 1] = np.nan
+        predicted = np.full((1, 5), 3.0)
+
+        result = marshal.prediction_all_result(
+            SENSORS,
+            ["2024-01-01", "2024-01-02"],
+            values,
+            ["2024-01-03"],
+            predicted,
+            interval=(0.95, predicted - 1, predicted + 1),
+        )
+        single = marshal.prediction_result(
+            SensorType.PH, ["2024", "2025"], values[:, 1], ["2026"], predicted[:, 1]
+        )
+
+        dumped = result.model_dump(mode="json")
+        assert dumped["data"][SENSORS[1].value] == [None, 6.0]
+        assert dumped["interval"]["upper"][SENSORS[0].value] == [4.0]
+        assert PredictionResultAll.model_validate(dumped) == result
+        assert PredictionResult.model_validate(single.model_dump(mode="json")) == single
+
+
+def _best_time(convert, runs: int = 5) -> float:
+    convert()
+    times = []
+    gc.disable()
+    try:
+        for _ in range(runs):
+            started = time.perf_counter()
+            convert()
+            times.append(time.perf_counter() - started)
+    finally:
+        gc.enable()
+    return min(times)
+
+
+@pytest.mark.slow
+class TestMarshalBenchmark:
+
+    DAYS = 20 * 365
+
+    def test_all_sensors_against_per_cell(self):
+        df = _daily_df(self.DAYS)
+        new = marshal.avg_period_all_result(df, PERIOD, PeriodEnum.DAYS)
+        assert new.model_dump(mode="json") == _per_cell_all_result(df).model_dump(
+            mode="json"
+        )
+
+        before = _best_time(lambda: _per_cell_all_result(df))
+        after = _best_time(
+            lambda: marshal.avg_period_all_result(df, PERIOD, PeriodEnum.DAYS)
+        )
+
+        print(f"per cell {before:.4f}s, builders {after:.4f}s")
+        assert after < before * 0.8
+
+    def test_single_sensor_against_iterrows(self):
+        df = _daily_df(self.DAYS)
+        new = marshal.avg_period_result(df, SensorType.PH, PERIOD, PeriodEnum.DAYS)
+        assert new.model_dump(mode="json") == _iterrows_result(
+            df, SensorType.PH
+        ).model_dump(mode="json")
+
+        before = _best_time(lambda: _iterrows_result(df, SensorType.PH))
+        after = _best_time(
+            lambda: marshal.avg_period_result(
+                df, SensorType.PH, PERIOD, PeriodEnum.DAYS
+            )
+        )
+
+        print(f"iterrows {before:.4f}s, builders {after:.4f}s")
+        assert after < before / 3
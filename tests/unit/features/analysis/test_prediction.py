@@ -0,0 +1,174 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features.analysis.domain.enums import PeriodEnum
+from app.features.analysis.domain.models.prediction import PredictionParam
+from app.features.analysis.domain.regression import LinearTrend, t_critical
+from app.features.analysis.infrastructure.analysis_impl import AnalysisAverage
+from app.share.meter_records.domain.columns import (
+    NUMERIC_SENSORS,
+    AggregateColumns,
+    RecordColumns,
+)
+from app.share.meter_records.domain.enums import SensorType
+
+START = 1704067200  # 2024-01-01 00:00:00 UTC
+
+
+@pytest.fixture
+def analysis():
+    return AnalysisAverage(record_repo=None)
+
+
+def _period_df(dates: list[str], **columns) -> pd.DataFrame:
+    data = {"datetime": pd.to_datetime(dates)}
+    for sensor in NUMERIC_SENSORS:
+        data[sensor.value] = columns.get(sensor.value, np.arange(len(dates), dtype=float))
+    return pd.DataFrame(data)
+
+
+class TestLinearTrend:
+
+    def test_matches_polyfit_per_column(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(40, dtype=float)
+        Y = np.column_stack([3 * x + 2, -0.5 * x + 10, rng.normal(size=40)])
+        Y += rng.normal(scale=0.3, size=Y.shape)
+        Y[::4, 1] = np.nan
+        Y[5:9, 2] = np.nan
+
+        trend = LinearTrend(x, Y, np.array([40.0, 41.0]))
+
+        for j in range(Y.shape[1]):
+            mask = ~np.isnan(Y[:, j])
+            slope, intercept = np.polyfit(x[mask], Y[mask, j], 1)
+            assert trend.slope[j] == pytest.approx(slope)
+            assert trend.intercept[j] == pytest.approx(intercept)
+            assert trend.predicted[0, j] == pytest.approx(intercept + slope * 40)
+
+    def test_confidence_interval(self):
+        stats = pytest.importorskip("scipy.stats")
+        rng = np.random.default_rng(1)
+        x = np.arange(12, dtype=float)
+        y = 2 * x + rng.normal(size=12)
+
+        trend = LinearTrend(x, y, np.array([15.0]))
+
+        fit = stats.linregress(x, y)
+        residuals = y - (fit.intercept + fit.slope * x)
+        s = np.sqrt((residuals**2).sum() / 10)
+        se = s * np.sqrt(1 / 12 + (15 - x.mean()) ** 2 / ((x - x.mean()) ** 2).sum())
+        margin = stats.t.ppf(0.975, 10) * se
+
+        assert trend.upper[0, 0] - trend.predicted[0, 0] == pytest.approx(margin, rel=1e-4)
+        assert trend.predicted[0, 0] - trend.lower[0, 0] == pytest.approx(margin, rel=1e-4)
+
+    def test_degenerate_columns(self):
+        x = np.array([0.0, 1.0, 2.0])
+        Y = np.array([[np.nan, 5.0], [np.nan, np.nan], [np.nan, np.nan]])
+
+        trend = LinearTrend(x, Y, np.array([3.0]))
+
+        assert np.isnan(trend.predicted[0, 0])
+        # A single point gives a flat line without an interval
+        assert trend.predicted[0, 1] == 5.0
+        assert np.isnan(trend.lower[0, 1]) and np.isnan(trend.upper[0, 1])
+
+    def test_t_critical(self):
+        t = t_critical(np.array([0, 1, 2, 10, 1000]), 0.95)
+
+        assert np.isnan(t[0])
+        assert t[1:3] == pytest.approx([12.7062, 4.3027], abs=1e-4)
+        assert t[3] == pytest.approx(2.2281, abs=1e-3)
+        assert t[4] == pytest.approx(1.9623, abs=1e-3)
+
+
+class TestPredictionResult:
+
+    def test_monthly_labels(self, analysis):
+        df = _period_df(["2024-01-01", "2024-02-01", "2024-04-01"])
+
+        result = analysis._prediction_result(
+            df,
+            PredictionParam(
+                start_date="2024-01-01 00:00:00",
+                end_date="2024-05-01 00:00:00",
+                period_type=PeriodEnum.MONTHS,
+            ),
+        )
+
+        assert result.data.labels == ["2024-01", "2024-02", "2024-04"]
+        assert result.pred.labels[:2] == ["2024-05", "2024-06"]
+        assert result.pred.ph[0] == pytest.approx(3.0)
+        assert result.interval.lower.labels == result.pred.labels
+        assert result.interval.confidence == 0.95
+
+    def test_yearly_with_missing_values(self, analysis):
+        df = _period_df(
+            ["2021-01-01", "2022-01-01", "2023-01-01"], tds=np.array([1.0, np.nan, 3.0])
+        )
+
+        result = analysis._prediction_result(
+            df,
+            PredictionParam(
+                start_date="2021-01-01 00:00:00",
+                end_date="2024-01-01 00:00:00",
+                period_type=PeriodEnum.YEARS,
+                sensor_type=SensorType.TDS,
+            ),
+        )
+
+        assert result.data.labels == ["2021", "2022", "2023"]
+        assert result.data.values == [1.0, None, 3.0]
+        assert result.pred.labels[0] == "2024"
+        assert result.pred.values[0] == pytest.approx(4.0)
+        # Two points leave no degrees of freedom for the interval
+        assert result.interval.lower[0] is None
+
+    def test_empty_range(self, analysis):
+        with pytest.raises(ValueError):
+            analysis._prediction_result(
+                _period_df([]),
+                PredictionParam(
+                    start_date="2024-01-01 00:00:00", end_date="2024-02-01 00:00:00"
+                ),
+            )
+
+
+@pytest.mark.slow
+class TestPredictionBenchmark:
+
+    ROWS = 1_000_000
+
+    def test_one_million_rows(self, analysis):
+        rng = np.random.default_rng(2)
+        timestamps = START + np.arange(self.ROWS, dtype=np.int64) * 30
+        values = {
+            sensor: rng.normal(10, 2, self.ROWS) for sensor in NUMERIC_SENSORS
+        }
+        values[SensorType.PH][rng.random(self.ROWS) < 0.05] = np.nan
+        columns = RecordColumns(timestamps=timestamps, values=values)
+
+        started = time.perf_counter()
+
+        aggregates = AggregateColumns.from_records(columns)
+        df = analysis._period_df(aggregates, PeriodEnum.DAYS, period_start=True)
+        df = df.dropna(how="all").reset_index()
+
+        aggregated = time.perf_counter()
+        result = analysis._prediction_result(
+            df,
+            PredictionParam(
+                start_date="2024-01-01 00:00:00", end_date="2025-01-01 00:00:00"
+            ),
+        )
+        finished = time.perf_counter()
+
+        assert len(result.data.labels) == 348
+        assert len(result.pred.ph) == 10
+        # The fit of every sensor is a few array operations
+        assert finished - aggregated < 0.5
+        assert finished - started < 15.0
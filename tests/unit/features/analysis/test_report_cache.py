@@ -0,0 +1,104 @@
+import os
+from io import BytesIO
+from unittest.mock import Mock
+
+import pytest
+
+from app.features.analysis.domain.chart_model import (
+    ChartConfig,
+    ChartType,
+    LineChartData,
+)
+from app.features.analysis.infrastructure.cached_chart_generator import (
+    CachedAnalysisChartGenerator,
+)
+from app.features.analysis.infrastructure.disk_report_cache import DiskReportCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DiskReportCache(root=str(tmp_path), max_bytes=100)
+
+
+class TestDiskReportCache:
+
+    def test_get_put(self, cache):
+        cache.put("a1", "v1", "chart", b"png")
+
+        assert cache.get("a1", "v1", "chart") == b"png"
+        assert cache.get("a1", "v2", "chart") is None
+        assert cache.get("a2", "v1", "chart") is None
+
+    def test_least_recently_used_are_evicted(self, cache):
+        cache.put("a1", "v1", "first", b"x" * 40)
+        cache.put("a1", "v1", "second", b"x" * 40)
+        cache.get("a1", "v1", "first")
+
+        cache.put("a2", "v1", "third", b"x" * 40)
+
+        assert cache.get("a1", "v1", "second") is None
+        assert cache.get("a1", "v1", "first") is not None
+        assert cache.get("a2", "v1", "third") is not None
+        assert cache.size() == 80
+
+    def test_larger_than_the_cache_is_not_kept(self, cache):
+        cache.put("a1", "v1", "chart", b"x" * 101)
+
+        assert cache.get("a1", "v1", "chart") is None
+        assert cache.size() == 0
+
+    def test_invalidate(self, cache):
+        cache.put("a1", "v1", "chart", b"png")
+        cache.put("a1", "v2", "pdf", b"pdf")
+        cache.put("a2", "v1", "chart", b"png")
+
+        cache.invalidate("a1")
+
+        assert cache.get("a1", "v1", "chart") is None
+        assert cache.get("a1", "v2", "pdf") is None
+        assert cache.get("a2", "v1", "chart") == b"png"
+        assert cache.size() == 3
+
+    def test_reloaded_from_disk(self, cache, tmp_path):
+        cache.put("a1", "v1", "old", b"x" * 40)
+        cache.put("a1", "v1", "new", b"x" * 40)
+        old, new = sorted(tmp_path.glob("*/*.bin"), key=os.path.getmtime)
+        os.utime(old, (1, 1))
+
+        reloaded = DiskReportCache(root=str(tmp_path), max_bytes=100)
+        reloaded.put("a2", "v1", "other", b"x" * 40)
+
+        assert reloaded.get("a1", "v1", "new") is not None
+        assert reloaded.get("a1", "v1", "old") is None
+
+
+class TestCachedAnalysisChartGenerator:
+
+    def _chart_gen(self):
+        chart_gen = Mock()
+        chart_gen.generate_line_chart.side_effect = lambda data, config: BytesIO(
+            config.title.encode()
+        )
+        return chart_gen
+
+    def _line(self, title="pH"):
+        return (
+            LineChartData(x_values=["2024-01-01"], series={"pH": [7.0]}),
+            ChartConfig(chart_type=ChartType.LINE, title=title),
+        )
+
+    def test_rendered_once_per_version(self, tmp_path):
+        cache = DiskReportCache(root=str(tmp_path), max_bytes=10_000)
+        chart_gen = self._chart_gen()
+
+        first = CachedAnalysisChartGenerator(chart_gen, cache, "a1", "v1")
+        assert first.generate_line_chart(*self._line()).read() == b"pH"
+        assert first.generate_line_chart(*self._line()).read() == b"pH"
+        assert chart_gen.generate_line_chart.call_count == 1
+
+        first.generate_line_chart(*self._line(title="TDS"))
+        assert chart_gen.generate_line_chart.call_count == 2
+
+        updated = CachedAnalysisChartGenerator(chart_gen, cache, "a1", "v2")
+        updated.generate_line_chart(*self._line())
+        assert chart_gen.generate_line_chart.call_count == 3
@@ -0,0 +1,210 @@
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.features.analysis.domain.enums import AnalysisEnum, AverageMode
+from app.features.analysis.domain.models.average import AverageParam
+from app.features.analysis.domain.state import AnalysisState
+from app.features.analysis.domain.streaming import RunningStats
+from app.features.analysis.infrastructure.analysis_impl import AnalysisAverage
+from app.share.meter_records.domain.columns import (
+    NUMERIC_SENSORS,
+    AggregateColumns,
+    RecordColumns,
+)
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.model import RecordWatermark, SensorIdentifier
+
+START = 1704067200  # 2024-01-01 00:00:00 UTC
+
+
+def _snapshot(rows: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(rows):
+        data[str(START + i * 60)] = {
+            sensor.value: {"value": float(rng.normal(10, 3)), "datetime": ""}
+            for sensor in NUMERIC_SENSORS
+            # Some records miss a sensor
+            if rng.random() > 0.1
+        }
+    return data
+
+
+def _chunks(snapshot: dict, size: int):
+    keys = sorted(snapshot)
+    for i in range(0, len(keys), size):
+        yield {key: snapshot[key] for key in keys[i : i + size]}
+
+
+@pytest.fixture
+def snapshot():
+    return _snapshot(rows=500)
+
+
+@pytest.fixture
+def record_repo(snapshot):
+    repo = Mock()
+    repo.query_aggregates.side_effect = (
+        lambda identifier, params, max_granularity, sensors=None: (
+            AggregateColumns.from_records(RecordColumns.from_snapshot(snapshot, sensors))
+        )
+    )
+    repo.export_records.side_effect = lambda identifier, params, chunk_size: _chunks(
+        snapshot, 64
+    )
+    repo.get_last_key.side_effect = lambda identifier, params: max(map(int, snapshot))
+    repo.get_rollup_coverage.return_value = None
+    return repo
+
+
+@pytest.fixture
+def analysis(record_repo):
+    return AnalysisAverage(record_repo=record_repo)
+
+
+@pytest.fixture
+def identifier():
+    return SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+
+
+RANGE = {"start_date": "2024-01-01 00:00:00", "end_date": "2024-01-02 00:00:00"}
+
+
+class TestRunningStats:
+
+    @pytest.mark.parametrize("chunk_size", [1, 7, 500])
+    def test_matches_pandas(self, snapshot, chunk_size):
+        stats = RunningStats(NUMERIC_SENSORS)
+        for chunk in _chunks(snapshot, chunk_size):
+            stats.update(RecordColumns.from_snapshot(chunk))
+
+        df = pd.DataFrame(RecordColumns.from_snapshot(snapshot).values)
+
+        assert stats.average() == pytest.approx(df.mean().to_numpy())
+        assert stats.variance() == pytest.approx(df.var(ddof=0).to_numpy())
+        assert stats.min.tolist() == df.min().tolist()
+        assert stats.max.tolist() == df.max().tolist()
+        assert stats.records == len(snapshot)
+        assert stats.last_key == max(map(int, snapshot))
+
+    def test_variance_keeps_precision(self):
+        rng = np.random.default_rng(3)
+        values = 1e9 + rng.normal(0, 0.01, 10_000)
+
+        stats = RunningStats([SensorType.TDS])
+        for part in np.array_split(values, 37):
+            stats.update(
+                RecordColumns(
+                    timestamps=np.arange(len(part), dtype=np.int64),
+                    values={SensorType.TDS: part},
+                )
+            )
+
+        assert stats.variance()[0] == pytest.approx(values.var(), rel=1e-6)
+
+    def test_stored_state_keeps_precision(self, analysis):
+        rng = np.random.default_rng(3)
+        values = 1e9 + rng.normal(0, 0.01, 10_000)
+
+        stats = RunningStats([SensorType.TDS])
+        for part in np.array_split(values, 37):
+            stats.update(
+                RecordColumns(
+                    timestamps=START + np.arange(len(part), dtype=np.int64),
+                    values={SensorType.TDS: part},
+                )
+            )
+        state = AnalysisState(
+            aggregates=stats.to_aggregates(),
+            watermark=RecordWatermark(last_key=stats.last_key, count=stats.records),
+            granularity=None,
+        )
+        loaded = AnalysisState.from_dict(state.to_dict(), state.watermark)
+
+        params = AverageParam(**RANGE, sensor_type=SensorType.TDS).model_dump()
+        result = analysis.generate_from_state(AnalysisEnum.AVERAGE, params, loaded)
+
+        assert result.stats.std == pytest.approx(values.std(), rel=1e-6)
+
+    def test_sensor_without_values(self):
+        stats = RunningStats([SensorType.PH, SensorType.TDS])
+        stats.update(
+            RecordColumns(
+                timestamps=np.array([START], dtype=np.int64),
+                values={
+                    SensorType.PH: np.array([7.0]),
+                    SensorType.TDS: np.array([np.nan]),
+                },
+            )
+        )
+
+        assert stats.average()[0] == 7.0
+        assert np.isnan(stats.average()[1]) and np.isnan(stats.variance()[1])
+
+    def test_aggregates_round_trip(self, snapshot):
+        stats = RunningStats(NUMERIC_SENSORS)
+        for chunk in _chunks(snapshot, 100):
+            stats.update(RecordColumns.from_snapshot(chunk))
+
+        expected = AggregateColumns.from_records(
+            RecordColumns.from_snapshot(snapshot)
+        ).group(None)
+        aggregates = stats.to_aggregates()
+
+        assert aggregates.timestamps.tolist() == expected.timestamps.tolist()
+        for sensor in NUMERIC_SENSORS:
+            for field in AggregateColumns.FIELDS:
+                assert aggregates.stats[sensor][field] == pytest.approx(
+                    expected.stats[sensor][field]
+                )
+
+
+def _average(analysis, identifier, params: dict):
+    state = analysis.load_state(identifier, AnalysisEnum.AVERAGE, params)
+    return state, analysis.generate_from_state(AnalysisEnum.AVERAGE, params, state)
+
+
+class TestStreamingMode:
+
+    def test_matches_pandas(self, analysis, identifier, snapshot):
+        params = AverageParam(**RANGE, mode=AverageMode.STREAMING).model_dump()
+
+        _, result = _average(analysis, identifier, params)
+
+        df = pd.DataFrame(
+            {
+                sensor.value: values
+                for sensor, values in RecordColumns.from_snapshot(snapshot).values.items()
+            }
+        )
+        for got in result.result:
+            want = df[SensorType(got.sensor).value]
+            assert got.average == pytest.approx(want.mean())
+            assert got.std == pytest.approx(want.std(ddof=0))
+            assert (got.min, got.max) == (want.min(), want.max())
+
+    def test_reads_pages_only(self, analysis, record_repo, identifier):
+        params = AverageParam(
+            **RANGE, sensor_type=SensorType.PH, mode=AverageMode.STREAMING
+        ).model_dump()
+
+        _, result = _average(analysis, identifier, params)
+
+        record_repo.query_aggregates.assert_not_called()
+        assert result.sensor == SensorType.PH
+        assert result.stats.std > 0
+
+    def test_state_matches_aggregates_mode(self, analysis, record_repo, identifier):
+        params = AverageParam(**RANGE, mode=AverageMode.STREAMING).model_dump()
+
+        state, result = _average(analysis, identifier, params)
+        record_repo.query_aggregates.assert_not_called()
+        _, expected = _average(analysis, identifier, AverageParam(**RANGE).model_dump())
+
+        assert state.watermark.count == 500
+        for got, want in zip(result.result, expected.result):
+            assert got.average == pytest.approx(want.average)
+            assert got.std == pytest.approx(want.std)
@@ -0,0 +1,137 @@
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from app.share.messages.domain.model import AlertData, AlertType
+from app.share.messages.domain.rules import AlertRules
+from app.share.messages.infra.alert_rules_impl import AlertRulesRepositoryImpl
+from app.share.socketio.domain.model import RecordBody, SRColorValue
+
+
+def _record(**values) -> RecordBody:
+    data = {"conductivity": 0.0, "ph": 0.0, "temperature": 0.0, "tds": 0.0, "turbidity": 0.0}
+    data.update(values)
+    return RecordBody(color=SRColorValue(r=0, g=0, b=0), **data)
+
+
+def _alert(alert_id: str, **ranges) -> AlertData:
+    parameters = {
+        name: {"min": 100.0, "max": 200.0}
+        for name in ["ph", "tds", "temperature", "conductivity", "turbidity"]
+    }
+    parameters.update({name: {"min": low, "max": high} for name, (low, high) in ranges.items()})
+    return AlertData(
+        id=alert_id,
+        title=alert_id,
+        meter_id="m1",
+        type=AlertType.POOR,
+        user_uid="u1",
+        parameters=parameters,
+    )
+
+
+def _reference(record: RecordBody, alerts: list[AlertData]) -> tuple[set, list]:
+    """Range check done one alert and one parameter at a time."""
+    ids, data = set(), []
+    for alert in alerts:
+        if not alert.parameters:
+            continue
+        count = 0
+        for param, range_param in alert.parameters.model_dump().items():
+            value = getattr(record, param)
+            if not (range_param["min"] <= value <= range_param["max"]):
+                continue
+            data.append((alert.id, param, value))
+            if param in ("ph", "turbidity"):
+                ids.add(alert.id)
+            else:
+                count += 1
+        if count >= 3:
+            ids.add(alert.id)
+    return ids, data
+
+
+class TestAlertRules:
+
+    def test_priority_parameter_triggers(self):
+        rules = AlertRules([_alert("a1", ph=(0.0, 6.0))])
+
+        result = rules.validate(_record(ph=5.0))
+
+        assert result.has_parameters
+        assert result.alerts_ids == ["a1"]
+        assert [(p.parameter, p.value) for p in result.parameters_data] == [("ph", 5.0)]
+
+    def test_three_parameters_trigger(self):
+        rules = AlertRules(
+            [_alert("a1", tds=(0, 10), temperature=(0, 10), conductivity=(0, 10))]
+        )
+
+        assert rules.validate(_record(tds=1, temperature=1, conductivity=1)).alerts_ids == ["a1"]
+
+        result = rules.validate(_record(tds=1, temperature=1, conductivity=50))
+        assert result.alerts_ids == []
+        assert len(result.parameters_data) == 2
+
+    def test_alerts_without_parameters(self):
+        alert = _alert("a1")
+        alert.parameters = None
+        rules = AlertRules([alert])
+
+        result = rules.validate(_record())
+
+        assert not result.has_parameters
+        assert rules.alerts == [alert]
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(1)
+        alerts = []
+        for i in range(20):
+            low = rng.uniform(0, 50, 5)
+            alerts.append(
+                _alert(
+                    f"a{i}",
+                    **{
+                        name: (float(low[j]), float(low[j] + rng.uniform(1, 50)))
+                        for j, name in enumerate(
+                            ["ph", "tds", "temperature", "conductivity", "turbidity"]
+                        )
+                    },
+                )
+            )
+        records = [
+            _record(**dict(zip(["ph", "tds", "temperature", "conductivity", "turbidity"], v)))
+            for v in rng.uniform(0, 100, (50, 5)).tolist()
+        ]
+
+        results = AlertRules(alerts).validate_many(records)
+
+        for record, result in zip(records, results):
+            ids, data = _reference(record, alerts)
+            assert set(result.alerts_ids) == ids
+            assert [(p.alert_id, p.parameter, p.value) for p in result.parameters_data] == data
+
+
+class TestAlertRulesCache:
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        AlertRulesRepositoryImpl.rules.clear()
+        yield
+        AlertRulesRepositoryImpl.rules.clear()
+
+    def test_rules_cached_until_invalidated(self):
+        repo = AlertRulesRepositoryImpl()
+
+        with patch.object(
+            AlertRulesRepositoryImpl, "_list_alerts_by_meter", return_value=[_alert("a1")]
+        ) as list_alerts:
+            first = repo.get("m1")
+            assert repo.get("m1") is first
+            assert list_alerts.call_count == 1
+
+            AlertRulesRepositoryImpl.invalidate("m1")
+
+            assert repo.get("m1") is not first
+            assert list_alerts.call_count == 2
@@ -0,0 +1,117 @@
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.share.messages.domain.model import NotificationControl
+from app.share.messages.infra.notification_control_impl import (
+    NotificationControlRepositoryImpl,
+)
+
+
+@pytest.fixture
+def notification_manager():
+    manager = Mock()
+    manager.get_control.side_effect = lambda alert_id: NotificationControl(
+        alert_id=alert_id, validation_count=0
+    )
+    return manager
+
+
+@pytest.fixture
+def firebase():
+    with patch("app.share.messages.infra.notification_control_impl.db") as db:
+        yield db.reference.return_value
+
+
+@pytest.fixture
+def control_repo(notification_manager):
+    return NotificationControlRepositoryImpl(notification_manager=notification_manager)
+
+
+class TestNotificationControl:
+
+    def test_controls_are_read_once(self, control_repo, notification_manager, firebase):
+        for _ in range(25):
+            control_repo.increment("a1")
+            control_repo.reset("a2")
+
+        assert control_repo.get("a1").validation_count == 25
+        assert notification_manager.get_control.call_count == 2
+        firebase.update.assert_not_called()
+
+    def test_flush_writes_changed_controls(self, control_repo, firebase):
+        control_repo.increment("a1")
+        control_repo.increment("a1")
+        control_repo.reset("a2")  # Already 0, nothing to write
+
+        assert control_repo.flush() == 1
+        firebase.update.assert_called_once_with(
+            {
+                "notifications_control/a1/alert_id": "a1",
+                "notifications_control/a1/validation_count": 2,
+                "notifications_control/a1/last_sent": None,
+            }
+        )
+
+        assert control_repo.flush() == 0
+        firebase.update.assert_called_once()
+
+    def test_reset_after_send(self, control_repo, firebase):
+        for _ in range(20):
+            control_repo.increment("a1")
+        control_repo.set_last_sent("a1", 100.0)
+        control_repo.reset("a1")
+        control_repo.flush()
+
+        updates = firebase.update.call_args.args[0]
+        assert updates["notifications_control/a1/validation_count"] == 0
+        assert updates["notifications_control/a1/last_sent"] == 100.0
+
+    def test_failed_flush_is_retried(self, control_repo, firebase):
+        firebase.update.side_effect = [Exception("unavailable"), None]
+        control_repo.increment("a1")
+
+        with pytest.raises(Exception):
+            control_repo.flush()
+
+        assert control_repo.flush() == 1
+        assert firebase.update.call_count == 2
+
+    def test_get_returns_a_copy(self, control_repo):
+        control = control_repo.get("a1")
+        control.validation_count = 10
+
+        assert control_repo.get("a1").validation_count == 0
+
+    def test_cache_is_bounded(self, control_repo, notification_manager, firebase):
+        control_repo.max_size = 3
+        control_repo.increment("a0")
+        for i in range(1, 10):
+            control_repo.get(f"a{i}")
+
+        # The changed control is kept until it is written
+        assert len(control_repo._controls) == 3
+        assert "a0" in control_repo._controls
+
+        control_repo.flush()
+        control_repo.get("a10")
+
+        assert "a0" not in control_repo._controls
+        assert list(control_repo._controls) == ["a8", "a9", "a10"]
+
+    def test_unchanged_controls_expire(self, control_repo, notification_manager):
+        control_repo.increment("a1")
+        control_repo.get("a2")
+
+        with patch(
+            "app.share.messages.infra.notification_control_impl.time.monotonic",
+            return_value=time.monotonic() + control_repo.ttl + 1,
+        ):
+            # Not written yet: still the one in memory
+            assert control_repo.get("a1").validation_count == 1
+            control_repo.get("a2")
+
+        assert [
+            call.kwargs["alert_id"] for call in notification_manager.get_control.call_args_list
+        ] == ["a1", "a2", "a2"]
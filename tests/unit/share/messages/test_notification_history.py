@@ -0,0 +1,124 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.share.messages.domain.model import (
+    NotificationBody,
+    NotificationStatus,
+    QueryNotificationParams,
+)
+from app.share.messages.infra.notification_manager import NotificationManagerRepositoryImpl
+from app.share.users.domain.model.user import UserData
+from app.share.users.infra.cached_users_repo_impl import CachedUserRepository
+
+
+def _notification(i: int, **extra) -> dict:
+    data = {
+        "read": i % 2 == 0,
+        "title": f"n{i}",
+        "body": "body",
+        "user_ids": ["u1", "u2"],
+        "timestamp": 1700000000 + i,
+        "status": "pending" if i % 3 else "accepted",
+    }
+    data.update(extra)
+    return data
+
+
+@pytest.fixture
+def history():
+    return {f"id{i:03d}": _notification(i) for i in range(30)}
+
+
+@pytest.fixture
+def firebase(history):
+    def reference(path: str):
+        ref = Mock()
+        if path.startswith("/notifications_by_user/"):
+            ref.get.side_effect = lambda shallow=False: {key: True for key in history}
+        else:
+            notification_id = path.strip("/").split("/")[-1]
+            ref.get.return_value = history.get(notification_id)
+        return ref
+
+    with patch("app.share.messages.infra.notification_manager.db") as db:
+        db.reference.side_effect = reference
+        yield db
+
+
+@pytest.fixture
+def user_repo():
+    repo = Mock()
+    repo.get_by_uids.side_effect = lambda uids, limit_data=False: {
+        uid: UserData(uid=uid, email=f"{uid}@mail.com", username=uid) for uid in uids
+    }
+    return repo
+
+
+@pytest.fixture
+def manager(user_repo):
+    CachedUserRepository.clear()
+    yield NotificationManagerRepositoryImpl(user_repo=CachedUserRepository(user_repo))
+    CachedUserRepository.clear()
+
+
+class TestNotificationHistory:
+
+    def test_filters_and_resolves_emails_in_one_batch(self, manager, user_repo, firebase):
+        notifications = manager.get_history(
+            "u1", QueryNotificationParams(status=NotificationStatus.PENDING, is_read=False)
+        )
+
+        assert [n.title for n in notifications] == [
+            f"n{i}" for i in range(30) if i % 3 and i % 2
+        ]
+        assert notifications[0].user_ids == ["u1@mail.com", "u2@mail.com"]
+        user_repo.get_by_uids.assert_called_once_with(["u1", "u2"], limit_data=True)
+        user_repo.get_by_uid.assert_not_called()
+
+    def test_emails_are_cached(self, manager, user_repo, firebase):
+        params = QueryNotificationParams(status=NotificationStatus.PENDING)
+
+        manager.get_history("u1", params)
+        manager.get_history("u1", params)
+
+        assert user_repo.get_by_uids.call_count == 1
+
+    def test_denormalized_emails(self, manager, user_repo, firebase, history):
+        for notification in history.values():
+            notification["user_emails"] = ["stored@mail.com"]
+
+        notifications = manager.get_history(
+            "u1", QueryNotificationParams(status=NotificationStatus.ACCEPTED)
+        )
+
+        assert notifications[0].user_ids == ["stored@mail.com"]
+        user_repo.get_by_uids.assert_not_called()
+
+    def test_cursor_pagination(self, manager, firebase):
+        seen = []
+        cursor = None
+
+        while True:
+            page = manager.get_history_page(
+                "u1",
+                QueryNotificationParams(
+                    status=NotificationStatus.PENDING, cursor=cursor, limit=4
+                ),
+            )
+            seen.extend(n.title for n in page.notifications)
+            assert len(page.notifications) <= 4
+            if page.next_cursor is None:
+                break
+            cursor = page.next_cursor
+
+        assert seen == [f"n{i}" for i in range(30) if i % 3]
+
+    def test_create_stores_emails(self, manager, firebase):
+        push_ref = Mock()
+        push_ref.push.return_value.key = "new"
+        firebase.reference.side_effect = lambda path: push_ref
+
+        manager.create(NotificationBody(title="t", body="b", user_ids=["u1"]))
+
+        assert push_ref.push.call_args.args[0]["user_emails"] == ["u1@mail.com"]
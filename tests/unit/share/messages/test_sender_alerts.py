@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+# Loads the socket layer first, as the app does
+from app.share.socketio.domain.model import RecordBody
+from app.share.messages.domain.model import NotificationStatus
+from app.share.messages.domain.rules import AlertRules
+from app.share.messages.infra.sender_alerts import SenderAlertsRepositoryImpl
+from tests.unit.share.messages.test_alert_rules import _alert, _record
+from tests.unit.share.messages.test_notification_control import (  # noqa: F401
+    control_repo,
+    firebase,
+    notification_manager,
+)
+
+IN_RANGE: RecordBody = _record(ph=5.0)
+OUT_OF_RANGE: RecordBody = _record(ph=7.0)
+
+
+@pytest.fixture
+def alert_rules():
+    repo = Mock()
+    repo.get.return_value = AlertRules([_alert("a1", ph=(0.0, 6.0))])
+    return repo
+
+
+@pytest.fixture
+def sender(alert_rules, control_repo, notification_manager):
+    with patch("app.share.messages.infra.sender_alerts.db"):
+        sender = SenderAlertsRepositoryImpl(
+            sender_service=Mock(send_notification=AsyncMock()),
+            notification_manager=notification_manager,
+            alert_rules=alert_rules,
+            control_repo=control_repo,
+        )
+        sender._get_owner_of_workspace = Mock(return_value="owner")
+        yield sender
+
+
+def _send(sender: SenderAlertsRepositoryImpl, records) -> None:
+    async def send():
+        await sender.send_alerts_many("w1", "m1", records)
+        await sender.control_repo.stop()
+
+    asyncio.run(send())
+
+
+class TestSendAlertsMany:
+
+    def test_records_are_counted_in_order(self, sender, firebase):
+        _send(sender, [IN_RANGE, IN_RANGE, OUT_OF_RANGE, IN_RANGE])
+
+        assert sender.control_repo.get("a1").validation_count == 1
+        sender.alert_rules.get.assert_called_once_with("m1")
+
+    def test_same_as_one_by_one(self, sender, firebase):
+        records = [IN_RANGE] * 22 + [OUT_OF_RANGE, IN_RANGE]
+
+        _send(sender, records)
+
+        # Sent once the count reaches 20, then not again on the same day
+        sender.sender_service.send_notification.assert_awaited_once()
+        notification = sender.sender_service.send_notification.await_args.args[0]
+        assert notification.alert_id == "a1"
+        assert notification.status == NotificationStatus.PENDING
+        assert [p.parameter for p in notification.record_parameters] == ["ph"]
+        assert sender.control_repo.get("a1").validation_count == 0
+
+    def test_database_calls_leave_the_event_loop(self, sender, firebase):
+        loop_thread = threading.get_ident()
+        threads: dict[str, int] = {}
+
+        def record(name, value=None):
+            def call(*args, **kwargs):
+                threads[name] = threading.get_ident()
+                return value
+
+            return call
+
+        sender._get_owner_of_workspace = Mock(side_effect=record("owner", "owner"))
+        sender._get_meter_name = Mock(side_effect=record("meter_name", "Medidor"))
+        sender.notification_manager.create.side_effect = record("create")
+
+        _send(sender, [IN_RANGE] * 21)
+
+        notification = sender.sender_service.send_notification.await_args.args[0]
+        assert "Medidor" in notification.body
+        assert sorted(threads) == ["create", "meter_name", "owner"]
+        assert loop_thread not in threads.values()
@@ -0,0 +1,81 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.share.meter_records.domain.columns import NUMERIC_SENSORS, RecordColumns
+from app.share.meter_records.domain.enums import SensorType
+
+
+def _record(value, name="ph"):
+    return {name: {"value": value, "datetime": "2025-01-01T00:00:00"}}
+
+
+@pytest.fixture
+def snapshot():
+    return {
+        "1700000000": {
+            "ph": {"value": 7.1, "datetime": "2023-11-14T22:13:20"},
+            "tds": {"value": 120, "datetime": "2023-11-14T22:13:20"},
+            "color": {"value": {"r": 1, "g": 2, "b": 3}, "datetime": "2023-11-14T22:13:20"},
+        },
+        "1700000001": {
+            "ph": {"value": 7.3, "datetime": "2023-11-14T22:13:21"},
+        },
+        "1700000002": {
+            "ph": {"value": None, "datetime": "2023-11-14T22:13:22"},
+            "tds": {"value": 130.5, "datetime": "2023-11-14T22:13:22"},
+        },
+    }
+
+
+class TestRecordColumns:
+
+    def test_from_snapshot_types(self, snapshot):
+        columns = RecordColumns.from_snapshot(snapshot)
+
+        assert columns.timestamps.dtype == np.int64
+        assert list(columns.timestamps) == [1700000000, 1700000001, 1700000002]
+        assert list(columns.values.keys()) == NUMERIC_SENSORS
+        for values in columns.values.values():
+            assert values.dtype == np.float64
+            assert len(values) == len(columns)
+
+    def test_missing_values_are_nan(self, snapshot):
+        columns = RecordColumns.from_snapshot(snapshot)
+
+        ph = columns.values[SensorType.PH]
+        tds = columns.values[SensorType.TDS]
+
+        assert ph[0] == pytest.approx(7.1)
+        assert ph[1] == pytest.approx(7.3)
+        assert math.isnan(ph[2])
+        assert tds[0] == pytest.approx(120.0)
+        assert math.isnan(tds[1])
+        assert np.isnan(columns.values[SensorType.TURBIDITY]).all()
+
+    def test_selected_sensors(self, snapshot):
+        columns = RecordColumns.from_snapshot(snapshot, sensors=[SensorType.TDS])
+
+        assert list(columns.values.keys()) == [SensorType.TDS]
+
+    def test_color_not_supported(self, snapshot):
+        with pytest.raises(ValueError):
+            RecordColumns.from_snapshot(snapshot, sensors=[SensorType.COLOR])
+
+    @pytest.mark.parametrize("data", [None, {}])
+    def test_empty_snapshot(self, data):
+        columns = RecordColumns.from_snapshot(data, sensors=[SensorType.PH])
+
+        assert len(columns) == 0
+        assert columns.timestamps.dtype == np.int64
+        assert columns.values[SensorType.PH].dtype == np.float64
+
+    def test_ignores_non_numeric_keys(self):
+        columns = RecordColumns.from_snapshot(
+            {"1700000000": _record(7.0), "abc": _record(8.0)},
+            sensors=[SensorType.PH],
+        )
+
+        assert list(columns.timestamps) == [1700000000]
+        assert list(columns.values[SensorType.PH]) == [7.0]
@@ -0,0 +1,169 @@
+import csv
+import io
+import json
+from unittest.mock import Mock
+
+import pytest
+
+from app.share.meter_records.domain.export import (
+    EXPORT_COLUMNS,
+    ExportFormat,
+    encode_records,
+    flatten_record,
+)
+from app.share.meter_records.domain.model import SensorIdentifier, SensorQueryParams
+from app.share.meter_records.infrastructure.meter_records_impl import (
+    MeterRecordsRepositoryImpl,
+)
+
+
+def _record(i: int) -> dict:
+    return {
+        "ph": {"value": 7.0 + i / 100, "datetime": "2023-11-14T22:13:20"},
+        "tds": {"value": 100 + i, "datetime": "2023-11-14T22:13:20"},
+        "color": {"value": {"r": i, "g": 2, "b": 3}, "datetime": "2023-11-14T22:13:20"},
+    }
+
+
+@pytest.fixture
+def sensors():
+    return {str(1700000000 + i): _record(i) for i in range(25)}
+
+
+class FakeQuery:
+    """order_by_key query over an in-memory sensors node, recording each page."""
+
+    def __init__(self, sensors: dict, pages: list):
+        self.sensors = sensors
+        self.pages = pages
+        self.start = None
+        self.end = None
+        self.limit = None
+        self.last = False
+
+    def start_at(self, key):
+        self.start = int(key)
+        return self
+
+    def end_at(self, key):
+        self.end = int(key)
+        return self
+
+    def limit_to_first(self, limit):
+        self.limit = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self.limit = limit
+        self.last = True
+        return self
+
+    def get(self):
+        keys = sorted(self.sensors, key=int)
+        keys = [
+            key
+            for key in keys
+            if (self.start is None or int(key) >= self.start)
+            and (self.end is None or int(key) <= self.end)
+        ]
+        keys = keys[-self.limit :] if self.last else keys[: self.limit]
+        self.pages.append(len(keys))
+        return {key: self.sensors[key] for key in keys}
+
+
+@pytest.fixture
+def pages():
+    return []
+
+
+@pytest.fixture
+def repo(sensors, pages):
+    meter_ref = Mock()
+    meter_ref.child.return_value.get.return_value = "meter"
+    meter_ref.child.return_value.order_by_key.side_effect = lambda: FakeQuery(
+        sensors, pages
+    )
+
+    access = Mock()
+    access.get_ref.return_value.ref.child.return_value.child.return_value = meter_ref
+    return MeterRecordsRepositoryImpl(workspace_access=access)
+
+
+IDENTIFIER = SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+
+
+class TestExportRecords:
+
+    def test_pages_through_keys(self, repo, sensors, pages):
+        chunks = list(repo.export_records(IDENTIFIER, SensorQueryParams(), chunk_size=10))
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        # The first and last key, then the pages
+        assert pages == [1, 1, 10, 10, 5]
+        keys = [key for chunk in chunks for key in chunk]
+        assert keys == list(sensors)
+
+    def test_exact_multiple_stops_at_last_key(self, repo, pages):
+        chunks = list(repo.export_records(IDENTIFIER, SensorQueryParams(), chunk_size=5))
+
+        assert len(chunks) == 5
+        assert pages == [1, 1, 5, 5, 5, 5, 5]
+
+    def test_date_range(self, repo):
+        params = SensorQueryParams(
+            start_date="2023-11-14 22:13:25", end_date="2023-11-14 22:13:29"
+        )
+        # Keys are epoch seconds; compute the range the same way the repo does
+        start = repo._convert_to_timestamp(params.start_date)
+        end = repo._convert_to_timestamp(params.end_date)
+
+        chunks = list(repo.export_records(IDENTIFIER, params, chunk_size=2))
+
+        keys = [int(key) for chunk in chunks for key in chunk]
+        assert keys == [key for key in range(1700000000, 1700000025) if start <= key <= end]
+
+    def test_access_checked_before_iterating(self, repo):
+        repo.workspace_access.get_ref.side_effect = ValueError("sin acceso")
+
+        with pytest.raises(ValueError):
+            repo.export_records(IDENTIFIER, SensorQueryParams())
+
+
+class TestEncoders:
+
+    def test_flatten_record(self):
+        row = flatten_record("1700000003", _record(3))
+
+        assert list(row) == EXPORT_COLUMNS
+        assert row["timestamp"] == 1700000003
+        assert row["ph"] == 7.03 and row["tds"] == 103 and row["turbidity"] is None
+        assert (row["color_r"], row["color_g"], row["color_b"]) == (3, 2, 3)
+
+    def test_ndjson(self, sensors):
+        chunks = [dict(list(sensors.items())[:10]), dict(list(sensors.items())[10:])]
+
+        data = b"".join(encode_records(chunks, ExportFormat.NDJSON)).decode()
+
+        rows = [json.loads(line) for line in data.splitlines()]
+        assert [row["timestamp"] for row in rows] == [int(key) for key in sensors]
+
+    def test_csv(self, sensors):
+        chunks = [dict(list(sensors.items())[:10]), dict(list(sensors.items())[10:])]
+
+        data = b"".join(encode_records(chunks, ExportFormat.CSV)).decode()
+
+        rows = list(csv.DictReader(io.StringIO(data)))
+        assert len(rows) == len(sensors)
+        assert list(rows[0]) == EXPORT_COLUMNS
+        assert rows[1]["tds"] == "101"
+
+    def test_arrow(self, sensors):
+        pa = pytest.importorskip("pyarrow")
+        chunks = [dict(list(sensors.items())[:10]), dict(list(sensors.items())[10:])]
+
+        data = b"".join(encode_records(chunks, ExportFormat.ARROW))
+
+        table = pa.ipc.open_stream(data).read_all()
+        assert table.num_rows == len(sensors)
+        assert table.column_names == EXPORT_COLUMNS
+        assert table.column("color_r").to_pylist()[:3] == [0.0, 1.0, 2.0]
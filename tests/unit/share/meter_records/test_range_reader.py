@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+
+import pytest
+
+from app.share.meter_records.infrastructure.range_reader import FirebaseRangeReader
+
+START = 1700000000
+
+
+class FakeSensorsRef:
+    """sensors node with order_by_key queries, optionally slow or failing."""
+
+    def __init__(self, keys: list[int], failures: int = 0, delay: float = 0.0):
+        self.data = {str(key): {"ph": {"value": key}} for key in keys}
+        self.failures = failures
+        self.delay = delay
+        self.queries: list[tuple] = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def order_by_key(self):
+        return FakeQuery(self)
+
+
+class FakeQuery:
+    def __init__(self, ref: FakeSensorsRef):
+        self.ref = ref
+        self.start = None
+        self.end = None
+        self.limit = None
+        self.last = False
+
+    def start_at(self, key):
+        self.start = int(key)
+        return self
+
+    def end_at(self, key):
+        self.end = int(key)
+        return self
+
+    def limit_to_first(self, limit):
+        self.limit = limit
+        return self
+
+    def limit_to_last(self, limit):
+        self.limit, self.last = limit, True
+        return self
+
+    def get(self):
+        ref = self.ref
+        with ref.lock:
+            ref.queries.append((self.start, self.end, self.limit, self.last))
+            ref.active += 1
+            ref.max_active = max(ref.max_active, ref.active)
+            fail = ref.failures > 0
+            ref.failures -= 1 if fail else 0
+
+        try:
+            if ref.delay:
+                time.sleep(random.uniform(0, ref.delay))
+            if fail:
+                raise ConnectionError("timeout")
+
+            keys = [
+                key
+                for key in sorted(ref.data, key=int)
+                if (self.start is None or int(key) >= self.start)
+                and (self.end is None or int(key) <= self.end)
+            ]
+            if self.limit is not None:
+                keys = keys[-self.limit :] if self.last else keys[: self.limit]
+            return {key: ref.data[key] for key in keys}
+        finally:
+            with ref.lock:
+                ref.active -= 1
+
+
+def _keys(chunks) -> list[int]:
+    return [int(key) for chunk in chunks for key in chunk]
+
+
+class TestFirebaseRangeReader:
+
+    def test_slices_cover_the_range(self):
+        reader = FirebaseRangeReader(slice_seconds=10)
+
+        assert reader.slices(START, START + 24) == [
+            (START, START + 9),
+            (START + 10, START + 19),
+            (START + 20, START + 24),
+        ]
+        assert reader.slices(START, START) == [(START, START)]
+
+    def test_ordered_with_bounded_parallelism(self):
+        keys = sorted(random.Random(0).sample(range(START, START + 5000), 800))
+        ref = FakeSensorsRef(keys, delay=0.005)
+        reader = FirebaseRangeReader(slice_seconds=100, max_workers=3, page_size=7)
+
+        chunks = list(reader.read(ref))
+
+        assert _keys(chunks) == keys
+        assert max(len(chunk) for chunk in chunks) <= 7
+        assert 1 < ref.max_active <= 3
+        reader.stop()
+
+    def test_range_is_clipped_to_its_keys(self):
+        ref = FakeSensorsRef(list(range(START + 100, START + 150)))
+        reader = FirebaseRangeReader(slice_seconds=10)
+
+        chunks = list(reader.read(ref, START, START + 10_000))
+
+        assert _keys(chunks) == list(range(START + 100, START + 150))
+        # Two edge queries and one per slice of the keys, not of the range
+        assert len(ref.queries) == 2 + 5
+
+    def test_empty_range(self):
+        ref = FakeSensorsRef([START])
+        reader = FirebaseRangeReader()
+
+        assert list(reader.read(ref, START + 1, START + 100)) == []
+        assert len(ref.queries) == 1
+
+    def test_failed_queries_are_retried(self):
+        ref = FakeSensorsRef(list(range(START, START + 30)), failures=2)
+        reader = FirebaseRangeReader(slice_seconds=10, retry_delay=0)
+
+        assert _keys(reader.read(ref)) == list(range(START, START + 30))
+
+    def test_gives_up_after_retries(self):
+        ref = FakeSensorsRef(list(range(START, START + 30)), failures=10)
+        reader = FirebaseRangeReader(retries=1, retry_delay=0)
+
+        with pytest.raises(ConnectionError):
+            list(reader.read(ref))
+
+    def test_stopping_early_cancels_pending_slices(self):
+        ref = FakeSensorsRef(list(range(START, START + 1000)))
+        reader = FirebaseRangeReader(slice_seconds=10, max_workers=2)
+
+        chunks = reader.read(ref)
+        next(chunks)
+        chunks.close()
+
+        # Edges, the slice read and at most the next window
+        assert len(ref.queries) <= 2 + 1 + 2
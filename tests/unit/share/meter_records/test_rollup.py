@@ -0,0 +1,459 @@
+from datetime import datetime, timezone
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pytest
+
+from app.share.meter_records.domain.columns import AggregateColumns, RecordColumns
+from app.share.meter_records.domain.enums import SensorType
+from app.share.meter_records.domain.model import SensorIdentifier, SensorQueryParams
+from app.share.meter_records.domain.rollup import (
+    RollupCoverage,
+    RollupGranularity,
+    bucket_end,
+    bucket_start,
+    cover_range,
+    merge_bucket,
+)
+from app.share.meter_records.domain.rollup_repository import RollupRepository
+from app.share.meter_records.infrastructure.meter_records_impl import (
+    MeterRecordsRepositoryImpl,
+)
+from app.share.meter_records.infrastructure.rollup_impl import RollupRepositoryImpl
+
+
+def _ts(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+class FakeRollupRepository(RollupRepository):
+    def __init__(self):
+        self.buckets = {granularity: {} for granularity in RollupGranularity}
+        self.since = None
+        self.until = None
+
+    def add(self, id_workspace, id_meter, timestamp, values):
+        self.since = timestamp if self.since is None else min(self.since, timestamp)
+        self.until = timestamp if self.until is None else max(self.until, timestamp)
+        for granularity, buckets in self.buckets.items():
+            key = str(bucket_start(timestamp, granularity))
+            buckets[key] = merge_bucket(buckets.get(key), values)
+
+    def add_many(self, id_workspace, id_meter, readings):
+        for timestamp, values in readings.items():
+            self.add(id_workspace, id_meter, timestamp, values)
+
+    def get_coverage(self, id_workspace, id_meter):
+        if self.since is None:
+            return None
+        return RollupCoverage(since=self.since, until=self.until)
+
+    def query(self, id_workspace, id_meter, granularity, start, end):
+        return {
+            key: bucket
+            for key, bucket in self.buckets[granularity].items()
+            if start <= int(key) < end
+        }
+
+    def backfill(self, id_workspace, id_meter):
+        return 0
+
+    def delete(self, id_workspace, id_meter):
+        pass
+
+
+class TestBuckets:
+
+    def test_bucket_start(self):
+        ts = _ts(2024, 2, 15, 13, 45, 10)
+
+        assert bucket_start(ts, RollupGranularity.HOUR) == _ts(2024, 2, 15, 13)
+        assert bucket_start(ts, RollupGranularity.DAY) == _ts(2024, 2, 15)
+        assert bucket_start(ts, RollupGranularity.MONTH) == _ts(2024, 2, 1)
+
+    def test_bucket_end_month_rollover(self):
+        assert bucket_end(_ts(2024, 12, 1), RollupGranularity.MONTH) == _ts(2025, 1, 1)
+        assert bucket_end(_ts(2024, 2, 1), RollupGranularity.MONTH) == _ts(2024, 3, 1)
+
+    def test_merge_bucket(self):
+        bucket = merge_bucket(None, {"ph": 7.0, "tds": None})
+        bucket = merge_bucket(bucket, {"ph": 9.0, "tds": 100.0})
+
+        assert bucket["ph"] == {
+            "count": 2,
+            "sum": 16.0,
+            "sum_sq": 130.0,
+            "min": 7.0,
+            "max": 9.0,
+        }
+        assert bucket["tds"]["count"] == 1
+
+
+class TestCoverRange:
+
+    def _covered(self, spans):
+        return sum(span.end - span.start for span in spans)
+
+    def test_spans_are_contiguous(self):
+        start = _ts(2024, 1, 10, 5, 30)
+        end = _ts(2024, 4, 2, 7, 15)
+
+        spans = cover_range(start, end)
+
+        assert spans[0].start == start
+        assert spans[-1].end == end
+        for previous, current in zip(spans, spans[1:]):
+            assert previous.end == current.start
+        assert self._covered(spans) == end - start
+
+    def test_uses_coarse_buckets(self):
+        spans = cover_range(_ts(2024, 1, 10, 5, 30), _ts(2024, 4, 2, 7, 15))
+        granularities = [span.granularity for span in spans]
+
+        assert granularities == [
+            None,
+            RollupGranularity.HOUR,
+            RollupGranularity.DAY,
+            RollupGranularity.MONTH,
+            RollupGranularity.DAY,
+            RollupGranularity.HOUR,
+            None,
+        ]
+
+    def test_max_granularity(self):
+        spans = cover_range(
+            _ts(2024, 1, 1), _ts(2024, 3, 1), max_granularity=RollupGranularity.DAY
+        )
+
+        assert [span.granularity for span in spans] == [RollupGranularity.DAY]
+
+    def test_short_range_is_raw(self):
+        spans = cover_range(_ts(2024, 1, 1, 10, 5), _ts(2024, 1, 1, 10, 50))
+
+        assert [span.granularity for span in spans] == [None]
+
+
+class TestQueryAggregates:
+
+    @pytest.fixture
+    def snapshot(self):
+        rng = np.random.default_rng(0)
+        start = _ts(2024, 1, 30, 22)
+        data = {}
+        for i in range(0, 4 * 24 * 60 * 60, 600):
+            value = float(rng.normal(7, 1))
+            data[str(start + i)] = {"ph": {"value": value, "datetime": ""}}
+        return data
+
+    def _repo(self, snapshot, rollup_repo):
+        repo = MeterRecordsRepositoryImpl(workspace_access=Mock(), rollup_repo=rollup_repo)
+        repo._get_meter = Mock()
+        repo._query_range = Mock(
+            side_effect=lambda meter_ref, start, end: {
+                key: value for key, value in snapshot.items() if start <= int(key) < end
+            }
+        )
+        return repo
+
+    def _daily_means(self, aggregates: AggregateColumns) -> dict[int, float]:
+        stats = aggregates.stats[SensorType.PH]
+        days = aggregates.timestamps - aggregates.timestamps % 86400
+        return {
+            int(day): stats["sum"][days == day].sum() / stats["count"][days == day].sum()
+            for day in np.unique(days)
+        }
+
+    def test_rollups_match_raw(self, snapshot):
+        rollup_repo = FakeRollupRepository()
+        for key, record in snapshot.items():
+            if int(key) >= _ts(2024, 1, 31, 3, 20):
+                rollup_repo.add("w1", "m1", int(key), {"ph": record["ph"]["value"]})
+
+        identifier = SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+        params = SensorQueryParams(
+            start_date=datetime.fromtimestamp(_ts(2024, 1, 30, 23, 10)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+            end_date=datetime.fromtimestamp(_ts(2024, 2, 3, 12, 40)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+        )
+
+        raw = self._repo(snapshot, None).query_aggregates(
+            identifier, params, RollupGranularity.DAY, [SensorType.PH]
+        )
+        mixed = self._repo(snapshot, rollup_repo).query_aggregates(
+            identifier, params, RollupGranularity.DAY, [SensorType.PH]
+        )
+
+        assert len(mixed) < len(raw)
+        assert mixed.stats[SensorType.PH]["count"].sum() == len(
+            RecordColumns.from_snapshot(
+                {
+                    k: v
+                    for k, v in snapshot.items()
+                    if _ts(2024, 1, 30, 23, 10) <= int(k) <= _ts(2024, 2, 3, 12, 40)
+                }
+            )
+        )
+
+        raw_means = self._daily_means(raw)
+        mixed_means = self._daily_means(mixed)
+        assert raw_means.keys() == mixed_means.keys()
+        for day, mean in raw_means.items():
+            assert mixed_means[day] == pytest.approx(mean)
+
+
+    def test_records_past_until_are_read_raw(self, snapshot):
+        rollup_repo = FakeRollupRepository()
+        for key, record in snapshot.items():
+            # The ingest has not added the last day yet
+            if int(key) < _ts(2024, 2, 2, 5, 30):
+                rollup_repo.add("w1", "m1", int(key), {"ph": record["ph"]["value"]})
+
+        identifier = SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+        params = SensorQueryParams(
+            start_date=datetime.fromtimestamp(_ts(2024, 1, 30, 22)).strftime(
+                "%Y-%m-%d %H:%M:%S"
+            ),
+        )
+
+        raw = self._repo(snapshot, None).query_aggregates(
+            identifier, params, RollupGranularity.DAY, [SensorType.PH]
+        )
+        mixed = self._repo(snapshot, rollup_repo).query_aggregates(
+            identifier, params, RollupGranularity.DAY, [SensorType.PH]
+        )
+
+        assert mixed.stats[SensorType.PH]["count"].sum() == len(snapshot)
+        assert self._daily_means(mixed) == pytest.approx(self._daily_means(raw))
+
+
+class FakeRef:
+    """Realtime Database reference over a dict, with keys in string order"""
+
+    def __init__(self, tree: dict, path: tuple = (), start=None, end=None):
+        self.tree = tree
+        self.path = path
+        self.start = start
+        self.end = end
+
+    def child(self, name):
+        return FakeRef(self.tree, self.path + (str(name),))
+
+    def get(self, shallow=False):
+        node = self.tree
+        for name in self.path:
+            node = node.get(name) if isinstance(node, dict) else None
+        if shallow and isinstance(node, dict):
+            return {
+                key: True if isinstance(value, dict) else value
+                for key, value in node.items()
+            }
+        if node is None or self.start is None:
+            return node
+        return {key: value for key, value in node.items() if self.start <= key <= self.end}
+
+    def set(self, value):
+        node = self.tree
+        for name in self.path[:-1]:
+            node = node.setdefault(name, {})
+        node[self.path[-1]] = value
+
+    def update(self, values: dict):
+        for path, value in values.items():
+            ref = self
+            for name in path.split("/"):
+                ref = ref.child(name)
+            ref.set(value)
+
+    def transaction(self, update):
+        value = update(self.get())
+        self.set(value)
+        return value
+
+    def order_by_key(self):
+        return self
+
+    def start_at(self, start):
+        return FakeRef(self.tree, self.path, start, self.end)
+
+    def end_at(self, end):
+        return FakeRef(self.tree, self.path, self.start, end)
+
+
+class TestRollupRepositoryImpl:
+
+    @pytest.fixture
+    def tree(self):
+        return {}
+
+    @pytest.fixture
+    def records(self):
+        """Raw readings of the meter, as written by the ingest"""
+        return {}
+
+    @pytest.fixture
+    def range_reader(self, records):
+        def read(sensors_ref, start, end):
+            # One day of records at a time
+            days: dict[int, dict] = {}
+            for timestamp, values in sorted(records.items()):
+                if (start is None or timestamp >= start) and (end is None or timestamp <= end):
+                    days.setdefault(bucket_start(timestamp, RollupGranularity.DAY), {})[
+                        str(timestamp)
+                    ] = {sensor: {"value": value} for sensor, value in values.items()}
+            return iter(days.values())
+
+        return Mock(read=Mock(side_effect=read))
+
+    @pytest.fixture
+    def repo(self, tree, range_reader):
+        RollupRepositoryImpl._coverage.clear()
+        with patch("app.share.meter_records.infrastructure.rollup_impl.db") as db:
+            db.reference.side_effect = lambda: FakeRef(tree)
+            yield RollupRepositoryImpl(range_reader=range_reader)
+
+    def _bucket(self, tree, granularity, start):
+        return tree["rollups"]["w1"]["m1"][granularity.value][str(start)]
+
+    def test_same_readings_are_counted_once(self, repo, tree, records):
+        readings = {_ts(2024, 1, 1, 10, minute): {"ph": 7.0} for minute in range(3)}
+        records.update(readings)
+
+        repo.add_many("w1", "m1", readings)
+        repo.add_many("w1", "m1", readings)
+
+        for granularity, start in [
+            (RollupGranularity.HOUR, _ts(2024, 1, 1, 10)),
+            (RollupGranularity.DAY, _ts(2024, 1, 1)),
+            (RollupGranularity.MONTH, _ts(2024, 1, 1)),
+        ]:
+            bucket = self._bucket(tree, granularity, start)
+            assert bucket["records"] == 3
+            assert bucket["ph"]["count"] == 3
+            assert bucket["ph"]["sum"] == 21.0
+
+        assert self._bucket(tree, RollupGranularity.HOUR, _ts(2024, 1, 1, 10))[
+            "last"
+        ] == _ts(2024, 1, 1, 10, 2)
+
+    def test_days_and_months_add_up_their_parts(self, repo, tree, records):
+        records[_ts(2024, 1, 1, 10)] = {"ph": 7.0}
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 10): {"ph": 7.0}})
+        repo.add_many(
+            "w1",
+            "m1",
+            {
+                # Retried together with new readings of other hours
+                _ts(2024, 1, 1, 10): {"ph": 7.0},
+                _ts(2024, 1, 1, 11): {"ph": 9.0},
+                _ts(2024, 1, 2, 8): {"ph": 5.0},
+            },
+        )
+
+        day = self._bucket(tree, RollupGranularity.DAY, _ts(2024, 1, 1))
+        month = self._bucket(tree, RollupGranularity.MONTH, _ts(2024, 1, 1))
+
+        assert day["records"] == 2
+        assert day["ph"] == {
+            "count": 2,
+            "sum": 16.0,
+            "sum_sq": 130.0,
+            "min": 7.0,
+            "max": 9.0,
+        }
+        assert month["records"] == 3
+        assert month["ph"]["min"] == 5.0
+        assert repo.get_coverage("w1", "m1") == RollupCoverage(
+            since=_ts(2024, 1, 1, 10), until=_ts(2024, 1, 2, 8)
+        )
+
+    def test_late_readings_recount_their_hour(self, repo, tree, records):
+        readings = {_ts(2024, 1, 1, 10, m): {"ph": 7.0} for m in (0, 30)}
+        records.update(readings)
+        repo.add_many("w1", "m1", readings)
+
+        # Written after a newer reading of the same hour, e.g. a dead letter
+        records.update({_ts(2024, 1, 1, 10, 5): {"ph": 3.0}})
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 10, 5): {"ph": 3.0}})
+
+        for granularity, start in [
+            (RollupGranularity.HOUR, _ts(2024, 1, 1, 10)),
+            (RollupGranularity.DAY, _ts(2024, 1, 1)),
+            (RollupGranularity.MONTH, _ts(2024, 1, 1)),
+        ]:
+            bucket = self._bucket(tree, granularity, start)
+            assert bucket["records"] == 3
+            assert bucket["ph"]["count"] == 3
+            assert bucket["ph"]["sum"] == 17.0
+            assert bucket["ph"]["min"] == 3.0
+
+        assert self._bucket(tree, RollupGranularity.HOUR, _ts(2024, 1, 1, 10))[
+            "last"
+        ] == _ts(2024, 1, 1, 10, 30)
+
+    def test_records_left_out_are_added_after_a_restart(self, repo, tree, records):
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 10): {"ph": 7.0}})
+        # Written raw, but their rollups were lost with the process
+        records.update({_ts(2024, 1, 1, 11, m): {"ph": 7.0} for m in range(2)})
+
+        RollupRepositoryImpl._coverage.clear()
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 12): {"ph": 7.0}})
+
+        assert self._bucket(tree, RollupGranularity.DAY, _ts(2024, 1, 1))["records"] == 4
+        assert repo.get_coverage("w1", "m1").until == _ts(2024, 1, 1, 12)
+
+    def test_one_update_per_call(self, repo, tree):
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 10): {"ph": 7.0}})
+        rollup_ref = Mock(wraps=FakeRef(tree).child("rollups").child("w1").child("m1"))
+        repo._get_ref = Mock(return_value=rollup_ref)
+
+        repo.add_many(
+            "w1",
+            "m1",
+            {_ts(2024, 1, day, hour): {"ph": 7.0} for day in (1, 2) for hour in range(11, 20)},
+        )
+
+        rollup_ref.update.assert_called_once()
+        # One query of the hours, the days and the months
+        assert rollup_ref.child.call_count == 3
+        assert self._bucket(tree, RollupGranularity.MONTH, _ts(2024, 1, 1))["records"] == 19
+
+    def test_readings_before_since_are_left_raw(self, repo, tree):
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 10): {"ph": 7.0}})
+        repo.add_many("w1", "m1", {_ts(2024, 1, 1, 9): {"ph": 7.0}})
+
+        assert repo.get_coverage("w1", "m1").since == _ts(2024, 1, 1, 10)
+        assert self._bucket(tree, RollupGranularity.DAY, _ts(2024, 1, 1))["records"] == 1
+
+    def test_backfill_adds_the_records_before_since(
+        self, repo, tree, range_reader, records
+    ):
+        since = _ts(2024, 1, 2, 10, 30)
+        repo.add_many("w1", "m1", {since: {"ph": 9.0}, since + 60: {"ph": 9.0}})
+        # Two days of records before since
+        records.update({_ts(2024, 1, 1, 23, m): {"ph": 7.0} for m in range(3)})
+        records.update({_ts(2024, 1, 2, 10, m): {"ph": 5.0} for m in range(2)})
+
+        assert repo.backfill("w1", "m1") == 5
+
+        assert range_reader.read.call_args.args[1:] == (None, since - 1)
+        assert repo.get_coverage("w1", "m1") == RollupCoverage(
+            since=_ts(2024, 1, 1, 23), until=since + 60
+        )
+
+        # The hour of since keeps the readings added after it
+        hour = self._bucket(tree, RollupGranularity.HOUR, _ts(2024, 1, 2, 10))
+        assert hour["records"] == 4 and hour["ph"]["min"] == 5.0
+        assert hour["last"] == since + 60
+        assert self._bucket(tree, RollupGranularity.HOUR, _ts(2024, 1, 1, 23))[
+            "last"
+        ] == _ts(2024, 1, 1, 23, 2)
+        assert self._bucket(tree, RollupGranularity.DAY, _ts(2024, 1, 1))["records"] == 3
+        assert self._bucket(tree, RollupGranularity.MONTH, _ts(2024, 1, 1))[
+            "records"
+        ] == 7
+
+        # Nothing older is left
+        assert repo.backfill("w1", "m1") == 0
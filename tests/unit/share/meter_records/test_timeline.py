@@ -0,0 +1,137 @@
+from datetime import datetime
+from unittest.mock import Mock
+
+import pytest
+
+from app.share.meter_records.domain.model import SensorIdentifier, SensorQueryParams
+from app.share.meter_records.domain.rollup import RollupGranularity
+from app.share.meter_records.infrastructure.meter_records_impl import (
+    MeterRecordsRepositoryImpl,
+)
+from tests.unit.share.meter_records.test_range_reader import FakeSensorsRef
+from tests.unit.share.meter_records.test_rollup import FakeRollupRepository, _ts
+
+IDENTIFIER = SensorIdentifier(workspace_id="w1", meter_id="m1", user_id="u1")
+HOUR = 60 * 60
+
+
+class TimelineSensorsRef(FakeSensorsRef):
+    """Also counts reads of the whole node."""
+
+    def __init__(self, keys: list[int]):
+        super().__init__(keys)
+        self.full_reads = 0
+
+    def get(self, shallow=False):
+        self.full_reads += 1
+        return {key: True for key in self.data}
+
+
+@pytest.fixture
+def keys():
+    # Every 10 minutes for 3 days, except the second day
+    start = _ts(2024, 3, 1)
+    return [
+        start + i
+        for i in range(0, 3 * 24 * HOUR, 600)
+        if not _ts(2024, 3, 2) <= start + i < _ts(2024, 3, 3)
+    ]
+
+
+def _repo(sensors_ref, rollup_repo=None) -> MeterRecordsRepositoryImpl:
+    repo = MeterRecordsRepositoryImpl(workspace_access=Mock(), rollup_repo=rollup_repo)
+    meter_ref = Mock()
+    meter_ref.child.return_value = sensors_ref
+    repo._get_meter = Mock(return_value=meter_ref)
+    return repo
+
+
+def _date(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S")
+
+
+class TestTimeline:
+
+    def _only_bounds_read(self, sensors_ref) -> bool:
+        return sensors_ref.full_reads == 0 and all(
+            limit == 1 for _, _, limit, _ in sensors_ref.queries
+        )
+
+    def test_nothing_is_counted_without_rollups(self, keys):
+        sensors_ref = TimelineSensorsRef(keys)
+
+        timeline = _repo(sensors_ref).get_timeline(IDENTIFIER, SensorQueryParams())
+
+        assert (timeline.first_key, timeline.last_key) == (keys[0], keys[-1])
+        assert timeline.counted_from is None and timeline.buckets == []
+        assert self._only_bounds_read(sensors_ref)
+
+    def test_counts_from_rollups(self, keys):
+        sensors_ref = TimelineSensorsRef(keys)
+        rollup_repo = FakeRollupRepository()
+        for key in keys:
+            rollup_repo.add("w1", "m1", key, {"ph": 7.0, "tds": 100.0})
+
+        timeline = _repo(sensors_ref, rollup_repo).get_timeline(
+            IDENTIFIER,
+            SensorQueryParams(
+                start_date=_date(_ts(2024, 3, 3, 5)), end_date=_date(_ts(2024, 3, 3, 7))
+            ),
+            RollupGranularity.HOUR,
+        )
+
+        assert timeline.first_key == _ts(2024, 3, 3, 5)
+        assert timeline.last_key == _ts(2024, 3, 3, 7)
+        # Buckets at the edges are counted whole
+        assert [(b.start, b.count) for b in timeline.buckets] == [
+            (_ts(2024, 3, 3, 5), 6),
+            (_ts(2024, 3, 3, 6), 6),
+            (_ts(2024, 3, 3, 7), 6),
+        ]
+        assert timeline.counted_from == _ts(2024, 3, 3, 5)
+        assert self._only_bounds_read(sensors_ref)
+
+    def test_records_before_the_rollups_are_not_read(self, keys):
+        sensors_ref = TimelineSensorsRef(keys)
+        rollup_repo = FakeRollupRepository()
+        for key in keys:
+            if key >= _ts(2024, 3, 1, 12):
+                rollup_repo.add("w1", "m1", key, {"ph": 7.0})
+
+        timeline = _repo(sensors_ref, rollup_repo).get_timeline(
+            IDENTIFIER, SensorQueryParams()
+        )
+
+        assert [(b.start, b.count) for b in timeline.buckets] == [
+            (_ts(2024, 3, 1), 72),
+            (_ts(2024, 3, 3), 144),
+        ]
+        assert timeline.counted_from == _ts(2024, 3, 1, 12)
+        assert self._only_bounds_read(sensors_ref)
+
+    def test_records_past_until_are_counted_from_their_keys(self, keys):
+        sensors_ref = TimelineSensorsRef(keys)
+        rollup_repo = FakeRollupRepository()
+        for key in keys:
+            # The ingest has not added the last hours yet
+            if key < _ts(2024, 3, 3, 20):
+                rollup_repo.add("w1", "m1", key, {"ph": 7.0})
+
+        timeline = _repo(sensors_ref, rollup_repo).get_timeline(
+            IDENTIFIER, SensorQueryParams()
+        )
+
+        assert [(b.start, b.count) for b in timeline.buckets] == [
+            (_ts(2024, 3, 1), 144),
+            (_ts(2024, 3, 3), 144),
+        ]
+        starts = [start for start, _, limit, _ in sensors_ref.queries if limit != 1]
+        assert starts and min(starts) >= _ts(2024, 3, 3, 19, 50)
+
+    def test_empty_range(self, keys):
+        timeline = _repo(TimelineSensorsRef(keys)).get_timeline(
+            IDENTIFIER,
+            SensorQueryParams(start_date=_date(_ts(2025, 1, 1))),
+        )
+
+        assert timeline.first_key is None and timeline.buckets == []
@@ -0,0 +1,110 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.share.reports.infrastructure.report_renderer import (
+    ThreadPoolReportRenderer,
+    iter_chunks,
+)
+
+
+class FakeGenerator:
+    """Keeps the document being built, like the real generators."""
+
+    def __init__(self):
+        self.parts: list[str] = []
+
+
+class TestThreadPoolReportRenderer:
+
+    def test_event_loop_is_not_blocked(self):
+        asyncio.run(self._event_loop_is_not_blocked())
+
+    async def _event_loop_is_not_blocked(self):
+        renderer = ThreadPoolReportRenderer(pdf_factory=FakeGenerator, max_workers=1)
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.005)
+
+        def build(pdf_gen):
+            time.sleep(0.1)
+            return b"pdf"
+
+        ticker = asyncio.create_task(tick())
+        assert await renderer.render(build) == b"pdf"
+        ticker.cancel()
+
+        assert ticks > 5
+        renderer.stop()
+
+    def test_each_report_has_its_own_generator(self):
+        asyncio.run(self._each_report_has_its_own_generator())
+
+    async def _each_report_has_its_own_generator(self):
+        renderer = ThreadPoolReportRenderer(pdf_factory=FakeGenerator, max_workers=4)
+
+        def build(name):
+            def fill(pdf_gen):
+                for i in range(20):
+                    pdf_gen.parts.append(name)
+                    time.sleep(0.001)
+                return "".join(sorted(set(pdf_gen.parts))).encode()
+
+            return fill
+
+        reports = await asyncio.gather(
+            *(renderer.render(build(name)) for name in "abcd")
+        )
+
+        assert reports == [b"a", b"b", b"c", b"d"]
+        renderer.stop()
+
+    def test_concurrent_renders_are_limited(self):
+        asyncio.run(self._concurrent_renders_are_limited())
+
+    async def _concurrent_renders_are_limited(self):
+        renderer = ThreadPoolReportRenderer(
+            pdf_factory=FakeGenerator, max_workers=2, max_queue=1
+        )
+        lock = threading.Lock()
+        active = max_active = 0
+        release = threading.Event()
+
+        def build(pdf_gen):
+            nonlocal active, max_active
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+            release.wait(1)
+            with lock:
+                active -= 1
+            return b"pdf"
+
+        renders = [asyncio.create_task(renderer.render(build)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+
+        with pytest.raises(HTTPException) as exc:
+            await renderer.render(build)
+        assert exc.value.status_code == 503
+
+        release.set()
+        assert await asyncio.gather(*renders) == [b"pdf"] * 3
+        assert max_active == 2
+        assert renderer.pending() == 0
+        renderer.stop()
+
+
+def test_iter_chunks():
+    content = bytes(range(256)) * 10
+
+    chunks = list(iter_chunks(content, chunk_size=1000))
+
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 560]
+    assert b"".join(chunks) == content
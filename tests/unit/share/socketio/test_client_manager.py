@@ -0,0 +1,76 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from socketio import AsyncManager, AsyncServer
+
+from app.share.socketio.infra.client_manager import (
+    InProcessPubSubManager,
+    create_client_manager,
+)
+
+
+def _config(message_queue: str | None) -> Mock:
+    return Mock(message_queue=message_queue, channel="test")
+
+
+async def _server(channel: str) -> AsyncServer:
+    server = AsyncServer(
+        async_mode="asgi", client_manager=InProcessPubSubManager(channel=channel)
+    )
+    server._send_eio_packet = AsyncMock()
+    server.manager_initialized = True
+    server.manager.initialize()
+    return server
+
+
+async def _subscribe(server: AsyncServer, room: str) -> None:
+    sid = await server.manager.connect("eio-1", "/subscribe/")
+    await server.manager.enter_room(sid, "/subscribe/", room)
+
+
+class TestClientManager:
+
+    def test_in_process_without_queue(self):
+        assert type(create_client_manager(_config(None))) is AsyncManager
+
+    def test_in_process_stand_in(self):
+        manager = create_client_manager(_config("memory://"))
+
+        assert isinstance(manager, InProcessPubSubManager)
+        assert manager.channel == "test"
+        manager.close()
+
+    def test_emit_reaches_the_rooms_of_other_servers(self):
+        asyncio.run(self._emit_reaches_the_rooms_of_other_servers())
+
+    async def _emit_reaches_the_rooms_of_other_servers(self):
+        # The ingest receives the record, the subscriber is on the other server
+        ingest = await _server("fan-out")
+        subscribe = await _server("fan-out")
+        await _subscribe(subscribe, "w1-m1")
+
+        await ingest.emit("message", {"ph": 7.0}, namespace="/subscribe/", room="w1-m1")
+        await asyncio.sleep(0.01)
+
+        subscribe._send_eio_packet.assert_awaited_once()
+        assert subscribe._send_eio_packet.call_args.args[0] == "eio-1"
+        ingest._send_eio_packet.assert_not_awaited()
+
+        ingest.manager.close()
+        subscribe.manager.close()
+
+    def test_channels_are_apart(self):
+        asyncio.run(self._channels_are_apart())
+
+    async def _channels_are_apart(self):
+        ingest = await _server("one")
+        subscribe = await _server("other")
+        await _subscribe(subscribe, "w1-m1")
+
+        await ingest.emit("message", {"ph": 7.0}, namespace="/subscribe/", room="w1-m1")
+        await asyncio.sleep(0.01)
+
+        subscribe._send_eio_packet.assert_not_awaited()
+
+        ingest.manager.close()
+        subscribe.manager.close()
@@ -0,0 +1,137 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock
+
+from app.share.socketio.infra.fan_out_impl import (
+    BoundedAsyncServer,
+    FanOutRepositoryImpl,
+)
+
+
+def _fan_out(**options) -> FanOutRepositoryImpl:
+    return FanOutRepositoryImpl(
+        server=Mock(emit=AsyncMock(), dropped_frames=0), namespace="/subscribe/", **options
+    )
+
+
+def _frames(fan_out: FanOutRepositoryImpl) -> list[tuple[str, str, object]]:
+    """(room, event, data) of each emitted frame"""
+    return [
+        (call.kwargs["room"], call.args[0], call.args[1])
+        for call in fan_out.server.emit.await_args_list
+    ]
+
+
+async def _publish_burst(fan_out: FanOutRepositoryImpl, room: str, count: int) -> None:
+    for i in range(count):
+        await fan_out.publish(room, [{"i": i}])
+
+
+class TestFanOut:
+
+    def test_coalesces_records_between_frames(self):
+        asyncio.run(self._coalesces_records_between_frames())
+
+    async def _coalesces_records_between_frames(self):
+        fan_out = _fan_out(rate=20)
+
+        await _publish_burst(fan_out, "w1-m1", 10)
+        # The first record goes right away, the rest wait for the next frame
+        assert _frames(fan_out) == [("w1-m1", "message", {"i": 0})]
+
+        await asyncio.sleep(0.1)
+        assert _frames(fan_out)[1] == (
+            "w1-m1",
+            "batch",
+            {"records": [{"i": i} for i in range(1, 10)]},
+        )
+        assert fan_out.metrics().frames == 2
+        assert fan_out.metrics().published == 10
+
+    def test_latest_only(self):
+        asyncio.run(self._latest_only())
+
+    async def _latest_only(self):
+        fan_out = _fan_out(rate=20, latest_only=True)
+
+        await _publish_burst(fan_out, "w1-m1", 10)
+        await asyncio.sleep(0.1)
+
+        assert _frames(fan_out) == [
+            ("w1-m1", "message", {"i": 0}),
+            ("w1-m1", "message", {"i": 9}),
+        ]
+        assert fan_out.metrics().coalesced == 8
+
+    def test_frames_keep_the_newest_records(self):
+        asyncio.run(self._frames_keep_the_newest_records())
+
+    async def _frames_keep_the_newest_records(self):
+        fan_out = _fan_out(rate=20, frame_records=3)
+
+        await fan_out.publish("w1-m1", [{"i": i} for i in range(5)])
+
+        assert _frames(fan_out) == [
+            ("w1-m1", "batch", {"records": [{"i": 2}, {"i": 3}, {"i": 4}]})
+        ]
+        assert fan_out.metrics().coalesced == 2
+
+    def test_rooms_are_limited_apart(self):
+        asyncio.run(self._rooms_are_limited_apart())
+
+    async def _rooms_are_limited_apart(self):
+        fan_out = _fan_out(rate=1)
+
+        await fan_out.publish("w1-m1", [{"i": 0}])
+        await fan_out.publish("w1-m2", [{"i": 0}])
+        await fan_out.publish("w1-m1", [{"i": 1}])
+
+        assert [(room, data) for room, _, data in _frames(fan_out)] == [
+            ("w1-m1", {"i": 0}),
+            ("w1-m2", {"i": 0}),
+        ]
+        assert fan_out.metrics().rooms_pending == 1
+
+        # Pending frames are sent on stop, without waiting for the rate
+        await fan_out.stop()
+        assert _frames(fan_out)[-1] == ("w1-m1", "message", {"i": 1})
+
+    def test_without_rate_every_record_is_sent(self):
+        asyncio.run(self._without_rate_every_record_is_sent())
+
+    async def _without_rate_every_record_is_sent(self):
+        fan_out = _fan_out(rate=0)
+
+        await _publish_burst(fan_out, "w1-m1", 5)
+
+        assert len(_frames(fan_out)) == 5
+
+
+class TestBoundedAsyncServer:
+
+    def test_drops_frames_for_slow_subscribers(self):
+        asyncio.run(self._drops_frames_for_slow_subscribers())
+
+    async def _drops_frames_for_slow_subscribers(self):
+        server = BoundedAsyncServer(
+            async_mode="asgi", dropped_namespace="/subscribe/", max_client_queue=2
+        )
+        socket = Mock(closed=False, queue=asyncio.Queue(), send=AsyncMock())
+        server.eio.sockets["eio-1"] = socket
+        for namespace in ["/subscribe/", "/receive/"]:
+            sid = await server.manager.connect("eio-1", namespace)
+            await server.manager.enter_room(sid, namespace, "w1-m1")
+
+        socket.queue.put_nowait("waiting")
+        socket.queue.put_nowait("waiting")
+
+        await server.emit("message", {"i": 0}, namespace="/subscribe/", room="w1-m1")
+        # Other namespaces are never dropped
+        await server.emit("message", {"i": 0}, namespace="/receive/", room="w1-m1")
+        assert server.dropped_frames == 1
+        assert socket.send.await_count == 1
+
+        # Reading again, it gets the next frames
+        socket.queue.get_nowait()
+        await server.emit("message", {"i": 1}, namespace="/subscribe/", room="w1-m1")
+        assert server.dropped_frames == 1
+        assert socket.send.await_count == 2
@@ -0,0 +1,266 @@
+import asyncio
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
+from app.share.socketio.domain.model import (
+    DeadLetter,
+    IngestItem,
+    RecordBody,
+    RollupReadings,
+    SRColorValue,
+)
+from app.share.socketio.infra.dead_letter_impl import (
+    MemoryDeadLetterStore,
+    SQLiteDeadLetterStore,
+)
+from app.share.socketio.infra.ingest_writer_impl import IngestWriterRepositoryImpl
+from app.share.socketio.infra.record_repo_impl import RecordRepositoryImpl
+
+
+def _record(ph: float):
+    _, record = RecordRepositoryImpl().create(
+        RecordBody(
+            color=SRColorValue(r=0, g=0, b=0),
+            conductivity=1.0,
+            ph=ph,
+            temperature=20.0,
+            tds=100.0,
+            turbidity=2.0,
+        )
+    )
+    return record
+
+
+@pytest.fixture
+def firebase():
+    with patch("app.share.socketio.infra.ingest_writer_impl.db") as db:
+        yield db.reference.return_value
+
+
+class TestIngestWriter:
+
+    def test_batch_is_one_multipath_update(self, firebase):
+        asyncio.run(self._batch_is_one_multipath_update(firebase))
+
+    async def _batch_is_one_multipath_update(self, firebase):
+        rollup_repo = Mock()
+        writer = IngestWriterRepositoryImpl(rollup_repo=rollup_repo, flush_interval=0.01)
+
+        await writer.put(
+            IngestItem(id_workspace="w1", id_meter="m1", state=MeterConnectionState.CONNECTED)
+        )
+        for i in range(3):
+            await writer.put(
+                IngestItem(
+                    id_workspace="w1",
+                    id_meter="m1",
+                    state=MeterConnectionState.SENDING_DATA,
+                    timestamp=1000 + i,
+                    record=_record(7.0 + i),
+                )
+            )
+        await writer.stop()
+
+        firebase.update.assert_called_once()
+        updates = firebase.update.call_args.args[0]
+        assert updates["workspaces/w1/meters/m1/state"] == "sending_data"
+        assert updates["workspaces/w1/meters/m1/sensors/1002"]["ph"]["value"] == 9.0
+        assert len(updates) == 4
+
+        rollup_repo.add_many.assert_called_once()
+        id_workspace, id_meter, readings = rollup_repo.add_many.call_args.args
+        assert (id_workspace, id_meter) == ("w1", "m1")
+        assert [values["ph"] for values in readings.values()] == [7.0, 8.0, 9.0]
+
+        metrics = writer.metrics()
+        assert metrics.received == 4
+        assert metrics.written == 4
+        assert metrics.batches == 1
+        assert metrics.queue_depth == 0
+        assert metrics.last_flush_latency is not None
+
+    def test_last_state_wins(self, firebase):
+        asyncio.run(self._last_state_wins(firebase))
+
+    async def _last_state_wins(self, firebase):
+        writer = IngestWriterRepositoryImpl(flush_interval=0.01)
+
+        await writer.put(
+            IngestItem(
+                id_workspace="w1",
+                id_meter="m1",
+                state=MeterConnectionState.SENDING_DATA,
+                timestamp=1000,
+                record=_record(7.0),
+            )
+        )
+        await writer.put(
+            IngestItem(
+                id_workspace="w1", id_meter="m1", state=MeterConnectionState.DISCONNECTED
+            )
+        )
+        await writer.stop()
+
+        updates = firebase.update.call_args.args[0]
+        assert updates["workspaces/w1/meters/m1/state"] == "disconnected"
+
+    def test_back_pressure(self, firebase):
+        asyncio.run(self._back_pressure(firebase))
+
+    async def _back_pressure(self, firebase):
+        writer = IngestWriterRepositoryImpl(max_queue=2, max_batch=2, flush_interval=0.05)
+
+        for i in range(6):
+            await asyncio.wait_for(
+                writer.put(
+                    IngestItem(
+                        id_workspace="w1",
+                        id_meter="m1",
+                        timestamp=1000 + i,
+                        record=_record(7.0),
+                    )
+                ),
+                timeout=1,
+            )
+            assert writer.metrics().queue_depth <= 2
+        await writer.stop()
+
+        assert writer.metrics().written == 6
+        assert firebase.update.call_count >= 3
+
+    def test_failed_batch_is_kept_as_dead_letter(self, firebase):
+        asyncio.run(self._failed_batch_is_kept_as_dead_letter(firebase))
+
+    async def _failed_batch_is_kept_as_dead_letter(self, firebase):
+        firebase.update.side_effect = Exception("unavailable")
+        rollup_repo = Mock()
+        writer = IngestWriterRepositoryImpl(
+            rollup_repo=rollup_repo, flush_interval=0.001, max_retries=2
+        )
+
+        await writer.put(
+            IngestItem(
+                id_workspace="w1",
+                id_meter="m1",
+                state=MeterConnectionState.SENDING_DATA,
+                timestamp=1000,
+                record=_record(7.0),
+            )
+        )
+        await writer.stop()
+
+        assert firebase.update.call_count == 2
+        rollup_repo.add_many.assert_not_called()
+        metrics = writer.metrics()
+        assert metrics.failed_batches == 1
+        assert metrics.dropped == 0
+        assert metrics.written == 0
+        assert metrics.dead_letters == 1
+
+        [(_, letter)] = writer.dead_letters.peek(10)
+        # The state is left out, a later write carries a newer one
+        assert list(letter.updates) == ["workspaces/w1/meters/m1/sensors/1000"]
+        assert letter.rollups[0].readings[1000]["ph"] == 7.0
+
+    def test_dead_letters_are_written_again(self, firebase):
+        asyncio.run(self._dead_letters_are_written_again(firebase))
+
+    async def _dead_letters_are_written_again(self, firebase):
+        firebase.update.side_effect = [Exception("unavailable"), None, None]
+        rollup_repo = Mock()
+        writer = IngestWriterRepositoryImpl(
+            rollup_repo=rollup_repo,
+            flush_interval=0.001,
+            max_retries=1,
+            retry_interval=0.05,
+        )
+
+        await writer.put(
+            IngestItem(
+                id_workspace="w1", id_meter="m1", timestamp=1000, record=_record(7.0)
+            )
+        )
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if writer.metrics().replayed:
+                break
+        await writer.stop()
+
+        metrics = writer.metrics()
+        assert metrics.replayed == 1
+        assert metrics.dead_letters == 0
+        assert "workspaces/w1/meters/m1/sensors/1000" in firebase.update.call_args.args[0]
+        rollup_repo.add_many.assert_called_once()
+
+    def test_failed_rollups_do_not_hold_back_records(self, firebase):
+        asyncio.run(self._failed_rollups_do_not_hold_back_records(firebase))
+
+    async def _failed_rollups_do_not_hold_back_records(self, firebase):
+        rollup_repo = Mock()
+        rollup_repo.add_many.side_effect = Exception("unavailable")
+        writer = IngestWriterRepositoryImpl(
+            rollup_repo=rollup_repo, flush_interval=0.001, max_retries=2
+        )
+
+        for i in range(3):
+            await writer.put(
+                IngestItem(
+                    id_workspace="w1",
+                    id_meter="m1",
+                    timestamp=1000 + i,
+                    record=_record(7.0),
+                )
+            )
+            await asyncio.sleep(0.01)
+        await writer.stop()
+
+        metrics = writer.metrics()
+        assert metrics.written == 3
+        assert metrics.failed_rollups >= 1
+        readings = {
+            timestamp
+            for _, letter in writer.dead_letters.peek(10)
+            for item in letter.rollups
+            for timestamp in item.readings
+        }
+        assert readings == {1000, 1001, 1002}
+        assert all(not letter.updates for _, letter in writer.dead_letters.peek(10))
+
+
+class TestDeadLetterStore:
+
+    @pytest.fixture(params=["memory", "sqlite"])
+    def store(self, request, tmp_path):
+        if request.param == "memory":
+            return MemoryDeadLetterStore()
+        return SQLiteDeadLetterStore(str(tmp_path / "dead_letters.db"))
+
+    def test_oldest_first_until_removed(self, store):
+        for i in range(3):
+            store.put(DeadLetter(updates={f"path/{i}": i}))
+
+        letters = store.peek(2)
+        assert [letter.updates for _, letter in letters] == [{"path/0": 0}, {"path/1": 1}]
+
+        store.remove(letters[0][0])
+
+        assert store.count() == 2
+        assert store.peek(10)[0][1].updates == {"path/1": 1}
+
+    def test_sqlite_letters_survive_a_restart(self, tmp_path):
+        path = str(tmp_path / "dead_letters.db")
+        SQLiteDeadLetterStore(path).put(
+            DeadLetter(
+                rollups=[
+                    RollupReadings(
+                        id_workspace="w1", id_meter="m1", readings={1000: {"ph": 7.0}}
+                    )
+                ]
+            )
+        )
+
+        [(_, letter)] = SQLiteDeadLetterStore(path).peek(10)
+
+        assert letter.rollups[0].readings == {1000: {"ph": 7.0}}
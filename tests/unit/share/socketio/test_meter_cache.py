@@ -0,0 +1,98 @@
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.share.jwt.domain.payload import MeterPayload
+from app.share.socketio.domain.enum.meter_connection_state import MeterConnectionState
+from app.share.socketio.infra.meter_cache_impl import MeterCacheRepositoryImpl
+from app.share.socketio.infra.record_repo_impl import RecordRepositoryImpl
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    MeterCacheRepositoryImpl.meters.clear()
+    MeterCacheRepositoryImpl.expires.clear()
+    yield
+    MeterCacheRepositoryImpl.meters.clear()
+    MeterCacheRepositoryImpl.expires.clear()
+
+
+@pytest.fixture
+def meter_ref():
+    with patch("app.share.socketio.infra.meter_cache_impl.db") as db:
+        yield db.reference.return_value
+
+
+class TestMeterCache:
+
+    def test_load_uses_shallow_read(self, meter_ref):
+        meter_ref.get.return_value = {"name": "m", "sensors": True, "state": "connected"}
+
+        assert MeterCacheRepositoryImpl.load("w1", "m1") is True
+
+        meter_ref.get.assert_called_once_with(shallow=True)
+        assert MeterCacheRepositoryImpl.meters[("w1", "m1")] == (
+            MeterConnectionState.CONNECTED
+        )
+
+    def test_load_missing_meter(self, meter_ref):
+        meter_ref.get.return_value = None
+
+        assert MeterCacheRepositoryImpl.load("w1", "m1") is False
+        assert not MeterCacheRepositoryImpl.is_cached("w1", "m1")
+
+    def test_state_written_only_on_transitions(self, meter_ref):
+        meter_ref.get.return_value = {"state": "disconnected"}
+        MeterCacheRepositoryImpl.load("w1", "m1")
+
+        changes = [
+            MeterCacheRepositoryImpl.set_state("w1", "m1", state)
+            for state in [
+                MeterConnectionState.CONNECTED,
+                MeterConnectionState.SENDING_DATA,
+                MeterConnectionState.SENDING_DATA,
+                MeterConnectionState.SENDING_DATA,
+                MeterConnectionState.DISCONNECTED,
+            ]
+        ]
+
+        assert changes == [True, True, False, False, True]
+
+    def test_invalidate_workspace(self, meter_ref):
+        meter_ref.get.return_value = {"state": "connected"}
+        for key in [("w1", "m1"), ("w1", "m2"), ("w2", "m1")]:
+            MeterCacheRepositoryImpl.load(*key)
+
+        MeterCacheRepositoryImpl.invalidate("w1")
+
+        assert list(MeterCacheRepositoryImpl.meters) == [("w2", "m1")]
+
+    def test_check_meter_does_not_read_cached_meter(self, meter_ref):
+        meter_ref.get.return_value = {"state": "connected"}
+        repo = RecordRepositoryImpl(meter_cache=MeterCacheRepositoryImpl())
+        payload = MeterPayload(id_workspace="w1", owner="u1", id_meter="m1")
+
+        for _ in range(5):
+            repo.check_meter(payload)
+
+        assert meter_ref.get.call_count == 1
+
+    def test_deleted_meter_is_rejected_after_ttl(self, meter_ref):
+        meter_ref.get.return_value = {"state": "connected"}
+        repo = RecordRepositoryImpl(meter_cache=MeterCacheRepositoryImpl())
+        payload = MeterPayload(id_workspace="w1", owner="u1", id_meter="m1")
+        repo.check_meter(payload)
+
+        # Deleted through another process, which can't invalidate this cache
+        meter_ref.get.return_value = None
+        repo.check_meter(payload)
+
+        with patch(
+            "app.share.socketio.infra.meter_cache_impl.time.monotonic",
+            return_value=time.monotonic() + MeterCacheRepositoryImpl.ttl + 1,
+        ):
+            with pytest.raises(Exception, match="No existe el sensor"):
+                repo.check_meter(payload)
+
+        assert not MeterCacheRepositoryImpl.is_cached("w1", "m1")
@@ -0,0 +1,212 @@
+import asyncio
+import time
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+from pydantic import ValidationError
+
+from app.share.jwt.domain.payload import MeterPayload
+from app.share.socketio.domain.model import (
+    MAX_BATCH_RECORDS,
+    MAX_READING_AGE,
+    IngestItem,
+    RecordBatchBody,
+)
+from app.share.socketio.infra.ingest_writer_impl import IngestWriterRepositoryImpl
+from app.share.socketio.infra.record_repo_impl import RecordRepositoryImpl
+from app.share.socketio.infra.session_repo_impl import SessionSocketIORepositoryImpl
+from tests.unit.share.socketio.test_ingest_writer import firebase  # noqa: F401
+
+NOW = int(time.time())
+
+
+def _reading(timestamp: float, ph: float = 7.0) -> dict:
+    return {
+        "timestamp": timestamp,
+        "color": {"r": 0, "g": 0, "b": 0},
+        "conductivity": 1.0,
+        "ph": ph,
+        "temperature": 20.0,
+        "tds": 100.0,
+        "turbidity": 2.0,
+    }
+
+
+class TestRecordBatchBody:
+
+    def test_limits(self):
+        with pytest.raises(ValidationError):
+            RecordBatchBody(records=[])
+        with pytest.raises(ValidationError):
+            RecordBatchBody(records=[_reading(NOW)] * (MAX_BATCH_RECORDS + 1))
+
+    def test_rejects_invalid_readings_one_by_one(self):
+        batch = RecordBatchBody(
+            records=[
+                _reading(NOW),
+                _reading(NOW + 3600),
+                _reading(0),
+                _reading(NOW - MAX_READING_AGE - 60),
+                {"timestamp": NOW},
+            ]
+        )
+
+        assert [record.timestamp for record in batch.records] == [NOW]
+        assert [rejected.index for rejected in batch.rejected] == [1, 2, 3, 4]
+        assert "futura" in batch.rejected[0].error
+        assert "antigua" in batch.rejected[2].error
+
+    def test_accepts_old_readings(self):
+        # Backfill after an outage
+        batch = RecordBatchBody(records=[_reading(NOW - 7 * 24 * 3600)])
+
+        assert len(batch.records) == 1 and batch.rejected == []
+
+
+class TestCreateMany:
+
+    def test_records_by_second_in_time_order(self):
+        batch = RecordBatchBody(
+            records=[
+                _reading(NOW + 0.9, ph=9.0),
+                _reading(NOW - 1.5, ph=6.0),
+                _reading(NOW + 0.1, ph=7.0),
+                _reading(NOW + 0.5, ph=8.0),
+            ]
+        )
+
+        records = RecordRepositoryImpl().create_many(batch)
+
+        assert list(records) == [NOW - 2, NOW]
+        # The last reading of the second is kept
+        assert [record.ph.value for record in records.values()] == [6.0, 8.0]
+        assert records[NOW].ph.datetime.timestamp() == pytest.approx(NOW + 0.5)
+
+
+class TestBatchIngest:
+
+    def test_batch_is_one_update(self, firebase):
+        asyncio.run(self._batch_is_one_update(firebase))
+
+    async def _batch_is_one_update(self, firebase):
+        rollup_repo = Mock()
+        # Larger than a flush, written together anyway
+        writer = IngestWriterRepositoryImpl(
+            rollup_repo=rollup_repo, max_batch=10, flush_interval=0.01
+        )
+        batch = RecordBatchBody(
+            records=[_reading(NOW - 600 + i, ph=i / 100) for i in range(600)]
+        )
+
+        await writer.put(
+            IngestItem(
+                id_workspace="w1",
+                id_meter="m1",
+                records=RecordRepositoryImpl().create_many(batch),
+            )
+        )
+        await writer.stop()
+
+        firebase.update.assert_called_once()
+        updates = firebase.update.call_args.args[0]
+        assert len(updates) == 600
+        assert updates[f"workspaces/w1/meters/m1/sensors/{NOW - 1}"]["ph"]["value"] == 5.99
+
+        _, _, readings = rollup_repo.add_many.call_args.args
+        assert len(readings) == 600
+
+
+class TestReceiveBatch:
+
+    def test_one_write_one_publish_one_check(self):
+        asyncio.run(self._one_write_one_publish_one_check())
+
+    async def _one_write_one_publish_one_check(self):
+        import app.share.socketio as socket_layer
+
+        payload = MeterPayload(id_workspace="w1", owner="u1", id_meter="m1")
+        writer, sender, fan_out = AsyncMock(), AsyncMock(), AsyncMock()
+        meter_cache = Mock(is_cached=Mock(return_value=True), set_state=Mock(return_value=False))
+
+        with (
+            patch.object(
+                socket_layer, "meter_sessions", Mock(get_local=Mock(return_value=payload))
+            ),
+            patch.object(socket_layer, "meter_cache", meter_cache),
+            patch.object(socket_layer, "ingest_writer", writer),
+            patch.object(socket_layer, "sender", sender),
+            patch.object(socket_layer, "fan_out", fan_out),
+        ):
+            await socket_layer.receive_batch(
+                "sid-1", {"records": [_reading(NOW - i) for i in range(50)]}
+            )
+
+        item = writer.put.await_args.args[0]
+        assert writer.put.await_count == 1 and len(item.records) == 50
+
+        room, records = fan_out.publish.await_args.args
+        assert fan_out.publish.await_count == 1
+        assert room == "w1-m1" and len(records) == 50
+        assert records[0]["ph"]["datetime"] < records[-1]["ph"]["datetime"]
+
+        assert len(sender.send_alerts_many.await_args.kwargs["records"]) == 50
+
+    def test_rejected_readings_are_acknowledged(self):
+        asyncio.run(self._rejected_readings_are_acknowledged())
+
+    async def _rejected_readings_are_acknowledged(self):
+        import app.share.socketio as socket_layer
+
+        payload = MeterPayload(id_workspace="w1", owner="u1", id_meter="m1")
+        writer = AsyncMock()
+        meter_cache = Mock(is_cached=Mock(return_value=True), set_state=Mock(return_value=False))
+
+        with (
+            patch.object(
+                socket_layer, "meter_sessions", Mock(get_local=Mock(return_value=payload))
+            ),
+            patch.object(socket_layer, "meter_cache", meter_cache),
+            patch.object(socket_layer, "ingest_writer", writer),
+            patch.object(socket_layer, "sender", AsyncMock()),
+            patch.object(socket_layer, "fan_out", AsyncMock()),
+        ):
+            partial = await socket_layer.receive_batch(
+                "sid-1", {"records": [_reading(NOW), _reading(-1)]}
+            )
+            none = await socket_layer.receive_batch(
+                "sid-1", {"records": [_reading(NOW + 3600)]}
+            )
+
+        assert partial == {
+            "accepted": 1,
+            "rejected": [{"index": 1, "error": partial["rejected"][0]["error"]}],
+        }
+        assert none["accepted"] == 0 and len(none["rejected"]) == 1
+        # Only the valid reading is written
+        assert writer.put.await_count == 1
+        assert list(writer.put.await_args.args[0].records) == [NOW]
+
+    def test_unknown_connection_is_closed(self):
+        asyncio.run(self._unknown_connection_is_closed())
+
+    async def _unknown_connection_is_closed(self):
+        import app.share.socketio as socket_layer
+
+        store = Mock(get=Mock(return_value=None))
+        sessions = SessionSocketIORepositoryImpl(store, "meter", MeterPayload)
+        writer, sio = AsyncMock(), AsyncMock()
+
+        with (
+            patch.object(socket_layer, "meter_sessions", sessions),
+            patch.object(socket_layer, "ingest_writer", writer),
+            patch.object(socket_layer, "sio", sio),
+        ):
+            await socket_layer.receive_message("sid-1", None)
+            await socket_layer.receive_batch("sid-1", {"records": [_reading(NOW)]})
+
+        assert sio.disconnect.await_count == 2
+        sio.disconnect.assert_awaited_with("sid-1", namespace="/receive/")
+        sio.emit.assert_not_awaited()
+        writer.put.assert_not_awaited()
+        # The session of a connection is never looked up in the store
+        store.get.assert_not_called()
@@ -0,0 +1,163 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from app.share.jwt.domain.payload import MeterPayload
+from app.share.socketio.infra.session_keeper import SessionKeeper
+from app.share.socketio.infra.session_repo_impl import SessionSocketIORepositoryImpl
+from app.share.socketio.infra.session_store_impl import (
+    MemorySessionStore,
+    SQLiteSessionStore,
+    create_session_store,
+)
+
+
+def _meter(id_meter: str) -> MeterPayload:
+    return MeterPayload(id_workspace="w1", owner="u1", id_meter=id_meter)
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionStore()
+    return SQLiteSessionStore(str(tmp_path / "sessions.db"))
+
+
+class TestSessionStore:
+
+    def test_put_get_delete(self, store):
+        store.put({"meter:a": "A", "user:a": "U"}, expires_at=100)
+
+        assert store.get("meter:a") == "A"
+        assert sorted(store.values("meter:")) == ["A"]
+
+        store.delete("meter:a")
+        assert store.get("meter:a") is None
+
+    def test_renew_reports_missing(self, store):
+        store.put({"meter:a": "A"}, expires_at=100)
+
+        assert store.renew(["meter:a", "meter:b"], expires_at=200) == ["meter:b"]
+        assert store.pop_expired("meter:", now=150) == []
+        assert store.get("meter:b") is None
+
+    def test_pop_expired_by_prefix(self, store):
+        store.put({"meter:a": "A", "meter:b": "B", "user:a": "U"}, expires_at=100)
+        store.put({"meter:c": "C"}, expires_at=300)
+
+        assert sorted(store.pop_expired("meter:", now=200)) == ["A", "B"]
+        assert store.pop_expired("meter:", now=200) == []
+        assert store.get("user:a") == "U"
+        assert store.get("meter:c") == "C"
+
+
+class TestSQLiteSessionStore:
+
+    def test_shared_by_processes(self, tmp_path):
+        path = str(tmp_path / "sessions.db")
+        first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+
+        first.put({"meter:a": "A"}, expires_at=100)
+
+        assert second.get("meter:a") == "A"
+        # Only one of them gets each expired session
+        assert second.pop_expired("meter:", now=200) == ["A"]
+        assert first.pop_expired("meter:", now=200) == []
+
+    def test_create_from_url(self, tmp_path):
+        config = Mock(session_store=f"sqlite:///{tmp_path / 'sessions.db'}")
+
+        assert isinstance(create_session_store(config), SQLiteSessionStore)
+        assert isinstance(create_session_store(Mock(session_store=None)), MemorySessionStore)
+
+
+class TestSessionRepository:
+
+    def _sessions(self, store, ttl=60) -> SessionSocketIORepositoryImpl[MeterPayload]:
+        return SessionSocketIORepositoryImpl(store, kind="meter", model=MeterPayload, ttl=ttl)
+
+    def test_sessions_of_other_processes(self, store):
+        self._sessions(store).add("sid-1", _meter("m1"))
+
+        other = self._sessions(store)
+        assert other.get("sid-1") == _meter("m1")
+        assert other.delete("sid-1") == _meter("m1")
+        assert other.get("sid-1") is None
+
+    def test_own_sessions_are_read_from_memory(self):
+        store = Mock(wraps=MemorySessionStore())
+        sessions = self._sessions(store)
+        sessions.add("sid-1", _meter("m1"))
+
+        assert sessions.get("sid-1") == _meter("m1")
+        store.get.assert_not_called()
+
+    def test_expire_without_heartbeat(self, store):
+        stopped = self._sessions(store, ttl=-1)
+        stopped.add("sid-1", _meter("m1"))
+
+        assert self._sessions(store).pop_expired() == [_meter("m1")]
+        assert self._sessions(store).pop_expired() == []
+
+    def test_heartbeat_adds_lost_sessions_again(self, store):
+        sessions = self._sessions(store, ttl=-1)
+        sessions.add("sid-1", _meter("m1"))
+        sessions.add("sid-2", _meter("m2"))
+        # Popped by another process while this one stalled
+        store.pop_expired("meter:sid-1", now=1e12)
+
+        sessions.ttl = 60
+        assert sessions.heartbeat() == [_meter("m1")]
+        assert sessions.heartbeat() == []
+        assert self._sessions(store).get("sid-1") == _meter("m1")
+
+
+class TestSessionKeeper:
+
+    def test_reconciles_at_start_and_renews(self):
+        asyncio.run(self._reconciles_at_start_and_renews())
+
+    async def _reconciles_at_start_and_renews(self):
+        store = MemorySessionStore()
+        # Left by a process that stopped
+        SessionSocketIORepositoryImpl(store, "meter", MeterPayload, ttl=-1).add(
+            "old", _meter("m1")
+        )
+        sessions = SessionSocketIORepositoryImpl(store, "meter", MeterPayload, ttl=60)
+        sessions.add("sid-1", _meter("m2"))
+        on_expired, on_lost = AsyncMock(), AsyncMock()
+
+        keeper = SessionKeeper(sessions, on_expired, on_lost, interval=0.01)
+        await keeper.start()
+        await asyncio.sleep(0.05)
+        await keeper.stop()
+
+        on_expired.assert_awaited_once_with([_meter("m1")])
+        on_lost.assert_not_awaited()
+        assert sessions.get("sid-1") == _meter("m2")
+
+
+class TestExpiredMeters:
+
+    def test_reconnected_meters_keep_their_state(self):
+        asyncio.run(self._reconnected_meters_keep_their_state())
+
+    async def _reconnected_meters_keep_their_state(self):
+        import app.share.socketio as socket_layer
+
+        sessions = SessionSocketIORepositoryImpl(MemorySessionStore(), "meter", MeterPayload)
+        # m2 connected again to another process
+        sessions.add("new", _meter("m2"))
+        writer = AsyncMock()
+
+        with (
+            patch.object(socket_layer, "meter_sessions", sessions),
+            patch.object(socket_layer, "ingest_writer", writer),
+        ):
+            await socket_layer._expired_sessions([_meter("m1"), _meter("m2")])
+
+        items = [call.args[0] for call in writer.put.await_args_list]
+        assert [(item.id_meter, item.state.value) for item in items] == [
+            ("m1", "disconnected")
+        ]
@@ -0,0 +1,105 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from app.share.users.domain.model.user import UserData, UserUpdate
+from app.share.users.infra.cached_users_repo_impl import CachedUserRepository
+
+
+def _user(uid: str) -> UserData:
+    return UserData(
+        uid=uid, username=uid, email=f"{uid}@mail.com", phone="+521234567890", rol="client"
+    )
+
+
+@pytest.fixture
+def inner():
+    repo = Mock()
+    repo.get_by_uid.side_effect = lambda uid, limit_data=False: (
+        None if uid == "missing" else _user(uid)
+    )
+    repo.get_by_uids.side_effect = lambda uids, limit_data=False: {
+        uid: _user(uid) for uid in uids if uid != "missing"
+    }
+    repo.update_user.side_effect = lambda uid, user: _user(uid)
+    return repo
+
+
+@pytest.fixture
+def repo(inner):
+    CachedUserRepository.clear()
+    yield CachedUserRepository(user_repo=inner)
+    CachedUserRepository.clear()
+
+
+class TestCachedUserRepository:
+
+    def test_get_by_uid_is_cached(self, repo, inner):
+        for _ in range(5):
+            assert repo.get_by_uid("u1").email == "u1@mail.com"
+
+        assert inner.get_by_uid.call_count == 1
+        metrics = repo.metrics()
+        assert (metrics.hits, metrics.misses, metrics.size) == (4, 1, 1)
+
+    def test_limited_lookup_uses_full_entry(self, repo, inner):
+        repo.get_by_uid("u1")
+
+        limited = repo.get_by_uid("u1", limit_data=True)
+
+        assert limited.phone is None and limited.rol is None
+        assert inner.get_by_uid.call_count == 1
+
+        # A limited entry never answers a full lookup
+        repo.get_by_uid("u2", limit_data=True)
+        repo.get_by_uid("u2")
+        assert inner.get_by_uid.call_count == 3
+
+    def test_not_found_is_cached(self, repo, inner):
+        assert repo.get_by_uid("missing") is None
+        assert repo.get_by_uid("missing") is None
+
+        assert inner.get_by_uid.call_count == 1
+
+    def test_get_by_uids_only_loads_missing(self, repo, inner):
+        repo.get_by_uid("u1", limit_data=True)
+
+        users = repo.get_by_uids(["u1", "u2", "missing", "u2"], limit_data=True)
+
+        assert set(users) == {"u1", "u2"}
+        inner.get_by_uids.assert_called_once_with(["u2", "missing"], limit_data=True)
+
+        repo.get_by_uids(["u1", "u2", "missing"], limit_data=True)
+        assert inner.get_by_uids.call_count == 1
+
+    def test_update_invalidates(self, repo, inner):
+        repo.get_by_uid("u1")
+        repo.update_user("u1", UserUpdate(username="new"))
+        repo.get_by_uid("u1")
+
+        assert inner.get_by_uid.call_count == 2
+
+    def test_ttl(self, repo, inner):
+        with patch(
+            "app.share.users.infra.cached_users_repo_impl.time.monotonic"
+        ) as monotonic:
+            monotonic.return_value = 1000.0
+            repo.get_by_uid("u1")
+
+            monotonic.return_value = 1000.0 + CachedUserRepository.ttl + 1
+            repo.get_by_uid("u1")
+
+        assert inner.get_by_uid.call_count == 2
+
+    def test_lru_eviction(self, repo, inner):
+        with patch.object(CachedUserRepository, "max_size", 2):
+            repo.get_by_uid("u1")
+            repo.get_by_uid("u2")
+            repo.get_by_uid("u1")
+            repo.get_by_uid("u3")  # Evicts u2, the least recently used
+
+            repo.get_by_uid("u1")
+            repo.get_by_uid("u2")
+
+        assert [c.args[0] for c in inner.get_by_uid.call_args_list] == ["u1", "u2", "u3", "u2"]
+        assert repo.metrics().evictions == 2
@@ -0,0 +1,119 @@
+import contextvars
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app.share.users.domain.model.user import UserData
+from app.share.workspace.auth_context import WorkspaceAuthContext
+from app.share.workspace.domain.model import WorkspaceRoles, WorkspaceRolesAll
+from app.share.workspace.workspace_access import WorkspaceAccess
+
+
+@pytest.fixture
+def workspaces():
+    return {
+        "w1": {
+            "owner": "owner",
+            "type": "private",
+            "name": "Workspace",
+            "meters": {"m1": {"sensors": {str(i): {} for i in range(1000)}}},
+            "guests": {"guest": {"rol": "manager"}},
+        }
+    }
+
+
+@pytest.fixture
+def firebase(workspaces):
+    """Workspace refs by path, each read is counted by the mocks."""
+    refs: dict[tuple, Mock] = {}
+
+    def child(path: tuple):
+        if path not in refs:
+            ref = Mock()
+            ref.key = path[-1]
+            ref.child.side_effect = lambda name: child(path + (name,))
+
+            def get(path=path, shallow=False):
+                node = {"workspaces": workspaces}
+                for name in path:
+                    node = node.get(name) if isinstance(node, dict) else None
+                if shallow and isinstance(node, dict):
+                    return {
+                        key: True if isinstance(value, dict) else value
+                        for key, value in node.items()
+                    }
+                return node
+
+            ref.get.side_effect = get
+            refs[path] = ref
+        return refs[path]
+
+    root = Mock()
+    root.child.side_effect = lambda name: child((name,))
+
+    with patch("app.share.workspace.auth_context.db") as db, patch(
+        "app.share.workspace.workspace_access.db"
+    ) as access_db:
+        db.reference.return_value = root
+        access_db.reference.return_value = root
+        yield refs
+
+
+@pytest.fixture
+def access():
+    user_repo = Mock()
+    user_repo.get_by_uid.side_effect = lambda uid, limit_data=False: UserData(
+        uid=uid, username=uid, email=f"{uid}@mail.com", rol="client"
+    )
+    return WorkspaceAccess(user_repo=user_repo)
+
+
+def _in_request(fn):
+    """Run fn as a request would, with its own authorization context."""
+
+    def run():
+        WorkspaceAuthContext.start()
+        return fn()
+
+    return contextvars.copy_context().run(run)
+
+
+class TestWorkspaceAuthContext:
+
+    def test_one_shallow_read(self, firebase, access):
+        workspace_ref = _in_request(lambda: access.get_ref("w1", "owner"))
+
+        assert workspace_ref.rol == WorkspaceRolesAll.OWNER
+        firebase[("workspaces", "w1")].get.assert_called_once_with(shallow=True)
+        assert ("workspaces", "w1", "owner") not in firebase
+        assert ("workspaces", "w1", "type") not in firebase
+
+    def test_memoized_within_request(self, firebase, access):
+        def checks():
+            for _ in range(3):
+                ref = access.get_ref("w1", "guest", roles=[WorkspaceRoles.MANAGER])
+                assert ref.rol == WorkspaceRoles.MANAGER
+
+        _in_request(checks)
+
+        assert firebase[("workspaces", "w1")].get.call_count == 1
+        assert firebase[("workspaces", "w1", "guests", "guest", "rol")].get.call_count == 1
+
+    def test_each_request_reads_again(self, firebase, access):
+        _in_request(lambda: access.get_ref("w1", "owner"))
+        _in_request(lambda: access.get_ref("w1", "owner"))
+
+        assert firebase[("workspaces", "w1")].get.call_count == 2
+
+    def test_no_memo_outside_request(self, firebase, access):
+        access.get_ref("w1", "owner")
+        access.get_ref("w1", "owner")
+
+        assert firebase[("workspaces", "w1")].get.call_count == 2
+
+    def test_missing_workspace(self, firebase, access):
+        with pytest.raises(HTTPException) as error:
+            _in_request(lambda: access.get_ref("w2", "owner"))
+
+        assert error.value.status_code == 404
@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# Loaded on first use, never when the app starts
+HEAVY_MODULES = ["pandas", "matplotlib", "fpdf", "pydantic_ai", "openai", "onesignal", "sklearn"]
+
+
+def _import_app(profile: str, module: str = "app.api") -> dict[str, tuple[int, int]]:
+    """Modules imported by the app module, with their self and cumulative µs"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        env={**os.environ, "APP_PROFILE": profile, "SKIP_FIREBASE_INIT": "true"},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        if own.strip().isdigit():
+            modules[name.strip()] = (int(own), int(cumulative))
+    return modules
+
+
+def _report(profile: str, modules: dict[str, tuple[int, int]], module: str = "app.api") -> str:
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:10]
+    lines = [f"import {module} ({profile}): {modules[module][1] / 1e6:.2f}s"]
+    lines += [f"  {cumulative / 1e3:8.1f} ms  {name}" for name, (_, cumulative) in slowest]
+    return "\n".join(lines)
+
+
+@pytest.mark.slow
+class TestImportTime:
+
+    @pytest.mark.parametrize("profile", ["full", "ingest"])
+    def test_heavy_stacks_are_not_loaded(self, profile):
+        modules = _import_app(profile)
+        print(_report(profile, modules))
+
+        assert [name for name in HEAVY_MODULES if name in modules] == []
+
+    def test_ingest_profile_has_no_analysis(self):
+        modules = _import_app("ingest")
+
+        assert not any(name.startswith("app.features.analysis") for name in modules)
+
+    def test_ingest_app_has_no_api(self):
+        modules = _import_app("full", "app.ingest")
+        print(_report("full", modules, "app.ingest"))
+
+        assert [name for name in HEAVY_MODULES if name in modules] == []
+        assert not any(
+            name == "app.api" or name.startswith("app.features") for name in modules
+        )
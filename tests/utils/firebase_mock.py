@@ -156,9 +156,15 @@ class FirebaseRefMock:
         
         return self._mock.reference(child_path)
     
-    def get(self) -> Any:
-        """Get the value at this reference."""
-        return self._mock._get_nested_value(self._path)
+    def get(self, shallow: bool = False) -> Any:
+        """Get the value at this reference; children are True when shallow."""
+        value = self._mock._get_nested_value(self._path)
+        if shallow and isinstance(value, dict):
+            return {
+                key: True if isinstance(child, dict) else child
+                for key, child in value.items()
+            }
+        return value
     
     def set(self, value: Any) -> None:
         """Set the value at this reference."""